@@ -0,0 +1,137 @@
+""" Benchmark of magnetic field ramp profiles on the magnetic beam case.
+
+The magnetic beam case (magnetic_beam_case.py) is run with each ramp profile and
+a range of time steps. For each run, the number of time steps until the beam
+reaches steady state is reported, or whether the run became unstable.
+"""
+import time as timer
+import numpy as np
+from elastica import *
+from elastica.timestepper import extend_stepper_interface
+from magneto_pyelastica import *
+from magneto_pyelastica.utils import RAMP_PROFILES
+
+
+# benchmark params
+RAMP_INTERVAL = 100.0
+FINAL_TIME = 1000.0
+# time steps are dt_factor * dl, magnetic_beam_case.py uses 0.05
+DT_FACTORS = [0.05, 0.1, 0.2]
+# steady state is reached when velocity norm stays below the tolerance
+VELOCITY_TOLERANCE = 1e-4
+CHECK_EVERY = 100
+
+
+class MagneticBeamSimulator(BaseSystemCollection, Constraints, Forcing, Damping):
+    pass
+
+
+def run_magnetic_beam_case(ramp_profile, dt_factor):
+    """
+    Runs the magnetic beam case with given ramp profile and time step factor.
+
+    Returns
+    -------
+    steady_state_step : int or None
+        Time step where steady state is reached, None if it is not reached.
+    is_stable : bool
+        False if the simulation blows up.
+    """
+    magnetic_beam_sim = MagneticBeamSimulator()
+
+    # setting up test params, same as magnetic_beam_case.py
+    n_elem = 50
+    start = np.zeros((3,))
+    direction = np.array([1.0, 0.0, 0.0])
+    normal = np.array([0.0, 1.0, 0.0])
+    base_length = 6.0
+    base_radius = 0.15
+    density = 5000
+    E = 1e6
+    poisson_ratio = 0.5
+    shear_modulus = E / (2 * poisson_ratio + 1.0)
+
+    # setting up magnetic properties
+    magnetization_density = 1e5
+    magnetic_field_angle = 2 * np.pi / 3
+    magnetic_field = 1e-2
+    magnetization_direction = np.ones((n_elem)) * direction.reshape(3, 1)
+
+    magnetic_rod = CosseratRod.straight_rod(
+        n_elem,
+        start,
+        direction,
+        normal,
+        base_length,
+        base_radius,
+        density,
+        youngs_modulus=E,
+        shear_modulus=shear_modulus,
+    )
+    magnetic_beam_sim.append(magnetic_rod)
+    magnetic_beam_sim.constrain(magnetic_rod).using(
+        OneEndFixedBC, constrained_position_idx=(0,), constrained_director_idx=(0,)
+    )
+
+    magnetic_field_amplitude = magnetic_field * np.array(
+        [np.cos(magnetic_field_angle), np.sin(magnetic_field_angle), 0]
+    )
+    magnetic_field_object = ConstantMagneticField(
+        magnetic_field_amplitude,
+        ramp_interval=RAMP_INTERVAL,
+        start_time=0.0,
+        end_time=100000,
+        ramp_profile=ramp_profile,
+    )
+    magnetic_beam_sim.add_forcing_to(magnetic_rod).using(
+        MagneticForces,
+        external_magnetic_field=magnetic_field_object,
+        magnetization_density=magnetization_density,
+        magnetization_direction=magnetization_direction,
+        rod_volume=magnetic_rod.volume,
+        rod_director_collection=magnetic_rod.director_collection,
+    )
+
+    dl = base_length / n_elem
+    dt = dt_factor * dl
+    magnetic_beam_sim.dampen(magnetic_rod).using(
+        AnalyticalLinearDamper,
+        damping_constant=1.0,
+        time_step=dt,
+    )
+    magnetic_beam_sim.finalize()
+
+    timestepper = PositionVerlet()
+    do_step, stages_and_updates = extend_stepper_interface(
+        timestepper, magnetic_beam_sim
+    )
+    total_steps = int(FINAL_TIME / dt)
+    time = np.float64(0.0)
+    for step in range(1, total_steps + 1):
+        time = do_step(timestepper, stages_and_updates, magnetic_beam_sim, time, dt)
+        if step % CHECK_EVERY:
+            continue
+        velocity_norm = np.linalg.norm(magnetic_rod.velocity_collection)
+        if not np.isfinite(velocity_norm):
+            return None, False
+        if time > RAMP_INTERVAL and velocity_norm < VELOCITY_TOLERANCE:
+            return step, True
+    return None, True
+
+
+if __name__ == "__main__":
+    print(f"{'ramp profile':<14}{'dt factor':>10}{'steps':>12}{'wall time':>12}")
+    for ramp_profile in RAMP_PROFILES:
+        for dt_factor in DT_FACTORS:
+            tic = timer.perf_counter()
+            steady_state_step, is_stable = run_magnetic_beam_case(
+                ramp_profile, dt_factor
+            )
+            wall_time = timer.perf_counter() - tic
+            if not is_stable:
+                result = "unstable"
+            elif steady_state_step is None:
+                result = "not reached"
+            else:
+                result = str(steady_state_step)
+            print(f"{ramp_profile:<14}{dt_factor:>10}{result:>12}{wall_time:>11.1f}s")
@@ -13,6 +13,9 @@ class MagneticBeamSimulator(
 
 
 magnetic_beam_sim = MagneticBeamSimulator()
+# If True, the rods are the unit cell of an infinite carpet, and the magnetic
+# dipole interactions with all periodic images of the rods are included.
+periodic_carpet = False
 # setting up test params
 n_rods_x = 8
 n_rods_y = 4
@@ -48,13 +51,19 @@ magnetization_density = (
 )
 carpet_length_x = spacing_between_rods * (n_rods_x - 1)
 carpet_length_y = spacing_between_rods * (n_rods_y - 1)
-spatial_magnetisation_wavelength = carpet_length_x
+if periodic_carpet:
+    # magnetization pattern repeats with the unit cell
+    spatial_magnetisation_wavelength_x = spacing_between_rods * n_rods_x
+    spatial_magnetisation_wavelength_y = spacing_between_rods * n_rods_y
+else:
+    spatial_magnetisation_wavelength_x = carpet_length_x
+    spatial_magnetisation_wavelength_y = carpet_length_x
 spatial_magnetisation_phase_diff = np.pi
 magnetization_angle_x = spatial_magnetisation_phase_diff + (
-    2 * np.pi * start_collection[..., 0] / spatial_magnetisation_wavelength
+    2 * np.pi * start_collection[..., 0] / spatial_magnetisation_wavelength_x
 )
 magnetization_angle_y = spatial_magnetisation_phase_diff + (
-    2 * np.pi * start_collection[..., 1] / spatial_magnetisation_wavelength
+    2 * np.pi * start_collection[..., 1] / spatial_magnetisation_wavelength_y
 )
 magnetic_rod_list = []
 magnetization_direction_list = []
@@ -109,17 +118,25 @@ magnetic_field_object = SingleModeOscillatingMagneticField(
     end_time=5e3,
 )
 
-# Apply magnetic forces
-for magnetization_direction, magnetic_rod in zip(
-    magnetization_direction_list, magnetic_rod_list
-):
-    magnetic_beam_sim.add_forcing_to(magnetic_rod).using(
-        MagneticForces,
-        external_magnetic_field=magnetic_field_object,
+# Apply magnetic forces on all rods at once, field is evaluated once per step
+magnetic_beam_sim.add_forcing_to(magnetic_rod_list[0]).using(
+    CollectiveMagneticForces,
+    external_magnetic_field=magnetic_field_object,
+    rod_list=magnetic_rod_list,
+    magnetization_density=magnetization_density,
+    magnetization_direction=magnetization_direction_list,
+)
+
+if periodic_carpet:
+    # Dipole interactions of the rods and their periodic images, with the
+    # particle-mesh Ewald summation
+    magnetic_beam_sim.add_forcing_to(magnetic_rod_list[0]).using(
+        PeriodicMagneticDipoleInteraction,
+        rod_list=magnetic_rod_list,
         magnetization_density=magnetization_density,
-        magnetization_direction=magnetization_direction,
-        rod_volume=magnetic_rod.volume,
-        rod_director_collection=magnetic_rod.director_collection,
+        magnetization_direction=magnetization_direction_list,
+        domain_size=spacing_between_rods * np.array([n_rods_x, n_rods_y]),
+        cutoff_radius=spacing_between_rods,
     )
 
 # Add callbacks
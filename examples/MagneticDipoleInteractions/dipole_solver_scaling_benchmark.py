@@ -0,0 +1,151 @@
+""" Scaling benchmark of the magnetic dipole interaction solvers.
+
+Magnetized elements are laid out as a square carpet of vertical rods, and the
+dipole fields and forces of all elements are computed with the Barnes-Hut tree
+code for increasing numbers of elements, up to 10^6. For smaller carpets, the
+direct O(N^2) summation is also timed and used to report the tree code error.
+"""
+import time as timer
+import numpy as np
+from magneto_pyelastica.magnetic_interactions import (
+    _build_cell_list,
+    _compute_dipole_interactions_with_cell_list,
+    _build_octree,
+    _refit_octree,
+    _compute_dipole_interactions_with_octree,
+)
+
+
+# benchmark params
+N_ELEMS_PER_ROD = 25
+N_RODS_PER_SIDE = [10, 20, 40, 80, 200]
+MAX_DIRECT_N_ELEMS = 40000
+OPENING_ANGLE = 0.3
+LEAF_SIZE = 8
+MAX_DEPTH = 32
+ROD_SPACING = 1.0
+ROD_LENGTH = 5.0
+
+
+def make_carpet(n_rods_per_side):
+    n_rods = n_rods_per_side**2
+    rod_x, rod_y = np.meshgrid(
+        ROD_SPACING * np.arange(n_rods_per_side),
+        ROD_SPACING * np.arange(n_rods_per_side),
+        indexing="ij",
+    )
+    element_z = (np.arange(N_ELEMS_PER_ROD) + 0.5) * ROD_LENGTH / N_ELEMS_PER_ROD
+    positions = np.vstack(
+        (
+            np.repeat(rod_x.ravel(), N_ELEMS_PER_ROD),
+            np.repeat(rod_y.ravel(), N_ELEMS_PER_ROD),
+            np.tile(element_z, n_rods),
+        )
+    )
+    # tilted magnetization with some noise
+    magnetization = np.array([0.3, 0.0, 1.0]).reshape(3, 1) + 0.1 * np.random.randn(
+        3, positions.shape[1]
+    )
+    rod_index = np.repeat(np.arange(n_rods), N_ELEMS_PER_ROD).astype(np.int64)
+    element_offsets = (N_ELEMS_PER_ROD * np.arange(n_rods + 1)).astype(np.int64)
+    return positions, magnetization, rod_index, element_offsets
+
+
+def compute_direct(positions, magnetization, rod_index, element_offsets):
+    # a single cell with infinite cutoff is the direct summation over all pairs
+    (
+        grid_origin,
+        grid_shape,
+        cell_size,
+        cell_index,
+        cell_start,
+        cell_elements,
+    ) = _build_cell_list(positions, np.inf)
+    dipole_field = np.zeros_like(positions)
+    dipole_force = np.zeros_like(positions)
+    _compute_dipole_interactions_with_cell_list(
+        positions,
+        magnetization,
+        rod_index,
+        element_offsets,
+        True,
+        np.inf,
+        False,
+        grid_origin,
+        grid_shape,
+        cell_size,
+        cell_index,
+        cell_start,
+        cell_elements,
+        np.zeros(0, dtype=np.int64),
+        np.zeros((3, 0)),
+        np.zeros((3, 3, 0)),
+        dipole_field,
+        dipole_force,
+    )
+    return dipole_field, dipole_force
+
+
+def compute_barnes_hut(positions, magnetization, rod_index, element_offsets):
+    octree = _build_octree(positions, LEAF_SIZE, MAX_DEPTH)
+    (
+        node_centroid,
+        node_magnetization,
+        node_first_moment,
+        node_second_moment,
+        node_size,
+    ) = _refit_octree(positions, magnetization, octree[0], octree[2], octree[3])
+    dipole_field = np.zeros_like(positions)
+    dipole_force = np.zeros_like(positions)
+    _compute_dipole_interactions_with_octree(
+        positions,
+        magnetization,
+        rod_index,
+        element_offsets,
+        True,
+        OPENING_ANGLE,
+        MAX_DEPTH,
+        *octree,
+        node_centroid,
+        node_magnetization,
+        node_first_moment,
+        node_second_moment,
+        node_size,
+        dipole_field,
+        dipole_force,
+    )
+    return dipole_field, dipole_force
+
+
+if __name__ == "__main__":
+    # compile kernels
+    carpet = make_carpet(2)
+    compute_direct(*carpet)
+    compute_barnes_hut(*carpet)
+
+    print(
+        f"{'n_elems':>10}{'tree code':>12}{'direct':>12}{'field error':>14}"
+        f"{'force error':>14}"
+    )
+    for n_rods_per_side in N_RODS_PER_SIDE:
+        carpet = make_carpet(n_rods_per_side)
+        n_elems = carpet[0].shape[1]
+
+        tic = timer.perf_counter()
+        dipole_field, dipole_force = compute_barnes_hut(*carpet)
+        tree_code_time = timer.perf_counter() - tic
+
+        if n_elems <= MAX_DIRECT_N_ELEMS:
+            tic = timer.perf_counter()
+            correct_dipole_field, correct_dipole_force = compute_direct(*carpet)
+            direct_time = f"{timer.perf_counter() - tic:>11.3f}s"
+            field_error = f"{np.linalg.norm(dipole_field - correct_dipole_field) / np.linalg.norm(correct_dipole_field):>14.2e}"
+            force_error = f"{np.linalg.norm(dipole_force - correct_dipole_force) / np.linalg.norm(correct_dipole_force):>14.2e}"
+        else:
+            direct_time = f"{'-':>12}"
+            field_error = f"{'-':>14}"
+            force_error = f"{'-':>14}"
+        print(
+            f"{n_elems:>10}{tree_code_time:>11.3f}s{direct_time}{field_error}"
+            f"{force_error}"
+        )
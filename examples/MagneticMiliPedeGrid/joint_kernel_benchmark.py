@@ -0,0 +1,209 @@
+""" Micro-benchmark of the connection kernels of the magnetic millipede grid.
+
+Backbone rods are laid side by side and magnetic rods are connected with their
+tips to the backbones, as in the decapot grid. The time per joint of one
+force and torque evaluation is reported for one joint object per connection,
+as registered with the connect method of the simulator, and for the batched
+connections, which apply all joints with allocation free kernels in one call.
+"""
+import time as timer
+import numpy as np
+from elastica import CosseratRod
+from elastica.experimental.connection_contact_joint.parallel_connection import (
+    SurfaceJointSideBySide,
+)
+from magneto_pyelastica.connections import (
+    BatchedPerpendicularRodsConnection,
+    BatchedSurfaceJointSideBySide,
+    find_perpendicular_rods_connections,
+    find_side_by_side_connections,
+)
+from examples.MagneticMiliPedeGrid.connect_perpendicular_rods import (
+    PerpendicularRodsConnection,
+)
+
+
+# benchmark params
+N_BACKBONE_RODS = [2, 8, 32]
+N_ELEMS_BACKBONE = 40
+N_ELEMS_MAGNETIC_ROD = 10
+RADIUS = 0.1
+N_REPEATS = 200
+
+
+def make_grid(n_backbone_rods):
+    backbone_length = 2 * RADIUS * N_ELEMS_BACKBONE
+    backbone_rod_list = [
+        CosseratRod.straight_rod(
+            N_ELEMS_BACKBONE,
+            np.array([0.0, 2 * RADIUS * i, 0.0]),
+            np.array([1.0, 0.0, 0.0]),
+            np.array([0.0, 0.0, 1.0]),
+            backbone_length,
+            RADIUS,
+            1e3,
+            youngs_modulus=1e6,
+            shear_modulus=1e6 / 3.0,
+        )
+        for i in range(n_backbone_rods)
+    ]
+    # magnetic rods hang below the backbones, one per backbone element
+    magnetic_rod_length = 1.0
+    magnetic_rod_list = [
+        CosseratRod.straight_rod(
+            N_ELEMS_MAGNETIC_ROD,
+            np.array(
+                [(2 * i + 1) * RADIUS, 2 * RADIUS * j, -RADIUS - magnetic_rod_length]
+            ),
+            np.array([0.0, 0.0, 1.0]),
+            np.array([0.0, 1.0, 0.0]),
+            magnetic_rod_length,
+            RADIUS,
+            1e3,
+            youngs_modulus=1e6,
+            shear_modulus=1e6 / 3.0,
+        )
+        for j in range(n_backbone_rods)
+        for i in range(N_ELEMS_BACKBONE)
+    ]
+    return backbone_rod_list, magnetic_rod_list
+
+
+def perturb_rods(rod_list):
+    for rod in rod_list:
+        rod.position_collection += 1e-3 * np.random.randn(
+            *rod.position_collection.shape
+        )
+        rod.velocity_collection[...] = np.random.randn(*rod.velocity_collection.shape)
+
+
+def time_per_joint(apply_joints, n_joints):
+    # compile kernels
+    apply_joints()
+    tic = timer.perf_counter()
+    for _ in range(N_REPEATS):
+        apply_joints()
+    return (timer.perf_counter() - tic) / N_REPEATS / n_joints * 1e9
+
+
+def benchmark_side_by_side(backbone_rod_list):
+    connections = find_side_by_side_connections(
+        backbone_rod_list,
+        rod_one_index=np.arange(len(backbone_rod_list)),
+        rod_two_index=np.arange(len(backbone_rod_list)),
+    )
+    n_joints = connections["rod_one_index"].shape[0]
+    perturb_rods(backbone_rod_list)
+
+    joints = [
+        (
+            SurfaceJointSideBySide(
+                k=1e5,
+                nu=0.1,
+                k_repulsive=1e6,
+                rod_one_direction_vec_in_material_frame=connections[
+                    "rod_one_direction_vec_in_material_frame"
+                ][:, n : n + 1],
+                rod_two_direction_vec_in_material_frame=connections[
+                    "rod_two_direction_vec_in_material_frame"
+                ][:, n : n + 1],
+                offset_btw_rods=connections["offset_btw_rods"][n : n + 1],
+            ),
+            backbone_rod_list[connections["rod_one_index"][n]],
+            connections["rod_one_element_index"][n : n + 1],
+            backbone_rod_list[connections["rod_two_index"][n]],
+            connections["rod_two_element_index"][n : n + 1],
+        )
+        for n in range(n_joints)
+    ]
+
+    def apply_joint_objects():
+        for joint, rod_one, index_one, rod_two, index_two in joints:
+            joint.apply_forces(rod_one, index_one, rod_two, index_two, 0.0)
+            joint.apply_torques(rod_one, index_one, rod_two, index_two, 0.0)
+
+    batched_joint = BatchedSurfaceJointSideBySide(
+        rod_list=backbone_rod_list, k=1e5, nu=0.1, k_repulsive=1e6, **connections
+    )
+
+    def apply_batched_joint():
+        batched_joint.apply_forces(backbone_rod_list[0], 0.0)
+        batched_joint.apply_torques(backbone_rod_list[0], 0.0)
+
+    return (
+        n_joints,
+        time_per_joint(apply_joint_objects, n_joints),
+        time_per_joint(apply_batched_joint, n_joints),
+    )
+
+
+def benchmark_perpendicular(backbone_rod_list, magnetic_rod_list):
+    rod_list = backbone_rod_list + magnetic_rod_list
+    connections = find_perpendicular_rods_connections(
+        rod_list,
+        rod_one_index=np.arange(len(backbone_rod_list)),
+        rod_two_index=np.arange(len(backbone_rod_list), len(rod_list)),
+    )
+    n_joints = connections["rod_one_index"].shape[0]
+    perturb_rods(rod_list)
+
+    joints = [
+        (
+            PerpendicularRodsConnection(
+                k=1e5,
+                nu=0.1,
+                k_repulsive=1e4,
+                kt=1e4,
+                rod_one_direction_vec_in_material_frame=connections[
+                    "rod_one_direction_vec_in_material_frame"
+                ][:, n],
+                rod_two_direction_vec_in_material_frame=connections[
+                    "rod_two_direction_vec_in_material_frame"
+                ][:, n],
+                offset_btw_rods=connections["offset_btw_rods"][n],
+            ),
+            rod_list[connections["rod_one_index"][n]],
+            int(connections["rod_one_element_index"][n]),
+            rod_list[connections["rod_two_index"][n]],
+            int(connections["rod_two_element_index"][n]),
+        )
+        for n in range(n_joints)
+    ]
+
+    def apply_joint_objects():
+        for joint, rod_one, index_one, rod_two, index_two in joints:
+            joint.apply_forces(rod_one, index_one, rod_two, index_two)
+            joint.apply_torques(rod_one, index_one, rod_two, index_two)
+
+    batched_connection = BatchedPerpendicularRodsConnection(
+        rod_list=rod_list, k=1e5, nu=0.1, k_repulsive=1e4, kt=1e4, **connections
+    )
+
+    def apply_batched_connection():
+        batched_connection.apply_forces(rod_list[0], 0.0)
+        batched_connection.apply_torques(rod_list[0], 0.0)
+
+    return (
+        n_joints,
+        time_per_joint(apply_joint_objects, n_joints),
+        time_per_joint(apply_batched_connection, n_joints),
+    )
+
+
+if __name__ == "__main__":
+    print(f"{'joint':>14}{'n_joints':>10}{'per joint':>14}{'batched':>14}")
+    for n_backbone_rods in N_BACKBONE_RODS:
+        for name, (n_joints, joint_object_time, batched_time) in (
+            (
+                "side by side",
+                benchmark_side_by_side(make_grid(n_backbone_rods)[0]),
+            ),
+            (
+                "perpendicular",
+                benchmark_perpendicular(*make_grid(n_backbone_rods)),
+            ),
+        ):
+            print(
+                f"{name:>14}{n_joints:>10}{joint_object_time:>11.0f} ns"
+                f"{batched_time:>11.0f} ns"
+            )
@@ -1,21 +1,12 @@
 import numpy as np
 from elastica import *
 from magneto_pyelastica import *
-from elastica.experimental.connection_contact_joint.parallel_connection import (
-    SurfaceJointSideBySide,
-    get_connection_vector_straight_straight_rod,
-)
 
 from examples.post_processing import (
     plot_video_with_surface,
     plot_center_of_mass_position,
 )
-from examples.MagneticMiliPedeGrid.connect_perpendicular_rods import (
-    get_connection_vector_for_perpendicular_rods,
-    PerpendicularRodsConnection,
-)
 
-from elastica._linalg import _batch_norm
 from examples.MagneticMiliPedeGrid.interaction_plane_for_rod_tips import (
     IsotropicFrictionalPlaneForRodTips,
 )
@@ -232,203 +223,40 @@ rod_list += backbone_rod_list + backbone_rod_second_layer_list + magnetic_rod_li
 
 
 # Connections
-# Connect magnetic rods with their backbone
-for backbone_idx, back_bone_rod in enumerate(backbone_rod_list):
-    back_bone_rod_element_position = 0.5 * (
-        back_bone_rod.position_collection[:, 1:]
-        + back_bone_rod.position_collection[:, :-1]
-    )
-    magnetic_rod_connection_index = n_elem_magnetic_rod - 1
-    rod_one_direction_vec_in_material_frame_list = []
-    rod_two_direction_vec_in_material_frame_list = []
-    offset_btw_rods_list = []
-    for idx, magnetic_rod in enumerate(magnetic_rod_list):
-        magnetic_rod_tip_element_position = 0.5 * (
-            magnetic_rod.position_collection[:, magnetic_rod_connection_index]
-            + magnetic_rod.position_collection[:, magnetic_rod_connection_index + 1]
-        ).reshape(3, 1)
-
-        distance_btw_rods = _batch_norm(
-            back_bone_rod_element_position - magnetic_rod_tip_element_position
-        )
-        distance_btw_rods -= magnetic_rod.rest_lengths[-1] / 2 + back_bone_rod.radius[0]
-        if np.min(distance_btw_rods) > 1e-8:
-            # In this case rods are far from each other so no need for connection.
-            continue
-        back_bone_rod_connection_index = int(np.argmin(distance_btw_rods))
-
-        (
-            rod_one_direction_vec_in_material_frame,
-            rod_two_direction_vec_in_material_frame,
-            offset_btw_rods,
-        ) = get_connection_vector_for_perpendicular_rods(
-            back_bone_rod,
-            magnetic_rod,
-            rod_one_index=back_bone_rod_connection_index,
-            rod_two_index=magnetic_rod_connection_index,  # Since we are connecting at its tip we know the index
-        )
-
-        rod_one_direction_vec_in_material_frame_list.append(
-            rod_one_direction_vec_in_material_frame.copy()
-        )
-        rod_two_direction_vec_in_material_frame_list.append(
-            rod_two_direction_vec_in_material_frame.copy()
-        )
-        offset_btw_rods_list.append(offset_btw_rods)
-
-        magnetic_decapot_simulator.connect(
-            first_rod=back_bone_rod,
-            second_rod=magnetic_rod,
-            first_connect_idx=back_bone_rod_connection_index,
-            second_connect_idx=magnetic_rod_connection_index,
-        ).using(
-            PerpendicularRodsConnection,
-            k=1e6 / 10,  # * 10,
-            nu=0.1,
-            k_repulsive=1e4,
-            kt=1e4,  # * 10 * 10,
-            rod_one_direction_vec_in_material_frame=rod_one_direction_vec_in_material_frame,
-            rod_two_direction_vec_in_material_frame=rod_two_direction_vec_in_material_frame,
-            offset_btw_rods=offset_btw_rods,
-        )
-
-# Connect backbones using parallel connections.
-for rod_one_idx, rod_one in enumerate(backbone_rod_list):
-    for rod_two_idx in range(rod_one_idx + 1, len(backbone_rod_list[:])):
-        rod_two = backbone_rod_list[rod_two_idx]
-
-        assert (
-            rod_one.n_elems == rod_two.n_elems
-        ), " Backbone rods do not have same number of elements"
-
-        n_elem = rod_one.n_elems
-
-        (
-            rod_one_direction_vec_in_material_frame,
-            rod_two_direction_vec_in_material_frame,
-            offset_btw_rods,
-        ) = get_connection_vector_straight_straight_rod(
-            rod_one, rod_two, rod_one_idx=(0, n_elem), rod_two_idx=(0, n_elem)
-        )
-
-        if (
-            np.max(offset_btw_rods) > 1e-8
-        ):  # spacing_btw_magnetic_rods_in_one_backbone - 2 * rod_one.radius[0]:# 1e-8:
-            # In this case rods are far from each other so no need for connection.
-            continue
-
-        for elem_idx in range(n_elem):
-            magnetic_decapot_simulator.connect(
-                first_rod=rod_one,
-                second_rod=rod_two,
-                first_connect_idx=elem_idx,
-                second_connect_idx=elem_idx,
-            ).using(
-                SurfaceJointSideBySide,
-                k=1e5,
-                nu=0.1,
-                k_repulsive=1e6,
-                rod_one_direction_vec_in_material_frame=rod_one_direction_vec_in_material_frame[
-                    :, elem_idx
-                ],
-                rod_two_direction_vec_in_material_frame=rod_two_direction_vec_in_material_frame[
-                    :, elem_idx
-                ],
-                offset_btw_rods=offset_btw_rods[elem_idx],
-            )
-
-# Second backbone layer connection with each other
-for rod_one_idx, rod_one in enumerate(backbone_rod_second_layer_list):
-    for rod_two_idx in range(rod_one_idx + 1, len(backbone_rod_second_layer_list[:])):
-        rod_two = backbone_rod_second_layer_list[rod_two_idx]
-
-        assert (
-            rod_one.n_elems == rod_two.n_elems
-        ), " Backbone rods do not have same number of elements"
-
-        n_elem = rod_one.n_elems
-
-        (
-            rod_one_direction_vec_in_material_frame,
-            rod_two_direction_vec_in_material_frame,
-            offset_btw_rods,
-        ) = get_connection_vector_straight_straight_rod(
-            rod_one, rod_two, rod_one_idx=(0, n_elem), rod_two_idx=(0, n_elem)
-        )
-
-        if (
-            np.max(offset_btw_rods) > 1e-8
-        ):  # spacing_btw_magnetic_rods_in_one_backbone - 2 * rod_one.radius[0]:# 1e-8:
-            # In this case rods are far from each other so no need for connection.
-            continue
-
-        for elem_idx in range(n_elem):
-            magnetic_decapot_simulator.connect(
-                first_rod=rod_one,
-                second_rod=rod_two,
-                first_connect_idx=elem_idx,
-                second_connect_idx=elem_idx,
-            ).using(
-                SurfaceJointSideBySide,
-                k=1e5,
-                nu=0.1,
-                k_repulsive=1e6,
-                rod_one_direction_vec_in_material_frame=rod_one_direction_vec_in_material_frame[
-                    :, elem_idx
-                ],
-                rod_two_direction_vec_in_material_frame=rod_two_direction_vec_in_material_frame[
-                    :, elem_idx
-                ],
-                offset_btw_rods=offset_btw_rods[elem_idx],
-            )
-
-# Connect first layer and second layer backbones
-for rod_one_idx, rod_one in enumerate(backbone_rod_list):
-    rod_one_element_position = 0.5 * (
-        rod_one.position_collection[..., 1:] + rod_one.position_collection[..., :-1]
-    )
-
-    for rod_two_idx, rod_two in enumerate(backbone_rod_second_layer_list):
-        rod_two_element_position = 0.5 * (
-            rod_two.position_collection[..., 1:] + rod_two.position_collection[..., :-1]
-        )
+# Connect magnetic rods with their backbone, all connections are found and applied
+# at once
+connected_rod_list = backbone_rod_list + magnetic_rod_list
+magnetic_decapot_simulator.add_forcing_to(connected_rod_list[0]).using(
+    BatchedPerpendicularRodsConnection,
+    rod_list=connected_rod_list,
+    k=1e6 / 10,  # * 10,
+    nu=0.1,
+    k_repulsive=1e4,
+    kt=1e4,  # * 10 * 10,
+    **find_perpendicular_rods_connections(
+        connected_rod_list,
+        rod_one_index=np.arange(len(backbone_rod_list)),
+        rod_two_index=np.arange(len(backbone_rod_list), len(connected_rod_list)),
+        tolerance=1e-8,
+    ),
+)
 
-        for i in range(rod_two.n_elems):
-            rod_one_elem_idx = rod_two_idx
-            rod_two_elem_idx = i
-
-            (
-                rod_one_direction_vec_in_material_frame,
-                rod_two_direction_vec_in_material_frame,
-                offset_btw_rods,
-            ) = get_connection_vector_straight_straight_rod(
-                rod_one,
-                rod_two,
-                rod_one_idx=(rod_one_elem_idx, rod_one_elem_idx + 1),
-                rod_two_idx=(rod_two_elem_idx, rod_two_elem_idx + 1),
-            )
-
-            if offset_btw_rods > 1e-13:
-                continue
-
-            magnetic_decapot_simulator.connect(
-                first_rod=rod_one,
-                second_rod=rod_two,
-                first_connect_idx=rod_two_idx,
-                second_connect_idx=i,
-            ).using(
-                SurfaceJointSideBySide,
-                k=1e5,
-                nu=0.1,
-                k_repulsive=1e6,
-                rod_one_direction_vec_in_material_frame=rod_one_direction_vec_in_material_frame[
-                    ..., 0
-                ],
-                rod_two_direction_vec_in_material_frame=rod_two_direction_vec_in_material_frame[
-                    ..., 0
-                ],
-                offset_btw_rods=offset_btw_rods[..., 0],
-            )
+# Connect backbones of the first and second layers using parallel connections, all
+# touching backbone elements are found and connected at once
+backbone_layers_rod_list = backbone_rod_list + backbone_rod_second_layer_list
+magnetic_decapot_simulator.add_forcing_to(backbone_layers_rod_list[0]).using(
+    BatchedSurfaceJointSideBySide,
+    rod_list=backbone_layers_rod_list,
+    k=1e5,
+    nu=0.1,
+    k_repulsive=1e6,
+    **find_side_by_side_connections(
+        backbone_layers_rod_list,
+        rod_one_index=np.arange(len(backbone_layers_rod_list)),
+        rod_two_index=np.arange(len(backbone_layers_rod_list)),
+        tolerance=1e-8,
+    ),
+)
 
 
 # Create magnetic field object
@@ -445,18 +273,14 @@ magnetic_field_object = SingleModeOscillatingMagneticField(
     end_time=5e3,
 )
 
-# Apply magnetic forces
-for magnetization_direction, magnetic_rod in zip(
-    magnetization_direction_list, magnetic_rod_list
-):
-    magnetic_decapot_simulator.add_forcing_to(magnetic_rod).using(
-        MagneticForces,
-        external_magnetic_field=magnetic_field_object,
-        magnetization_density=magnetization_density,
-        magnetization_direction=magnetization_direction,
-        rod_volume=magnetic_rod.volume,
-        rod_director_collection=magnetic_rod.director_collection,
-    )
+# Apply magnetic forces on all magnetic rods at once
+magnetic_decapot_simulator.add_forcing_to(magnetic_rod_list[0]).using(
+    CollectiveMagneticForces,
+    external_magnetic_field=magnetic_field_object,
+    rod_list=magnetic_rod_list,
+    magnetization_density=magnetization_density,
+    magnetization_direction=magnetization_direction_list,
+)
 
 
 # Add gravitational forces
@@ -1,3 +1,6 @@
 from magneto_pyelastica.magnetic_field import *
 from magneto_pyelastica.magnetic_forces import *
+from magneto_pyelastica.magnetization_profile import *
 from magneto_pyelastica.utils import *
+from magneto_pyelastica.magnetic_interactions import *
+from magneto_pyelastica.connections import *
@@ -0,0 +1,1632 @@
+__doc__ = """ Module implementation for batched connections between Cosserat rods."""
+__all__ = [
+    "get_connection_vector_for_perpendicular_rods",
+    "get_connection_vectors_for_perpendicular_rods",
+    "find_perpendicular_rods_connections",
+    "find_side_by_side_connections",
+    "BatchedPerpendicularRodsConnection",
+    "BatchedSurfaceJointSideBySide",
+]
+
+from elastica.external_forces import NoForces
+from elastica.rod.cosserat_rod import CosseratRod
+from elastica._linalg import _batch_matvec, _batch_norm
+from itertools import product
+import numpy as np
+from numba import njit, types
+from numba.typed import List
+from typing import Union, Sequence
+
+
+def get_connection_vector_for_perpendicular_rods(
+    rod_one,
+    rod_two,
+    rod_one_index,
+    rod_two_index,
+):
+    """
+    This function computes the connection vectors in from rod one to rod two and rod two to rod one.
+    Here we are assuming rod two tip is connected with rod one. Becareful with rod orders.
+
+    Parameters
+    ----------
+    rod_one : rod object
+    rod_two : rod object
+    rod_one_index : int
+    rod_two_index : int
+
+    Returns
+    -------
+    rod_one_direction_vec_in_material_frame: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+        Direction from rod one to rod two, in the material frame of rod one.
+    rod_two_direction_vec_in_material_frame: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+        Direction from rod two to rod one, in the material frame of rod two.
+    offset_btw_rods: float
+        Distance between the surface of rod one and the tip of rod two.
+
+    """
+
+    # Compute positions of the connected rod elements
+    rod_one_element_position = 0.5 * (
+        rod_one.position_collection[:, rod_one_index]
+        + rod_one.position_collection[:, rod_one_index + 1]
+    )
+    rod_two_element_position = 0.5 * (
+        rod_two.position_collection[:, rod_two_index]
+        + rod_two.position_collection[:, rod_two_index + 1]
+    )
+
+    # Lets get the distance between rod elements
+    distance_vector_rod_one_to_rod_two = (
+        rod_two_element_position - rod_one_element_position
+    )
+    distance_vector_rod_one_to_rod_two_norm = np.linalg.norm(
+        distance_vector_rod_one_to_rod_two
+    )
+    distance_vector_rod_one_to_rod_two /= distance_vector_rod_one_to_rod_two_norm
+
+    distance_vector_rod_two_to_rod_one = -distance_vector_rod_one_to_rod_two
+
+    rod_one_direction_vec_in_material_frame = (
+        rod_one.director_collection[:, :, rod_one_index]
+        @ distance_vector_rod_one_to_rod_two
+    )
+
+    rod_two_direction_vec_in_material_frame = (
+        rod_two.director_collection[:, :, rod_two_index]
+        @ distance_vector_rod_two_to_rod_one
+    )
+
+    offset_btw_rods = distance_vector_rod_one_to_rod_two_norm - (
+        rod_one.radius[rod_one_index] + rod_two.lengths[rod_two_index] / 2
+    )
+
+    return (
+        rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame,
+        offset_btw_rods,
+    )
+
+
+def _get_element_collections(rod_list, rod_index):
+    """
+    This function stacks the element data of the rods in rod_index, which is
+    needed to find and compute the connections between them.
+    """
+    element_position = []
+    director_collection = []
+    radius = []
+    lengths = []
+    element_rod_index = []
+    element_index = []
+    for idx in rod_index:
+        rod = rod_list[idx]
+        element_position.append(
+            0.5 * (rod.position_collection[:, 1:] + rod.position_collection[:, :-1])
+        )
+        director_collection.append(rod.director_collection)
+        radius.append(rod.radius)
+        lengths.append(rod.lengths)
+        element_rod_index.append(np.full((rod.n_elems,), idx, dtype=np.int64))
+        element_index.append(np.arange(rod.n_elems))
+    return (
+        np.hstack(element_position),
+        np.concatenate(director_collection, axis=2),
+        np.hstack(radius),
+        np.hstack(lengths),
+        np.hstack(element_rod_index),
+        np.hstack(element_index),
+    )
+
+
+def _find_close_element_pairs(
+    element_position_one,
+    element_size_one,
+    element_position_two,
+    element_size_two,
+    tolerance,
+):
+    """
+    This function finds the element pairs whose gap, the distance between element
+    centers minus the element sizes, is below the tolerance. Elements two are
+    binned into a uniform grid with cells larger than the largest contact
+    distance, so only the neighbouring cells of each element one are searched.
+
+    Parameters
+    ----------
+    element_position_one: numpy.ndarray
+        2D (dim, n_elems_one) array containing data with 'float' type.
+    element_size_one: numpy.ndarray
+        1D (n_elems_one,) array containing data with 'float' type.
+    element_position_two: numpy.ndarray
+        2D (dim, n_elems_two) array containing data with 'float' type.
+    element_size_two: numpy.ndarray
+        1D (n_elems_two,) array containing data with 'float' type.
+    tolerance: float
+
+    Returns
+    -------
+    index_one: numpy.ndarray
+        1D (n_pairs,) array containing data with 'int' type.
+    index_two: numpy.ndarray
+        1D (n_pairs,) array containing data with 'int' type.
+    gap: numpy.ndarray
+        1D (n_pairs,) array containing data with 'float' type.
+
+    """
+    cell_size = element_size_one.max() + element_size_two.max() + tolerance
+    origin = np.minimum(
+        element_position_one.min(axis=1), element_position_two.min(axis=1)
+    ).reshape(3, 1)
+    # cells are shifted by one, so that neighbouring cells have positive indices
+    cell_one = (
+        np.floor((element_position_one - origin) / cell_size).astype(np.int64) + 1
+    )
+    cell_two = (
+        np.floor((element_position_two - origin) / cell_size).astype(np.int64) + 1
+    )
+    n_cells = tuple(np.maximum(cell_one.max(axis=1), cell_two.max(axis=1)) + 2)
+    cell_key_two = np.ravel_multi_index(cell_two, n_cells)
+    order_two = np.argsort(cell_key_two, kind="stable")
+    sorted_cell_key_two = cell_key_two[order_two]
+
+    index_one_list = []
+    index_two_list = []
+    for cell_offset in product((-1, 0, 1), repeat=3):
+        neighbour_cell_key = np.ravel_multi_index(
+            cell_one + np.array(cell_offset).reshape(3, 1), n_cells
+        )
+        start = np.searchsorted(sorted_cell_key_two, neighbour_cell_key, side="left")
+        end = np.searchsorted(sorted_cell_key_two, neighbour_cell_key, side="right")
+        n_neighbours = end - start
+        index_one = np.repeat(np.arange(n_neighbours.shape[0]), n_neighbours)
+        position_in_cell = np.arange(index_one.shape[0]) - np.repeat(
+            np.cumsum(n_neighbours) - n_neighbours, n_neighbours
+        )
+        index_one_list.append(index_one)
+        index_two_list.append(
+            order_two[np.repeat(start, n_neighbours) + position_in_cell]
+        )
+    index_one = np.hstack(index_one_list)
+    index_two = np.hstack(index_two_list)
+
+    gap = _batch_norm(
+        element_position_two[:, index_two] - element_position_one[:, index_one]
+    ) - (element_size_one[index_one] + element_size_two[index_two])
+    is_close = gap <= tolerance
+    return index_one[is_close], index_two[is_close], gap[is_close]
+
+
+def _get_connection_vectors(
+    rod_one_element_position,
+    rod_one_director_collection,
+    rod_two_element_position,
+    rod_two_director_collection,
+):
+    """
+    This function computes the connection directions between element centers in
+    the material frames of the elements, and the distances between the centers.
+    """
+    distance_vector_rod_one_to_rod_two = (
+        rod_two_element_position - rod_one_element_position
+    )
+    distance_btw_rods = _batch_norm(distance_vector_rod_one_to_rod_two)
+    distance_vector_rod_one_to_rod_two /= distance_btw_rods
+
+    rod_one_direction_vec_in_material_frame = _batch_matvec(
+        rod_one_director_collection, distance_vector_rod_one_to_rod_two
+    )
+    rod_two_direction_vec_in_material_frame = _batch_matvec(
+        rod_two_director_collection, -distance_vector_rod_one_to_rod_two
+    )
+    return (
+        rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame,
+        distance_btw_rods,
+    )
+
+
+def _check_connection_indices(
+    rod_list, rod_one_index, rod_one_element_index, rod_two_index, rod_two_element_index
+):
+    """
+    This function checks the connection indices and returns them as integer
+    arrays.
+    """
+    rod_one_index = np.asarray(rod_one_index, dtype=np.int64)
+    n_connections = rod_one_index.shape[0] if rod_one_index.ndim == 1 else -1
+    connection_indices = (
+        rod_one_index,
+        np.asarray(rod_one_element_index, dtype=np.int64),
+        np.asarray(rod_two_index, dtype=np.int64),
+        np.asarray(rod_two_element_index, dtype=np.int64),
+    )
+    for index in connection_indices:
+        if index.shape != (n_connections,):
+            raise ValueError(
+                "Invalid connection indices! Should be arrays of shape "
+                "(num_connections,)"
+            )
+    rod_index = np.hstack((connection_indices[0], connection_indices[2]))
+    if n_connections and (rod_index.min() < 0 or rod_index.max() >= len(rod_list)):
+        raise ValueError(
+            "Invalid connection indices! Rod indices should be in the rod_list"
+        )
+    return connection_indices
+
+
+def get_connection_vectors_for_perpendicular_rods(
+    rod_list: Sequence[CosseratRod],
+    rod_one_index: np.ndarray,
+    rod_one_element_index: np.ndarray,
+    rod_two_index: np.ndarray,
+    rod_two_element_index: np.ndarray,
+):
+    """
+    This function computes the connection vectors of many connections between
+    perpendicular rods, i.e. the batched version of
+    get_connection_vector_for_perpendicular_rods. Element centers are computed
+    once for each connected rod, and connection vectors of all connections in
+    one vectorized pass.
+    Here we are assuming rod two tip is connected with rod one. Becareful with rod
+    orders.
+
+    Parameters
+    ----------
+    rod_list: list
+        List of rod objects.
+    rod_one_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+        Index of rod one of the connections in the rod_list.
+    rod_one_element_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+        Connected element of rod one.
+    rod_two_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+        Index of rod two of the connections in the rod_list.
+    rod_two_element_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+        Connected element of rod two, usually its tip element.
+
+    Returns
+    -------
+    rod_one_direction_vec_in_material_frame: numpy.ndarray
+        2D (dim, n_connections) array containing data with 'float' type.
+        Direction from rod one to rod two, in the material frame of rod one.
+    rod_two_direction_vec_in_material_frame: numpy.ndarray
+        2D (dim, n_connections) array containing data with 'float' type.
+        Direction from rod two to rod one, in the material frame of rod two.
+    offset_btw_rods: numpy.ndarray
+        1D (n_connections,) array containing data with 'float' type.
+        Distance between the surface of rod one and the tip of rod two.
+
+    """
+    (
+        rod_one_index,
+        rod_one_element_index,
+        rod_two_index,
+        rod_two_element_index,
+    ) = _check_connection_indices(
+        rod_list,
+        rod_one_index,
+        rod_one_element_index,
+        rod_two_index,
+        rod_two_element_index,
+    )
+    n_connections = rod_one_index.shape[0]
+    if n_connections == 0:
+        return np.zeros((3, 0)), np.zeros((3, 0)), np.zeros((0,))
+
+    # element data of each connected rod is stacked once
+    connected_rod_index, connected_rod_position = np.unique(
+        np.hstack((rod_one_index, rod_two_index)), return_inverse=True
+    )
+    (
+        element_position,
+        director_collection,
+        radius,
+        lengths,
+        _,
+        _,
+    ) = _get_element_collections(rod_list, connected_rod_index)
+    first_element_index = np.cumsum(
+        [0] + [rod_list[idx].n_elems for idx in connected_rod_index[:-1]]
+    )
+    index_one = (
+        first_element_index[connected_rod_position[:n_connections]]
+        + rod_one_element_index
+    )
+    index_two = (
+        first_element_index[connected_rod_position[n_connections:]]
+        + rod_two_element_index
+    )
+
+    (
+        rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame,
+        distance_btw_rods,
+    ) = _get_connection_vectors(
+        element_position[:, index_one],
+        director_collection[:, :, index_one],
+        element_position[:, index_two],
+        director_collection[:, :, index_two],
+    )
+    offset_btw_rods = distance_btw_rods - (radius[index_one] + lengths[index_two] / 2)
+
+    return (
+        rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame,
+        offset_btw_rods,
+    )
+
+
+def find_perpendicular_rods_connections(
+    rod_list: Sequence[CosseratRod],
+    rod_one_index: Sequence[int],
+    rod_two_index: Sequence[int],
+    tolerance: float = 1e-8,
+):
+    """
+    This function finds the connections between the tip elements of rods two and
+    the elements of rods one, i.e. magnetic rods and their backbone, and computes
+    their connection vectors. The tip of a rod two is connected to the closest
+    element of each rod one, if its gap to the rod one surface is below the
+    tolerance. Elements are binned into a uniform grid, so the cost scales with
+    the number of elements instead of the number of rod pairs.
+
+    Parameters
+    ----------
+    rod_list: list
+        List of rod objects.
+    rod_one_index: list or numpy.ndarray
+        Indices of rods one in the rod_list.
+    rod_two_index: list or numpy.ndarray
+        Indices of rods two in the rod_list, connected at their tips.
+    tolerance: float
+        Largest gap between the rod one surface and the rod two tip.
+
+    Returns
+    -------
+    connections: dict
+        Connection indices and vectors, keyed by the keyword arguments of
+        BatchedPerpendicularRodsConnection.
+
+    """
+    (
+        rod_one_element_position,
+        rod_one_director_collection,
+        rod_one_radius,
+        _,
+        rod_one_element_rod_index,
+        rod_one_element_index,
+    ) = _get_element_collections(rod_list, rod_one_index)
+    (
+        rod_two_element_position,
+        rod_two_director_collection,
+        _,
+        rod_two_lengths,
+        rod_two_element_rod_index,
+        rod_two_element_index,
+    ) = _get_element_collections(rod_list, rod_two_index)
+    # only tip elements of rods two are connected
+    is_tip = np.hstack([rod_two_element_index[1:] == 0, np.ones((1,), dtype=np.bool_)])
+    tip = np.flatnonzero(is_tip)
+
+    index_one, index_two, gap = _find_close_element_pairs(
+        rod_one_element_position,
+        rod_one_radius,
+        rod_two_element_position[:, tip],
+        rod_two_lengths[tip] / 2,
+        tolerance,
+    )
+    index_two = tip[index_two]
+    is_connected = (
+        rod_one_element_rod_index[index_one] != rod_two_element_rod_index[index_two]
+    )
+    index_one = index_one[is_connected]
+    index_two = index_two[is_connected]
+    gap = gap[is_connected]
+
+    # keep the closest rod one element for each pair of rods
+    order = np.lexsort(
+        (
+            gap,
+            rod_two_element_rod_index[index_two],
+            rod_one_element_rod_index[index_one],
+        )
+    )
+    index_one = index_one[order]
+    index_two = index_two[order]
+    rod_pair = np.vstack(
+        (rod_one_element_rod_index[index_one], rod_two_element_rod_index[index_two])
+    )
+    is_closest = np.hstack(
+        [
+            np.ones((min(1, order.shape[0]),), dtype=np.bool_),
+            np.any(np.diff(rod_pair), axis=0),
+        ]
+    )
+    index_one = index_one[is_closest]
+    index_two = index_two[is_closest]
+
+    (
+        rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame,
+        distance_btw_rods,
+    ) = _get_connection_vectors(
+        rod_one_element_position[:, index_one],
+        rod_one_director_collection[:, :, index_one],
+        rod_two_element_position[:, index_two],
+        rod_two_director_collection[:, :, index_two],
+    )
+    return dict(
+        rod_one_index=rod_one_element_rod_index[index_one],
+        rod_one_element_index=rod_one_element_index[index_one],
+        rod_two_index=rod_two_element_rod_index[index_two],
+        rod_two_element_index=rod_two_element_index[index_two],
+        rod_one_direction_vec_in_material_frame=rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame=rod_two_direction_vec_in_material_frame,
+        offset_btw_rods=distance_btw_rods
+        - (rod_one_radius[index_one] + rod_two_lengths[index_two] / 2),
+    )
+
+
+def find_side_by_side_connections(
+    rod_list: Sequence[CosseratRod],
+    rod_one_index: Sequence[int],
+    rod_two_index: Sequence[int],
+    tolerance: float = 1e-8,
+):
+    """
+    This function finds the side by side connections between the elements of
+    rods one and rods two, i.e. touching backbone rods, and computes their
+    connection vectors. Two elements are connected if the gap between their
+    surfaces is below the tolerance. Elements are binned into a uniform grid, so
+    the cost scales with the number of elements instead of the number of rod
+    pairs.
+
+    Parameters
+    ----------
+    rod_list: list
+        List of rod objects.
+    rod_one_index: list or numpy.ndarray
+        Indices of rods one in the rod_list.
+    rod_two_index: list or numpy.ndarray
+        Indices of rods two in the rod_list. Rods can be both rod one and rod two,
+        each pair of rods is connected once.
+    tolerance: float
+        Largest gap between the rod surfaces.
+
+    Returns
+    -------
+    connections: dict
+        Connection indices and vectors, keyed by the keyword arguments of
+        BatchedSurfaceJointSideBySide.
+
+    """
+    (
+        rod_one_element_position,
+        rod_one_director_collection,
+        rod_one_radius,
+        _,
+        rod_one_element_rod_index,
+        rod_one_element_index,
+    ) = _get_element_collections(rod_list, rod_one_index)
+    (
+        rod_two_element_position,
+        rod_two_director_collection,
+        rod_two_radius,
+        _,
+        rod_two_element_rod_index,
+        rod_two_element_index,
+    ) = _get_element_collections(rod_list, rod_two_index)
+
+    index_one, index_two, _ = _find_close_element_pairs(
+        rod_one_element_position,
+        rod_one_radius,
+        rod_two_element_position,
+        rod_two_radius,
+        tolerance,
+    )
+    rod_one = rod_one_element_rod_index[index_one]
+    rod_two = rod_two_element_rod_index[index_two]
+    # pairs found in both orders are kept once
+    is_found_twice = np.isin(rod_one, rod_two_index) & np.isin(rod_two, rod_one_index)
+    is_connected = (rod_one != rod_two) & ~(is_found_twice & (rod_one > rod_two))
+    index_one = index_one[is_connected]
+    index_two = index_two[is_connected]
+    # connections of the same pair of rods are consecutive, so that the batched
+    # connection looks up their rod arrays once
+    order = np.lexsort(
+        (
+            rod_one_element_index[index_one],
+            rod_two_element_rod_index[index_two],
+            rod_one_element_rod_index[index_one],
+        )
+    )
+    index_one = index_one[order]
+    index_two = index_two[order]
+
+    (
+        rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame,
+        distance_btw_rods,
+    ) = _get_connection_vectors(
+        rod_one_element_position[:, index_one],
+        rod_one_director_collection[:, :, index_one],
+        rod_two_element_position[:, index_two],
+        rod_two_director_collection[:, :, index_two],
+    )
+    return dict(
+        rod_one_index=rod_one_element_rod_index[index_one],
+        rod_one_element_index=rod_one_element_index[index_one],
+        rod_two_index=rod_two_element_rod_index[index_two],
+        rod_two_element_index=rod_two_element_index[index_two],
+        rod_one_direction_vec_in_material_frame=rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame=rod_two_direction_vec_in_material_frame,
+        offset_btw_rods=distance_btw_rods
+        - (rod_one_radius[index_one] + rod_two_radius[index_two]),
+    )
+
+
+def _expand_connection_parameter(parameter, n_connections):
+    parameter = np.asarray(parameter, dtype=np.float64)
+    if parameter.shape not in ((), (n_connections,)):
+        raise ValueError(
+            "Invalid connection parameter! Should be either a float or an array of "
+            "shape (num_connections,)"
+        )
+    return parameter * np.ones((n_connections,))
+
+
+class _BatchedRodsConnection(NoForces):
+    """
+    This is the base class for batched connections between rod elements, which
+    stores the connections as index and parameter arrays, and the rod arrays as
+    typed lists for the compiled kernels.
+
+    Notes
+    -----
+    Rod arrays are looked up again only when the rods change from one connection
+    to the next, so connections of the same pair of rods should be consecutive,
+    as returned by the find connections functions.
+    """
+
+    def __init__(
+        self,
+        rod_list: Sequence[CosseratRod],
+        rod_one_index: np.ndarray,
+        rod_one_element_index: np.ndarray,
+        rod_two_index: np.ndarray,
+        rod_two_element_index: np.ndarray,
+        k: Union[float, np.ndarray],
+        nu: Union[float, np.ndarray],
+        k_repulsive: Union[float, np.ndarray],
+        rod_one_direction_vec_in_material_frame: np.ndarray,
+        rod_two_direction_vec_in_material_frame: np.ndarray,
+        offset_btw_rods: np.ndarray,
+    ):
+        super(_BatchedRodsConnection, self).__init__()
+        self.rod_list = list(rod_list)
+        (
+            self.rod_one_index,
+            self.rod_one_element_index,
+            self.rod_two_index,
+            self.rod_two_element_index,
+        ) = _check_connection_indices(
+            self.rod_list,
+            rod_one_index,
+            rod_one_element_index,
+            rod_two_index,
+            rod_two_element_index,
+        )
+        n_connections = self.rod_one_index.shape[0]
+
+        self.k = _expand_connection_parameter(k, n_connections)
+        self.nu = _expand_connection_parameter(nu, n_connections)
+        self.k_repulsive = _expand_connection_parameter(k_repulsive, n_connections)
+        self.offset_btw_rods = _expand_connection_parameter(
+            offset_btw_rods, n_connections
+        )
+        self.rod_one_direction_vec_in_material_frame = np.asarray(
+            rod_one_direction_vec_in_material_frame, dtype=np.float64
+        ).reshape(3, n_connections)
+        self.rod_two_direction_vec_in_material_frame = np.asarray(
+            rod_two_direction_vec_in_material_frame, dtype=np.float64
+        ).reshape(3, n_connections)
+
+        # typed lists of the rod arrays, rebuilt if the rods are moved into a
+        # memory block
+        self._first_rod_director_collection = None
+
+    def _update_rod_array_lists(self):
+        array_1d = types.Array(types.float64, 1, "A")
+        array_2d = types.Array(types.float64, 2, "A")
+        array_3d = types.Array(types.float64, 3, "A")
+        self._director_collection_list = List.empty_list(array_3d)
+        self._position_collection_list = List.empty_list(array_2d)
+        self._velocity_collection_list = List.empty_list(array_2d)
+        self._radius_list = List.empty_list(array_1d)
+        self._lengths_list = List.empty_list(array_1d)
+        self._dilatation_list = List.empty_list(array_1d)
+        self._external_forces_list = List.empty_list(array_2d)
+        self._external_torques_list = List.empty_list(array_2d)
+        for rod in self.rod_list:
+            self._director_collection_list.append(rod.director_collection)
+            self._position_collection_list.append(rod.position_collection)
+            self._velocity_collection_list.append(rod.velocity_collection)
+            self._radius_list.append(rod.radius)
+            self._lengths_list.append(rod.lengths)
+            self._dilatation_list.append(rod.dilatation)
+            self._external_forces_list.append(rod.external_forces)
+            self._external_torques_list.append(rod.external_torques)
+        self._first_rod_director_collection = self.rod_list[0].director_collection
+
+    def apply_torques(self, rod: CosseratRod, time: np.float64 = 0.0):
+        # torques are applied with the forces in apply_forces
+        pass
+
+
+class BatchedPerpendicularRodsConnection(_BatchedRodsConnection):
+    """
+    This class connects the tip elements of rods to elements of perpendicular
+    rods, i.e. magnetic rods to their backbone, for all connections at once. Each
+    connection is a spring-damper between the surface of rod one and the tip of
+    rod two, with a Hertzian contact force if the rods penetrate each other, and
+    a torsional spring keeping the rods perpendicular.
+
+        Attributes
+        ----------
+        rod_list: list
+            List of the connected rod objects.
+        rod_one_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Index of rod one of the connections in the rod_list.
+        rod_one_element_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Connected element of rod one.
+        rod_two_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Index of rod two of the connections in the rod_list.
+        rod_two_element_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Connected element of rod two, usually its tip element.
+        k: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Spring constant of the connections.
+        nu: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Damping constant of the connections.
+        k_repulsive: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Contact stiffness of the connections.
+        kt: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Torsional spring constant of the connections.
+        rod_one_direction_vec_in_material_frame: numpy.ndarray
+            2D (dim, n_connections) array containing data with 'float' type.
+            Direction from rod one to rod two, in the material frame of rod one.
+        rod_two_direction_vec_in_material_frame: numpy.ndarray
+            2D (dim, n_connections) array containing data with 'float' type.
+            Direction from rod two to rod one, in the material frame of rod two.
+        offset_btw_rods: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Rest distance between the surface of rod one and the tip of rod two.
+
+    Notes
+    -----
+    This forcing class has to be added to only one of the rods in the rod_list, i.e.
+    `simulator.add_forcing_to(rod_list[0]).using(BatchedPerpendicularRodsConnection,
+    ...)`. Forces and torques of all connections are computed in apply_forces, in
+    one compiled pass, and apply_torques does nothing.
+
+    """
+
+    def __init__(
+        self,
+        rod_list: Sequence[CosseratRod],
+        rod_one_index: np.ndarray,
+        rod_one_element_index: np.ndarray,
+        rod_two_index: np.ndarray,
+        rod_two_element_index: np.ndarray,
+        k: Union[float, np.ndarray],
+        nu: Union[float, np.ndarray],
+        k_repulsive: Union[float, np.ndarray],
+        kt: Union[float, np.ndarray],
+        rod_one_direction_vec_in_material_frame: np.ndarray,
+        rod_two_direction_vec_in_material_frame: np.ndarray,
+        offset_btw_rods: np.ndarray,
+    ):
+        """
+        Parameters
+        ----------
+        rod_list: list
+            List of the connected rod objects.
+        rod_one_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Index of rod one of the connections in the rod_list.
+        rod_one_element_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Connected element of rod one.
+        rod_two_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Index of rod two of the connections in the rod_list.
+        rod_two_element_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Connected element of rod two, usually its tip element.
+        k: float or numpy.ndarray
+            Float number or 1D (n_connections,) array containing data with 'float'
+            type. Spring constant of the connections.
+        nu: float or numpy.ndarray
+            Float number or 1D (n_connections,) array containing data with 'float'
+            type. Damping constant of the connections.
+        k_repulsive: float or numpy.ndarray
+            Float number or 1D (n_connections,) array containing data with 'float'
+            type. Contact stiffness of the connections.
+        kt: float or numpy.ndarray
+            Float number or 1D (n_connections,) array containing data with 'float'
+            type. Torsional spring constant of the connections.
+        rod_one_direction_vec_in_material_frame: numpy.ndarray
+            2D (dim, n_connections) array containing data with 'float' type.
+            Direction from rod one to rod two, in the material frame of rod one.
+        rod_two_direction_vec_in_material_frame: numpy.ndarray
+            2D (dim, n_connections) array containing data with 'float' type.
+            Direction from rod two to rod one, in the material frame of rod two.
+        offset_btw_rods: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Rest distance between the surface of rod one and the tip of rod two.
+
+        """
+        super(BatchedPerpendicularRodsConnection, self).__init__(
+            rod_list=rod_list,
+            rod_one_index=rod_one_index,
+            rod_one_element_index=rod_one_element_index,
+            rod_two_index=rod_two_index,
+            rod_two_element_index=rod_two_element_index,
+            k=k,
+            nu=nu,
+            k_repulsive=k_repulsive,
+            rod_one_direction_vec_in_material_frame=rod_one_direction_vec_in_material_frame,
+            rod_two_direction_vec_in_material_frame=rod_two_direction_vec_in_material_frame,
+            offset_btw_rods=offset_btw_rods,
+        )
+        self.kt = _expand_connection_parameter(kt, self.k.shape[0])
+
+    def apply_forces(self, rod: CosseratRod, time: np.float64 = 0.0):
+        if (
+            self._first_rod_director_collection
+            is not self.rod_list[0].director_collection
+        ):
+            self._update_rod_array_lists()
+
+        _apply_perpendicular_rods_connections(
+            self.rod_one_index,
+            self.rod_one_element_index,
+            self.rod_two_index,
+            self.rod_two_element_index,
+            self.k,
+            self.nu,
+            self.k_repulsive,
+            self.kt,
+            self.rod_one_direction_vec_in_material_frame,
+            self.rod_two_direction_vec_in_material_frame,
+            self.offset_btw_rods,
+            self._director_collection_list,
+            self._position_collection_list,
+            self._velocity_collection_list,
+            self._radius_list,
+            self._lengths_list,
+            self._dilatation_list,
+            self._external_forces_list,
+            self._external_torques_list,
+        )
+
+
+@njit(cache=True, error_model="numpy")
+def _apply_perpendicular_rods_connections(
+    rod_one_index,
+    rod_one_element_index,
+    rod_two_index,
+    rod_two_element_index,
+    k,
+    nu,
+    k_repulsive,
+    kt,
+    rod_one_direction_vec_in_material_frame,
+    rod_two_direction_vec_in_material_frame,
+    rest_offset_btw_rods,
+    director_collection_list,
+    position_collection_list,
+    velocity_collection_list,
+    radius_list,
+    lengths_list,
+    dilatation_list,
+    external_forces_list,
+    external_torques_list,
+):
+    """
+    This function computes the connection forces and torques of all perpendicular
+    rod connections, and adds them in place to the external forces and torques of
+    the rods. Connections are processed sequentially, since several connections
+    can share the same rod.
+
+    Parameters
+    ----------
+    rod_one_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+    rod_one_element_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+    rod_two_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+    rod_two_element_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+    k: numpy.ndarray
+        1D (n_connections,) array containing data with 'float' type.
+    nu: numpy.ndarray
+        1D (n_connections,) array containing data with 'float' type.
+    k_repulsive: numpy.ndarray
+        1D (n_connections,) array containing data with 'float' type.
+    kt: numpy.ndarray
+        1D (n_connections,) array containing data with 'float' type.
+    rod_one_direction_vec_in_material_frame: numpy.ndarray
+        2D (dim, n_connections) array containing data with 'float' type.
+    rod_two_direction_vec_in_material_frame: numpy.ndarray
+        2D (dim, n_connections) array containing data with 'float' type.
+    rest_offset_btw_rods: numpy.ndarray
+        1D (n_connections,) array containing data with 'float' type.
+    director_collection_list: numba.typed.List
+        Director collections of the rods.
+    position_collection_list: numba.typed.List
+        Position collections of the rods.
+    velocity_collection_list: numba.typed.List
+        Velocity collections of the rods.
+    radius_list: numba.typed.List
+        Element radii of the rods.
+    lengths_list: numba.typed.List
+        Element lengths of the rods.
+    dilatation_list: numba.typed.List
+        Element dilatations of the rods.
+    external_forces_list: numba.typed.List
+        External forces of the rods, in the lab frame.
+    external_torques_list: numba.typed.List
+        External torques of the rods, in the material frame.
+
+    """
+    n_connections = rod_one_index.shape[0]
+    if n_connections == 0:
+        return
+    # typed list look ups are costly, rod arrays are only looked up again when the
+    # rods change from one connection to the next
+    rod_one = rod_one_index[0]
+    rod_one_director_collection = director_collection_list[rod_one]
+    rod_one_position_collection = position_collection_list[rod_one]
+    rod_one_velocity_collection = velocity_collection_list[rod_one]
+    rod_one_radius = radius_list[rod_one]
+    rod_one_dilatation = dilatation_list[rod_one]
+    rod_one_external_forces = external_forces_list[rod_one]
+    rod_one_external_torques = external_torques_list[rod_one]
+    rod_two = rod_two_index[0]
+    rod_two_director_collection = director_collection_list[rod_two]
+    rod_two_position_collection = position_collection_list[rod_two]
+    rod_two_velocity_collection = velocity_collection_list[rod_two]
+    rod_two_lengths = lengths_list[rod_two]
+    rod_two_dilatation = dilatation_list[rod_two]
+    rod_two_external_forces = external_forces_list[rod_two]
+    rod_two_external_torques = external_torques_list[rod_two]
+    for n in range(n_connections):
+        if rod_one_index[n] != rod_one:
+            rod_one = rod_one_index[n]
+            rod_one_director_collection = director_collection_list[rod_one]
+            rod_one_position_collection = position_collection_list[rod_one]
+            rod_one_velocity_collection = velocity_collection_list[rod_one]
+            rod_one_radius = radius_list[rod_one]
+            rod_one_dilatation = dilatation_list[rod_one]
+            rod_one_external_forces = external_forces_list[rod_one]
+            rod_one_external_torques = external_torques_list[rod_one]
+        if rod_two_index[n] != rod_two:
+            rod_two = rod_two_index[n]
+            rod_two_director_collection = director_collection_list[rod_two]
+            rod_two_position_collection = position_collection_list[rod_two]
+            rod_two_velocity_collection = velocity_collection_list[rod_two]
+            rod_two_lengths = lengths_list[rod_two]
+            rod_two_dilatation = dilatation_list[rod_two]
+            rod_two_external_forces = external_forces_list[rod_two]
+            rod_two_external_torques = external_torques_list[rod_two]
+        _apply_perpendicular_rods_joint(
+            k[n],
+            nu[n],
+            k_repulsive[n],
+            kt[n],
+            rod_one_direction_vec_in_material_frame[:, n],
+            rod_two_direction_vec_in_material_frame[:, n],
+            rest_offset_btw_rods[n],
+            rod_one_element_index[n],
+            rod_two_element_index[n],
+            rod_one_director_collection,
+            rod_two_director_collection,
+            rod_one_position_collection,
+            rod_two_position_collection,
+            rod_one_velocity_collection,
+            rod_two_velocity_collection,
+            rod_one_radius,
+            rod_two_lengths,
+            rod_one_dilatation,
+            rod_two_dilatation,
+            rod_one_external_forces,
+            rod_two_external_forces,
+            rod_one_external_torques,
+            rod_two_external_torques,
+        )
+
+
+@njit(cache=True, error_model="numpy", inline="always")
+def _apply_perpendicular_rods_joint(
+    k,
+    nu,
+    k_repulsive,
+    kt,
+    rod_one_direction_vec_in_material_frame,
+    rod_two_direction_vec_in_material_frame,
+    rest_offset_btw_rods,
+    index_one,
+    index_two,
+    rod_one_director_collection,
+    rod_two_director_collection,
+    rod_one_position_collection,
+    rod_two_position_collection,
+    rod_one_velocity_collection,
+    rod_two_velocity_collection,
+    rod_one_radius,
+    rod_two_lengths,
+    rod_one_dilatation,
+    rod_two_dilatation,
+    rod_one_external_forces,
+    rod_two_external_forces,
+    rod_one_external_torques,
+    rod_two_external_torques,
+):
+    """
+    This function computes the connection force and torques of one perpendicular
+    rod connection, and adds them in place to the external forces and torques of
+    the rods. Vector operations are unrolled over the components, so that no
+    temporary arrays are allocated.
+
+    Parameters
+    ----------
+    k: float
+    nu: float
+    k_repulsive: float
+    kt: float
+    rod_one_direction_vec_in_material_frame: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+    rod_two_direction_vec_in_material_frame: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+    rest_offset_btw_rods: float
+    index_one: int
+    index_two: int
+    rod_one_director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+    rod_two_director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+    rod_one_position_collection: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_two_position_collection: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_one_velocity_collection: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_two_velocity_collection: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_one_radius: numpy.ndarray
+        1D (n_elems,) array containing data with 'float' type.
+    rod_two_lengths: numpy.ndarray
+        1D (n_elems,) array containing data with 'float' type.
+    rod_one_dilatation: numpy.ndarray
+        1D (n_elems,) array containing data with 'float' type.
+    rod_two_dilatation: numpy.ndarray
+        1D (n_elems,) array containing data with 'float' type.
+    rod_one_external_forces: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_two_external_forces: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_one_external_torques: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+    rod_two_external_torques: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+
+    """
+    i1 = index_one
+    i2 = index_two
+    q1 = rod_one_director_collection
+    q2 = rod_two_director_collection
+    a1 = rod_one_direction_vec_in_material_frame
+    a2 = rod_two_direction_vec_in_material_frame
+
+    # convert connection directions to lab frame
+    c1x = q1[0, 0, i1] * a1[0] + q1[1, 0, i1] * a1[1] + q1[2, 0, i1] * a1[2]
+    c1y = q1[0, 1, i1] * a1[0] + q1[1, 1, i1] * a1[1] + q1[2, 1, i1] * a1[2]
+    c1z = q1[0, 2, i1] * a1[0] + q1[1, 2, i1] * a1[1] + q1[2, 2, i1] * a1[2]
+    c2x = q2[0, 0, i2] * a2[0] + q2[1, 0, i2] * a2[1] + q2[2, 0, i2] * a2[2]
+    c2y = q2[0, 1, i2] * a2[0] + q2[1, 1, i2] * a2[1] + q2[2, 1, i2] * a2[2]
+    c2z = q2[0, 2, i2] * a2[0] + q2[1, 2, i2] * a2[1] + q2[2, 2, i2] * a2[2]
+
+    # Compute element positions
+    x1 = rod_one_position_collection
+    x2 = rod_two_position_collection
+    p1x = 0.5 * (x1[0, i1] + x1[0, i1 + 1])
+    p1y = 0.5 * (x1[1, i1] + x1[1, i1 + 1])
+    p1z = 0.5 * (x1[2, i1] + x1[2, i1 + 1])
+    p2x = 0.5 * (x2[0, i2] + x2[0, i2 + 1])
+    p2y = 0.5 * (x2[1, i2] + x2[1, i2 + 1])
+    p2z = 0.5 * (x2[2, i2] + x2[2, i2 + 1])
+
+    # If there is an offset between rod one and rod two surface, then it
+    # should change as a function of dilatation.
+    offset_rod_one = 0.5 * rest_offset_btw_rods / np.sqrt(rod_one_dilatation[i1])
+    offset_rod_two = 0.5 * rest_offset_btw_rods * rod_two_dilatation[i2]
+    rod_one_radius_i = rod_one_radius[i1]
+    rod_two_half_length = 0.5 * rod_two_lengths[i2]
+
+    # Compute vector r*d2 (radius * connection vector) for rod one to two
+    rd2_scale = rod_one_radius_i + offset_rod_one
+    rd2x = c1x * rd2_scale
+    rd2y = c1y * rd2_scale
+    rd2z = c1z * rd2_scale
+    # Compute vector l*d3 (half length * connection vector) for rod two to one
+    ld3_scale = rod_two_half_length + offset_rod_two
+    ld3x = c2x * ld3_scale
+    ld3y = c2y * ld3_scale
+    ld3z = c2z * ld3_scale
+
+    # Compute spring force between connection points on the rod surfaces
+    dx = round((p2x + ld3x) - (p1x + rd2x), 12)
+    dy = round((p2y + ld3y) - (p1y + rd2y), 12)
+    dz = round((p2z + ld3z) - (p1z + rd2z), 12)
+    fx = k * dx
+    fy = k * dy
+    fz = k * dz
+
+    # Damping force along the spring
+    v1 = rod_one_velocity_collection
+    v2 = rod_two_velocity_collection
+    rvx = 0.5 * (v2[0, i2] + v2[0, i2 + 1]) - 0.5 * (v1[0, i1] + v1[0, i1 + 1])
+    rvy = 0.5 * (v2[1, i2] + v2[1, i2 + 1]) - 0.5 * (v1[1, i1] + v1[1, i1 + 1])
+    rvz = 0.5 * (v2[2, i2] + v2[2, i2 + 1]) - 0.5 * (v1[2, i1] + v1[2, i1 + 1])
+    distance = np.sqrt(dx * dx + dy * dy + dz * dz)
+    if distance >= 1e-12:
+        nx = dx / distance
+        ny = dy / distance
+        nz = dz / distance
+    else:
+        nx = 0.0
+        ny = 0.0
+        nz = 0.0
+    normal_relative_velocity = rvx * nx + rvy * ny + rvz * nz
+    total_fx = fx + nu * (normal_relative_velocity * nx)
+    total_fy = fy + nu * (normal_relative_velocity * ny)
+    total_fz = fz + nu * (normal_relative_velocity * nz)
+
+    # Hertzian contact force if rods penetrate each other
+    cx = p2x - p1x
+    cy = p2y - p1y
+    cz = p2z - p1z
+    center_distance = np.sqrt(cx * cx + cy * cy + cz * cz)
+    penetration = center_distance - (
+        rod_one_radius_i + offset_rod_one + rod_two_half_length + offset_rod_two
+    )
+    if penetration < 0:
+        contact_force = k_repulsive * np.abs(penetration) ** 1.5
+        total_fx -= contact_force * cx / center_distance
+        total_fy -= contact_force * cy / center_distance
+        total_fz -= contact_force * cz / center_distance
+
+    # Re-distribute forces from elements to nodes.
+    rod_one_external_forces[0, i1] += 0.5 * total_fx
+    rod_one_external_forces[1, i1] += 0.5 * total_fy
+    rod_one_external_forces[2, i1] += 0.5 * total_fz
+    rod_one_external_forces[0, i1 + 1] += 0.5 * total_fx
+    rod_one_external_forces[1, i1 + 1] += 0.5 * total_fy
+    rod_one_external_forces[2, i1 + 1] += 0.5 * total_fz
+    rod_two_external_forces[0, i2] -= 0.5 * total_fx
+    rod_two_external_forces[1, i2] -= 0.5 * total_fy
+    rod_two_external_forces[2, i2] -= 0.5 * total_fz
+    rod_two_external_forces[0, i2 + 1] -= 0.5 * total_fx
+    rod_two_external_forces[1, i2 + 1] -= 0.5 * total_fy
+    rod_two_external_forces[2, i2 + 1] -= 0.5 * total_fz
+
+    # Compute torques due to the connection forces
+    t1x = rd2y * fz - rd2z * fy
+    t1y = rd2z * fx - rd2x * fz
+    t1z = rd2x * fy - rd2y * fx
+    t2x = ld3z * fy - ld3y * fz
+    t2y = ld3x * fz - ld3z * fx
+    t2z = ld3y * fx - ld3x * fy
+
+    # Torsional spring keeping the rods perpendicular, moment arm is in the
+    # direction of rod two tangent.
+    ld3_norm = np.sqrt(ld3x * ld3x + ld3y * ld3y + ld3z * ld3z)
+    mx = rod_one_radius_i * (ld3x / ld3_norm) + ld3x
+    my = rod_one_radius_i * (ld3y / ld3_norm) + ld3y
+    mz = rod_one_radius_i * (ld3z / ld3_norm) + ld3z
+    ex = kt * round(p1x - (p2x + mx), 12)
+    ey = kt * round(p1y - (p2y + my), 12)
+    ez = kt * round(p1z - (p2z + mz), 12)
+    spring_torque_x = my * ez - mz * ey
+    spring_torque_y = mz * ex - mx * ez
+    spring_torque_z = mx * ey - my * ex
+    t1x -= spring_torque_x
+    t1y -= spring_torque_y
+    t1z -= spring_torque_z
+    t2x += spring_torque_x
+    t2y += spring_torque_y
+    t2z += spring_torque_z
+
+    # convert torques to material frame
+    for i in range(3):
+        rod_one_external_torques[i, i1] += (
+            q1[i, 0, i1] * t1x + q1[i, 1, i1] * t1y + q1[i, 2, i1] * t1z
+        )
+        rod_two_external_torques[i, i2] += (
+            q2[i, 0, i2] * t2x + q2[i, 1, i2] * t2y + q2[i, 2, i2] * t2z
+        )
+
+
+class BatchedSurfaceJointSideBySide(_BatchedRodsConnection):
+    """
+    This class connects elements of parallel rods side by side, i.e. neighbouring
+    backbone rods, for all connected element pairs at once. Each connection is a
+    spring-damper between the surfaces of the two rod elements, with a Hertzian
+    contact force if the rods penetrate each other, as in SurfaceJointSideBySide
+    of PyElastica.
+
+        Attributes
+        ----------
+        rod_list: list
+            List of the connected rod objects.
+        rod_one_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Index of rod one of the connections in the rod_list.
+        rod_one_element_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Connected element of rod one.
+        rod_two_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Index of rod two of the connections in the rod_list.
+        rod_two_element_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Connected element of rod two.
+        k: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Spring constant of the connections.
+        nu: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Damping constant of the connections.
+        k_repulsive: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Contact stiffness of the connections.
+        rod_one_direction_vec_in_material_frame: numpy.ndarray
+            2D (dim, n_connections) array containing data with 'float' type.
+            Direction from rod one to rod two, in the material frame of rod one.
+        rod_two_direction_vec_in_material_frame: numpy.ndarray
+            2D (dim, n_connections) array containing data with 'float' type.
+            Direction from rod two to rod one, in the material frame of rod two.
+        offset_btw_rods: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Rest distance between the surfaces of the rods.
+
+    Notes
+    -----
+    This forcing class has to be added to only one of the rods in the rod_list, i.e.
+    `simulator.add_forcing_to(rod_list[0]).using(BatchedSurfaceJointSideBySide,
+    ...)`. The connections are built with find_side_by_side_connections, which
+    returns the keyword arguments of this class. Connections of the same pair of
+    rods should be consecutive, as returned by find_side_by_side_connections,
+    since the rod arrays are looked up again whenever the pair of rods changes.
+    Forces and torques of all connections are computed in apply_forces, in one
+    compiled pass, and apply_torques does nothing.
+
+    """
+
+    def __init__(
+        self,
+        rod_list: Sequence[CosseratRod],
+        rod_one_index: np.ndarray,
+        rod_one_element_index: np.ndarray,
+        rod_two_index: np.ndarray,
+        rod_two_element_index: np.ndarray,
+        k: Union[float, np.ndarray],
+        nu: Union[float, np.ndarray],
+        k_repulsive: Union[float, np.ndarray],
+        rod_one_direction_vec_in_material_frame: np.ndarray,
+        rod_two_direction_vec_in_material_frame: np.ndarray,
+        offset_btw_rods: np.ndarray,
+    ):
+        """
+        Parameters
+        ----------
+        rod_list: list
+            List of the connected rod objects.
+        rod_one_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Index of rod one of the connections in the rod_list.
+        rod_one_element_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Connected element of rod one.
+        rod_two_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Index of rod two of the connections in the rod_list.
+        rod_two_element_index: numpy.ndarray
+            1D (n_connections,) array containing data with 'int' type.
+            Connected element of rod two.
+        k: float or numpy.ndarray
+            Float number or 1D (n_connections,) array containing data with 'float'
+            type. Spring constant of the connections.
+        nu: float or numpy.ndarray
+            Float number or 1D (n_connections,) array containing data with 'float'
+            type. Damping constant of the connections.
+        k_repulsive: float or numpy.ndarray
+            Float number or 1D (n_connections,) array containing data with 'float'
+            type. Contact stiffness of the connections.
+        rod_one_direction_vec_in_material_frame: numpy.ndarray
+            2D (dim, n_connections) array containing data with 'float' type.
+            Direction from rod one to rod two, in the material frame of rod one.
+        rod_two_direction_vec_in_material_frame: numpy.ndarray
+            2D (dim, n_connections) array containing data with 'float' type.
+            Direction from rod two to rod one, in the material frame of rod two.
+        offset_btw_rods: numpy.ndarray
+            1D (n_connections,) array containing data with 'float' type.
+            Rest distance between the surfaces of the rods.
+
+        """
+        super(BatchedSurfaceJointSideBySide, self).__init__(
+            rod_list=rod_list,
+            rod_one_index=rod_one_index,
+            rod_one_element_index=rod_one_element_index,
+            rod_two_index=rod_two_index,
+            rod_two_element_index=rod_two_element_index,
+            k=k,
+            nu=nu,
+            k_repulsive=k_repulsive,
+            rod_one_direction_vec_in_material_frame=rod_one_direction_vec_in_material_frame,
+            rod_two_direction_vec_in_material_frame=rod_two_direction_vec_in_material_frame,
+            offset_btw_rods=offset_btw_rods,
+        )
+
+    def apply_forces(self, rod: CosseratRod, time: np.float64 = 0.0):
+        if (
+            self._first_rod_director_collection
+            is not self.rod_list[0].director_collection
+        ):
+            self._update_rod_array_lists()
+
+        _apply_side_by_side_surface_joints(
+            self.rod_one_index,
+            self.rod_one_element_index,
+            self.rod_two_index,
+            self.rod_two_element_index,
+            self.k,
+            self.nu,
+            self.k_repulsive,
+            self.rod_one_direction_vec_in_material_frame,
+            self.rod_two_direction_vec_in_material_frame,
+            self.offset_btw_rods,
+            self._director_collection_list,
+            self._position_collection_list,
+            self._velocity_collection_list,
+            self._radius_list,
+            self._dilatation_list,
+            self._external_forces_list,
+            self._external_torques_list,
+        )
+
+
+@njit(cache=True, error_model="numpy")
+def _apply_side_by_side_surface_joints(
+    rod_one_index,
+    rod_one_element_index,
+    rod_two_index,
+    rod_two_element_index,
+    k,
+    nu,
+    k_repulsive,
+    rod_one_direction_vec_in_material_frame,
+    rod_two_direction_vec_in_material_frame,
+    rest_offset_btw_rods,
+    director_collection_list,
+    position_collection_list,
+    velocity_collection_list,
+    radius_list,
+    dilatation_list,
+    external_forces_list,
+    external_torques_list,
+):
+    """
+    This function computes the connection forces and torques of all side by side
+    surface joints, and adds them in place to the external forces and torques of
+    the rods. Connections are processed sequentially, since several connections
+    can share the same rod.
+
+    Parameters
+    ----------
+    rod_one_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+    rod_one_element_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+    rod_two_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+    rod_two_element_index: numpy.ndarray
+        1D (n_connections,) array containing data with 'int' type.
+    k: numpy.ndarray
+        1D (n_connections,) array containing data with 'float' type.
+    nu: numpy.ndarray
+        1D (n_connections,) array containing data with 'float' type.
+    k_repulsive: numpy.ndarray
+        1D (n_connections,) array containing data with 'float' type.
+    rod_one_direction_vec_in_material_frame: numpy.ndarray
+        2D (dim, n_connections) array containing data with 'float' type.
+    rod_two_direction_vec_in_material_frame: numpy.ndarray
+        2D (dim, n_connections) array containing data with 'float' type.
+    rest_offset_btw_rods: numpy.ndarray
+        1D (n_connections,) array containing data with 'float' type.
+    director_collection_list: numba.typed.List
+        Director collections of the rods.
+    position_collection_list: numba.typed.List
+        Position collections of the rods.
+    velocity_collection_list: numba.typed.List
+        Velocity collections of the rods.
+    radius_list: numba.typed.List
+        Element radii of the rods.
+    dilatation_list: numba.typed.List
+        Element dilatations of the rods.
+    external_forces_list: numba.typed.List
+        External forces of the rods, in the lab frame.
+    external_torques_list: numba.typed.List
+        External torques of the rods, in the material frame.
+
+    """
+    n_connections = rod_one_index.shape[0]
+    if n_connections == 0:
+        return
+    # typed list look ups are costly, rod arrays are only looked up again when the
+    # rods change from one connection to the next
+    rod_one = rod_one_index[0]
+    rod_one_director_collection = director_collection_list[rod_one]
+    rod_one_position_collection = position_collection_list[rod_one]
+    rod_one_velocity_collection = velocity_collection_list[rod_one]
+    rod_one_radius = radius_list[rod_one]
+    rod_one_dilatation = dilatation_list[rod_one]
+    rod_one_external_forces = external_forces_list[rod_one]
+    rod_one_external_torques = external_torques_list[rod_one]
+    rod_two = rod_two_index[0]
+    rod_two_director_collection = director_collection_list[rod_two]
+    rod_two_position_collection = position_collection_list[rod_two]
+    rod_two_velocity_collection = velocity_collection_list[rod_two]
+    rod_two_radius = radius_list[rod_two]
+    rod_two_dilatation = dilatation_list[rod_two]
+    rod_two_external_forces = external_forces_list[rod_two]
+    rod_two_external_torques = external_torques_list[rod_two]
+    for n in range(n_connections):
+        if rod_one_index[n] != rod_one:
+            rod_one = rod_one_index[n]
+            rod_one_director_collection = director_collection_list[rod_one]
+            rod_one_position_collection = position_collection_list[rod_one]
+            rod_one_velocity_collection = velocity_collection_list[rod_one]
+            rod_one_radius = radius_list[rod_one]
+            rod_one_dilatation = dilatation_list[rod_one]
+            rod_one_external_forces = external_forces_list[rod_one]
+            rod_one_external_torques = external_torques_list[rod_one]
+        if rod_two_index[n] != rod_two:
+            rod_two = rod_two_index[n]
+            rod_two_director_collection = director_collection_list[rod_two]
+            rod_two_position_collection = position_collection_list[rod_two]
+            rod_two_velocity_collection = velocity_collection_list[rod_two]
+            rod_two_radius = radius_list[rod_two]
+            rod_two_dilatation = dilatation_list[rod_two]
+            rod_two_external_forces = external_forces_list[rod_two]
+            rod_two_external_torques = external_torques_list[rod_two]
+        _apply_side_by_side_surface_joint(
+            k[n],
+            nu[n],
+            k_repulsive[n],
+            rod_one_direction_vec_in_material_frame[:, n],
+            rod_two_direction_vec_in_material_frame[:, n],
+            rest_offset_btw_rods[n],
+            rod_one_element_index[n],
+            rod_two_element_index[n],
+            rod_one_director_collection,
+            rod_two_director_collection,
+            rod_one_position_collection,
+            rod_two_position_collection,
+            rod_one_velocity_collection,
+            rod_two_velocity_collection,
+            rod_one_radius,
+            rod_two_radius,
+            rod_one_dilatation,
+            rod_two_dilatation,
+            rod_one_external_forces,
+            rod_two_external_forces,
+            rod_one_external_torques,
+            rod_two_external_torques,
+        )
+
+
+@njit(cache=True, error_model="numpy", inline="always")
+def _apply_side_by_side_surface_joint(
+    k,
+    nu,
+    k_repulsive,
+    rod_one_direction_vec_in_material_frame,
+    rod_two_direction_vec_in_material_frame,
+    rest_offset_btw_rods,
+    index_one,
+    index_two,
+    rod_one_director_collection,
+    rod_two_director_collection,
+    rod_one_position_collection,
+    rod_two_position_collection,
+    rod_one_velocity_collection,
+    rod_two_velocity_collection,
+    rod_one_radius,
+    rod_two_radius,
+    rod_one_dilatation,
+    rod_two_dilatation,
+    rod_one_external_forces,
+    rod_two_external_forces,
+    rod_one_external_torques,
+    rod_two_external_torques,
+):
+    """
+    This function computes the connection force and torques of one side by side
+    surface joint, and adds them in place to the external forces and torques of
+    the rods. Vector operations are unrolled over the components, so that no
+    temporary arrays are allocated.
+
+    Parameters
+    ----------
+    k: float
+    nu: float
+    k_repulsive: float
+    rod_one_direction_vec_in_material_frame: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+    rod_two_direction_vec_in_material_frame: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+    rest_offset_btw_rods: float
+    index_one: int
+    index_two: int
+    rod_one_director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+    rod_two_director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+    rod_one_position_collection: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_two_position_collection: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_one_velocity_collection: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_two_velocity_collection: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_one_radius: numpy.ndarray
+        1D (n_elems,) array containing data with 'float' type.
+    rod_two_radius: numpy.ndarray
+        1D (n_elems,) array containing data with 'float' type.
+    rod_one_dilatation: numpy.ndarray
+        1D (n_elems,) array containing data with 'float' type.
+    rod_two_dilatation: numpy.ndarray
+        1D (n_elems,) array containing data with 'float' type.
+    rod_one_external_forces: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_two_external_forces: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    rod_one_external_torques: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+    rod_two_external_torques: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+
+    """
+    i1 = index_one
+    i2 = index_two
+    q1 = rod_one_director_collection
+    q2 = rod_two_director_collection
+    a1 = rod_one_direction_vec_in_material_frame
+    a2 = rod_two_direction_vec_in_material_frame
+
+    # convert connection directions to lab frame
+    c1x = q1[0, 0, i1] * a1[0] + q1[1, 0, i1] * a1[1] + q1[2, 0, i1] * a1[2]
+    c1y = q1[0, 1, i1] * a1[0] + q1[1, 1, i1] * a1[1] + q1[2, 1, i1] * a1[2]
+    c1z = q1[0, 2, i1] * a1[0] + q1[1, 2, i1] * a1[1] + q1[2, 2, i1] * a1[2]
+    c2x = q2[0, 0, i2] * a2[0] + q2[1, 0, i2] * a2[1] + q2[2, 0, i2] * a2[2]
+    c2y = q2[0, 1, i2] * a2[0] + q2[1, 1, i2] * a2[1] + q2[2, 1, i2] * a2[2]
+    c2z = q2[0, 2, i2] * a2[0] + q2[1, 2, i2] * a2[1] + q2[2, 2, i2] * a2[2]
+
+    # Compute element positions
+    x1 = rod_one_position_collection
+    x2 = rod_two_position_collection
+    p1x = 0.5 * (x1[0, i1] + x1[0, i1 + 1])
+    p1y = 0.5 * (x1[1, i1] + x1[1, i1 + 1])
+    p1z = 0.5 * (x1[2, i1] + x1[2, i1 + 1])
+    p2x = 0.5 * (x2[0, i2] + x2[0, i2 + 1])
+    p2y = 0.5 * (x2[1, i2] + x2[1, i2 + 1])
+    p2z = 0.5 * (x2[2, i2] + x2[2, i2 + 1])
+
+    # If there is an offset between rod one and rod two surface, then it
+    # should change as a function of dilatation.
+    offset_rod_one = 0.5 * rest_offset_btw_rods / np.sqrt(rod_one_dilatation[i1])
+    offset_rod_two = 0.5 * rest_offset_btw_rods / np.sqrt(rod_two_dilatation[i2])
+    rod_one_radius_i = rod_one_radius[i1]
+    rod_two_radius_i = rod_two_radius[i2]
+
+    # Compute vector r*d2 (radius * connection vector) for each rod
+    rod_one_rd2_scale = rod_one_radius_i + offset_rod_one
+    rd2_1x = c1x * rod_one_rd2_scale
+    rd2_1y = c1y * rod_one_rd2_scale
+    rd2_1z = c1z * rod_one_rd2_scale
+    rod_two_rd2_scale = rod_two_radius_i + offset_rod_two
+    rd2_2x = c2x * rod_two_rd2_scale
+    rd2_2y = c2y * rod_two_rd2_scale
+    rd2_2z = c2z * rod_two_rd2_scale
+
+    # Compute spring force between connection points on the rod surfaces
+    fx = k * round((p2x + rd2_2x) - (p1x + rd2_1x), 12)
+    fy = k * round((p2y + rd2_2y) - (p1y + rd2_1y), 12)
+    fz = k * round((p2z + rd2_2z) - (p1z + rd2_1z), 12)
+
+    # Damping force
+    v1 = rod_one_velocity_collection
+    v2 = rod_two_velocity_collection
+    total_fx = fx + nu * (
+        0.5 * (v2[0, i2] + v2[0, i2 + 1]) - 0.5 * (v1[0, i1] + v1[0, i1 + 1])
+    )
+    total_fy = fy + nu * (
+        0.5 * (v2[1, i2] + v2[1, i2 + 1]) - 0.5 * (v1[1, i1] + v1[1, i1 + 1])
+    )
+    total_fz = fz + nu * (
+        0.5 * (v2[2, i2] + v2[2, i2 + 1]) - 0.5 * (v1[2, i1] + v1[2, i1 + 1])
+    )
+
+    # Hertzian contact force if rods penetrate each other
+    cx = p2x - p1x
+    cy = p2y - p1y
+    cz = p2z - p1z
+    center_distance = np.sqrt(cx * cx + cy * cy + cz * cz)
+    penetration = round(
+        center_distance
+        - (rod_one_radius_i + offset_rod_one + rod_two_radius_i + offset_rod_two),
+        12,
+    )
+    if penetration < 0:
+        contact_force = k_repulsive * np.abs(penetration) ** 1.5
+        total_fx -= contact_force * (cx / center_distance)
+        total_fy -= contact_force * (cy / center_distance)
+        total_fz -= contact_force * (cz / center_distance)
+
+    # Re-distribute forces from elements to nodes.
+    rod_one_external_forces[0, i1] += 0.5 * total_fx
+    rod_one_external_forces[1, i1] += 0.5 * total_fy
+    rod_one_external_forces[2, i1] += 0.5 * total_fz
+    rod_one_external_forces[0, i1 + 1] += 0.5 * total_fx
+    rod_one_external_forces[1, i1 + 1] += 0.5 * total_fy
+    rod_one_external_forces[2, i1 + 1] += 0.5 * total_fz
+    rod_two_external_forces[0, i2] -= 0.5 * total_fx
+    rod_two_external_forces[1, i2] -= 0.5 * total_fy
+    rod_two_external_forces[2, i2] -= 0.5 * total_fz
+    rod_two_external_forces[0, i2 + 1] -= 0.5 * total_fx
+    rod_two_external_forces[1, i2 + 1] -= 0.5 * total_fy
+    rod_two_external_forces[2, i2 + 1] -= 0.5 * total_fz
+
+    # Compute torques due to the connection forces
+    t1x = rd2_1y * fz - rd2_1z * fy
+    t1y = rd2_1z * fx - rd2_1x * fz
+    t1z = rd2_1x * fy - rd2_1y * fx
+    t2x = rd2_2z * fy - rd2_2y * fz
+    t2y = rd2_2x * fz - rd2_2z * fx
+    t2z = rd2_2y * fx - rd2_2x * fy
+
+    # convert torques to material frame
+    for i in range(3):
+        rod_one_external_torques[i, i1] += (
+            q1[i, 0, i1] * t1x + q1[i, 1, i1] * t1y + q1[i, 2, i1] * t1z
+        )
+        rod_two_external_torques[i, i2] += (
+            q2[i, 0, i2] * t2x + q2[i, 1, i2] * t2y + q2[i, 2, i2] * t2z
+        )
@@ -3,10 +3,30 @@ __all__ = [
     "BaseMagneticField",
     "ConstantMagneticField",
     "SingleModeOscillatingMagneticField",
+    "MultiModeOscillatingMagneticField",
+    "TabulatedMagneticField",
+    "CoilMagneticField",
+    "GriddedMagneticField",
+    "CompositeMagneticField",
+    "compute_current_loop_segments",
 ]
 
-from magneto_pyelastica.utils import compute_ramp_factor
+import os
+from concurrent.futures import ThreadPoolExecutor
+from magneto_pyelastica.utils import (
+    compute_ramp_factor,
+    compute_ramp_factor_kernel,
+    compute_ramp_factors,
+    compute_ramp_factors_kernel,
+    get_ramp_profile_id,
+    trilinear_interpolation,
+    trilinear_interpolation_gradient,
+)
 import numpy as np
+from numba import njit
+
+# vacuum permeability
+MU_0 = 4e-7 * np.pi
 
 
 class BaseMagneticField:
@@ -16,18 +36,180 @@ class BaseMagneticField:
     Notes
     -----
     Every new magnetic field class must be derived
-    from BaseMagneticField class.
+    from BaseMagneticField class, and implement the compute_value method.
+    The value method memoizes the last evaluated time, so that several
+    forcing objects sharing the same field cost one evaluation per time.
+    If the parameters of a field are mutated at runtime, invalidate_cache
+    has to be called.
+
+    Spatially varying magnetic fields have to set is_uniform to False and
+    implement the value_at method, which is evaluated for all elements in
+    one call. They can also implement jacobian_at analytically, otherwise
+    it is computed by batched central finite differences of value_at.
+
+    Uniform magnetic fields can provide a compiled counterpart, with a njit
+    decorated compiled_kernel(time, parameters, magnetic_field) function and
+    the compiled_parameters method packing field parameters into a float
+    array. Compiled kernels can be called from other njit decorated functions,
+    i.e. `field.compiled_kernel(time, field.compiled_parameters(), out)`.
+
+    Magnetic fields can be composed with `+`, `-`, scalar `*` and the gated
+    method, i.e. `bias_field + 0.5 * rotating_field.gated(1.0, 2.0)`, which
+    returns a CompositeMagneticField evaluated in one fused pass.
 
     """
 
+    is_uniform = True
+    jacobian_step = 1e-6
+    compiled_kernel = None
+
     def __init__(self):
         """
         BaseMagneticField class does not need any input parameters.
         """
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """
+        This function clears the memoized value of the magnetic field, it has to be
+        called after the field parameters are mutated.
+        """
+        self._cached_time = None
+        self._cached_value = None
 
     def value(self, time: np.float64 = 0.0):
         """Returns the value of the magnetic field vector.
 
+        The value is computed with compute_value method, and a read-only view of it
+        is cached and returned while the time does not change.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+
+        Returns
+        -------
+        magnetic_field: numpy.ndarray
+            1D (dim,) array containing data with 'float' type.
+            Value of the magnetic field, read-only.
+
+        """
+        if time != self._cached_time:
+            magnetic_field = self.compute_value(time=time)
+            if isinstance(magnetic_field, np.ndarray):
+                magnetic_field = magnetic_field.view()
+                magnetic_field.flags.writeable = False
+            self._cached_value = magnetic_field
+            self._cached_time = time
+        return self._cached_value
+
+    def values(self, times: np.ndarray):
+        """Returns the values of the magnetic field vector for an array of times.
+
+        By default, compute_value is evaluated for each time, field classes
+        override this method with a vectorized evaluation. The cache is not used.
+
+        Parameters
+        ----------
+        times : numpy.ndarray
+            1D (n_times,) array containing data with 'float' type.
+            Times of simulation.
+
+        Returns
+        -------
+        magnetic_field_values: numpy.ndarray
+            2D (n_times, dim) array containing data with 'float' type.
+            Values of the magnetic field.
+
+        """
+        times = np.asarray(times, dtype=np.float64)
+        magnetic_field_values = np.zeros((times.shape[0], 3))
+        for k, time in enumerate(times):
+            magnetic_field_values[k] = self.compute_value(time=time)
+        return magnetic_field_values
+
+    def compiled_parameters(self):
+        """Returns the parameters of the compiled kernel.
+
+        In BaseMagneticField class, there is no compiled kernel.
+
+        Returns
+        -------
+        parameters: numpy.ndarray
+            1D array containing data with 'float' type.
+
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not have a compiled kernel"
+        )
+
+    def value_at(self, time: np.float64, positions: np.ndarray):
+        """Returns the value of the magnetic field vector at given positions.
+
+        In BaseMagneticField class, the field is uniform and its value is
+        broadcast to all positions without copying.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+        positions : numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Positions where magnetic field is evaluated, i.e. element centers.
+
+        Returns
+        -------
+        magnetic_field: numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Value of the magnetic field at positions, read-only.
+
+        """
+        return np.broadcast_to(
+            self.value(time=time).reshape(3, 1), (3, positions.shape[1])
+        )
+
+    def jacobian_at(self, time: np.float64, positions: np.ndarray):
+        """Returns the spatial gradient of the magnetic field at given positions.
+
+        By default, the gradient is computed by central finite differences with
+        jacobian_step, where all perturbed positions are evaluated in one
+        value_at call.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+        positions : numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Positions where magnetic field gradient is evaluated.
+
+        Returns
+        -------
+        magnetic_field_jacobian: numpy.ndarray
+            3D (dim, dim, n_points) array containing data with 'float' type.
+            Gradient of the magnetic field dB_i/dx_j at positions, stored as [i, j].
+
+        """
+        n_points = positions.shape[1]
+        if self.is_uniform:
+            return np.zeros((3, 3, n_points))
+
+        # (dim, 2 * dim, n_points) stencil with +h and -h along each direction
+        stencil = np.repeat(positions[:, np.newaxis, :], 2 * 3, axis=1)
+        for j in range(3):
+            stencil[j, 2 * j, :] += self.jacobian_step
+            stencil[j, 2 * j + 1, :] -= self.jacobian_step
+        magnetic_field = self.value_at(
+            time=time, positions=stencil.reshape(3, 2 * 3 * n_points)
+        ).reshape(3, 2 * 3, n_points)
+        return (magnetic_field[:, 0::2, :] - magnetic_field[:, 1::2, :]) / (
+            2.0 * self.jacobian_step
+        )
+
+    def compute_value(self, time: np.float64 = 0.0):
+        """Computes the value of the magnetic field vector.
+
         In BaseMagneticField class, this routine simply passes.
 
         Parameters
@@ -40,6 +222,121 @@ class BaseMagneticField:
 
         """
 
+    def gated(self, start_time: np.float64, end_time: np.float64):
+        """Returns the magnetic field switched on only in a time window.
+
+        Parameters
+        ----------
+        start_time : float
+            Opening time of the gate, field is zero at and before it.
+        end_time : float
+            Closing time of the gate, field is zero after it.
+
+        Returns
+        -------
+        magnetic_field: CompositeMagneticField
+            Gated magnetic field.
+
+        """
+        return CompositeMagneticField([(self, 1.0, start_time, end_time)])
+
+    def __add__(self, other):
+        if not isinstance(other, BaseMagneticField):
+            return NotImplemented
+        return CompositeMagneticField(
+            [(self, 1.0, -np.inf, np.inf), (other, 1.0, -np.inf, np.inf)]
+        )
+
+    def __radd__(self, other):
+        # allows sum() over magnetic fields, which starts from 0
+        if np.isscalar(other) and other == 0:
+            return self
+        return NotImplemented
+
+    def __sub__(self, other):
+        if not isinstance(other, BaseMagneticField):
+            return NotImplemented
+        return self + (-1.0) * other
+
+    def __mul__(self, scale):
+        if not np.isscalar(scale):
+            return NotImplemented
+        return CompositeMagneticField([(self, float(scale), -np.inf, np.inf)])
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return (-1.0) * self
+
+    def fused_modes(self):
+        """Returns the sinusoidal modes of the magnetic field, for fused evaluation.
+
+        Magnetic fields which are a sum of modes A sin(w t + phi) multiplied by
+        the ramp factor override this method, so that CompositeMagneticField
+        evaluates them in one trigonometric pass. In BaseMagneticField class,
+        the field does not have modes.
+
+        Returns
+        -------
+        modes: tuple or None
+            Amplitudes, angular frequencies and phase differences of the modes,
+            each a 2D (dim, n_modes) array, or None if the field does not have
+            modes.
+
+        """
+        return None
+
+
+@njit(cache=True)
+def _constant_magnetic_field_kernel(time, parameters, magnetic_field):
+    """
+    This function is the compiled counterpart of ConstantMagneticField.value.
+
+    Parameters
+    ----------
+    time : float
+        The time of simulation.
+    parameters: numpy.ndarray
+        1D (7,) array containing data with 'float' type.
+        Parameters packed by ConstantMagneticField.compiled_parameters.
+    magnetic_field: numpy.ndarray
+        1D (dim,) array containing data with 'float' type, output.
+
+    """
+    factor = compute_ramp_factor_kernel(
+        time, parameters[0], parameters[1], parameters[2], int(parameters[3])
+    )
+    for i in range(3):
+        magnetic_field[i] = parameters[4 + i] * factor
+
+
+@njit(cache=True)
+def _single_mode_oscillating_magnetic_field_kernel(time, parameters, magnetic_field):
+    """
+    This function is the compiled counterpart of
+    SingleModeOscillatingMagneticField.value.
+
+    Parameters
+    ----------
+    time : float
+        The time of simulation.
+    parameters: numpy.ndarray
+        1D (13,) array containing data with 'float' type.
+        Parameters packed by SingleModeOscillatingMagneticField.compiled_parameters.
+    magnetic_field: numpy.ndarray
+        1D (dim,) array containing data with 'float' type, output.
+
+    """
+    factor = compute_ramp_factor_kernel(
+        time, parameters[0], parameters[1], parameters[2], int(parameters[3])
+    )
+    for i in range(3):
+        magnetic_field[i] = (
+            factor
+            * parameters[4 + i]
+            * np.sin(parameters[7 + i] * time + parameters[10 + i])
+        )
+
 
 class ConstantMagneticField(BaseMagneticField):
     """
@@ -56,10 +353,22 @@ class ConstantMagneticField(BaseMagneticField):
             Turning on time of magnetic field.
         end_time : float
             Turning off time of magnetic field.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
 
     """
 
-    def __init__(self, magnetic_field_amplitude, ramp_interval, start_time, end_time):
+    compiled_kernel = staticmethod(_constant_magnetic_field_kernel)
+
+    def __init__(
+        self,
+        magnetic_field_amplitude,
+        ramp_interval,
+        start_time,
+        end_time,
+        ramp_profile="linear",
+    ):
         """
 
         Parameters
@@ -73,6 +382,9 @@ class ConstantMagneticField(BaseMagneticField):
             Turning on time of magnetic field.
         end_time : float
             Turning off time of magnetic field.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
 
         """
         super(ConstantMagneticField, self).__init__()
@@ -80,8 +392,32 @@ class ConstantMagneticField(BaseMagneticField):
         self.ramp_interval = ramp_interval
         self.start_time = start_time
         self.end_time = end_time
+        get_ramp_profile_id(ramp_profile)
+        self.ramp_profile = ramp_profile
 
-    def value(self, time: np.float64 = 0.0):
+    def compiled_parameters(self):
+        """
+        This function packs the field parameters for the compiled kernel as
+        [ramp_interval, start_time, end_time, ramp profile id,
+        magnetic_field_amplitude].
+
+        Returns
+        -------
+        parameters: numpy.ndarray
+            1D (7,) array containing data with 'float' type.
+
+        """
+        return np.hstack(
+            (
+                self.ramp_interval,
+                self.start_time,
+                self.end_time,
+                get_ramp_profile_id(self.ramp_profile),
+                self.magnetic_field_amplitude,
+            )
+        ).astype(np.float64)
+
+    def compute_value(self, time: np.float64 = 0.0):
         """
         This function returns the value of the magnetic field vector based on the
         magnetic_field_amplitude.
@@ -106,9 +442,58 @@ class ConstantMagneticField(BaseMagneticField):
             ramp_interval=self.ramp_interval,
             start_time=self.start_time,
             end_time=self.end_time,
+            ramp_profile=self.ramp_profile,
         )
         return self.magnetic_field_amplitude * factor
 
+    def values(self, times: np.ndarray):
+        """
+        This function returns the values of the constant magnetic field vector for
+        an array of times.
+
+        Parameters
+        ----------
+        times : numpy.ndarray
+            1D (n_times,) array containing data with 'float' type.
+            Times of simulation.
+
+        Returns
+        -------
+        magnetic_field_values: numpy.ndarray
+            2D (n_times, dim) array containing data with 'float' type.
+            Values of the constant magnetic field.
+
+        """
+        factors = compute_ramp_factors(
+            times=times,
+            ramp_interval=self.ramp_interval,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            ramp_profile=self.ramp_profile,
+        )
+        return factors[:, np.newaxis] * self.magnetic_field_amplitude
+
+    def fused_modes(self):
+        """
+        This function returns the constant magnetic field as a single mode with
+        zero angular frequency and pi / 2 phase difference.
+
+        Returns
+        -------
+        modes: tuple
+            Amplitudes, angular frequencies and phase differences of the modes,
+            each a 2D (dim, 1) array.
+
+        """
+        magnetic_field_amplitude = np.asarray(
+            self.magnetic_field_amplitude, dtype=np.float64
+        ).reshape(3, 1)
+        return (
+            magnetic_field_amplitude,
+            np.zeros((3, 1)),
+            np.full((3, 1), 0.5 * np.pi),
+        )
+
 
 class SingleModeOscillatingMagneticField(BaseMagneticField):
     """
@@ -132,9 +517,14 @@ class SingleModeOscillatingMagneticField(BaseMagneticField):
             Turning on time of magnetic field.
         end_time : float
             Turning off time of magnetic field.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
 
     """
 
+    compiled_kernel = staticmethod(_single_mode_oscillating_magnetic_field_kernel)
+
     def __init__(
         self,
         magnetic_field_amplitude,
@@ -143,6 +533,7 @@ class SingleModeOscillatingMagneticField(BaseMagneticField):
         ramp_interval,
         start_time,
         end_time,
+        ramp_profile="linear",
     ):
         """
 
@@ -163,6 +554,9 @@ class SingleModeOscillatingMagneticField(BaseMagneticField):
             Turning on time of magnetic field.
         end_time : float
             Turning off time of magnetic field.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
 
         """
         super(SingleModeOscillatingMagneticField, self).__init__()
@@ -172,8 +566,35 @@ class SingleModeOscillatingMagneticField(BaseMagneticField):
         self.ramp_interval = ramp_interval
         self.start_time = start_time
         self.end_time = end_time
+        get_ramp_profile_id(ramp_profile)
+        self.ramp_profile = ramp_profile
 
-    def value(self, time: np.float64 = 0.0):
+    def compiled_parameters(self):
+        """
+        This function packs the field parameters for the compiled kernel as
+        [ramp_interval, start_time, end_time, ramp profile id,
+        magnetic_field_amplitude, magnetic_field_angular_frequency,
+        magnetic_field_phase_difference].
+
+        Returns
+        -------
+        parameters: numpy.ndarray
+            1D (13,) array containing data with 'float' type.
+
+        """
+        return np.hstack(
+            (
+                self.ramp_interval,
+                self.start_time,
+                self.end_time,
+                get_ramp_profile_id(self.ramp_profile),
+                self.magnetic_field_amplitude,
+                self.magnetic_field_angular_frequency,
+                self.magnetic_field_phase_difference,
+            )
+        ).astype(np.float64)
+
+    def compute_value(self, time: np.float64 = 0.0):
         """
         This function returns the value of the sinusoidally oscillating magnetic field
         vector, based on amplitude, frequency and phase difference.
@@ -198,6 +619,7 @@ class SingleModeOscillatingMagneticField(BaseMagneticField):
             ramp_interval=self.ramp_interval,
             start_time=self.start_time,
             end_time=self.end_time,
+            ramp_profile=self.ramp_profile,
         )
         return (
             factor
@@ -207,3 +629,1617 @@ class SingleModeOscillatingMagneticField(BaseMagneticField):
                 + self.magnetic_field_phase_difference
             )
         )
+
+    def values(self, times: np.ndarray):
+        """
+        This function returns the values of the sinusoidally oscillating magnetic
+        field vector for an array of times.
+
+        Parameters
+        ----------
+        times : numpy.ndarray
+            1D (n_times,) array containing data with 'float' type.
+            Times of simulation.
+
+        Returns
+        -------
+        magnetic_field_values: numpy.ndarray
+            2D (n_times, dim) array containing data with 'float' type.
+            Values of the oscillatory magnetic field.
+
+        """
+        times = np.asarray(times, dtype=np.float64)
+        factors = compute_ramp_factors(
+            times=times,
+            ramp_interval=self.ramp_interval,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            ramp_profile=self.ramp_profile,
+        )
+        return (
+            factors[:, np.newaxis]
+            * self.magnetic_field_amplitude
+            * np.sin(
+                self.magnetic_field_angular_frequency * times[:, np.newaxis]
+                + self.magnetic_field_phase_difference
+            )
+        )
+
+    def fused_modes(self):
+        """
+        This function returns the sinusoidally oscillating magnetic field as a
+        single mode.
+
+        Returns
+        -------
+        modes: tuple
+            Amplitudes, angular frequencies and phase differences of the modes,
+            each a 2D (dim, 1) array.
+
+        """
+        return tuple(
+            np.broadcast_to(
+                np.asarray(parameter, dtype=np.float64).reshape(-1, 1), (3, 1)
+            )
+            for parameter in (
+                self.magnetic_field_amplitude,
+                self.magnetic_field_angular_frequency,
+                self.magnetic_field_phase_difference,
+            )
+        )
+
+
+class MultiModeOscillatingMagneticField(BaseMagneticField):
+    """
+    This class represents a magnetic field oscillating in time with many sinusoidal
+    modes, i.e. a Fourier series. All modes are evaluated in one compiled call.
+
+        Attributes
+        ----------
+        magnetic_field_amplitude: numpy.ndarray
+            2D (dim, n_modes) array containing data with 'float' type.
+            Amplitudes of the magnetic field modes.
+        magnetic_field_angular_frequency: numpy.ndarray
+            2D (dim, n_modes) array containing data with 'float' type.
+            Angular frequencies of the magnetic field modes.
+        magnetic_field_phase_difference: numpy.ndarray
+            2D (dim, n_modes) array containing data with 'float' type.
+            Phase differences of the magnetic field modes.
+        fundamental_angular_frequency: float
+            Fundamental angular frequency, if modes are evaluated with the sin/cos
+            recurrence.
+        ramp_interval : float
+            ramping time for magnetic field.
+        start_time : float
+            Turning on time of magnetic field.
+        end_time : float
+            Turning off time of magnetic field.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
+
+    Notes
+    -----
+    If a fundamental_angular_frequency is given, all angular frequencies have to be
+    integer multiples of it. Then only one sine and one cosine are evaluated per
+    time, and the harmonics are computed by angle addition recurrence.
+
+    """
+
+    def __init__(
+        self,
+        magnetic_field_amplitude,
+        magnetic_field_angular_frequency,
+        magnetic_field_phase_difference,
+        ramp_interval,
+        start_time,
+        end_time,
+        fundamental_angular_frequency=None,
+        ramp_profile="linear",
+    ):
+        """
+
+        Parameters
+        ----------
+        magnetic_field_amplitude: numpy.ndarray
+            2D (dim, n_modes) array containing data with 'float' type.
+            Amplitudes of the magnetic field modes.
+        magnetic_field_angular_frequency: numpy.ndarray
+            2D (dim, n_modes) array containing data with 'float' type.
+            Angular frequencies of the magnetic field modes.
+        magnetic_field_phase_difference: numpy.ndarray
+            2D (dim, n_modes) array containing data with 'float' type.
+            Phase differences of the magnetic field modes.
+        ramp_interval : float
+            ramping time for magnetic field.
+        start_time : float
+            Turning on time of magnetic field.
+        end_time : float
+            Turning off time of magnetic field.
+        fundamental_angular_frequency: float
+            Fundamental angular frequency, angular frequencies of all modes are
+            integer multiples of it. If given, modes are evaluated with the
+            sin/cos recurrence.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
+
+        """
+        super(MultiModeOscillatingMagneticField, self).__init__()
+        self.magnetic_field_amplitude = np.asarray(
+            magnetic_field_amplitude, dtype=np.float64
+        )
+        self.magnetic_field_angular_frequency = np.asarray(
+            magnetic_field_angular_frequency, dtype=np.float64
+        )
+        self.magnetic_field_phase_difference = np.asarray(
+            magnetic_field_phase_difference, dtype=np.float64
+        )
+        if not (
+            self.magnetic_field_amplitude.ndim == 2
+            and self.magnetic_field_amplitude.shape[0] == 3
+            and self.magnetic_field_angular_frequency.shape
+            == self.magnetic_field_amplitude.shape
+            and self.magnetic_field_phase_difference.shape
+            == self.magnetic_field_amplitude.shape
+        ):
+            raise ValueError(
+                "Invalid magnetic field modes! Amplitude, angular frequency and "
+                "phase difference should be arrays of shape (3, num_modes)"
+            )
+        self.ramp_interval = ramp_interval
+        self.start_time = start_time
+        self.end_time = end_time
+        get_ramp_profile_id(ramp_profile)
+        self.ramp_profile = ramp_profile
+        self.fundamental_angular_frequency = fundamental_angular_frequency
+
+        if fundamental_angular_frequency is not None:
+            harmonic_number = (
+                self.magnetic_field_angular_frequency / fundamental_angular_frequency
+            )
+            self.harmonic_number = np.rint(harmonic_number).astype(np.int64)
+            if not (
+                np.allclose(harmonic_number, self.harmonic_number)
+                and np.all(self.harmonic_number >= 0)
+            ):
+                raise ValueError(
+                    "Invalid fundamental angular frequency! Angular frequencies "
+                    "should be non-negative integer multiples of it"
+                )
+            self.cos_phase_difference = np.cos(self.magnetic_field_phase_difference)
+            self.sin_phase_difference = np.sin(self.magnetic_field_phase_difference)
+            self._harmonic_buffer = np.zeros((2, self.harmonic_number.max() + 1))
+
+    def compute_value(self, time: np.float64 = 0.0):
+        """
+        This function returns the value of the multi mode oscillating magnetic
+        field vector, based on amplitudes, frequencies and phase differences of the
+        modes.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+
+        Returns
+        -------
+        magnetic_field: numpy.ndarray
+            1D (dim,) array containing data with 'float' type.
+            Value of the oscillatory magnetic field.
+        Notes
+        -------
+        Assumes only time dependence.
+
+        """
+        factor = compute_ramp_factor(
+            time=time,
+            ramp_interval=self.ramp_interval,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            ramp_profile=self.ramp_profile,
+        )
+        if self.fundamental_angular_frequency is None:
+            return _compute_multi_mode_field(
+                factor,
+                time,
+                self.magnetic_field_amplitude,
+                self.magnetic_field_angular_frequency,
+                self.magnetic_field_phase_difference,
+            )
+        return _compute_multi_mode_field_with_recurrence(
+            factor,
+            self.fundamental_angular_frequency * time,
+            self.magnetic_field_amplitude,
+            self.harmonic_number,
+            self.cos_phase_difference,
+            self.sin_phase_difference,
+            self._harmonic_buffer,
+        )
+
+    def values(self, times: np.ndarray):
+        """
+        This function returns the values of the multi mode oscillating magnetic
+        field vector for an array of times, all modes are summed in one pass.
+
+        Parameters
+        ----------
+        times : numpy.ndarray
+            1D (n_times,) array containing data with 'float' type.
+            Times of simulation.
+
+        Returns
+        -------
+        magnetic_field_values: numpy.ndarray
+            2D (n_times, dim) array containing data with 'float' type.
+            Values of the oscillatory magnetic field.
+
+        """
+        times = np.asarray(times, dtype=np.float64)
+        factors = compute_ramp_factors(
+            times=times,
+            ramp_interval=self.ramp_interval,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            ramp_profile=self.ramp_profile,
+        )
+        # (n_times, dim, n_modes) mode values summed over modes
+        mode_values = self.magnetic_field_amplitude * np.sin(
+            self.magnetic_field_angular_frequency * times[:, np.newaxis, np.newaxis]
+            + self.magnetic_field_phase_difference
+        )
+        return factors[:, np.newaxis] * mode_values.sum(axis=2)
+
+    def fused_modes(self):
+        """
+        This function returns the modes of the multi mode oscillating magnetic
+        field.
+
+        Returns
+        -------
+        modes: tuple
+            Amplitudes, angular frequencies and phase differences of the modes,
+            each a 2D (dim, n_modes) array.
+
+        """
+        return (
+            self.magnetic_field_amplitude,
+            self.magnetic_field_angular_frequency,
+            self.magnetic_field_phase_difference,
+        )
+
+
+class TabulatedMagneticField(BaseMagneticField):
+    """
+    This class represents a magnetic field with an arbitrary waveform in time, given
+    as samples, i.e. a recorded coil current waveform. Samples can be uniformly
+    or non-uniformly spaced in time, and are interpolated linearly or with cubic
+    Hermite splines.
+
+        Attributes
+        ----------
+        waveform: numpy.ndarray
+            2D (n_samples, dim) array containing data with 'float' type.
+            Magnetic field samples.
+        sample_times: numpy.ndarray
+            1D (n_samples,) array containing data with 'float' type.
+            Increasing sample times, empty for uniform sampling.
+        sample_start_time: float
+            Time of the first sample, for uniform sampling.
+        sampling_interval: float
+            Time between samples, for uniform sampling.
+        interpolation: str
+            Interpolation method, 'linear' or 'cubic'.
+        ramp_interval : float
+            ramping time for magnetic field.
+        start_time : float
+            Turning on time of magnetic field.
+        end_time : float
+            Turning off time of magnetic field.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
+
+    Notes
+    -----
+    For uniform sampling, bracketing samples are found by O(1) index computation.
+    For non-uniform sampling, the last bracket is cached and searched from, which
+    is O(1) for advancing simulation time. Times outside of the samples are
+    clamped to the first or last sample.
+
+    """
+
+    def __init__(
+        self,
+        waveform,
+        ramp_interval,
+        start_time,
+        end_time,
+        sample_times=None,
+        sample_start_time=0.0,
+        sampling_interval=None,
+        interpolation="linear",
+        ramp_profile="linear",
+    ):
+        """
+
+        Parameters
+        ----------
+        waveform: numpy.ndarray or str
+            2D (n_samples, dim) array containing data with 'float' type, or the path
+            of a .npy file containing it, which is streamed from the disk.
+            Magnetic field samples.
+        ramp_interval : float
+            ramping time for magnetic field.
+        start_time : float
+            Turning on time of magnetic field.
+        end_time : float
+            Turning off time of magnetic field.
+        sample_times: numpy.ndarray
+            1D (n_samples,) array containing data with 'float' type.
+            Increasing sample times, for non-uniform sampling.
+        sample_start_time: float
+            Time of the first sample, for uniform sampling.
+        sampling_interval: float
+            Time between samples, for uniform sampling.
+        interpolation: str
+            Interpolation method, 'linear' or 'cubic'.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
+
+        """
+        super(TabulatedMagneticField, self).__init__()
+        if isinstance(waveform, (str, os.PathLike)):
+            waveform = np.load(waveform, mmap_mode="r")
+        self.waveform = np.asarray(waveform)
+        if not (
+            self.waveform.ndim == 2
+            and self.waveform.shape[1] == 3
+            and self.waveform.shape[0] >= 2
+        ):
+            raise ValueError(
+                "Invalid waveform! Should be an array of shape (num_samples, 3) "
+                "with at least two samples"
+            )
+        if (sample_times is None) == (sampling_interval is None):
+            raise ValueError(
+                "Invalid sampling! Either sample_times or sampling_interval "
+                "should be given"
+            )
+        if interpolation not in ("linear", "cubic"):
+            raise ValueError(
+                "Invalid interpolation! Should be either 'linear' or 'cubic'"
+            )
+        self.uniform_sampling = sample_times is None
+        self.sample_times = (
+            np.zeros((0,))
+            if sample_times is None
+            else np.asarray(sample_times, dtype=np.float64)
+        )
+        if not self.uniform_sampling and (
+            self.sample_times.shape != (self.waveform.shape[0],)
+        ):
+            raise ValueError(
+                "Invalid sample times! Should have one time for each sample"
+            )
+        if not self.uniform_sampling and not np.all(np.diff(self.sample_times) > 0.0):
+            raise ValueError("Invalid sample times! Should be strictly increasing")
+        self.sample_start_time = float(sample_start_time)
+        self.sampling_interval = (
+            0.0 if sampling_interval is None else float(sampling_interval)
+        )
+        self.interpolation = interpolation
+        self.ramp_interval = ramp_interval
+        self.start_time = start_time
+        self.end_time = end_time
+        get_ramp_profile_id(ramp_profile)
+        self.ramp_profile = ramp_profile
+
+        self._bracket_index = np.zeros((1,), dtype=np.int64)
+
+    def compute_value(self, time: np.float64 = 0.0):
+        """
+        This function returns the value of the tabulated magnetic field vector,
+        interpolated from the waveform samples.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+
+        Returns
+        -------
+        magnetic_field: numpy.ndarray
+            1D (dim,) array containing data with 'float' type.
+            Value of the tabulated magnetic field.
+        Notes
+        -------
+        Assumes only time dependence.
+
+        """
+        factor = compute_ramp_factor(
+            time=time,
+            ramp_interval=self.ramp_interval,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            ramp_profile=self.ramp_profile,
+        )
+        # a new vector is returned, since values handed out are cached
+        magnetic_field = np.zeros((3,))
+        _compute_tabulated_field(
+            float(time),
+            factor,
+            self.waveform,
+            self.uniform_sampling,
+            self.sample_start_time,
+            self.sampling_interval,
+            self.sample_times,
+            self.interpolation == "cubic",
+            self._bracket_index,
+            magnetic_field,
+        )
+        return magnetic_field
+
+
+class CoilMagneticField(BaseMagneticField):
+    """
+    This class represents the magnetic field of electromagnetic coils, built from
+    straight current carrying segments. The Biot-Savart field of the coils is
+    precomputed once on a uniform 3D grid, and at every time step it is
+    trilinearly interpolated to the element positions and scaled with the
+    time dependent current.
+
+        Attributes
+        ----------
+        field_grid: numpy.ndarray
+            4D (n_x, n_y, n_z, dim) array containing data with 'float' type.
+            Magnetic field of the coils on the grid nodes, for unit current scale.
+        grid_origin: numpy.ndarray
+            1D (dim,) array containing data with 'float' type.
+            Position of the first grid node.
+        grid_spacing: numpy.ndarray
+            1D (dim,) array containing data with 'float' type.
+            Grid spacing in each direction.
+        current_waveform: callable
+            Function of time, that returns the current scale of the coils.
+        ramp_interval : float
+            ramping time for magnetic field.
+        start_time : float
+            Turning on time of magnetic field.
+        end_time : float
+            Turning off time of magnetic field.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
+
+    Notes
+    -----
+    Positions outside of the grid are clamped to the grid boundary.
+
+    """
+
+    is_uniform = False
+
+    def __init__(
+        self,
+        segment_start_collection,
+        segment_end_collection,
+        grid_origin,
+        grid_spacing,
+        grid_shape,
+        ramp_interval,
+        start_time,
+        end_time,
+        segment_current=1.0,
+        current_waveform=None,
+        n_workers=1,
+        ramp_profile="linear",
+    ):
+        """
+
+        Parameters
+        ----------
+        segment_start_collection: numpy.ndarray
+            2D (dim, n_segments) array containing data with 'float' type.
+            Start positions of the current carrying segments.
+        segment_end_collection: numpy.ndarray
+            2D (dim, n_segments) array containing data with 'float' type.
+            End positions of the current carrying segments.
+        grid_origin: numpy.ndarray
+            1D (dim,) array containing data with 'float' type.
+            Position of the first grid node.
+        grid_spacing: float or numpy.ndarray
+            Float or 1D (dim,) array containing data with 'float' type.
+            Grid spacing in each direction.
+        grid_shape: tuple
+            Number of grid nodes (n_x, n_y, n_z) in each direction.
+        ramp_interval : float
+            ramping time for magnetic field.
+        start_time : float
+            Turning on time of magnetic field.
+        end_time : float
+            Turning off time of magnetic field.
+        segment_current: float or numpy.ndarray
+            Float or 1D (n_segments,) array containing data with 'float' type.
+            Current of the segments, flowing from start to end.
+        current_waveform: callable
+            Function of time, that returns the current scale of the coils. If not
+            given current is constant.
+        n_workers: int
+            Number of threads, that precompute grid blocks in parallel.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
+
+        """
+        super(CoilMagneticField, self).__init__()
+        segment_start_collection = np.asarray(
+            segment_start_collection, dtype=np.float64
+        )
+        segment_end_collection = np.asarray(segment_end_collection, dtype=np.float64)
+        n_segments = segment_start_collection.shape[1]
+        self.grid_origin = np.asarray(grid_origin, dtype=np.float64)
+        self.grid_spacing = np.broadcast_to(
+            np.asarray(grid_spacing, dtype=np.float64), (3,)
+        ).copy()
+        grid_shape = tuple(grid_shape)
+        if len(grid_shape) != 3 or min(grid_shape) < 2:
+            raise ValueError(
+                "Invalid grid shape! Should have at least two grid nodes in each "
+                "direction"
+            )
+        self.current_waveform = current_waveform
+        self.ramp_interval = ramp_interval
+        self.start_time = start_time
+        self.end_time = end_time
+        get_ramp_profile_id(ramp_profile)
+        self.ramp_profile = ramp_profile
+
+        grid_points = np.stack(
+            np.meshgrid(
+                *[
+                    self.grid_origin[i]
+                    + self.grid_spacing[i] * np.arange(grid_shape[i])
+                    for i in range(3)
+                ],
+                indexing="ij",
+            )
+        ).reshape(3, -1)
+        segment_current = np.ones((n_segments,)) * segment_current
+        field_grid = np.zeros_like(grid_points)
+
+        # Precompute field on grid blocks, kernel releases the GIL.
+        blocks = np.array_split(np.arange(grid_points.shape[1]), max(n_workers, 1))
+        blocks = [block for block in blocks if block.shape[0] > 0]
+
+        def compute_block(block):
+            field_grid[:, block[0] : block[-1] + 1] = _compute_biot_savart_field(
+                np.ascontiguousarray(grid_points[:, block[0] : block[-1] + 1]),
+                segment_start_collection,
+                segment_end_collection,
+                segment_current,
+            )
+
+        if n_workers > 1:
+            with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                list(executor.map(compute_block, blocks))
+        else:
+            for block in blocks:
+                compute_block(block)
+
+        self.field_grid = np.ascontiguousarray(field_grid.T.reshape(grid_shape + (3,)))
+
+    def current_factor(self, time: np.float64 = 0.0):
+        """
+        This function returns the current scale of the coils, including the ramp.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+
+        Returns
+        -------
+        factor : float
+            Current scale.
+
+        """
+        factor = compute_ramp_factor(
+            time=time,
+            ramp_interval=self.ramp_interval,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            ramp_profile=self.ramp_profile,
+        )
+        if self.current_waveform is not None:
+            factor *= self.current_waveform(time)
+        return factor
+
+    def value_at(self, time: np.float64, positions: np.ndarray):
+        """
+        This function returns the value of the coil magnetic field at positions,
+        interpolated from the precomputed grid.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+        positions : numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Positions where magnetic field is evaluated, i.e. element centers.
+
+        Returns
+        -------
+        magnetic_field: numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Value of the magnetic field at positions.
+
+        """
+        return self.current_factor(time) * trilinear_interpolation(
+            self.field_grid, self.grid_origin, self.grid_spacing, positions
+        )
+
+    def jacobian_at(self, time: np.float64, positions: np.ndarray):
+        """
+        This function returns the spatial gradient of the coil magnetic field at
+        positions, using the gradient of the trilinear interpolation.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+        positions : numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Positions where magnetic field gradient is evaluated.
+
+        Returns
+        -------
+        magnetic_field_jacobian: numpy.ndarray
+            3D (dim, dim, n_points) array containing data with 'float' type.
+            Gradient of the magnetic field dB_i/dx_j at positions, stored as [i, j].
+
+        """
+        return self.current_factor(time) * trilinear_interpolation_gradient(
+            self.field_grid, self.grid_origin, self.grid_spacing, positions
+        )
+
+
+class GriddedMagneticField(BaseMagneticField):
+    """
+    This class represents a measured magnetic field map, given on a uniform 3D grid,
+    optionally for a sequence of time slices. Field maps stored in .npy or raw
+    binary files are opened as memory maps, so only grid nodes around the rod
+    elements are read from the disk, and memory footprint does not depend on the
+    field map size. Field is trilinearly interpolated in space and linearly
+    interpolated in time.
+
+        Attributes
+        ----------
+        field_map: numpy.ndarray
+            4D (n_x, n_y, n_z, dim) or 5D (n_slices, n_x, n_y, n_z, dim) array
+            containing data with 'float' type, possibly a memory map.
+            Magnetic field on the grid nodes.
+        grid_origin: numpy.ndarray
+            1D (dim,) array containing data with 'float' type.
+            Position of the first grid node.
+        grid_spacing: numpy.ndarray
+            1D (dim,) array containing data with 'float' type.
+            Grid spacing in each direction.
+        slice_times: numpy.ndarray
+            1D (n_slices,) array containing data with 'float' type.
+            Times of the field map slices, None if field map is static.
+        ramp_interval : float
+            ramping time for magnetic field.
+        start_time : float
+            Turning on time of magnetic field.
+        end_time : float
+            Turning off time of magnetic field.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
+
+    Notes
+    -----
+    Positions outside of the grid are clamped to the grid boundary, and times
+    outside of the slice times are clamped to the first or last slice.
+
+    """
+
+    is_uniform = False
+
+    def __init__(
+        self,
+        field_map,
+        grid_origin,
+        grid_spacing,
+        ramp_interval,
+        start_time,
+        end_time,
+        slice_times=None,
+        grid_shape=None,
+        dtype=np.float64,
+        offset=0,
+        ramp_profile="linear",
+    ):
+        """
+
+        Parameters
+        ----------
+        field_map: str or numpy.ndarray or list
+            Path of a .npy or raw binary file, or an array, containing the field
+            map with (n_x, n_y, n_z, dim) shape, or with (n_slices, n_x, n_y, n_z,
+            dim) shape if slice_times are given. A list of those for each time
+            slice is also accepted.
+        grid_origin: numpy.ndarray
+            1D (dim,) array containing data with 'float' type.
+            Position of the first grid node.
+        grid_spacing: float or numpy.ndarray
+            Float or 1D (dim,) array containing data with 'float' type.
+            Grid spacing in each direction.
+        ramp_interval : float
+            ramping time for magnetic field.
+        start_time : float
+            Turning on time of magnetic field.
+        end_time : float
+            Turning off time of magnetic field.
+        slice_times: numpy.ndarray
+            1D (n_slices,) array containing data with 'float' type.
+            Increasing times of the field map slices.
+        grid_shape: tuple
+            Number of grid nodes (n_x, n_y, n_z), only needed for raw files.
+        dtype: numpy.dtype
+            Data type of raw files.
+        offset: int
+            Header size in bytes of raw files.
+        ramp_profile : str
+            Ramp profile of magnetic field, one of 'linear', 'smoothstep',
+            'smootherstep', 'cosine' and 'exponential'.
+
+        """
+        super(GriddedMagneticField, self).__init__()
+        self.grid_origin = np.asarray(grid_origin, dtype=np.float64)
+        self.grid_spacing = np.broadcast_to(
+            np.asarray(grid_spacing, dtype=np.float64), (3,)
+        ).copy()
+        self.ramp_interval = ramp_interval
+        self.start_time = start_time
+        self.end_time = end_time
+        get_ramp_profile_id(ramp_profile)
+        self.ramp_profile = ramp_profile
+        self.slice_times = (
+            None if slice_times is None else np.asarray(slice_times, dtype=np.float64)
+        )
+
+        if isinstance(field_map, (list, tuple)):
+            # one file or array for each time slice
+            slice_shape = None if grid_shape is None else tuple(grid_shape) + (3,)
+            self.field_map = [
+                self._open_field_map(field_map_slice, slice_shape, dtype, offset)
+                for field_map_slice in field_map
+            ]
+            n_slices = len(self.field_map)
+            grid_shape = self.field_map[0].shape[:3]
+        else:
+            shape = None
+            if grid_shape is not None:
+                shape = tuple(grid_shape) + (3,)
+                if self.slice_times is not None:
+                    shape = (self.slice_times.shape[0],) + shape
+            self.field_map = self._open_field_map(field_map, shape, dtype, offset)
+            n_slices = self.field_map.shape[0] if self.slice_times is not None else 1
+            grid_shape = self.field_map.shape[-4:-1]
+
+        if self.slice_times is not None and self.slice_times.shape[0] != n_slices:
+            raise ValueError(
+                "Invalid slice times! Should have one time for each field map slice"
+            )
+        if self.slice_times is None and isinstance(self.field_map, list):
+            raise ValueError(
+                "Invalid slice times! Should be given for a sequence of field maps"
+            )
+        if min(grid_shape) < 2:
+            raise ValueError(
+                "Invalid grid shape! Should have at least two grid nodes in each "
+                "direction"
+            )
+
+    @staticmethod
+    def _open_field_map(field_map, shape, dtype, offset):
+        if isinstance(field_map, (str, os.PathLike)):
+            if os.fspath(field_map).endswith(".npy"):
+                return np.load(field_map, mmap_mode="r")
+            if shape is None:
+                raise ValueError(
+                    "Invalid grid shape! Should be given for raw field map files"
+                )
+            return np.memmap(
+                field_map, dtype=dtype, mode="r", offset=offset, shape=shape
+            )
+        return field_map
+
+    def _interpolate(self, interpolation, time, positions):
+        factor = compute_ramp_factor(
+            time=time,
+            ramp_interval=self.ramp_interval,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            ramp_profile=self.ramp_profile,
+        )
+        if self.slice_times is None:
+            return factor * interpolation(
+                self.field_map, self.grid_origin, self.grid_spacing, positions
+            )
+
+        # bracketing time slices
+        n_slices = self.slice_times.shape[0]
+        slice_idx = min(
+            max(int(np.searchsorted(self.slice_times, time, side="right")) - 1, 0),
+            max(n_slices - 2, 0),
+        )
+        next_slice_idx = min(slice_idx + 1, n_slices - 1)
+        time_interval = self.slice_times[next_slice_idx] - self.slice_times[slice_idx]
+        weight = (
+            min(max((time - self.slice_times[slice_idx]) / time_interval, 0.0), 1.0)
+            if time_interval > 0.0
+            else 0.0
+        )
+        field = (1.0 - weight) * interpolation(
+            self.field_map[slice_idx], self.grid_origin, self.grid_spacing, positions
+        )
+        if weight > 0.0:
+            field += weight * interpolation(
+                self.field_map[next_slice_idx],
+                self.grid_origin,
+                self.grid_spacing,
+                positions,
+            )
+        return factor * field
+
+    def value_at(self, time: np.float64, positions: np.ndarray):
+        """
+        This function returns the value of the gridded magnetic field at positions.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+        positions : numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Positions where magnetic field is evaluated, i.e. element centers.
+
+        Returns
+        -------
+        magnetic_field: numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Value of the magnetic field at positions.
+
+        """
+        return self._interpolate(trilinear_interpolation, time, positions)
+
+    def jacobian_at(self, time: np.float64, positions: np.ndarray):
+        """
+        This function returns the spatial gradient of the gridded magnetic field at
+        positions, using the gradient of the trilinear interpolation.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+        positions : numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Positions where magnetic field gradient is evaluated.
+
+        Returns
+        -------
+        magnetic_field_jacobian: numpy.ndarray
+            3D (dim, dim, n_points) array containing data with 'float' type.
+            Gradient of the magnetic field dB_i/dx_j at positions, stored as [i, j].
+
+        """
+        return self._interpolate(trilinear_interpolation_gradient, time, positions)
+
+
+class CompositeMagneticField(BaseMagneticField):
+    """
+    This class represents a sum of scaled and time gated magnetic fields. It is
+    usually built with `+`, `-`, scalar `*` and gated method of magnetic fields.
+
+    The expression tree is flattened when the composite field is created. All
+    sinusoidal modes of constant and oscillating fields are gathered in
+    (dim, n_modes) arrays, and evaluated in one compiled pass with one ramp
+    factor for each distinct ramp. Other fields are evaluated separately and
+    added.
+
+        Attributes
+        ----------
+        magnetic_field_terms: list
+            Flattened terms, each a tuple of (magnetic field, scale, gate start
+            time, gate end time).
+        magnetic_field_amplitude: numpy.ndarray
+            2D (dim, n_modes) array containing data with 'float' type.
+            Amplitudes of the gathered modes, multiplied by the scales.
+        magnetic_field_angular_frequency: numpy.ndarray
+            2D (dim, n_modes) array containing data with 'float' type.
+            Angular frequencies of the gathered modes.
+        magnetic_field_phase_difference: numpy.ndarray
+            2D (dim, n_modes) array containing data with 'float' type.
+            Phase differences of the gathered modes.
+        ramp_parameters: numpy.ndarray
+            2D (4, n_ramps) array containing data with 'float' type.
+            Ramp interval, start time, end time and ramp profile id of the
+            distinct ramps.
+        mode_ramp_index: numpy.ndarray
+            1D (n_modes,) array containing data with 'int' type.
+            Ramp of each mode.
+        mode_gate: numpy.ndarray
+            2D (2, n_modes) array containing data with 'float' type.
+            Gate start and end times of each mode.
+
+    Notes
+    -----
+    Parameters of the composed fields are copied when the composite field is
+    created, so later changes of the composed fields are not seen by it.
+
+    """
+
+    def __init__(self, magnetic_field_terms):
+        """
+
+        Parameters
+        ----------
+        magnetic_field_terms: list
+            Terms of the composite field, each a tuple of (magnetic field, scale,
+            gate start time, gate end time). Use -numpy.inf and numpy.inf for
+            ungated terms.
+
+        """
+        super(CompositeMagneticField, self).__init__()
+        # flatten nested composite fields, scales multiply and gates intersect
+        self.magnetic_field_terms = []
+        for (
+            magnetic_field,
+            scale,
+            gate_start_time,
+            gate_end_time,
+        ) in magnetic_field_terms:
+            if not isinstance(magnetic_field, BaseMagneticField):
+                raise ValueError(
+                    "Invalid magnetic field term! Should be a BaseMagneticField "
+                    "instance"
+                )
+            if isinstance(magnetic_field, CompositeMagneticField):
+                for (
+                    inner_field,
+                    inner_scale,
+                    inner_gate_start_time,
+                    inner_gate_end_time,
+                ) in magnetic_field.magnetic_field_terms:
+                    self.magnetic_field_terms.append(
+                        (
+                            inner_field,
+                            scale * inner_scale,
+                            max(gate_start_time, inner_gate_start_time),
+                            min(gate_end_time, inner_gate_end_time),
+                        )
+                    )
+            else:
+                self.magnetic_field_terms.append(
+                    (magnetic_field, float(scale), gate_start_time, gate_end_time)
+                )
+        self.is_uniform = all(
+            magnetic_field.is_uniform
+            for magnetic_field, _, _, _ in self.magnetic_field_terms
+        )
+
+        # gather modes of all fields which have them
+        amplitudes = []
+        angular_frequencies = []
+        phase_differences = []
+        ramps = []
+        mode_ramp_index = []
+        mode_gate = []
+        self.other_terms = []
+        for term in self.magnetic_field_terms:
+            magnetic_field, scale, gate_start_time, gate_end_time = term
+            modes = magnetic_field.fused_modes()
+            if modes is None:
+                self.other_terms.append(term)
+                continue
+            amplitude, angular_frequency, phase_difference = modes
+            n_modes = amplitude.shape[1]
+            ramp = (
+                float(magnetic_field.ramp_interval),
+                float(magnetic_field.start_time),
+                float(magnetic_field.end_time),
+                float(
+                    get_ramp_profile_id(
+                        getattr(magnetic_field, "ramp_profile", "linear")
+                    )
+                ),
+            )
+            if ramp not in ramps:
+                ramps.append(ramp)
+            amplitudes.append(scale * np.asarray(amplitude, dtype=np.float64))
+            angular_frequencies.append(angular_frequency)
+            phase_differences.append(phase_difference)
+            mode_ramp_index += [ramps.index(ramp)] * n_modes
+            mode_gate += [(gate_start_time, gate_end_time)] * n_modes
+
+        self.magnetic_field_amplitude = np.hstack([np.zeros((3, 0))] + amplitudes)
+        self.magnetic_field_angular_frequency = np.hstack(
+            [np.zeros((3, 0))] + angular_frequencies
+        ).astype(np.float64)
+        self.magnetic_field_phase_difference = np.hstack(
+            [np.zeros((3, 0))] + phase_differences
+        ).astype(np.float64)
+        self.ramp_parameters = np.array(ramps, dtype=np.float64).reshape(-1, 4).T.copy()
+        self.mode_ramp_index = np.array(mode_ramp_index, dtype=np.int64)
+        self.mode_gate = np.array(mode_gate, dtype=np.float64).reshape(-1, 2).T.copy()
+        self._ramp_factor_buffer = np.zeros(self.ramp_parameters.shape[1])
+
+    @staticmethod
+    def _gate_factor(time, gate_start_time, gate_end_time):
+        return (time > gate_start_time) * (time <= gate_end_time)
+
+    def compute_value(self, time: np.float64 = 0.0):
+        """
+        This function returns the value of the spatially uniform part of the
+        composite magnetic field vector.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+
+        Returns
+        -------
+        magnetic_field: numpy.ndarray
+            1D (dim,) array containing data with 'float' type.
+            Value of the composite magnetic field.
+
+        """
+        magnetic_field = np.zeros(3)
+        _compute_composite_field(
+            float(time),
+            self.ramp_parameters,
+            self.mode_ramp_index,
+            self.mode_gate,
+            self.magnetic_field_amplitude,
+            self.magnetic_field_angular_frequency,
+            self.magnetic_field_phase_difference,
+            self._ramp_factor_buffer,
+            magnetic_field,
+        )
+        for (
+            magnetic_field_term,
+            scale,
+            gate_start_time,
+            gate_end_time,
+        ) in self.other_terms:
+            if not magnetic_field_term.is_uniform:
+                continue
+            gate_factor = self._gate_factor(time, gate_start_time, gate_end_time)
+            if gate_factor:
+                magnetic_field += scale * magnetic_field_term.value(time=time)
+        return magnetic_field
+
+    def values(self, times: np.ndarray):
+        """
+        This function returns the values of the spatially uniform part of the
+        composite magnetic field vector for an array of times, all modes are
+        summed in one pass.
+
+        Parameters
+        ----------
+        times : numpy.ndarray
+            1D (n_times,) array containing data with 'float' type.
+            Times of simulation.
+
+        Returns
+        -------
+        magnetic_field_values: numpy.ndarray
+            2D (n_times, dim) array containing data with 'float' type.
+            Values of the composite magnetic field.
+
+        """
+        times = np.asarray(times, dtype=np.float64)
+        # (n_times, n_ramps) ramp factors of the distinct ramps
+        ramp_factors = np.zeros((times.shape[0], self.ramp_parameters.shape[1]))
+        for ramp in range(self.ramp_parameters.shape[1]):
+            ramp_interval, start_time, end_time, ramp_profile_id = self.ramp_parameters[
+                :, ramp
+            ]
+            ramp_factors[:, ramp] = compute_ramp_factors_kernel(
+                times, ramp_interval, start_time, end_time, int(ramp_profile_id)
+            )
+        # (n_times, n_modes) ramp and gate factors of the modes
+        mode_factors = ramp_factors[:, self.mode_ramp_index] * self._gate_factor(
+            times[:, np.newaxis], self.mode_gate[0], self.mode_gate[1]
+        )
+        mode_values = self.magnetic_field_amplitude * np.sin(
+            self.magnetic_field_angular_frequency * times[:, np.newaxis, np.newaxis]
+            + self.magnetic_field_phase_difference
+        )
+        magnetic_field_values = np.einsum("tm,tim->ti", mode_factors, mode_values)
+        for (
+            magnetic_field_term,
+            scale,
+            gate_start_time,
+            gate_end_time,
+        ) in self.other_terms:
+            if not magnetic_field_term.is_uniform:
+                continue
+            magnetic_field_values += (
+                scale
+                * self._gate_factor(times, gate_start_time, gate_end_time)[
+                    :, np.newaxis
+                ]
+                * magnetic_field_term.values(times=times)
+            )
+        return magnetic_field_values
+
+    def value_at(self, time: np.float64, positions: np.ndarray):
+        """
+        This function returns the value of the composite magnetic field vector at
+        given positions, as the uniform part plus the spatially varying fields.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+        positions : numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Positions where magnetic field is evaluated, i.e. element centers.
+
+        Returns
+        -------
+        magnetic_field: numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Value of the magnetic field at positions.
+
+        """
+        magnetic_field = super(CompositeMagneticField, self).value_at(
+            time=time, positions=positions
+        )
+        if self.is_uniform:
+            return magnetic_field
+        magnetic_field = magnetic_field.copy()
+        for (
+            magnetic_field_term,
+            scale,
+            gate_start_time,
+            gate_end_time,
+        ) in self.other_terms:
+            if magnetic_field_term.is_uniform:
+                continue
+            if self._gate_factor(time, gate_start_time, gate_end_time):
+                magnetic_field += scale * magnetic_field_term.value_at(
+                    time=time, positions=positions
+                )
+        return magnetic_field
+
+    def jacobian_at(self, time: np.float64, positions: np.ndarray):
+        """
+        This function returns the spatial gradient of the composite magnetic field
+        at given positions, as the sum of gradients of the spatially varying
+        fields.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+        positions : numpy.ndarray
+            2D (dim, n_points) array containing data with 'float' type.
+            Positions where magnetic field gradient is evaluated.
+
+        Returns
+        -------
+        magnetic_field_jacobian: numpy.ndarray
+            3D (dim, dim, n_points) array containing data with 'float' type.
+            Gradient of the magnetic field dB_i/dx_j at positions, stored as [i, j].
+
+        """
+        magnetic_field_jacobian = np.zeros((3, 3, positions.shape[1]))
+        for (
+            magnetic_field_term,
+            scale,
+            gate_start_time,
+            gate_end_time,
+        ) in self.other_terms:
+            if magnetic_field_term.is_uniform:
+                continue
+            if self._gate_factor(time, gate_start_time, gate_end_time):
+                magnetic_field_jacobian += scale * magnetic_field_term.jacobian_at(
+                    time=time, positions=positions
+                )
+        return magnetic_field_jacobian
+
+
+def compute_current_loop_segments(center, normal, radius, n_segments):
+    """
+    This function discretizes a circular current loop into straight segments.
+    Current flows counter-clockwise around the normal.
+
+    Parameters
+    ----------
+    center : numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+        Center of the loop.
+    normal : numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+        Normal of the loop plane.
+    radius : float
+        Radius of the loop.
+    n_segments : int
+        Number of straight segments.
+
+    Returns
+    -------
+    segment_start_collection: numpy.ndarray
+        2D (dim, n_segments) array containing data with 'float' type.
+        Start positions of the segments.
+    segment_end_collection: numpy.ndarray
+        2D (dim, n_segments) array containing data with 'float' type.
+        End positions of the segments.
+
+    """
+    normal = np.asarray(normal, dtype=np.float64)
+    normal = normal / np.linalg.norm(normal)
+    # any unit vector perpendicular to the normal
+    helper = np.eye(3)[np.argmin(np.abs(normal))]
+    first_axis = np.cross(normal, helper)
+    first_axis /= np.linalg.norm(first_axis)
+    second_axis = np.cross(normal, first_axis)
+
+    angle = np.linspace(0.0, 2.0 * np.pi, n_segments + 1)
+    loop_points = np.reshape(center, (3, 1)) + radius * (
+        np.cos(angle) * first_axis.reshape(3, 1)
+        + np.sin(angle) * second_axis.reshape(3, 1)
+    )
+    return loop_points[:, :-1].copy(), loop_points[:, 1:].copy()
+
+
+@njit(cache=True, nogil=True)
+def _compute_biot_savart_field(
+    points, segment_start_collection, segment_end_collection, segment_current
+):
+    """
+    This function computes the magnetic field of straight current carrying
+    segments at the points, using the closed form Biot-Savart law of a finite
+    segment.
+
+    Parameters
+    ----------
+    points: numpy.ndarray
+        2D (dim, n_points) array containing data with 'float' type.
+    segment_start_collection: numpy.ndarray
+        2D (dim, n_segments) array containing data with 'float' type.
+    segment_end_collection: numpy.ndarray
+        2D (dim, n_segments) array containing data with 'float' type.
+    segment_current: numpy.ndarray
+        1D (n_segments,) array containing data with 'float' type.
+
+    Returns
+    -------
+    magnetic_field: numpy.ndarray
+        2D (dim, n_points) array containing data with 'float' type.
+
+    """
+    n_points = points.shape[1]
+    n_segments = segment_start_collection.shape[1]
+    magnetic_field = np.zeros((3, n_points))
+    for k in range(n_points):
+        for s in range(n_segments):
+            r1_0 = points[0, k] - segment_start_collection[0, s]
+            r1_1 = points[1, k] - segment_start_collection[1, s]
+            r1_2 = points[2, k] - segment_start_collection[2, s]
+            r2_0 = points[0, k] - segment_end_collection[0, s]
+            r2_1 = points[1, k] - segment_end_collection[1, s]
+            r2_2 = points[2, k] - segment_end_collection[2, s]
+            r1_norm = np.sqrt(r1_0 * r1_0 + r1_1 * r1_1 + r1_2 * r1_2)
+            r2_norm = np.sqrt(r2_0 * r2_0 + r2_1 * r2_1 + r2_2 * r2_2)
+            denominator = (
+                r1_norm
+                * r2_norm
+                * (r1_norm * r2_norm + r1_0 * r2_0 + r1_1 * r2_1 + r1_2 * r2_2)
+            )
+            # points on the segment line do not get any contribution
+            if denominator < 1e-30:
+                continue
+            factor = (
+                MU_0
+                / (4.0 * np.pi)
+                * segment_current[s]
+                * (r1_norm + r2_norm)
+                / denominator
+            )
+            magnetic_field[0, k] += factor * (r1_1 * r2_2 - r1_2 * r2_1)
+            magnetic_field[1, k] += factor * (r1_2 * r2_0 - r1_0 * r2_2)
+            magnetic_field[2, k] += factor * (r1_0 * r2_1 - r1_1 * r2_0)
+    return magnetic_field
+
+
+@njit(cache=True)
+def _compute_multi_mode_field(
+    factor,
+    time,
+    magnetic_field_amplitude,
+    magnetic_field_angular_frequency,
+    magnetic_field_phase_difference,
+):
+    """
+    This function sums the sinusoidal modes of the magnetic field.
+
+    Parameters
+    ----------
+    factor: float
+        Ramp factor.
+    time: float
+        The time of simulation.
+    magnetic_field_amplitude: numpy.ndarray
+        2D (dim, n_modes) array containing data with 'float' type.
+    magnetic_field_angular_frequency: numpy.ndarray
+        2D (dim, n_modes) array containing data with 'float' type.
+    magnetic_field_phase_difference: numpy.ndarray
+        2D (dim, n_modes) array containing data with 'float' type.
+
+    Returns
+    -------
+    magnetic_field: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+
+    """
+    n_modes = magnetic_field_amplitude.shape[1]
+    magnetic_field = np.zeros(3)
+    for i in range(3):
+        for mode in range(n_modes):
+            magnetic_field[i] += magnetic_field_amplitude[i, mode] * np.sin(
+                magnetic_field_angular_frequency[i, mode] * time
+                + magnetic_field_phase_difference[i, mode]
+            )
+        magnetic_field[i] *= factor
+    return magnetic_field
+
+
+@njit(cache=True)
+def _compute_multi_mode_field_with_recurrence(
+    factor,
+    fundamental_phase,
+    magnetic_field_amplitude,
+    harmonic_number,
+    cos_phase_difference,
+    sin_phase_difference,
+    harmonic_buffer,
+):
+    """
+    This function sums the harmonic modes of the magnetic field, where sin(k theta)
+    and cos(k theta) of all harmonics are computed with the angle addition
+    recurrence from a single sine and cosine of the fundamental phase theta.
+
+    Parameters
+    ----------
+    factor: float
+        Ramp factor.
+    fundamental_phase: float
+        Fundamental angular frequency times time.
+    magnetic_field_amplitude: numpy.ndarray
+        2D (dim, n_modes) array containing data with 'float' type.
+    harmonic_number: numpy.ndarray
+        2D (dim, n_modes) array containing data with 'int' type.
+    cos_phase_difference: numpy.ndarray
+        2D (dim, n_modes) array containing data with 'float' type.
+    sin_phase_difference: numpy.ndarray
+        2D (dim, n_modes) array containing data with 'float' type.
+    harmonic_buffer: numpy.ndarray
+        2D (2, max_harmonic_number + 1) array containing data with 'float' type.
+        Buffer for sin(k theta) and cos(k theta).
+
+    Returns
+    -------
+    magnetic_field: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+
+    """
+    sin_fundamental = np.sin(fundamental_phase)
+    cos_fundamental = np.cos(fundamental_phase)
+    harmonic_buffer[0, 0] = 0.0
+    harmonic_buffer[1, 0] = 1.0
+    for k in range(1, harmonic_buffer.shape[1]):
+        harmonic_buffer[0, k] = (
+            harmonic_buffer[0, k - 1] * cos_fundamental
+            + harmonic_buffer[1, k - 1] * sin_fundamental
+        )
+        harmonic_buffer[1, k] = (
+            harmonic_buffer[1, k - 1] * cos_fundamental
+            - harmonic_buffer[0, k - 1] * sin_fundamental
+        )
+
+    n_modes = magnetic_field_amplitude.shape[1]
+    magnetic_field = np.zeros(3)
+    for i in range(3):
+        for mode in range(n_modes):
+            k = harmonic_number[i, mode]
+            # sin(k theta + phi) = sin(k theta) cos(phi) + cos(k theta) sin(phi)
+            magnetic_field[i] += magnetic_field_amplitude[i, mode] * (
+                harmonic_buffer[0, k] * cos_phase_difference[i, mode]
+                + harmonic_buffer[1, k] * sin_phase_difference[i, mode]
+            )
+        magnetic_field[i] *= factor
+    return magnetic_field
+
+
+@njit(cache=True)
+def _get_sample_time(
+    sample_idx, uniform_sampling, sample_start_time, sampling_interval, sample_times
+):
+    if uniform_sampling:
+        return sample_start_time + sample_idx * sampling_interval
+    return sample_times[sample_idx]
+
+
+@njit(cache=True)
+def _compute_tabulated_field(
+    time,
+    factor,
+    waveform,
+    uniform_sampling,
+    sample_start_time,
+    sampling_interval,
+    sample_times,
+    cubic_interpolation,
+    bracket_index,
+    magnetic_field,
+):
+    """
+    This function interpolates the magnetic field samples at time, and writes the
+    result in place without allocating.
+
+    Parameters
+    ----------
+    time: float
+        The time of simulation.
+    factor: float
+        Ramp factor.
+    waveform: numpy.ndarray
+        2D (n_samples, dim) array containing data with 'float' type.
+    uniform_sampling: bool
+        If samples are uniformly spaced in time.
+    sample_start_time: float
+        Time of the first sample, for uniform sampling.
+    sampling_interval: float
+        Time between samples, for uniform sampling.
+    sample_times: numpy.ndarray
+        1D (n_samples,) array containing data with 'float' type, for non-uniform
+        sampling.
+    cubic_interpolation: bool
+        If cubic Hermite interpolation is used instead of linear interpolation.
+    bracket_index: numpy.ndarray
+        1D (1,) array containing data with 'int' type.
+        Cached index of the last bracketing sample.
+    magnetic_field: numpy.ndarray
+        1D (dim,) array containing data with 'float' type, output.
+
+    """
+    n_samples = waveform.shape[0]
+    if uniform_sampling:
+        idx = int(np.floor((time - sample_start_time) / sampling_interval))
+        idx = min(max(idx, 0), n_samples - 2)
+    else:
+        # search from the cached bracket, O(1) for advancing time
+        idx = min(max(bracket_index[0], 0), n_samples - 2)
+        while idx < n_samples - 2 and sample_times[idx + 1] <= time:
+            idx += 1
+        while idx > 0 and sample_times[idx] > time:
+            idx -= 1
+        bracket_index[0] = idx
+
+    time_0 = _get_sample_time(
+        idx, uniform_sampling, sample_start_time, sampling_interval, sample_times
+    )
+    time_1 = _get_sample_time(
+        idx + 1, uniform_sampling, sample_start_time, sampling_interval, sample_times
+    )
+    interval = time_1 - time_0
+    weight = min(max((time - time_0) / interval, 0.0), 1.0)
+
+    if not cubic_interpolation:
+        for i in range(3):
+            magnetic_field[i] = factor * (
+                (1.0 - weight) * waveform[idx, i] + weight * waveform[idx + 1, i]
+            )
+        return
+
+    # Cubic Hermite interpolation, tangents are finite differences of neighbours.
+    previous_idx = max(idx - 1, 0)
+    next_idx = min(idx + 2, n_samples - 1)
+    time_previous = _get_sample_time(
+        previous_idx,
+        uniform_sampling,
+        sample_start_time,
+        sampling_interval,
+        sample_times,
+    )
+    time_next = _get_sample_time(
+        next_idx, uniform_sampling, sample_start_time, sampling_interval, sample_times
+    )
+    weight_2 = weight * weight
+    weight_3 = weight_2 * weight
+    h00 = 2.0 * weight_3 - 3.0 * weight_2 + 1.0
+    h10 = weight_3 - 2.0 * weight_2 + weight
+    h01 = -2.0 * weight_3 + 3.0 * weight_2
+    h11 = weight_3 - weight_2
+    for i in range(3):
+        tangent_0 = (waveform[idx + 1, i] - waveform[previous_idx, i]) / (
+            time_1 - time_previous
+        )
+        tangent_1 = (waveform[next_idx, i] - waveform[idx, i]) / (time_next - time_0)
+        magnetic_field[i] = factor * (
+            h00 * waveform[idx, i]
+            + h10 * interval * tangent_0
+            + h01 * waveform[idx + 1, i]
+            + h11 * interval * tangent_1
+        )
+
+
+@njit(cache=True)
+def _compute_composite_field(
+    time,
+    ramp_parameters,
+    mode_ramp_index,
+    mode_gate,
+    magnetic_field_amplitude,
+    magnetic_field_angular_frequency,
+    magnetic_field_phase_difference,
+    ramp_factor_buffer,
+    magnetic_field,
+):
+    """
+    This function sums the gathered modes of a composite magnetic field, ramp
+    factors are computed once for each distinct ramp.
+
+    Parameters
+    ----------
+    time: float
+        The time of simulation.
+    ramp_parameters: numpy.ndarray
+        2D (4, n_ramps) array containing data with 'float' type.
+    mode_ramp_index: numpy.ndarray
+        1D (n_modes,) array containing data with 'int' type.
+    mode_gate: numpy.ndarray
+        2D (2, n_modes) array containing data with 'float' type.
+    magnetic_field_amplitude: numpy.ndarray
+        2D (dim, n_modes) array containing data with 'float' type.
+    magnetic_field_angular_frequency: numpy.ndarray
+        2D (dim, n_modes) array containing data with 'float' type.
+    magnetic_field_phase_difference: numpy.ndarray
+        2D (dim, n_modes) array containing data with 'float' type.
+    ramp_factor_buffer: numpy.ndarray
+        1D (n_ramps,) array containing data with 'float' type.
+    magnetic_field: numpy.ndarray
+        1D (dim,) array containing data with 'float' type, output.
+
+    """
+    for ramp in range(ramp_parameters.shape[1]):
+        ramp_factor_buffer[ramp] = compute_ramp_factor_kernel(
+            time,
+            ramp_parameters[0, ramp],
+            ramp_parameters[1, ramp],
+            ramp_parameters[2, ramp],
+            int(ramp_parameters[3, ramp]),
+        )
+    for mode in range(magnetic_field_amplitude.shape[1]):
+        factor = (
+            ramp_factor_buffer[mode_ramp_index[mode]]
+            * (time > mode_gate[0, mode])
+            * (time <= mode_gate[1, mode])
+        )
+        for i in range(3):
+            magnetic_field[i] += (
+                factor
+                * magnetic_field_amplitude[i, mode]
+                * np.sin(
+                    magnetic_field_angular_frequency[i, mode] * time
+                    + magnetic_field_phase_difference[i, mode]
+                )
+            )
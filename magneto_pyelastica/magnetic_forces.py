@@ -1,18 +1,170 @@
 __doc__ = """ Module implementation for external magnetic forces for magnetic Cosserat rods."""
-__all__ = ["MagneticForces"]
+__all__ = [
+    "compute_magnetization_collection",
+    "compute_susceptibility_collection",
+    "MagneticForces",
+    "CollectiveMagneticForces",
+    "ProgrammedMagneticForces",
+    "SATURATION_LAWS",
+    "get_saturation_law_id",
+    "SoftMagneticForces",
+]
 
 from elastica.external_forces import NoForces
 from elastica.rod.cosserat_rod import CosseratRod
-from elastica._linalg import _batch_cross, _batch_matvec, _batch_norm
-from magneto_pyelastica.magnetic_field import BaseMagneticField
+from elastica._linalg import _batch_matvec, _batch_norm
+from magneto_pyelastica.magnetic_field import BaseMagneticField, MU_0
 import numpy as np
-from typing import Union
+from numba import njit, types
+from numba.typed import List
+from typing import Union, Sequence
+
+# saturation laws of induced magnetization, ids are used by the compiled kernels
+SATURATION_LAWS = {
+    "linear": 0,
+    "langevin": 1,
+    "frohlich": 2,
+}
+
+
+def compute_magnetization_collection(
+    magnetization_density: Union[float, np.ndarray],
+    magnetization_direction: np.ndarray,
+    rod_volume: np.ndarray,
+    rod_director_collection: np.ndarray,
+):
+    """
+    This function computes the magnetization of rod elements in the material frame,
+    from the magnetization density and the magnetization direction in the lab frame.
+
+    Parameters
+    ----------
+    magnetization_density: float or a np.ndarray
+        Float number or 1D (n_elems) array containing data with 'float' type.
+        Density of magnetization of the rod.
+    magnetization_direction: np.ndarray
+        1D (dim) or 2D (dim, n_elems) array containing data with 'float' type.
+        Direction of magnetization of the rod in the lab frame.
+    rod_volume: numpy.ndarray
+        1D (n_elems) array containing data with 'float' type.
+        Rod element volumes.
+    rod_director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+        Array containing rod elemental director matrices.
+
+    Returns
+    -------
+    magnetization_collection: np.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetization of the rod, defined on the elements, in the material frame.
+
+    """
+    rod_n_elem = rod_volume.shape[0]
+
+    _check_magnetization_direction(magnetization_direction, rod_n_elem)
+    # if fixed value, then expand to rod element size
+    magnetization_direction = magnetization_direction.reshape(3, -1) * np.ones(
+        (rod_n_elem,)
+    )
+    # normalise for unit vectors
+    magnetization_direction /= _batch_norm(magnetization_direction)
+    # convert to local frame
+    magnetization_direction_in_material_frame = _batch_matvec(
+        rod_director_collection, magnetization_direction
+    )
+
+    _check_magnetization_density(magnetization_density, rod_n_elem)
+
+    magnetization_collection = (
+        magnetization_density * rod_volume * magnetization_direction_in_material_frame
+    )
+    return magnetization_collection
+
+
+def _check_magnetization_direction(magnetization_direction, rod_n_elem):
+    if not (
+        magnetization_direction.shape == (3,)
+        or magnetization_direction.shape == (3, rod_n_elem)
+    ):
+        raise ValueError(
+            "Invalid magnetization direction! Should be either a (3,) array or "
+            "an array of shape (3, num_rod_elements)"
+        )
+
+
+def _check_magnetization_density(magnetization_density, rod_n_elem):
+    if not (
+        isinstance(magnetization_density, float)
+        or magnetization_density.shape == (rod_n_elem,)
+    ):
+        raise ValueError(
+            "Invalid magnetization intensity! Should be either a float or "
+            "an array of shape (num_rod_elements,)"
+        )
+
+
+def get_saturation_law_id(saturation_law):
+    """
+    This function returns the id of the saturation law, used by compiled kernels.
+
+    Parameters
+    ----------
+    saturation_law : str
+        Name of the saturation law, one of SATURATION_LAWS.
+
+    Returns
+    -------
+    saturation_law_id : int
+        Id of the saturation law.
+
+    """
+    if saturation_law not in SATURATION_LAWS:
+        raise ValueError(
+            "Invalid saturation law! Should be one of " + ", ".join(SATURATION_LAWS)
+        )
+    return SATURATION_LAWS[saturation_law]
+
+
+def compute_susceptibility_collection(
+    magnetic_susceptibility: Union[float, np.ndarray], rod_n_elem: int
+):
+    """
+    This function expands the magnetic susceptibility of a rod to its elements.
+
+    Parameters
+    ----------
+    magnetic_susceptibility: float or a np.ndarray
+        Float number, 1D (dim) or 2D (dim, n_elems) array containing data with
+        'float' type. Magnetic susceptibility of the rod along the directors d1, d2
+        and d3 of the material frame.
+    rod_n_elem: int
+        Number of rod elements.
+
+    Returns
+    -------
+    susceptibility_collection: np.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetic susceptibility of the rod, defined on the elements, in the
+        material frame.
+
+    """
+    magnetic_susceptibility = np.array(magnetic_susceptibility, dtype=np.float64)
+    if magnetic_susceptibility.shape in [(), (3,)]:
+        return magnetic_susceptibility.reshape(-1, 1) * np.ones((3, rod_n_elem))
+    if magnetic_susceptibility.shape == (3, rod_n_elem):
+        return magnetic_susceptibility
+    raise ValueError(
+        "Invalid magnetic susceptibility! Should be either a float, a (3,) array or "
+        "an array of shape (3, num_rod_elements)"
+    )
 
 
 class MagneticForces(NoForces):
     """
     This class applies magnetic forces on a magnetic Cosserat rod, based on an
-    external magnetic field.
+    external magnetic field. Magnetic torques m x B are applied for all fields,
+    and magnetic gradient forces grad(m . B) are applied only for spatially
+    varying fields.
 
         Attributes
         ----------
@@ -22,9 +174,40 @@ class MagneticForces(NoForces):
         magnetization_collection: np.ndarray
             2D (dim, n_elems) array containing data with 'float' type.
             Magnetization of the rod, defined on the elements, in the material frame.
+        magnetization_density: float or np.ndarray
+            Density of magnetization of the rod.
+        magnetization_direction_collection: np.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Unit direction of magnetization of the rod, in the material frame.
+        rod_volume: numpy.ndarray
+            1D (n_elems) array containing data with 'float' type.
+            Rod element volumes.
+        element_position_collection: np.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Buffer for the element positions, where spatially varying magnetic
+            fields are evaluated.
+        diagnostics_step_skip: int
+            Diagnostics are recorded every diagnostics_step_skip time steps, 0 if
+            they are not recorded.
+        diagnostics: dict
+            Recorded times, Zeeman energies -m . B and magnetic powers of the rod,
+            i.e. the rates of work of the magnetic torques and forces, as lists.
+
+    Notes
+    -----
+    Magnetization can be reprogrammed during the simulation with
+    set_magnetization, it is recomputed at the next time step.
+
+    Diagnostics are summed over the elements in the same kernel pass as the
+    magnetic torques and forces, and the kernels without diagnostics are used at
+    the other time steps.
 
     """
 
+    # magnetization_collection is recomputed at the next time step if True
+    _is_magnetization_outdated = False
+    diagnostics_step_skip = 0
+
     def __init__(
         self,
         external_magnetic_field: BaseMagneticField,
@@ -32,6 +215,7 @@ class MagneticForces(NoForces):
         magnetization_direction: np.ndarray,
         rod_volume: np.ndarray,
         rod_director_collection: np.ndarray,
+        diagnostics_step_skip: int = 0,
     ):
         """
         Parameters
@@ -51,56 +235,1381 @@ class MagneticForces(NoForces):
         rod_director_collection: numpy.ndarray
             3D (dim, dim, n_elems) array containing data with 'float' type.
             Array containing rod elemental director matrices.
+        diagnostics_step_skip: int
+            Diagnostics are recorded every diagnostics_step_skip time steps, 0 if
+            they are not recorded.
 
         """
         super(NoForces, self).__init__()
         self.external_magnetic_field = external_magnetic_field
-        rod_n_elem = rod_volume.shape[0]
+        self.magnetization_density = magnetization_density
+        self.rod_volume = rod_volume
+        self.magnetization_direction_collection = compute_magnetization_collection(
+            magnetization_density=1.0,
+            magnetization_direction=magnetization_direction,
+            rod_volume=np.ones_like(rod_volume),
+            rod_director_collection=rod_director_collection,
+        )
+        _check_magnetization_density(magnetization_density, rod_volume.shape[0])
+        self.magnetization_collection = (
+            magnetization_density * rod_volume * self.magnetization_direction_collection
+        )
+        self.element_position_collection = np.zeros_like(self.magnetization_collection)
+        self._magnetization_direction = None
+        self._init_diagnostics(diagnostics_step_skip)
 
-        # if fixed value, then expand to rod element size
-        if magnetization_direction.shape == (3,) or magnetization_direction.shape == (
-            3,
-            rod_n_elem,
-        ):
-            magnetization_direction = magnetization_direction.reshape(3, -1) * np.ones(
-                (rod_n_elem,)
-            )
-        else:
+    def _init_diagnostics(self, diagnostics_step_skip: int):
+        if not (isinstance(diagnostics_step_skip, int) and diagnostics_step_skip >= 0):
             raise ValueError(
-                "Invalid magnetization direction! Should be either a (3,) array or "
-                "an array of shape (3, num_rod_elements)"
+                "Invalid diagnostics step skip! Should be a non-negative integer"
             )
-        # normalise for unit vectors
-        magnetization_direction /= _batch_norm(magnetization_direction)
-        # convert to local frame
-        magnetization_direction_in_material_frame = _batch_matvec(
-            rod_director_collection, magnetization_direction
+        self.diagnostics_step_skip = diagnostics_step_skip
+        self.diagnostics = {"time": [], "zeeman_energy": [], "magnetic_power": []}
+        self._diagnostics_step = 0
+        # Zeeman energy, torque power and force power of the current time step
+        self._diagnostics_buffer = np.zeros((3,))
+
+    def _is_diagnostics_step(self):
+        return (
+            self.diagnostics_step_skip > 0
+            and self._diagnostics_step % self.diagnostics_step_skip == 0
+        )
+
+    def _record_diagnostics(self, time: np.float64):
+        if self._is_diagnostics_step():
+            self.diagnostics["time"].append(time)
+            self.diagnostics["zeeman_energy"].append(self._diagnostics_buffer[0])
+            self.diagnostics["magnetic_power"].append(
+                self._diagnostics_buffer[1] + self._diagnostics_buffer[2]
+            )
+        self._diagnostics_step += 1
+
+    def set_magnetization(
+        self,
+        magnetization_density: Union[float, np.ndarray] = None,
+        magnetization_direction: np.ndarray = None,
+        rod_volume: np.ndarray = None,
+    ):
+        """
+        This function reprograms the magnetization of the rod in place. The
+        magnetization is only recomputed at the next time step, and a new
+        magnetization direction is converted to the material frame with the
+        directors of the rod at that step. Arguments that are None are not changed.
+
+        Parameters
+        ----------
+        magnetization_density: float or a np.ndarray
+            Float number or 1D (n_elems) array containing data with 'float' type.
+            Density of magnetization of the rod.
+        magnetization_direction: np.ndarray
+            1D (dim) or 2D (dim, n_elems) array containing data with 'float' type.
+            Direction of magnetization of the rod in the lab frame.
+        rod_volume: numpy.ndarray
+            1D (n_elems) array containing data with 'float' type.
+            Rod element volumes.
+
+        """
+        rod_n_elem = self.magnetization_collection.shape[1]
+        if magnetization_density is not None:
+            _check_magnetization_density(magnetization_density, rod_n_elem)
+            self.magnetization_density = magnetization_density
+        if magnetization_direction is not None:
+            _check_magnetization_direction(magnetization_direction, rod_n_elem)
+            self._magnetization_direction = np.array(
+                magnetization_direction, dtype=np.float64
+            )
+        if rod_volume is not None:
+            self.rod_volume = rod_volume
+        self._is_magnetization_outdated = True
+
+    def _update_magnetization_collection(self, rod: CosseratRod):
+        if self._magnetization_direction is not None:
+            self.magnetization_direction_collection = compute_magnetization_collection(
+                magnetization_density=1.0,
+                magnetization_direction=self._magnetization_direction,
+                rod_volume=np.ones_like(self.rod_volume),
+                rod_director_collection=rod.director_collection,
+            )
+            self._magnetization_direction = None
+        self.magnetization_collection[...] = (
+            self.magnetization_density
+            * self.rod_volume
+            * self.magnetization_direction_collection
+        )
+        self._is_magnetization_outdated = False
+
+    def apply_forces(self, rod: CosseratRod, time: np.float64 = 0.0):
+        # uniform magnetic fields do not exert net forces on magnetic elements
+        if self.external_magnetic_field.is_uniform:
+            return
+
+        if self._is_magnetization_outdated:
+            self._update_magnetization_collection(rod)
+        _compute_element_positions(
+            rod.position_collection, self.element_position_collection
+        )
+        magnetic_field_jacobian = self.external_magnetic_field.jacobian_at(
+            time=time, positions=self.element_position_collection
         )
+        if self._is_diagnostics_step():
+            self._diagnostics_buffer[2] = _compute_magnetic_gradient_forces_and_power(
+                self.magnetization_collection,
+                rod.director_collection,
+                magnetic_field_jacobian,
+                rod.velocity_collection,
+                rod.external_forces,
+            )
+        else:
+            _compute_magnetic_gradient_forces(
+                self.magnetization_collection,
+                rod.director_collection,
+                magnetic_field_jacobian,
+                rod.external_forces,
+            )
+
+    def apply_torques(self, rod: CosseratRod, time: np.float64 = 0.0):
+        if self._is_magnetization_outdated:
+            self._update_magnetization_collection(rod)
+        if self._is_diagnostics_step():
+            if self.external_magnetic_field.is_uniform:
+                # uniform magnetic fields do not exert forces
+                self._diagnostics_buffer[2] = 0.0
+                magnetic_field_collection = np.broadcast_to(
+                    self.external_magnetic_field.value(time=time).reshape(3, 1),
+                    self.magnetization_collection.shape,
+                )
+            else:
+                _compute_element_positions(
+                    rod.position_collection, self.element_position_collection
+                )
+                magnetic_field_collection = self.external_magnetic_field.value_at(
+                    time=time, positions=self.element_position_collection
+                )
+            _compute_magnetic_torques_and_diagnostics(
+                self.magnetization_collection,
+                rod.director_collection,
+                magnetic_field_collection,
+                rod.omega_collection,
+                rod.external_torques,
+                self._diagnostics_buffer,
+            )
+        elif self.external_magnetic_field.is_uniform:
+            _compute_magnetic_torques(
+                self.magnetization_collection,
+                rod.director_collection,
+                self.external_magnetic_field.value(time=time),
+                rod.external_torques,
+            )
+        else:
+            _compute_element_positions(
+                rod.position_collection, self.element_position_collection
+            )
+            _compute_magnetic_torques_in_nonuniform_field(
+                self.magnetization_collection,
+                rod.director_collection,
+                self.external_magnetic_field.value_at(
+                    time=time, positions=self.element_position_collection
+                ),
+                rod.external_torques,
+            )
+        self._record_diagnostics(time)
+
+
+class CollectiveMagneticForces(NoForces):
+    """
+    This class applies magnetic forces on a collection of magnetic Cosserat rods,
+    that are under the same external magnetic field. The external magnetic field is
+    evaluated once per time step, and magnetic torques of all elements of all rods
+    are computed in a single compiled pass, over the concatenated magnetization of
+    the rods.
+
+        Attributes
+        ----------
+        external_magnetic_field: object
+            External magnetic field object, that returns the value of the magnetic field vector
+            via a .value() method.
+        rod_list: list
+            List of magnetic rods that magnetic forces are applied on.
+        magnetization_collection: np.ndarray
+            2D (dim, total_n_elems) array containing data with 'float' type.
+            Concatenated magnetization of the rods, defined on the elements, in the
+            material frame.
+        element_offsets: np.ndarray
+            1D (n_rods + 1) array containing data with 'int' type.
+            Start and end indices of the rod elements in magnetization_collection.
+        magnetization_density_collection: np.ndarray
+            1D (total_n_elems) array containing data with 'float' type.
+            Concatenated density of magnetization of the rods.
+        magnetization_direction_collection: np.ndarray
+            2D (dim, total_n_elems) array containing data with 'float' type.
+            Concatenated unit direction of magnetization of the rods, in the
+            material frame.
+        rod_volume_collection: np.ndarray
+            1D (total_n_elems) array containing data with 'float' type.
+            Concatenated element volumes of the rods.
+        element_position_collection: np.ndarray
+            2D (dim, total_n_elems) array containing data with 'float' type.
+            Buffer for the concatenated element positions of the rods, where
+            spatially varying magnetic fields are evaluated in one call.
+
+    Notes
+    -----
+    This forcing class has to be added to only one of the rods in the rod_list, i.e.
+    `simulator.add_forcing_to(rod_list[0]).using(CollectiveMagneticForces, ...)`,
+    it applies the torques on all the rods in the rod_list. Magnetization of each
+    rod can be reprogrammed during the simulation with set_magnetization, only the
+    elements of that rod are recomputed at the next time step.
 
+    """
+
+    def __init__(
+        self,
+        external_magnetic_field: BaseMagneticField,
+        rod_list: Sequence[CosseratRod],
+        magnetization_density: Union[float, np.ndarray, Sequence],
+        magnetization_direction: Union[np.ndarray, Sequence],
+    ):
+        """
+        Parameters
+        ----------
+        external_magnetic_field: object
+            External magnetic field object, that returns the value of the
+            magnetic field vector via a .value() method.
+        rod_list: list
+            List of magnetic rods that magnetic forces are applied on.
+        magnetization_density: float or a np.ndarray or list
+            Float number or 1D (n_elems) array containing data with 'float' type,
+            shared by all rods, or a list of those for each rod.
+            Density of magnetization of the rods.
+        magnetization_direction: np.ndarray or list
+            1D (dim) array containing data with 'float' type shared by all rods, or a
+            list of 1D (dim) or 2D (dim, n_elems) arrays for each rod.
+            Direction of magnetization of the rods in the lab frame.
+
+        """
+        super(NoForces, self).__init__()
+        self.external_magnetic_field = external_magnetic_field
+        self.rod_list = list(rod_list)
+        n_rods = len(self.rod_list)
+
+        if isinstance(magnetization_density, (list, tuple)):
+            magnetization_density_list = magnetization_density
+        else:
+            magnetization_density_list = [magnetization_density] * n_rods
+        if isinstance(magnetization_direction, (list, tuple)):
+            magnetization_direction_list = magnetization_direction
+        else:
+            magnetization_direction_list = [magnetization_direction] * n_rods
         if not (
-            isinstance(magnetization_density, float)
-            or magnetization_density.shape == (rod_n_elem,)
+            len(magnetization_density_list) == n_rods
+            and len(magnetization_direction_list) == n_rods
         ):
             raise ValueError(
-                "Invalid magnetization intensity! Should be either a float or "
-                "an array of shape (num_rod_elements,)"
+                "Invalid magnetization list! Should have one entry for each rod "
+                "in the rod_list"
             )
 
+        self.magnetization_direction_collection = np.hstack(
+            [
+                compute_magnetization_collection(
+                    magnetization_density=1.0,
+                    magnetization_direction=np.array(direction, dtype=np.float64),
+                    rod_volume=np.ones_like(rod.volume),
+                    rod_director_collection=rod.director_collection,
+                )
+                for rod, direction in zip(self.rod_list, magnetization_direction_list)
+            ]
+        )
+        for rod, density in zip(self.rod_list, magnetization_density_list):
+            _check_magnetization_density(density, rod.n_elems)
+        self.magnetization_density_collection = np.hstack(
+            [
+                density * np.ones((rod.n_elems,))
+                for rod, density in zip(self.rod_list, magnetization_density_list)
+            ]
+        )
+        self.rod_volume_collection = np.hstack([rod.volume for rod in self.rod_list])
         self.magnetization_collection = (
-            magnetization_density
-            * rod_volume
-            * magnetization_direction_in_material_frame
+            self.magnetization_density_collection
+            * self.rod_volume_collection
+            * self.magnetization_direction_collection
+        )
+        self.element_offsets = np.cumsum(
+            [0] + [rod.n_elems for rod in self.rod_list]
+        ).astype(np.int64)
+        self.element_position_collection = np.zeros_like(self.magnetization_collection)
+        # pending magnetization directions of the reprogrammed rods
+        self._outdated_magnetization_rods = {}
+
+        # Rod arrays are mapped onto the memory block at the finalize step of the
+        # simulator, so typed lists are built lazily at the first call.
+        self._director_collection_list = None
+        self._position_collection_list = None
+        self._external_forces_list = None
+        self._external_torques_list = None
+        self._first_rod_director_collection = None
+
+    def _update_rod_array_lists(self):
+        director_collection_list = List.empty_list(types.Array(types.float64, 3, "A"))
+        position_collection_list = List.empty_list(types.Array(types.float64, 2, "A"))
+        external_forces_list = List.empty_list(types.Array(types.float64, 2, "A"))
+        external_torques_list = List.empty_list(types.Array(types.float64, 2, "A"))
+        for rod in self.rod_list:
+            director_collection_list.append(rod.director_collection)
+            position_collection_list.append(rod.position_collection)
+            external_forces_list.append(rod.external_forces)
+            external_torques_list.append(rod.external_torques)
+        self._director_collection_list = director_collection_list
+        self._position_collection_list = position_collection_list
+        self._external_forces_list = external_forces_list
+        self._external_torques_list = external_torques_list
+        self._first_rod_director_collection = self.rod_list[0].director_collection
+
+    def set_magnetization(
+        self,
+        rod_idx: int,
+        magnetization_density: Union[float, np.ndarray] = None,
+        magnetization_direction: np.ndarray = None,
+        rod_volume: np.ndarray = None,
+    ):
+        """
+        This function reprograms the magnetization of one of the rods in place. The
+        magnetization of the rod is only recomputed at the next time step, and a new
+        magnetization direction is converted to the material frame with the
+        directors of the rod at that step. Arguments that are None are not changed.
+
+        Parameters
+        ----------
+        rod_idx: int
+            Index of the rod in the rod_list.
+        magnetization_density: float or a np.ndarray
+            Float number or 1D (n_elems) array containing data with 'float' type.
+            Density of magnetization of the rod.
+        magnetization_direction: np.ndarray
+            1D (dim) or 2D (dim, n_elems) array containing data with 'float' type.
+            Direction of magnetization of the rod in the lab frame.
+        rod_volume: numpy.ndarray
+            1D (n_elems) array containing data with 'float' type.
+            Rod element volumes.
+
+        """
+        start = self.element_offsets[rod_idx]
+        end = self.element_offsets[rod_idx + 1]
+        if magnetization_density is not None:
+            _check_magnetization_density(magnetization_density, end - start)
+            self.magnetization_density_collection[start:end] = magnetization_density
+        if magnetization_direction is not None:
+            _check_magnetization_direction(magnetization_direction, end - start)
+            self._outdated_magnetization_rods[rod_idx] = np.array(
+                magnetization_direction, dtype=np.float64
+            )
+        else:
+            self._outdated_magnetization_rods.setdefault(rod_idx, None)
+        if rod_volume is not None:
+            self.rod_volume_collection[start:end] = rod_volume
+
+    def _update_magnetization_collection(self):
+        for (
+            rod_idx,
+            magnetization_direction,
+        ) in self._outdated_magnetization_rods.items():
+            start = self.element_offsets[rod_idx]
+            end = self.element_offsets[rod_idx + 1]
+            if magnetization_direction is not None:
+                rod = self.rod_list[rod_idx]
+                self.magnetization_direction_collection[
+                    :, start:end
+                ] = compute_magnetization_collection(
+                    magnetization_density=1.0,
+                    magnetization_direction=magnetization_direction,
+                    rod_volume=np.ones_like(rod.volume),
+                    rod_director_collection=rod.director_collection,
+                )
+            self.magnetization_collection[:, start:end] = (
+                self.magnetization_density_collection[start:end]
+                * self.rod_volume_collection[start:end]
+                * self.magnetization_direction_collection[:, start:end]
+            )
+        self._outdated_magnetization_rods.clear()
+
+    def apply_forces(self, rod: CosseratRod, time: np.float64 = 0.0):
+        # uniform magnetic fields do not exert net forces on magnetic elements
+        if self.external_magnetic_field.is_uniform:
+            return
+
+        if (
+            self._first_rod_director_collection
+            is not self.rod_list[0].director_collection
+        ):
+            self._update_rod_array_lists()
+        if self._outdated_magnetization_rods:
+            self._update_magnetization_collection()
+
+        _compute_collective_element_positions(
+            self.element_offsets,
+            self._position_collection_list,
+            self.element_position_collection,
+        )
+        _compute_collective_magnetic_gradient_forces(
+            self.magnetization_collection,
+            self.element_offsets,
+            self._director_collection_list,
+            self.external_magnetic_field.jacobian_at(
+                time=time, positions=self.element_position_collection
+            ),
+            self._external_forces_list,
+        )
+
+    def apply_torques(self, rod: CosseratRod, time: np.float64 = 0.0):
+        if (
+            self._first_rod_director_collection
+            is not self.rod_list[0].director_collection
+        ):
+            self._update_rod_array_lists()
+        if self._outdated_magnetization_rods:
+            self._update_magnetization_collection()
+
+        if self.external_magnetic_field.is_uniform:
+            _compute_collective_magnetic_torques(
+                self.magnetization_collection,
+                self.element_offsets,
+                self._director_collection_list,
+                self.external_magnetic_field.value(time=time),
+                self._external_torques_list,
+            )
+        else:
+            _compute_collective_element_positions(
+                self.element_offsets,
+                self._position_collection_list,
+                self.element_position_collection,
+            )
+            _compute_collective_magnetic_torques_in_nonuniform_field(
+                self.magnetization_collection,
+                self.element_offsets,
+                self._director_collection_list,
+                self.external_magnetic_field.value_at(
+                    time=time, positions=self.element_position_collection
+                ),
+                self._external_torques_list,
+            )
+
+
+class ProgrammedMagneticForces(MagneticForces):
+    """
+    This class applies magnetic forces on a magnetic Cosserat rod, which
+    magnetization varies in time following a magnetization profile, i.e. a rod
+    reprogrammed or demagnetized during the simulation.
+
+        Attributes
+        ----------
+        external_magnetic_field: object
+            External magnetic field object, that returns the value of the magnetic field vector
+            via a .value() method.
+        magnetization_profile: object
+            Magnetization profile object, that returns the magnetization of the rod
+            elements in the material frame via a .value() method.
+        rod_volume: numpy.ndarray
+            1D (n_elems) array containing data with 'float' type.
+            Rod element volumes.
+        magnetization_collection: np.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Magnetization of the rod, defined on the elements, in the material frame,
+            updated when the value of the magnetization profile changes.
+
+    Notes
+    -----
+    Magnetization profiles memoize their value, so that the magnetization of the
+    rod is only recomputed when the profile value changes, and static profiles
+    cost as much as MagneticForces.
+
+    """
+
+    def __init__(
+        self,
+        external_magnetic_field: BaseMagneticField,
+        magnetization_profile,
+        rod_volume: np.ndarray,
+        diagnostics_step_skip: int = 0,
+    ):
+        """
+        Parameters
+        ----------
+        external_magnetic_field: object
+            External magnetic field object, that returns the value of the
+            magnetic field vector via a .value() method.
+        magnetization_profile: object
+            Magnetization profile object, that returns the magnetization of the rod
+            elements in the material frame via a .value() method.
+        rod_volume: numpy.ndarray
+            1D (n_elems) array containing data with 'float' type.
+            Rod element volumes.
+        diagnostics_step_skip: int
+            Diagnostics are recorded every diagnostics_step_skip time steps, 0 if
+            they are not recorded.
+
+        """
+        super(NoForces, self).__init__()
+        self.external_magnetic_field = external_magnetic_field
+        self.magnetization_profile = magnetization_profile
+        self.rod_volume = rod_volume
+        self.magnetization_collection = np.zeros((3, rod_volume.shape[0]))
+        self.element_position_collection = np.zeros_like(self.magnetization_collection)
+        self._magnetization_profile_value = None
+        self._init_diagnostics(diagnostics_step_skip)
+
+    def set_magnetization(self, *args, **kwargs):
+        raise TypeError(
+            f"{self.__class__.__name__} has programmed magnetization, it can not "
+            "be set"
         )
 
+    def update_magnetization(self, time: np.float64 = 0.0):
+        """
+        This function updates the magnetization of the rod elements, if the value
+        of the magnetization profile changed.
+
+        Parameters
+        ----------
+        time: float
+            The time of simulation.
+
+        """
+        magnetization = self.magnetization_profile.value(time=time)
+        if magnetization is not self._magnetization_profile_value:
+            np.multiply(
+                self.rod_volume, magnetization, out=self.magnetization_collection
+            )
+            self._magnetization_profile_value = magnetization
+
+    def apply_forces(self, rod: CosseratRod, time: np.float64 = 0.0):
+        # uniform magnetic fields do not exert net forces on magnetic elements
+        if self.external_magnetic_field.is_uniform:
+            return
+
+        self.update_magnetization(time)
+        super(ProgrammedMagneticForces, self).apply_forces(rod, time)
+
     def apply_torques(self, rod: CosseratRod, time: np.float64 = 0.0):
-        rod.external_torques += _batch_cross(
+        self.update_magnetization(time)
+        super(ProgrammedMagneticForces, self).apply_torques(rod, time)
+
+
+class SoftMagneticForces(MagneticForces):
+    """
+    This class applies magnetic forces on a soft magnetic Cosserat rod, which
+    magnetization is induced by the external magnetic field. At every time step,
+    the field at the elements is rotated into the material frame, and the
+    magnetization of the elements is M = chi H with H = B / mu_0, saturated by the
+    saturation law. Susceptibility can differ along the directors, e.g. a larger
+    susceptibility along the rod tangent d3 aligns the rod with the field.
+
+        Attributes
+        ----------
+        external_magnetic_field: object
+            External magnetic field object, that returns the value of the magnetic field vector
+            via a .value() method.
+        magnetic_susceptibility: np.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Magnetic susceptibility of the rod in the material frame.
+        saturation_magnetization: float
+            Saturation magnetization of the rod material.
+        saturation_law: str
+            Saturation law of the magnetization, one of SATURATION_LAWS.
+        rod_volume: numpy.ndarray
+            1D (n_elems) array containing data with 'float' type.
+            Rod element volumes.
+        magnetization_collection: np.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Induced magnetization of the rod, defined on the elements, in the
+            material frame, updated at every time step.
+        magnetic_field_collection: np.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            External magnetic field at the elements, in the lab frame.
+        diagnostics_step_skip: int
+            Diagnostics are recorded every diagnostics_step_skip time steps, 0 if
+            they are not recorded.
+        diagnostics: dict
+            Recorded times, Zeeman energies -m . B and magnetic powers of the rod,
+            as lists.
+
+    Notes
+    -----
+    Saturation laws scale the linear magnetization M_lin = chi H along its
+    direction, to M_s L(3 |M_lin| / M_s) with the Langevin function L for the
+    Langevin law, and to M_lin / (1 + |M_lin| / M_s) for the Frohlich-Kennelly law.
+
+    """
+
+    def __init__(
+        self,
+        external_magnetic_field: BaseMagneticField,
+        magnetic_susceptibility: Union[float, np.ndarray],
+        rod_volume: np.ndarray,
+        saturation_magnetization: float = np.inf,
+        saturation_law: str = "linear",
+        diagnostics_step_skip: int = 0,
+    ):
+        """
+        Parameters
+        ----------
+        external_magnetic_field: object
+            External magnetic field object, that returns the value of the
+            magnetic field vector via a .value() method.
+        magnetic_susceptibility: float or a np.ndarray
+            Float number, 1D (dim) or 2D (dim, n_elems) array containing data with
+            'float' type. Magnetic susceptibility of the rod along the directors
+            d1, d2 and d3 of the material frame.
+        rod_volume: numpy.ndarray
+            1D (n_elems) array containing data with 'float' type.
+            Rod element volumes.
+        saturation_magnetization: float
+            Saturation magnetization of the rod material, not used by the linear
+            saturation law.
+        saturation_law: str
+            Saturation law of the magnetization, one of SATURATION_LAWS.
+        diagnostics_step_skip: int
+            Diagnostics are recorded every diagnostics_step_skip time steps, 0 if
+            they are not recorded.
+
+        """
+        super(NoForces, self).__init__()
+        self.external_magnetic_field = external_magnetic_field
+        self.magnetic_susceptibility = compute_susceptibility_collection(
+            magnetic_susceptibility, rod_volume.shape[0]
+        )
+        if not saturation_magnetization > 0.0:
+            raise ValueError(
+                "Invalid saturation magnetization! Should be a positive float"
+            )
+        self.saturation_magnetization = float(saturation_magnetization)
+        self.saturation_law_id = get_saturation_law_id(saturation_law)
+        self.saturation_law = saturation_law
+        self.rod_volume = rod_volume
+        self.magnetization_collection = np.zeros_like(self.magnetic_susceptibility)
+        self.element_position_collection = np.zeros_like(self.magnetization_collection)
+        self.magnetic_field_collection = np.zeros_like(self.magnetization_collection)
+        self._magnetization_time = None
+        self._init_diagnostics(diagnostics_step_skip)
+
+    def set_magnetization(self, *args, **kwargs):
+        raise TypeError(
+            f"{self.__class__.__name__} has induced magnetization, it can not be set"
+        )
+
+    def update_magnetization(self, rod: CosseratRod, time: np.float64 = 0.0):
+        """
+        This function updates the induced magnetization of the rod elements, from
+        the external magnetic field at the elements.
+
+        Parameters
+        ----------
+        rod: object
+            Rod object.
+        time: float
+            The time of simulation.
+
+        """
+        if self.external_magnetic_field.is_uniform:
+            self.magnetic_field_collection[...] = self.external_magnetic_field.value(
+                time=time
+            ).reshape(3, 1)
+        else:
+            _compute_element_positions(
+                rod.position_collection, self.element_position_collection
+            )
+            self.magnetic_field_collection[...] = self.external_magnetic_field.value_at(
+                time=time, positions=self.element_position_collection
+            )
+        _compute_induced_magnetization(
+            self.magnetic_field_collection,
+            rod.director_collection,
+            self.rod_volume,
+            self.magnetic_susceptibility,
+            self.saturation_magnetization,
+            self.saturation_law_id,
             self.magnetization_collection,
-            # convert external_magnetic_field to local frame
-            _batch_matvec(
+        )
+        self._magnetization_time = time
+
+    def apply_forces(self, rod: CosseratRod, time: np.float64 = 0.0):
+        # uniform magnetic fields do not exert net forces on magnetic elements
+        if self.external_magnetic_field.is_uniform:
+            return
+
+        self.update_magnetization(rod, time)
+        super(SoftMagneticForces, self).apply_forces(rod, time)
+
+    def apply_torques(self, rod: CosseratRod, time: np.float64 = 0.0):
+        # magnetization is updated once per time step, in apply_forces for
+        # spatially varying fields
+        if self._magnetization_time != time:
+            self.update_magnetization(rod, time)
+        if self._is_diagnostics_step():
+            if self.external_magnetic_field.is_uniform:
+                # uniform magnetic fields do not exert forces
+                self._diagnostics_buffer[2] = 0.0
+            _compute_magnetic_torques_and_diagnostics(
+                self.magnetization_collection,
                 rod.director_collection,
-                self.external_magnetic_field.value(time=time).reshape(
-                    3, 1
-                )  # broadcasting 3D vector
-                * np.ones((rod.n_elems,)),
-            ),
+                self.magnetic_field_collection,
+                rod.omega_collection,
+                rod.external_torques,
+                self._diagnostics_buffer,
+            )
+        else:
+            _compute_magnetic_torques_in_nonuniform_field(
+                self.magnetization_collection,
+                rod.director_collection,
+                self.magnetic_field_collection,
+                rod.external_torques,
+            )
+        self._record_diagnostics(time)
+
+
+@njit(cache=True)
+def _compute_magnetic_torques(
+    magnetization_collection,
+    director_collection,
+    magnetic_field,
+    external_torques,
+):
+    """
+    This function computes the magnetic torques m x (Q B) on the elements, where
+    the uniform external magnetic field B is rotated into the material frame of
+    each element, and adds them in place to the external torques. We are using
+    njit decorated function to avoid temporary arrays at every time step.
+
+    Parameters
+    ----------
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetization of the rod, defined on the elements, in the material frame.
+    director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+        Array containing rod elemental director matrices.
+    magnetic_field: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+        Value of the external magnetic field in the lab frame.
+    external_torques: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        External torques on the rod elements, in the material frame.
+
+    Notes
+    -----
+    Operation order follows _batch_matvec and _batch_cross, so that the
+    result is identical to the vectorized implementation.
+
+    """
+    blocksize = magnetization_collection.shape[1]
+    for k in range(blocksize):
+        # convert external magnetic field to local frame
+        field_0 = 0.0
+        field_1 = 0.0
+        field_2 = 0.0
+        for j in range(3):
+            field_0 += director_collection[0, j, k] * magnetic_field[j]
+            field_1 += director_collection[1, j, k] * magnetic_field[j]
+            field_2 += director_collection[2, j, k] * magnetic_field[j]
+
+        external_torques[0, k] += (
+            magnetization_collection[1, k] * field_2
+            - magnetization_collection[2, k] * field_1
+        )
+        external_torques[1, k] += (
+            magnetization_collection[2, k] * field_0
+            - magnetization_collection[0, k] * field_2
+        )
+        external_torques[2, k] += (
+            magnetization_collection[0, k] * field_1
+            - magnetization_collection[1, k] * field_0
+        )
+
+
+@njit(cache=True)
+def _compute_magnetic_torques_in_nonuniform_field(
+    magnetization_collection,
+    director_collection,
+    magnetic_field_collection,
+    external_torques,
+):
+    """
+    This function computes the magnetic torques m x (Q B) on the elements, for a
+    spatially varying external magnetic field B evaluated at the element centers,
+    and adds them in place to the external torques.
+
+    Parameters
+    ----------
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetization of the rod, defined on the elements, in the material frame.
+    director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+        Array containing rod elemental director matrices.
+    magnetic_field_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Value of the external magnetic field at the elements, in the lab frame.
+    external_torques: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        External torques on the rod elements, in the material frame.
+
+    """
+    blocksize = magnetization_collection.shape[1]
+    for k in range(blocksize):
+        # convert external magnetic field to local frame
+        field_0 = 0.0
+        field_1 = 0.0
+        field_2 = 0.0
+        for j in range(3):
+            field_0 += director_collection[0, j, k] * magnetic_field_collection[j, k]
+            field_1 += director_collection[1, j, k] * magnetic_field_collection[j, k]
+            field_2 += director_collection[2, j, k] * magnetic_field_collection[j, k]
+
+        external_torques[0, k] += (
+            magnetization_collection[1, k] * field_2
+            - magnetization_collection[2, k] * field_1
+        )
+        external_torques[1, k] += (
+            magnetization_collection[2, k] * field_0
+            - magnetization_collection[0, k] * field_2
+        )
+        external_torques[2, k] += (
+            magnetization_collection[0, k] * field_1
+            - magnetization_collection[1, k] * field_0
+        )
+
+
+@njit(cache=True)
+def _compute_magnetic_torques_and_diagnostics(
+    magnetization_collection,
+    director_collection,
+    magnetic_field_collection,
+    omega_collection,
+    external_torques,
+    diagnostics,
+):
+    """
+    This function computes the magnetic torques m x (Q B) on the elements as
+    _compute_magnetic_torques_in_nonuniform_field, and in the same pass the
+    Zeeman energy -m . (Q B) and the power of the magnetic torques of the rod.
+
+    Parameters
+    ----------
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetization of the rod, defined on the elements, in the material frame.
+    director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+        Array containing rod elemental director matrices.
+    magnetic_field_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Value of the external magnetic field at the elements, in the lab frame.
+    omega_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Angular velocities of the rod elements, in the material frame.
+    external_torques: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        External torques on the rod elements, in the material frame.
+    diagnostics: numpy.ndarray
+        1D (3,) array containing data with 'float' type.
+        Zeeman energy and power of the magnetic torques are written to the first
+        two entries.
+
+    """
+    zeeman_energy = 0.0
+    torque_power = 0.0
+    blocksize = magnetization_collection.shape[1]
+    for k in range(blocksize):
+        # convert external magnetic field to local frame
+        field_0 = 0.0
+        field_1 = 0.0
+        field_2 = 0.0
+        for j in range(3):
+            field_0 += director_collection[0, j, k] * magnetic_field_collection[j, k]
+            field_1 += director_collection[1, j, k] * magnetic_field_collection[j, k]
+            field_2 += director_collection[2, j, k] * magnetic_field_collection[j, k]
+
+        torque_0 = (
+            magnetization_collection[1, k] * field_2
+            - magnetization_collection[2, k] * field_1
+        )
+        torque_1 = (
+            magnetization_collection[2, k] * field_0
+            - magnetization_collection[0, k] * field_2
+        )
+        torque_2 = (
+            magnetization_collection[0, k] * field_1
+            - magnetization_collection[1, k] * field_0
+        )
+        external_torques[0, k] += torque_0
+        external_torques[1, k] += torque_1
+        external_torques[2, k] += torque_2
+
+        zeeman_energy -= (
+            magnetization_collection[0, k] * field_0
+            + magnetization_collection[1, k] * field_1
+            + magnetization_collection[2, k] * field_2
+        )
+        torque_power += (
+            torque_0 * omega_collection[0, k]
+            + torque_1 * omega_collection[1, k]
+            + torque_2 * omega_collection[2, k]
+        )
+    diagnostics[0] = zeeman_energy
+    diagnostics[1] = torque_power
+
+
+@njit(cache=True)
+def _compute_magnetic_gradient_forces_and_power(
+    magnetization_collection,
+    director_collection,
+    magnetic_field_jacobian,
+    velocity_collection,
+    external_forces,
+):
+    """
+    This function computes the magnetic gradient forces grad(m . B) on the elements
+    as _compute_magnetic_gradient_forces, and in the same pass the power of the
+    magnetic forces on the rod nodes.
+
+    Parameters
+    ----------
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetization of the rod, defined on the elements, in the material frame.
+    director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+        Array containing rod elemental director matrices.
+    magnetic_field_jacobian: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+        Gradient of the external magnetic field dB_i/dx_j at the elements, stored as
+        [i, j], in the lab frame.
+    velocity_collection: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+        Velocities of the rod nodes, in the lab frame.
+    external_forces: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+        External forces on the rod nodes, in the lab frame.
+
+    Returns
+    -------
+    force_power: float
+        Power of the magnetic forces on the rod.
+
+    """
+    force_power = 0.0
+    blocksize = magnetization_collection.shape[1]
+    for k in range(blocksize):
+        # convert magnetization to lab frame
+        magnetization_0 = 0.0
+        magnetization_1 = 0.0
+        magnetization_2 = 0.0
+        for i in range(3):
+            magnetization_0 += (
+                director_collection[i, 0, k] * magnetization_collection[i, k]
+            )
+            magnetization_1 += (
+                director_collection[i, 1, k] * magnetization_collection[i, k]
+            )
+            magnetization_2 += (
+                director_collection[i, 2, k] * magnetization_collection[i, k]
+            )
+
+        for j in range(3):
+            force = (
+                magnetization_0 * magnetic_field_jacobian[0, j, k]
+                + magnetization_1 * magnetic_field_jacobian[1, j, k]
+                + magnetization_2 * magnetic_field_jacobian[2, j, k]
+            )
+            # Re-distribute forces from elements to nodes.
+            external_forces[j, k] += 0.5 * force
+            external_forces[j, k + 1] += 0.5 * force
+            force_power += (
+                0.5
+                * force
+                * (velocity_collection[j, k] + velocity_collection[j, k + 1])
+            )
+    return force_power
+
+
+@njit(cache=True)
+def _compute_magnetic_gradient_forces(
+    magnetization_collection,
+    director_collection,
+    magnetic_field_jacobian,
+    external_forces,
+):
+    """
+    This function computes the magnetic gradient forces grad(m . B) on the elements,
+    for a spatially varying external magnetic field, and re-distributes them in
+    place to the external forces on the nodes.
+
+    Parameters
+    ----------
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetization of the rod, defined on the elements, in the material frame.
+    director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+        Array containing rod elemental director matrices.
+    magnetic_field_jacobian: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+        Gradient of the external magnetic field dB_i/dx_j at the elements, stored as
+        [i, j], in the lab frame.
+    external_forces: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+        External forces on the rod nodes, in the lab frame.
+
+    """
+    blocksize = magnetization_collection.shape[1]
+    for k in range(blocksize):
+        # convert magnetization to lab frame
+        magnetization_0 = 0.0
+        magnetization_1 = 0.0
+        magnetization_2 = 0.0
+        for i in range(3):
+            magnetization_0 += (
+                director_collection[i, 0, k] * magnetization_collection[i, k]
+            )
+            magnetization_1 += (
+                director_collection[i, 1, k] * magnetization_collection[i, k]
+            )
+            magnetization_2 += (
+                director_collection[i, 2, k] * magnetization_collection[i, k]
+            )
+
+        for j in range(3):
+            force = (
+                magnetization_0 * magnetic_field_jacobian[0, j, k]
+                + magnetization_1 * magnetic_field_jacobian[1, j, k]
+                + magnetization_2 * magnetic_field_jacobian[2, j, k]
+            )
+            # Re-distribute forces from elements to nodes.
+            external_forces[j, k] += 0.5 * force
+            external_forces[j, k + 1] += 0.5 * force
+
+
+@njit(cache=True)
+def _compute_element_positions(position_collection, element_position_collection):
+    """
+    This function computes the element center positions from the node positions
+    in place.
+
+    Parameters
+    ----------
+    position_collection: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+        Positions of the rod nodes.
+    element_position_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Positions of the rod elements, output.
+
+    """
+    blocksize = element_position_collection.shape[1]
+    for i in range(3):
+        for k in range(blocksize):
+            element_position_collection[i, k] = 0.5 * (
+                position_collection[i, k] + position_collection[i, k + 1]
+            )
+
+
+@njit(cache=True)
+def _compute_collective_magnetic_torques(
+    magnetization_collection,
+    element_offsets,
+    director_collection_list,
+    magnetic_field,
+    external_torques_list,
+):
+    """
+    This function computes the magnetic torques on the elements of a collection of
+    rods, under the same uniform external magnetic field, and adds them in place to
+    the external torques of each rod.
+
+    Parameters
+    ----------
+    magnetization_collection: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Concatenated magnetization of the rods, in the material frame.
+    element_offsets: numpy.ndarray
+        1D (n_rods + 1) array containing data with 'int' type.
+        Start and end indices of the rod elements in magnetization_collection.
+    director_collection_list: numba.typed.List
+        List of 3D (dim, dim, n_elems) arrays containing rod elemental director
+        matrices.
+    magnetic_field: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+        Value of the external magnetic field in the lab frame.
+    external_torques_list: numba.typed.List
+        List of 2D (dim, n_elems) arrays containing external torques of the rods.
+
+    """
+    for rod_idx in range(len(director_collection_list)):
+        _compute_magnetic_torques(
+            magnetization_collection[
+                :, element_offsets[rod_idx] : element_offsets[rod_idx + 1]
+            ],
+            director_collection_list[rod_idx],
+            magnetic_field,
+            external_torques_list[rod_idx],
+        )
+
+
+@njit(cache=True)
+def _compute_collective_magnetic_torques_in_nonuniform_field(
+    magnetization_collection,
+    element_offsets,
+    director_collection_list,
+    magnetic_field_collection,
+    external_torques_list,
+):
+    """
+    This function computes the magnetic torques on the elements of a collection of
+    rods, for a spatially varying external magnetic field evaluated at the
+    concatenated element centers, and adds them in place to the external torques
+    of each rod.
+
+    Parameters
+    ----------
+    magnetization_collection: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Concatenated magnetization of the rods, in the material frame.
+    element_offsets: numpy.ndarray
+        1D (n_rods + 1) array containing data with 'int' type.
+        Start and end indices of the rod elements in magnetization_collection.
+    director_collection_list: numba.typed.List
+        List of 3D (dim, dim, n_elems) arrays containing rod elemental director
+        matrices.
+    magnetic_field_collection: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Value of the external magnetic field at the elements, in the lab frame.
+    external_torques_list: numba.typed.List
+        List of 2D (dim, n_elems) arrays containing external torques of the rods.
+
+    """
+    for rod_idx in range(len(director_collection_list)):
+        start = element_offsets[rod_idx]
+        end = element_offsets[rod_idx + 1]
+        _compute_magnetic_torques_in_nonuniform_field(
+            magnetization_collection[:, start:end],
+            director_collection_list[rod_idx],
+            magnetic_field_collection[:, start:end],
+            external_torques_list[rod_idx],
+        )
+
+
+@njit(cache=True)
+def _compute_collective_element_positions(
+    element_offsets,
+    position_collection_list,
+    element_position_collection,
+):
+    """
+    This function computes the concatenated element center positions of a
+    collection of rods in place.
+
+    Parameters
+    ----------
+    element_offsets: numpy.ndarray
+        1D (n_rods + 1) array containing data with 'int' type.
+        Start and end indices of the rod elements in element_position_collection.
+    position_collection_list: numba.typed.List
+        List of 2D (dim, n_nodes) arrays containing node positions of the rods.
+    element_position_collection: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Concatenated positions of the rod elements, output.
+
+    """
+    for rod_idx in range(len(position_collection_list)):
+        _compute_element_positions(
+            position_collection_list[rod_idx],
+            element_position_collection[
+                :, element_offsets[rod_idx] : element_offsets[rod_idx + 1]
+            ],
+        )
+
+
+@njit(cache=True)
+def _compute_collective_magnetic_gradient_forces(
+    magnetization_collection,
+    element_offsets,
+    director_collection_list,
+    magnetic_field_jacobian,
+    external_forces_list,
+):
+    """
+    This function computes the magnetic gradient forces on the elements of a
+    collection of rods, for a spatially varying external magnetic field, and
+    re-distributes them in place to the external forces on the nodes of each rod.
+
+    Parameters
+    ----------
+    magnetization_collection: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Concatenated magnetization of the rods, in the material frame.
+    element_offsets: numpy.ndarray
+        1D (n_rods + 1) array containing data with 'int' type.
+        Start and end indices of the rod elements in magnetization_collection.
+    director_collection_list: numba.typed.List
+        List of 3D (dim, dim, n_elems) arrays containing rod elemental director
+        matrices.
+    magnetic_field_jacobian: numpy.ndarray
+        3D (dim, dim, total_n_elems) array containing data with 'float' type.
+        Gradient of the external magnetic field at the elements, in the lab frame.
+    external_forces_list: numba.typed.List
+        List of 2D (dim, n_nodes) arrays containing external forces of the rods.
+
+    """
+    for rod_idx in range(len(director_collection_list)):
+        start = element_offsets[rod_idx]
+        end = element_offsets[rod_idx + 1]
+        _compute_magnetic_gradient_forces(
+            magnetization_collection[:, start:end],
+            director_collection_list[rod_idx],
+            magnetic_field_jacobian[:, :, start:end],
+            external_forces_list[rod_idx],
+        )
+
+
+@njit(cache=True)
+def _compute_induced_magnetization(
+    magnetic_field_collection,
+    director_collection,
+    rod_volume,
+    magnetic_susceptibility,
+    saturation_magnetization,
+    saturation_law_id,
+    magnetization_collection,
+):
+    """
+    This function computes the induced magnetization of the elements in the
+    material frame in place, from the magnetic field at the elements.
+
+    Parameters
+    ----------
+    magnetic_field_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Value of the magnetic field at the elements, in the lab frame.
+    director_collection: numpy.ndarray
+        3D (dim, dim, n_elems) array containing data with 'float' type.
+        Array containing rod elemental director matrices.
+    rod_volume: numpy.ndarray
+        1D (n_elems) array containing data with 'float' type.
+        Rod element volumes.
+    magnetic_susceptibility: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetic susceptibility of the rod in the material frame.
+    saturation_magnetization: float
+    saturation_law_id: int
+        Id of the saturation law, see SATURATION_LAWS.
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetization of the rod, defined on the elements, in the material frame,
+        output.
+
+    """
+    blocksize = magnetization_collection.shape[1]
+    for k in range(blocksize):
+        # linear magnetization chi H in the material frame
+        magnetization_0 = 0.0
+        magnetization_1 = 0.0
+        magnetization_2 = 0.0
+        for j in range(3):
+            magnetization_0 += (
+                director_collection[0, j, k] * magnetic_field_collection[j, k]
+            )
+            magnetization_1 += (
+                director_collection[1, j, k] * magnetic_field_collection[j, k]
+            )
+            magnetization_2 += (
+                director_collection[2, j, k] * magnetic_field_collection[j, k]
+            )
+        magnetization_0 *= magnetic_susceptibility[0, k] / MU_0
+        magnetization_1 *= magnetic_susceptibility[1, k] / MU_0
+        magnetization_2 *= magnetic_susceptibility[2, k] / MU_0
+
+        scale = rod_volume[k]
+        if saturation_law_id == 1:
+            # Langevin law M_s L(y) with y = 3 |M_lin| / M_s, L(y) / y -> 1 / 3
+            argument = (
+                3.0
+                * np.sqrt(
+                    magnetization_0 * magnetization_0
+                    + magnetization_1 * magnetization_1
+                    + magnetization_2 * magnetization_2
+                )
+                / saturation_magnetization
+            )
+            if argument < 1e-3:
+                scale *= 1.0 - argument * argument / 15.0
+            else:
+                scale *= 3.0 * (1.0 / np.tanh(argument) - 1.0 / argument) / argument
+        elif saturation_law_id == 2:
+            # Frohlich-Kennelly law M_lin / (1 + |M_lin| / M_s)
+            scale /= (
+                1.0
+                + np.sqrt(
+                    magnetization_0 * magnetization_0
+                    + magnetization_1 * magnetization_1
+                    + magnetization_2 * magnetization_2
+                )
+                / saturation_magnetization
+            )
+
+        magnetization_collection[0, k] = scale * magnetization_0
+        magnetization_collection[1, k] = scale * magnetization_1
+        magnetization_collection[2, k] = scale * magnetization_2
+
+
+@njit(cache=True)
+def _compute_collective_induced_magnetization(
+    magnetic_field_collection,
+    element_offsets,
+    director_collection_list,
+    rod_volume_collection,
+    magnetic_susceptibility,
+    saturation_magnetization,
+    saturation_law_id,
+    magnetization_collection,
+):
+    """
+    This function computes the induced magnetization of the elements of a
+    collection of rods in the material frame in place, from the magnetic field at
+    the concatenated element centers.
+
+    Parameters
+    ----------
+    magnetic_field_collection: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Value of the magnetic field at the elements, in the lab frame.
+    element_offsets: numpy.ndarray
+        1D (n_rods + 1) array containing data with 'int' type.
+        Start and end indices of the rod elements in magnetization_collection.
+    director_collection_list: numba.typed.List
+        List of 3D (dim, dim, n_elems) arrays containing rod elemental director
+        matrices.
+    rod_volume_collection: numpy.ndarray
+        1D (total_n_elems) array containing data with 'float' type.
+        Concatenated element volumes of the rods.
+    magnetic_susceptibility: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Concatenated magnetic susceptibility of the rods in the material frame.
+    saturation_magnetization: float
+    saturation_law_id: int
+        Id of the saturation law, see SATURATION_LAWS.
+    magnetization_collection: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Concatenated magnetization of the rods, in the material frame, output.
+
+    """
+    for rod_idx in range(len(director_collection_list)):
+        start = element_offsets[rod_idx]
+        end = element_offsets[rod_idx + 1]
+        _compute_induced_magnetization(
+            magnetic_field_collection[:, start:end],
+            director_collection_list[rod_idx],
+            rod_volume_collection[start:end],
+            magnetic_susceptibility[:, start:end],
+            saturation_magnetization,
+            saturation_law_id,
+            magnetization_collection[:, start:end],
         )
@@ -0,0 +1,2699 @@
+__doc__ = """ Module implementation for magnetic interactions between magnetized elements of Cosserat rods."""
+__all__ = [
+    "MagneticDipoleInteraction",
+    "BarnesHutMagneticDipoleInteraction",
+    "PeriodicMagneticDipoleInteraction",
+    "SoftMagneticDipoleInteraction",
+]
+
+from elastica.rod.cosserat_rod import CosseratRod
+from magneto_pyelastica.magnetic_field import BaseMagneticField, MU_0
+from magneto_pyelastica.magnetic_forces import (
+    CollectiveMagneticForces,
+    compute_susceptibility_collection,
+    get_saturation_law_id,
+    _compute_collective_element_positions,
+    _compute_collective_induced_magnetization,
+    _compute_collective_magnetic_gradient_forces,
+    _compute_collective_magnetic_torques_in_nonuniform_field,
+)
+from math import erfc
+import warnings
+import numpy as np
+from numba import njit, prange
+from typing import Union, Sequence
+
+
+# largest number of cells per element of the cell list grid
+_MAX_CELLS_PER_POINT = 8
+
+
+class MagneticDipoleInteraction(CollectiveMagneticForces):
+    """
+    This class applies the mutual magnetic dipole-dipole forces and torques among
+    the magnetized elements of a collection of magnetic Cosserat rods. Each element
+    is a point dipole at its center, and the dipole field of all other elements is
+    evaluated at it. Pairs closer than cutoff_radius are found with a uniform grid
+    cell list, so that the cost per time step is O(N) for N elements, and the
+    interactions are computed in parallel over the target elements.
+
+        Attributes
+        ----------
+        rod_list: list
+            List of magnetic rods that interact.
+        magnetization_collection: np.ndarray
+            2D (dim, total_n_elems) array containing data with 'float' type.
+            Concatenated magnetization of the rods, defined on the elements, in the
+            material frame.
+        element_offsets: np.ndarray
+            1D (n_rods + 1) array containing data with 'int' type.
+            Start and end indices of the rod elements in magnetization_collection.
+        element_position_collection: np.ndarray
+            2D (dim, total_n_elems) array containing data with 'float' type.
+            Concatenated element positions of the rods.
+        lab_frame_magnetization_collection: np.ndarray
+            2D (dim, total_n_elems) array containing data with 'float' type.
+            Concatenated magnetization of the rods, in the lab frame.
+        dipole_field_collection: np.ndarray
+            2D (dim, total_n_elems) array containing data with 'float' type.
+            Magnetic field of the other elements at the elements, in the lab frame.
+        dipole_force_collection: np.ndarray
+            2D (dim, total_n_elems) array containing data with 'float' type.
+            Magnetic dipole forces on the elements, in the lab frame.
+        cutoff_radius: float
+            Dipole pairs further than cutoff radius are not interacting.
+        far_field_correction: bool
+            If True, elements outside of the neighboring cells are not cut off,
+            but their dipoles are summed in each cell and placed at the cell center.
+            This costs O(N_cells^2) per time step for N_cells occupied cells.
+        exclude_same_rod: bool
+            If True, elements of the same rod do not interact.
+
+    Notes
+    -----
+    This forcing class has to be added to only one of the rods in the rod_list, i.e.
+    `simulator.add_forcing_to(rod_list[0]).using(MagneticDipoleInteraction, ...)`,
+    it applies the forces and torques on all the rods in the rod_list. It reuses
+    the magnetization and rod array bookkeeping of CollectiveMagneticForces,
+    without an external magnetic field.
+
+    The far-field correction sums the fields of all pairs of occupied cells, so
+    its cost is O(N_cells^2) per time step and it is off by default. It suits
+    layouts with few cells per cutoff radius. For long-range interactions of
+    large carpets, use BarnesHutMagneticDipoleInteraction, or
+    PeriodicMagneticDipoleInteraction for periodic carpets.
+
+    """
+
+    def __init__(
+        self,
+        rod_list: Sequence[CosseratRod],
+        magnetization_density: Union[float, np.ndarray, Sequence],
+        magnetization_direction: Union[np.ndarray, Sequence],
+        cutoff_radius: float,
+        far_field_correction: bool = False,
+        exclude_same_rod: bool = True,
+    ):
+        """
+        Parameters
+        ----------
+        rod_list: list
+            List of magnetic rods that interact.
+        magnetization_density: float or a np.ndarray or list
+            Float number or 1D (n_elems) array containing data with 'float' type,
+            shared by all rods, or a list of those for each rod.
+            Density of magnetization of the rods.
+        magnetization_direction: np.ndarray or list
+            1D (dim) array containing data with 'float' type shared by all rods, or a
+            list of 1D (dim) or 2D (dim, n_elems) arrays for each rod.
+            Direction of magnetization of the rods in the lab frame.
+        cutoff_radius: float
+            Dipole pairs further than cutoff radius are not interacting, it is also
+            the smallest cell size of the cell list.
+        far_field_correction: bool
+            If True, elements outside of the neighboring cells are not cut off,
+            but their dipoles are summed in each cell and placed at the cell center.
+            This costs O(N_cells^2) per time step for N_cells occupied cells.
+        exclude_same_rod: bool
+            If True, elements of the same rod do not interact.
+
+        """
+        super(MagneticDipoleInteraction, self).__init__(
+            external_magnetic_field=None,
+            rod_list=rod_list,
+            magnetization_density=magnetization_density,
+            magnetization_direction=magnetization_direction,
+        )
+        if not cutoff_radius > 0.0:
+            raise ValueError("Invalid cutoff radius! Should be a positive float")
+        self.cutoff_radius = float(cutoff_radius)
+        self.far_field_correction = far_field_correction
+        self.exclude_same_rod = exclude_same_rod
+
+        self.rod_index = np.repeat(
+            np.arange(len(self.rod_list)), np.diff(self.element_offsets)
+        ).astype(np.int64)
+        self.lab_frame_magnetization_collection = np.zeros_like(
+            self.magnetization_collection
+        )
+        self.dipole_field_collection = np.zeros_like(self.magnetization_collection)
+        self.dipole_force_collection = np.zeros_like(self.magnetization_collection)
+        self._interaction_time = None
+
+    def compute_dipole_interactions(self):
+        """
+        This function computes the dipole fields and forces at the elements, from
+        the current element positions and lab frame magnetization.
+        """
+        (
+            grid_origin,
+            grid_shape,
+            cell_size,
+            cell_index,
+            cell_start,
+            cell_elements,
+        ) = _build_cell_list(self.element_position_collection, self.cutoff_radius)
+        if self.far_field_correction:
+            occupied_cells = np.flatnonzero(np.diff(cell_start))
+            cell_far_field, cell_far_field_jacobian = _compute_cell_far_fields(
+                self.lab_frame_magnetization_collection,
+                cell_size,
+                grid_shape,
+                cell_start,
+                cell_elements,
+                occupied_cells,
+            )
+            occupied_cell_index = np.full(cell_start.shape[0] - 1, -1, dtype=np.int64)
+            occupied_cell_index[occupied_cells] = np.arange(occupied_cells.shape[0])
+        else:
+            cell_far_field = np.zeros((3, 0))
+            cell_far_field_jacobian = np.zeros((3, 3, 0))
+            occupied_cell_index = np.zeros(0, dtype=np.int64)
+        _compute_dipole_interactions_with_cell_list(
+            self.element_position_collection,
+            self.lab_frame_magnetization_collection,
+            self.rod_index,
+            self.element_offsets,
+            self.exclude_same_rod,
+            self.cutoff_radius,
+            self.far_field_correction,
+            grid_origin,
+            grid_shape,
+            cell_size,
+            cell_index,
+            cell_start,
+            cell_elements,
+            occupied_cell_index,
+            cell_far_field,
+            cell_far_field_jacobian,
+            self.dipole_field_collection,
+            self.dipole_force_collection,
+        )
+
+    def _update_dipole_interactions(self, time: np.float64):
+        if (
+            self._first_rod_director_collection
+            is not self.rod_list[0].director_collection
+        ):
+            self._update_rod_array_lists()
+        if self._outdated_magnetization_rods:
+            self._update_magnetization_collection()
+
+        _compute_collective_element_positions(
+            self.element_offsets,
+            self._position_collection_list,
+            self.element_position_collection,
+        )
+        _compute_collective_lab_frame_magnetization(
+            self.magnetization_collection,
+            self.element_offsets,
+            self._director_collection_list,
+            self.lab_frame_magnetization_collection,
+        )
+        self.compute_dipole_interactions()
+        self._interaction_time = time
+
+    def apply_forces(self, rod: CosseratRod, time: np.float64 = 0.0):
+        self._update_dipole_interactions(time)
+        _distribute_collective_element_forces(
+            self.dipole_force_collection,
+            self.element_offsets,
+            self._external_forces_list,
+        )
+
+    def apply_torques(self, rod: CosseratRod, time: np.float64 = 0.0):
+        # dipole fields are computed once per time step, in apply_forces
+        if self._interaction_time != time:
+            self._update_dipole_interactions(time)
+        _compute_collective_magnetic_torques_in_nonuniform_field(
+            self.magnetization_collection,
+            self.element_offsets,
+            self._director_collection_list,
+            self.dipole_field_collection,
+            self._external_torques_list,
+        )
+
+
+class BarnesHutMagneticDipoleInteraction(MagneticDipoleInteraction):
+    """
+    This class applies the mutual magnetic dipole-dipole forces and torques among
+    the magnetized elements of a collection of magnetic Cosserat rods, without a
+    cutoff. Dipole fields are computed with a Barnes-Hut tree code in
+    O(N log N) for N elements. Elements are sorted into an octree, and a tree
+    node is seen by a target element as the summed magnetization of its elements
+    at their centroid, corrected by the first and second moments of their
+    magnetization about the centroid, if size / distance of the node is less than
+    the opening angle. The error of the expansion is of third order in the
+    opening angle.
+
+    With the default opening angle of 0.3, the relative errors of the dipole
+    fields and forces are about 2e-4 and 2e-3 for the carpet of rods of the
+    scaling benchmark, whose forces largely cancel once elements of the same rod
+    are excluded, and below 1e-4 for random layouts of rods.
+
+    The octree is only rebuilt when an element moved further than half of the
+    skin distance since the last build. Otherwise the tree is refit, i.e. the
+    centroids, sizes and moments of the magnetization of the nodes are recomputed
+    for the current positions, which keeps the result valid for any motion.
+
+        Attributes
+        ----------
+        opening_angle: float
+            Accuracy parameter of the tree code, smaller is more accurate.
+        skin_distance: float
+            The octree is rebuilt when an element moved further than half of it.
+        leaf_size: int
+            Maximum number of elements in a leaf node of the octree.
+        n_tree_builds: int
+            Number of octree builds.
+
+    Notes
+    -----
+    Elements of the same rod are excluded in the direct sums of the leaves, and
+    removed from the moments of the magnetization of the nodes seen by the target
+    element.
+
+    """
+
+    max_depth = 32
+
+    def __init__(
+        self,
+        rod_list: Sequence[CosseratRod],
+        magnetization_density: Union[float, np.ndarray, Sequence],
+        magnetization_direction: Union[np.ndarray, Sequence],
+        opening_angle: float = 0.3,
+        skin_distance: float = 0.0,
+        leaf_size: int = 8,
+        exclude_same_rod: bool = True,
+    ):
+        """
+        Parameters
+        ----------
+        rod_list: list
+            List of magnetic rods that interact.
+        magnetization_density: float or a np.ndarray or list
+            Float number or 1D (n_elems) array containing data with 'float' type,
+            shared by all rods, or a list of those for each rod.
+            Density of magnetization of the rods.
+        magnetization_direction: np.ndarray or list
+            1D (dim) array containing data with 'float' type shared by all rods, or a
+            list of 1D (dim) or 2D (dim, n_elems) arrays for each rod.
+            Direction of magnetization of the rods in the lab frame.
+        opening_angle: float
+            Accuracy parameter of the tree code in (0, 1), smaller is more accurate
+            and slower.
+        skin_distance: float
+            The octree is rebuilt when an element moved further than half of it,
+            it is rebuilt at every time step if zero.
+        leaf_size: int
+            Maximum number of elements in a leaf node of the octree.
+        exclude_same_rod: bool
+            If True, elements of the same rod do not interact.
+
+        """
+        super(BarnesHutMagneticDipoleInteraction, self).__init__(
+            rod_list=rod_list,
+            magnetization_density=magnetization_density,
+            magnetization_direction=magnetization_direction,
+            cutoff_radius=np.inf,
+            exclude_same_rod=exclude_same_rod,
+        )
+        if not 0.0 < opening_angle < 1.0:
+            raise ValueError("Invalid opening angle! Should be a float between 0 and 1")
+        self.opening_angle = float(opening_angle)
+        self.skin_distance = float(skin_distance)
+        self.leaf_size = int(leaf_size)
+        self.n_tree_builds = 0
+        self._octree = None
+        self._octree_positions = None
+
+    def compute_dipole_interactions(self):
+        """
+        This function computes the dipole fields and forces at the elements with
+        the tree code, from the current element positions and lab frame
+        magnetization.
+        """
+        if self._octree is None or (
+            _compute_max_displacement(
+                self.element_position_collection, self._octree_positions
+            )
+            > 0.5 * self.skin_distance
+        ):
+            self._octree = _build_octree(
+                self.element_position_collection, self.leaf_size, self.max_depth
+            )
+            self._octree_positions = self.element_position_collection.copy()
+            self.n_tree_builds += 1
+
+        (
+            element_order,
+            element_rank,
+            node_start,
+            node_end,
+            node_first_child,
+            node_n_children,
+        ) = self._octree
+        (
+            node_centroid,
+            node_magnetization,
+            node_first_moment,
+            node_second_moment,
+            node_size,
+        ) = _refit_octree(
+            self.element_position_collection,
+            self.lab_frame_magnetization_collection,
+            element_order,
+            node_start,
+            node_end,
+        )
+        _compute_dipole_interactions_with_octree(
+            self.element_position_collection,
+            self.lab_frame_magnetization_collection,
+            self.rod_index,
+            self.element_offsets,
+            self.exclude_same_rod,
+            self.opening_angle,
+            self.max_depth,
+            element_order,
+            element_rank,
+            node_start,
+            node_end,
+            node_first_child,
+            node_n_children,
+            node_centroid,
+            node_magnetization,
+            node_first_moment,
+            node_second_moment,
+            node_size,
+            self.dipole_field_collection,
+            self.dipole_force_collection,
+        )
+
+
+class PeriodicMagneticDipoleInteraction(MagneticDipoleInteraction):
+    """
+    This class applies the mutual magnetic dipole-dipole forces and torques among
+    the magnetized elements of a collection of magnetic Cosserat rods, which is the
+    unit cell of a slab that is periodic in x and y, e.g. an infinite cilia carpet.
+    The interactions with all periodic images are computed with the particle-mesh
+    Ewald (PME) summation: the dipole interaction is split into a short-range part
+    summed over pairs closer than cutoff_radius, with the minimum image convention,
+    and a smooth long-range part solved on a mesh with FFTs, so that the cost per
+    time step is O(N log N) for N elements.
+
+    The mesh is periodic in z as well, with a vacuum gap between the slab and its
+    images in z. The net magnetization of the slab interacting with its images in z
+    is removed by the slab correction of Yeh and Berkowitz.
+
+        Attributes
+        ----------
+        domain_size: numpy.ndarray
+            1D (2,) array containing data with 'float' type.
+            Periods of the slab in x and y.
+        domain_height: float
+            Height of the periodic mesh in z, including the vacuum gap.
+        ewald_splitting: float
+            Inverse length of the Gaussian splitting of the Ewald summation.
+        mesh_shape: tuple
+            Number of mesh points in x, y and z.
+        interpolation_order: int
+            Order of the B-splines spreading the magnetization on the mesh.
+
+    Notes
+    -----
+    Elements of the same rod are only excluded in the unit cell, periodic images
+    of the rod interact with it. Rods should be shorter than half of the domain
+    size, and stay in the height of the slab at initialization.
+
+    References
+    ----------
+    Essmann, U., et al. "A smooth particle mesh Ewald method." The Journal of
+    Chemical Physics 103.19 (1995).
+    Yeh, I.-C., and M. L. Berkowitz. "Ewald summation for systems with slab
+    geometry." The Journal of Chemical Physics 111.7 (1999).
+
+    """
+
+    def __init__(
+        self,
+        rod_list: Sequence[CosseratRod],
+        magnetization_density: Union[float, np.ndarray, Sequence],
+        magnetization_direction: Union[np.ndarray, Sequence],
+        domain_size: Union[np.ndarray, Sequence],
+        cutoff_radius: float,
+        ewald_splitting: float = None,
+        mesh_spacing: float = None,
+        domain_height: float = None,
+        interpolation_order: int = 6,
+        exclude_same_rod: bool = True,
+    ):
+        """
+        Parameters
+        ----------
+        rod_list: list
+            List of magnetic rods in the unit cell.
+        magnetization_density: float or a np.ndarray or list
+            Float number or 1D (n_elems) array containing data with 'float' type,
+            shared by all rods, or a list of those for each rod.
+            Density of magnetization of the rods.
+        magnetization_direction: np.ndarray or list
+            1D (dim) array containing data with 'float' type shared by all rods, or a
+            list of 1D (dim) or 2D (dim, n_elems) arrays for each rod.
+            Direction of magnetization of the rods in the lab frame.
+        domain_size: np.ndarray or list
+            1D (2,) array containing data with 'float' type.
+            Periods of the slab in x and y.
+        cutoff_radius: float
+            Cutoff of the short-range pair sum, at most half of the domain size.
+        ewald_splitting: float
+            Inverse length of the Gaussian splitting of the Ewald summation,
+            default is 3.5 / cutoff_radius.
+        mesh_spacing: float
+            Largest spacing of the mesh, default is cutoff_radius / 10.
+        domain_height: float
+            Height of the periodic mesh in z, default is the height of the rods
+            plus 1.5 times the largest period as vacuum gap.
+        interpolation_order: int
+            Order of the B-splines spreading the magnetization on the mesh, an
+            even number.
+        exclude_same_rod: bool
+            If True, elements of the same rod do not interact.
+
+        """
+        super(PeriodicMagneticDipoleInteraction, self).__init__(
+            rod_list=rod_list,
+            magnetization_density=magnetization_density,
+            magnetization_direction=magnetization_direction,
+            cutoff_radius=cutoff_radius,
+            exclude_same_rod=exclude_same_rod,
+        )
+        domain_size = np.asarray(domain_size, dtype=np.float64)
+        if domain_size.shape != (2,) or not np.all(domain_size > 0.0):
+            raise ValueError("Invalid domain size! Should be two positive floats")
+        if self.cutoff_radius > 0.5 * domain_size.min():
+            raise ValueError(
+                "Invalid cutoff radius! Should not be larger than half of the "
+                "domain size"
+            )
+        if interpolation_order < 2 or interpolation_order % 2:
+            raise ValueError("Invalid interpolation order! Should be an even integer")
+        self.domain_size = domain_size
+        self.ewald_splitting = (
+            3.5 / self.cutoff_radius if ewald_splitting is None else ewald_splitting
+        )
+        self.interpolation_order = int(interpolation_order)
+
+        # vacuum gap between the slab and its images in z
+        z_min = min(rod.position_collection[2].min() for rod in self.rod_list)
+        z_max = max(rod.position_collection[2].max() for rod in self.rod_list)
+        if domain_height is None:
+            domain_height = z_max - z_min + 1.5 * domain_size.max()
+        self.domain_height = float(domain_height)
+        self.mesh_size = np.array([*domain_size, self.domain_height])
+        self.mesh_origin = np.array(
+            [0.0, 0.0, 0.5 * (z_min + z_max - self.domain_height)]
+        )
+
+        if mesh_spacing is None:
+            mesh_spacing = self.cutoff_radius / 10.0
+        # even number of mesh points, Nyquist modes are dropped
+        self.mesh_shape = tuple(
+            int(2 * np.ceil(0.5 * size / mesh_spacing)) for size in self.mesh_size
+        )
+        (
+            self._wave_vectors,
+            self._influence_function,
+        ) = _compute_ewald_influence_function(
+            self.mesh_size,
+            self.mesh_shape,
+            self.ewald_splitting,
+            self.interpolation_order,
+        )
+
+    def compute_dipole_interactions(self):
+        """
+        This function computes the dipole fields and forces at the elements with
+        the particle-mesh Ewald summation, from the current element positions and
+        lab frame magnetization.
+        """
+        positions = self.element_position_collection
+        magnetization = self.lab_frame_magnetization_collection
+        grid_shape, cell_index, cell_start, cell_elements = _build_periodic_cell_list(
+            positions, self.domain_size, self.cutoff_radius
+        )
+        _compute_periodic_real_space_dipole_interactions(
+            positions,
+            magnetization,
+            self.rod_index,
+            self.element_offsets,
+            self.exclude_same_rod,
+            self.domain_size,
+            self.cutoff_radius,
+            self.ewald_splitting,
+            grid_shape,
+            cell_index,
+            cell_start,
+            cell_elements,
+            self.dipole_field_collection,
+            self.dipole_force_collection,
+        )
+
+        # long-range part, the field is differentiated in Fourier space and the
+        # force is the gradient of the interpolated m . B
+        mesh = np.zeros((3, *self.mesh_shape))
+        _spread_magnetization_on_mesh(
+            positions,
+            magnetization,
+            self.mesh_origin,
+            self.mesh_size,
+            self.interpolation_order,
+            mesh,
+        )
+        mesh_hat = np.fft.rfftn(mesh, axes=(1, 2, 3))
+        k_x, k_y, k_z = self._wave_vectors
+        potential_hat = self._influence_function * (
+            k_x * mesh_hat[0] + k_y * mesh_hat[1] + k_z * mesh_hat[2]
+        )
+        mesh_hat[0] = -k_x * potential_hat
+        mesh_hat[1] = -k_y * potential_hat
+        mesh_hat[2] = -k_z * potential_hat
+        mesh_field = np.fft.irfftn(mesh_hat, s=self.mesh_shape, axes=(1, 2, 3))
+        mesh_field *= np.prod(self.mesh_shape)
+        _interpolate_mesh_field(
+            positions,
+            magnetization,
+            self.mesh_origin,
+            self.mesh_size,
+            self.interpolation_order,
+            mesh_field,
+            self.dipole_field_collection,
+            self.dipole_force_collection,
+        )
+
+        # slab correction, uniform field of the net magnetization in z
+        self.dipole_field_collection[2] -= (
+            MU_0 * magnetization[2].sum() / np.prod(self.mesh_size)
+        )
+
+
+class SoftMagneticDipoleInteraction(MagneticDipoleInteraction):
+    """
+    This class applies the magnetic forces and torques on a collection of soft
+    magnetic Cosserat rods, which magnetization is induced by the external magnetic
+    field and the dipole fields of all other elements. At every time step, the
+    magnetization is solved by under-relaxed fixed-point iterations of
+    m = V M(chi (B_ext + B_dipole(m)) / mu_0), warm started from the magnetization
+    of the previous step, so that one or two iterations are typically needed. Each
+    iteration computes the dipole interactions once with the cell list.
+
+        Attributes
+        ----------
+        external_magnetic_field: object
+            External magnetic field object, that returns the value of the magnetic field vector
+            via a .value() method.
+        magnetic_susceptibility: np.ndarray
+            2D (dim, total_n_elems) array containing data with 'float' type.
+            Concatenated magnetic susceptibility of the rods in the material frame.
+        saturation_magnetization: float
+            Saturation magnetization of the rod material.
+        saturation_law: str
+            Saturation law of the magnetization, one of SATURATION_LAWS.
+        rod_volume_collection: np.ndarray
+            1D (total_n_elems) array containing data with 'float' type.
+            Concatenated element volumes of the rods.
+        magnetic_field_collection: np.ndarray
+            2D (dim, total_n_elems) array containing data with 'float' type.
+            Total magnetic field at the elements, in the lab frame.
+        tolerance: float
+            Iterations stop when the magnetization changes less than tolerance,
+            relative to the largest magnetization.
+        max_iterations: int
+            Maximum number of iterations per time step.
+        relaxation_factor: float
+            Relaxation factor of the first iteration of each time step.
+        history_size: int
+            Number of secant pairs kept by the Anderson acceleration.
+        n_iterations: int
+            Number of iterations of the last time step.
+
+    Notes
+    -----
+    Each iteration moves the magnetization by the relaxation factor times the
+    residual m_induced - m. The relaxation factor is adapted after the first
+    iteration with Aitken's method, so that dipole couplings that make plain
+    fixed-point iterations oscillate, e.g. antiparallel side by side elements,
+    are damped. Aitken's method converges as long as the induced dipole fields do
+    not amplify the field inducing them, which holds for point dipoles that are
+    further apart than their size. Once the residual grows, the iterations of the
+    time step switch to Anderson acceleration over the last history_size pairs
+    of magnetization and residual changes, which is a Krylov method equivalent to
+    GMRES for the linear saturation law, and converges for overlapping dipoles as
+    well. If the tolerance is not met in max_iterations, a RuntimeWarning is
+    issued and the magnetization of the last iteration is kept together with its
+    forces and fields.
+
+    """
+
+    history_size = 10
+
+    def __init__(
+        self,
+        external_magnetic_field: BaseMagneticField,
+        rod_list: Sequence[CosseratRod],
+        magnetic_susceptibility: Union[float, np.ndarray, Sequence],
+        cutoff_radius: float,
+        saturation_magnetization: float = np.inf,
+        saturation_law: str = "linear",
+        far_field_correction: bool = False,
+        exclude_same_rod: bool = True,
+        tolerance: float = 1e-6,
+        max_iterations: int = 50,
+        relaxation_factor: float = 1.0,
+    ):
+        """
+        Parameters
+        ----------
+        external_magnetic_field: object
+            External magnetic field object, that returns the value of the
+            magnetic field vector via a .value() method.
+        rod_list: list
+            List of magnetic rods that interact.
+        magnetic_susceptibility: float or a np.ndarray or list
+            Float number, 1D (dim) or 2D (dim, n_elems) array containing data with
+            'float' type, shared by all rods, or a list of those for each rod.
+            Magnetic susceptibility of the rods along the directors d1, d2 and d3
+            of the material frame.
+        cutoff_radius: float
+            Dipole pairs further than cutoff radius are not interacting, it is also
+            the smallest cell size of the cell list.
+        saturation_magnetization: float
+            Saturation magnetization of the rod material, not used by the linear
+            saturation law.
+        saturation_law: str
+            Saturation law of the magnetization, one of SATURATION_LAWS.
+        far_field_correction: bool
+            If True, elements outside of the neighboring cells are not cut off,
+            but their dipoles are summed in each cell and placed at the cell center.
+            This costs O(N_cells^2) per time step for N_cells occupied cells.
+        exclude_same_rod: bool
+            If True, elements of the same rod do not interact.
+        tolerance: float
+            Iterations stop when the magnetization changes less than tolerance,
+            relative to the largest magnetization.
+        max_iterations: int
+            Maximum number of iterations per time step.
+        relaxation_factor: float
+            Relaxation factor of the first iteration of each time step, and of
+            the Anderson acceleration, in (0, 1].
+
+        """
+        # magnetization is induced, it is zero before the first time step
+        super(SoftMagneticDipoleInteraction, self).__init__(
+            rod_list=rod_list,
+            magnetization_density=0.0,
+            magnetization_direction=np.array([0.0, 0.0, 1.0]),
+            cutoff_radius=cutoff_radius,
+            far_field_correction=far_field_correction,
+            exclude_same_rod=exclude_same_rod,
+        )
+        self.external_magnetic_field = external_magnetic_field
+        if isinstance(magnetic_susceptibility, (list, tuple)):
+            magnetic_susceptibility_list = magnetic_susceptibility
+        else:
+            magnetic_susceptibility_list = [magnetic_susceptibility] * len(
+                self.rod_list
+            )
+        if not len(magnetic_susceptibility_list) == len(self.rod_list):
+            raise ValueError(
+                "Invalid magnetic susceptibility list! Should have one entry for "
+                "each rod in the rod_list"
+            )
+        self.magnetic_susceptibility = np.hstack(
+            [
+                compute_susceptibility_collection(susceptibility, rod.n_elems)
+                for rod, susceptibility in zip(
+                    self.rod_list, magnetic_susceptibility_list
+                )
+            ]
+        )
+        if not saturation_magnetization > 0.0:
+            raise ValueError(
+                "Invalid saturation magnetization! Should be a positive float"
+            )
+        self.saturation_magnetization = float(saturation_magnetization)
+        self.saturation_law_id = get_saturation_law_id(saturation_law)
+        self.saturation_law = saturation_law
+        self.rod_volume_collection = np.hstack([rod.volume for rod in self.rod_list])
+        if not 0.0 < relaxation_factor <= 1.0:
+            raise ValueError(
+                "Invalid relaxation factor! Should be a float in the interval (0, 1]"
+            )
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.relaxation_factor = float(relaxation_factor)
+        self.n_iterations = 0
+
+        self.external_magnetic_field_collection = np.zeros_like(
+            self.magnetization_collection
+        )
+        self.magnetic_field_collection = np.zeros_like(self.magnetization_collection)
+        self._induced_magnetization_collection = np.zeros_like(
+            self.magnetization_collection
+        )
+        self._residual_collection = np.zeros_like(self.magnetization_collection)
+        self._previous_residual_collection = np.zeros_like(
+            self.magnetization_collection
+        )
+        self._magnetization_change_collection = np.zeros_like(
+            self.magnetization_collection
+        )
+        self._residual_change_history = np.zeros(
+            (self.history_size,) + self.magnetization_collection.shape
+        )
+        self._magnetization_change_history = np.zeros_like(
+            self._residual_change_history
+        )
+
+    def set_magnetization(self, *args, **kwargs):
+        raise TypeError(
+            f"{self.__class__.__name__} has induced magnetization, it can not be set"
+        )
+
+    def _update_dipole_interactions(self, time: np.float64):
+        if (
+            self._first_rod_director_collection
+            is not self.rod_list[0].director_collection
+        ):
+            self._update_rod_array_lists()
+
+        _compute_collective_element_positions(
+            self.element_offsets,
+            self._position_collection_list,
+            self.element_position_collection,
+        )
+        if self.external_magnetic_field.is_uniform:
+            self.external_magnetic_field_collection[
+                ...
+            ] = self.external_magnetic_field.value(time=time).reshape(3, 1)
+        else:
+            self.external_magnetic_field_collection[
+                ...
+            ] = self.external_magnetic_field.value_at(
+                time=time, positions=self.element_position_collection
+            )
+
+        # fixed-point iterations, warm started from the previous magnetization
+        relaxation_factor = self.relaxation_factor
+        previous_residual_norm = np.inf
+        is_stalled = False
+        for iteration in range(1, self.max_iterations + 1):
+            _compute_collective_lab_frame_magnetization(
+                self.magnetization_collection,
+                self.element_offsets,
+                self._director_collection_list,
+                self.lab_frame_magnetization_collection,
+            )
+            self.compute_dipole_interactions()
+            np.add(
+                self.external_magnetic_field_collection,
+                self.dipole_field_collection,
+                out=self.magnetic_field_collection,
+            )
+            _compute_collective_induced_magnetization(
+                self.magnetic_field_collection,
+                self.element_offsets,
+                self._director_collection_list,
+                self.rod_volume_collection,
+                self.magnetic_susceptibility,
+                self.saturation_magnetization,
+                self.saturation_law_id,
+                self._induced_magnetization_collection,
+            )
+            # forces and fields are kept consistent with the current magnetization
+            np.subtract(
+                self._induced_magnetization_collection,
+                self.magnetization_collection,
+                out=self._residual_collection,
+            )
+            if np.abs(self._residual_collection).max() <= (
+                self.tolerance * np.abs(self._induced_magnetization_collection).max()
+            ):
+                break
+            if iteration == self.max_iterations:
+                warnings.warn(
+                    f"{self.__class__.__name__} magnetization did not converge in "
+                    f"{self.max_iterations} iterations at time {time}",
+                    RuntimeWarning,
+                )
+                break
+            residual_norm = np.vdot(
+                self._residual_collection, self._residual_collection
+            )
+            if iteration > 1:
+                # secant pair of the last iteration, replacing the oldest pair
+                history_index = (iteration - 2) % self.history_size
+                np.subtract(
+                    self._residual_collection,
+                    self._previous_residual_collection,
+                    out=self._residual_change_history[history_index],
+                )
+                self._magnetization_change_history[
+                    history_index
+                ] = self._magnetization_change_collection
+                # Aitken's method stalls when the residual grows, e.g. when the
+                # dipole fields amplify the field inducing them
+                is_stalled = is_stalled or residual_norm >= previous_residual_norm
+
+            if is_stalled:
+                # Anderson acceleration over the secant pairs
+                n_history = min(iteration - 1, self.history_size)
+                coefficients = np.linalg.lstsq(
+                    self._residual_change_history[:n_history].reshape(n_history, -1).T,
+                    self._residual_collection.ravel(),
+                    rcond=None,
+                )[0]
+                np.multiply(
+                    self.relaxation_factor,
+                    self._residual_collection,
+                    out=self._magnetization_change_collection,
+                )
+                self._magnetization_change_collection -= np.tensordot(
+                    coefficients,
+                    self._magnetization_change_history[:n_history]
+                    + self.relaxation_factor
+                    * self._residual_change_history[:n_history],
+                    axes=1,
+                )
+            else:
+                # Aitken relaxation from the change of the residual
+                if iteration > 1:
+                    residual_change = self._residual_change_history[history_index]
+                    residual_change_norm = np.vdot(residual_change, residual_change)
+                    if residual_change_norm > 0.0:
+                        relaxation_factor *= (
+                            -np.vdot(
+                                self._previous_residual_collection, residual_change
+                            )
+                            / residual_change_norm
+                        )
+                np.multiply(
+                    relaxation_factor,
+                    self._residual_collection,
+                    out=self._magnetization_change_collection,
+                )
+            self._previous_residual_collection[...] = self._residual_collection
+            previous_residual_norm = residual_norm
+            self.magnetization_collection += self._magnetization_change_collection
+        self.n_iterations = iteration
+        self._interaction_time = time
+
+    def apply_forces(self, rod: CosseratRod, time: np.float64 = 0.0):
+        super(SoftMagneticDipoleInteraction, self).apply_forces(rod, time)
+        if not self.external_magnetic_field.is_uniform:
+            _compute_collective_magnetic_gradient_forces(
+                self.magnetization_collection,
+                self.element_offsets,
+                self._director_collection_list,
+                self.external_magnetic_field.jacobian_at(
+                    time=time, positions=self.element_position_collection
+                ),
+                self._external_forces_list,
+            )
+
+    def apply_torques(self, rod: CosseratRod, time: np.float64 = 0.0):
+        # magnetization is solved once per time step, in apply_forces
+        if self._interaction_time != time:
+            self._update_dipole_interactions(time)
+        _compute_collective_magnetic_torques_in_nonuniform_field(
+            self.magnetization_collection,
+            self.element_offsets,
+            self._director_collection_list,
+            self.magnetic_field_collection,
+            self._external_torques_list,
+        )
+
+
+@njit(cache=True)
+def _compute_collective_lab_frame_magnetization(
+    magnetization_collection,
+    element_offsets,
+    director_collection_list,
+    lab_frame_magnetization_collection,
+):
+    """
+    This function rotates the concatenated magnetization of a collection of rods
+    from the material frame to the lab frame, m_lab = Q^T m, in place.
+
+    Parameters
+    ----------
+    magnetization_collection: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Concatenated magnetization of the rods, in the material frame.
+    element_offsets: numpy.ndarray
+        1D (n_rods + 1) array containing data with 'int' type.
+        Start and end indices of the rod elements in magnetization_collection.
+    director_collection_list: numba.typed.List
+        List of 3D (dim, dim, n_elems) arrays containing rod elemental director
+        matrices.
+    lab_frame_magnetization_collection: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Concatenated magnetization of the rods in the lab frame, output.
+
+    """
+    for rod_idx in range(len(director_collection_list)):
+        director_collection = director_collection_list[rod_idx]
+        start = element_offsets[rod_idx]
+        for k in range(element_offsets[rod_idx + 1] - start):
+            for j in range(3):
+                lab_frame_magnetization_collection[j, start + k] = (
+                    director_collection[0, j, k]
+                    * magnetization_collection[0, start + k]
+                    + director_collection[1, j, k]
+                    * magnetization_collection[1, start + k]
+                    + director_collection[2, j, k]
+                    * magnetization_collection[2, start + k]
+                )
+
+
+@njit(cache=True)
+def _distribute_collective_element_forces(
+    element_force_collection,
+    element_offsets,
+    external_forces_list,
+):
+    """
+    This function re-distributes the concatenated forces on the elements of a
+    collection of rods equally to the two nodes of each element, in place.
+
+    Parameters
+    ----------
+    element_force_collection: numpy.ndarray
+        2D (dim, total_n_elems) array containing data with 'float' type.
+        Concatenated forces on the rod elements, in the lab frame.
+    element_offsets: numpy.ndarray
+        1D (n_rods + 1) array containing data with 'int' type.
+        Start and end indices of the rod elements in element_force_collection.
+    external_forces_list: numba.typed.List
+        List of 2D (dim, n_nodes) arrays containing external forces of the rods.
+
+    """
+    for rod_idx in range(len(external_forces_list)):
+        external_forces = external_forces_list[rod_idx]
+        start = element_offsets[rod_idx]
+        for k in range(element_offsets[rod_idx + 1] - start):
+            for i in range(3):
+                half_force = 0.5 * element_force_collection[i, start + k]
+                external_forces[i, k] += half_force
+                external_forces[i, k + 1] += half_force
+
+
+@njit(cache=True)
+def _compute_dipole_pair_interaction(
+    r_x, r_y, r_z, m_i_x, m_i_y, m_i_z, m_j_x, m_j_y, m_j_z
+):
+    """
+    This function computes the magnetic field of dipole j at dipole i and the
+    force of dipole j on dipole i, where r = x_i - x_j.
+
+    B = mu_0 / (4 pi r^3) (3 (m_j . r_hat) r_hat - m_j)
+    F = 3 mu_0 / (4 pi r^4) ((m_i . r_hat) m_j + (m_j . r_hat) m_i
+        + (m_i . m_j) r_hat - 5 (m_i . r_hat) (m_j . r_hat) r_hat)
+
+    Returns
+    -------
+    field and force: tuple
+        Components of the field and the force, in the lab frame.
+
+    """
+    distance = np.sqrt(r_x * r_x + r_y * r_y + r_z * r_z)
+    inv_distance = 1.0 / distance
+    r_x *= inv_distance
+    r_y *= inv_distance
+    r_z *= inv_distance
+    m_i_r = m_i_x * r_x + m_i_y * r_y + m_i_z * r_z
+    m_j_r = m_j_x * r_x + m_j_y * r_y + m_j_z * r_z
+    m_i_m_j = m_i_x * m_j_x + m_i_y * m_j_y + m_i_z * m_j_z
+
+    field_prefactor = MU_0 / (4.0 * np.pi) * inv_distance * inv_distance * inv_distance
+    force_prefactor = 3.0 * field_prefactor * inv_distance
+    five_m_i_r_m_j_r = 5.0 * m_i_r * m_j_r
+    return (
+        field_prefactor * (3.0 * m_j_r * r_x - m_j_x),
+        field_prefactor * (3.0 * m_j_r * r_y - m_j_y),
+        field_prefactor * (3.0 * m_j_r * r_z - m_j_z),
+        force_prefactor
+        * (m_i_r * m_j_x + m_j_r * m_i_x + (m_i_m_j - five_m_i_r_m_j_r) * r_x),
+        force_prefactor
+        * (m_i_r * m_j_y + m_j_r * m_i_y + (m_i_m_j - five_m_i_r_m_j_r) * r_y),
+        force_prefactor
+        * (m_i_r * m_j_z + m_j_r * m_i_z + (m_i_m_j - five_m_i_r_m_j_r) * r_z),
+    )
+
+
+@njit(cache=True)
+def _compute_dipole_moment_interaction(
+    r_x, r_y, r_z, m_x, m_y, m_z, first_moment, second_moment
+):
+    """
+    This function computes the corrections to the magnetic field at dipole m and
+    to the force on it, of a group of dipoles m_k seen as their summed
+    magnetization at their centroid, to second order in d_k / r. Here d_k is the
+    distance of dipole k from the centroid, r = x - centroid, and the first and
+    second moments of the magnetization are
+
+    q_ij = sum_k m_k,i d_k,j
+    s_ijl = sum_k m_k,i d_k,j d_k,l
+
+    B_i = mu_0 / (4 pi) (-q_aj d^3 G / dr_i dr_a dr_j
+        + s_ajl / 2 d^4 G / dr_i dr_a dr_j dr_l)
+    F_n = m_i dB_i / dr_n
+
+    where G = 1 / r.
+
+    Returns
+    -------
+    field and force: tuple
+        Components of the field and the force corrections, in the lab frame.
+
+    """
+    q = first_moment
+    s = second_moment
+    inv_distance_squared = 1.0 / (r_x * r_x + r_y * r_y + r_z * r_z)
+    prefactor = (
+        MU_0
+        / (4.0 * np.pi)
+        * inv_distance_squared
+        * inv_distance_squared
+        * np.sqrt(inv_distance_squared)
+    )
+    m_r = m_x * r_x + m_y * r_y + m_z * r_z
+
+    # s is symmetric in its last two indices, so that all contractions follow
+    # from s_r_ij = s_ijl r_l and s_m_ij = s_ijl m_l
+    s_r_xx = s[0, 0, 0] * r_x + s[0, 0, 1] * r_y + s[0, 0, 2] * r_z
+    s_r_xy = s[0, 1, 0] * r_x + s[0, 1, 1] * r_y + s[0, 1, 2] * r_z
+    s_r_xz = s[0, 2, 0] * r_x + s[0, 2, 1] * r_y + s[0, 2, 2] * r_z
+    s_r_yx = s[1, 0, 0] * r_x + s[1, 0, 1] * r_y + s[1, 0, 2] * r_z
+    s_r_yy = s[1, 1, 0] * r_x + s[1, 1, 1] * r_y + s[1, 1, 2] * r_z
+    s_r_yz = s[1, 2, 0] * r_x + s[1, 2, 1] * r_y + s[1, 2, 2] * r_z
+    s_r_zx = s[2, 0, 0] * r_x + s[2, 0, 1] * r_y + s[2, 0, 2] * r_z
+    s_r_zy = s[2, 1, 0] * r_x + s[2, 1, 1] * r_y + s[2, 1, 2] * r_z
+    s_r_zz = s[2, 2, 0] * r_x + s[2, 2, 1] * r_y + s[2, 2, 2] * r_z
+    s_m_xx = s[0, 0, 0] * m_x + s[0, 0, 1] * m_y + s[0, 0, 2] * m_z
+    s_m_xy = s[0, 1, 0] * m_x + s[0, 1, 1] * m_y + s[0, 1, 2] * m_z
+    s_m_xz = s[0, 2, 0] * m_x + s[0, 2, 1] * m_y + s[0, 2, 2] * m_z
+    s_m_yx = s[1, 0, 0] * m_x + s[1, 0, 1] * m_y + s[1, 0, 2] * m_z
+    s_m_yy = s[1, 1, 0] * m_x + s[1, 1, 1] * m_y + s[1, 1, 2] * m_z
+    s_m_yz = s[1, 2, 0] * m_x + s[1, 2, 1] * m_y + s[1, 2, 2] * m_z
+    s_m_zx = s[2, 0, 0] * m_x + s[2, 0, 1] * m_y + s[2, 0, 2] * m_z
+    s_m_zy = s[2, 1, 0] * m_x + s[2, 1, 1] * m_y + s[2, 1, 2] * m_z
+    s_m_zz = s[2, 2, 0] * m_x + s[2, 2, 1] * m_y + s[2, 2, 2] * m_z
+
+    # contracted vectors, with a_i = s_ijl r_j r_l, c_i = s_jil r_j r_l,
+    # t_i = s_jji, w_i = s_ijj, g_i = r_a s_aij m_j, h_i = s_ija r_j m_a and
+    # k_i = m_a r_j s_aji
+    q_r_x = q[0, 0] * r_x + q[0, 1] * r_y + q[0, 2] * r_z
+    r_q_x = r_x * q[0, 0] + r_y * q[1, 0] + r_z * q[2, 0]
+    q_m_x = q[0, 0] * m_x + q[0, 1] * m_y + q[0, 2] * m_z
+    m_q_x = m_x * q[0, 0] + m_y * q[1, 0] + m_z * q[2, 0]
+    a_x = s_r_xx * r_x + s_r_xy * r_y + s_r_xz * r_z
+    c_x = r_x * s_r_xx + r_y * s_r_yx + r_z * s_r_zx
+    t_x = s[0, 0, 0] + s[1, 1, 0] + s[2, 2, 0]
+    w_x = s[0, 0, 0] + s[0, 1, 1] + s[0, 2, 2]
+    g_x = r_x * s_m_xx + r_y * s_m_yx + r_z * s_m_zx
+    h_x = s_r_xx * m_x + s_r_xy * m_y + s_r_xz * m_z
+    k_x = m_x * s_r_xx + m_y * s_r_yx + m_z * s_r_zx
+    q_r_y = q[1, 0] * r_x + q[1, 1] * r_y + q[1, 2] * r_z
+    r_q_y = r_x * q[0, 1] + r_y * q[1, 1] + r_z * q[2, 1]
+    q_m_y = q[1, 0] * m_x + q[1, 1] * m_y + q[1, 2] * m_z
+    m_q_y = m_x * q[0, 1] + m_y * q[1, 1] + m_z * q[2, 1]
+    a_y = s_r_yx * r_x + s_r_yy * r_y + s_r_yz * r_z
+    c_y = r_x * s_r_xy + r_y * s_r_yy + r_z * s_r_zy
+    t_y = s[0, 0, 1] + s[1, 1, 1] + s[2, 2, 1]
+    w_y = s[1, 0, 0] + s[1, 1, 1] + s[1, 2, 2]
+    g_y = r_x * s_m_xy + r_y * s_m_yy + r_z * s_m_zy
+    h_y = s_r_yx * m_x + s_r_yy * m_y + s_r_yz * m_z
+    k_y = m_x * s_r_xy + m_y * s_r_yy + m_z * s_r_zy
+    q_r_z = q[2, 0] * r_x + q[2, 1] * r_y + q[2, 2] * r_z
+    r_q_z = r_x * q[0, 2] + r_y * q[1, 2] + r_z * q[2, 2]
+    q_m_z = q[2, 0] * m_x + q[2, 1] * m_y + q[2, 2] * m_z
+    m_q_z = m_x * q[0, 2] + m_y * q[1, 2] + m_z * q[2, 2]
+    a_z = s_r_zx * r_x + s_r_zy * r_y + s_r_zz * r_z
+    c_z = r_x * s_r_xz + r_y * s_r_yz + r_z * s_r_zz
+    t_z = s[0, 0, 2] + s[1, 1, 2] + s[2, 2, 2]
+    w_z = s[2, 0, 0] + s[2, 1, 1] + s[2, 2, 2]
+    g_z = r_x * s_m_xz + r_y * s_m_yz + r_z * s_m_zz
+    h_z = s_r_zx * m_x + s_r_zy * m_y + s_r_zz * m_z
+    k_z = m_x * s_r_xz + m_y * s_r_yz + m_z * s_r_zz
+
+    # full contractions
+    trace = q[0, 0] + q[1, 1] + q[2, 2]
+    r_q_r = r_x * q_r_x + r_y * q_r_y + r_z * q_r_z
+    m_q_r = m_x * q_r_x + m_y * q_r_y + m_z * q_r_z
+    r_q_m = r_x * q_m_x + r_y * q_m_y + r_z * q_m_z
+    r_s_r_r = r_x * a_x + r_y * a_y + r_z * a_z
+    t_r = r_x * t_x + r_y * t_y + r_z * t_z
+    w_r = r_x * w_x + r_y * w_y + r_z * w_z
+    m_t = m_x * t_x + m_y * t_y + m_z * t_z
+    m_w = m_x * w_x + m_y * w_y + m_z * w_z
+    m_a = m_x * a_x + m_y * a_y + m_z * a_z
+    m_c = m_x * c_x + m_y * c_y + m_z * c_z
+
+    first_order_term = 15.0 * r_q_r * inv_distance_squared - 3.0 * trace
+    first_order_force_term = (
+        15.0 * (m_q_r + r_q_m + m_r * trace)
+        - 105.0 * m_r * r_q_r * inv_distance_squared
+    ) * inv_distance_squared
+    second_order_field_term = (
+        105.0 * r_s_r_r * inv_distance_squared - 15.0 * (2.0 * t_r + w_r)
+    ) * inv_distance_squared
+    second_order_force_term = (
+        -945.0 * m_r * r_s_r_r * inv_distance_squared * inv_distance_squared
+        + 105.0 * (m_a + 2.0 * m_c + m_r * (2.0 * t_r + w_r)) * inv_distance_squared
+        - 15.0 * (m_w + 2.0 * m_t)
+    ) * inv_distance_squared
+    return (
+        prefactor
+        * (
+            first_order_term * r_x
+            - 3.0 * (q_r_x + r_q_x)
+            + 0.5
+            * (
+                second_order_field_term * r_x
+                - 15.0 * inv_distance_squared * (a_x + 2.0 * c_x)
+                + 3.0 * (w_x + 2.0 * t_x)
+            )
+        ),
+        prefactor
+        * (
+            first_order_term * r_y
+            - 3.0 * (q_r_y + r_q_y)
+            + 0.5
+            * (
+                second_order_field_term * r_y
+                - 15.0 * inv_distance_squared * (a_y + 2.0 * c_y)
+                + 3.0 * (w_y + 2.0 * t_y)
+            )
+        ),
+        prefactor
+        * (
+            first_order_term * r_z
+            - 3.0 * (q_r_z + r_q_z)
+            + 0.5
+            * (
+                second_order_field_term * r_z
+                - 15.0 * inv_distance_squared * (a_z + 2.0 * c_z)
+                + 3.0 * (w_z + 2.0 * t_z)
+            )
+        ),
+        prefactor
+        * (
+            first_order_term * m_x
+            + 15.0 * m_r * inv_distance_squared * (q_r_x + r_q_x)
+            + first_order_force_term * r_x
+            - 3.0 * (q_m_x + m_q_x)
+            + 0.5
+            * (
+                second_order_force_term * r_x
+                + second_order_field_term * m_x
+                + 15.0
+                * inv_distance_squared
+                * (
+                    7.0 * m_r * inv_distance_squared * (a_x + 2.0 * c_x)
+                    - m_r * (w_x + 2.0 * t_x)
+                    - 2.0 * (g_x + h_x + k_x)
+                )
+            )
+        ),
+        prefactor
+        * (
+            first_order_term * m_y
+            + 15.0 * m_r * inv_distance_squared * (q_r_y + r_q_y)
+            + first_order_force_term * r_y
+            - 3.0 * (q_m_y + m_q_y)
+            + 0.5
+            * (
+                second_order_force_term * r_y
+                + second_order_field_term * m_y
+                + 15.0
+                * inv_distance_squared
+                * (
+                    7.0 * m_r * inv_distance_squared * (a_y + 2.0 * c_y)
+                    - m_r * (w_y + 2.0 * t_y)
+                    - 2.0 * (g_y + h_y + k_y)
+                )
+            )
+        ),
+        prefactor
+        * (
+            first_order_term * m_z
+            + 15.0 * m_r * inv_distance_squared * (q_r_z + r_q_z)
+            + first_order_force_term * r_z
+            - 3.0 * (q_m_z + m_q_z)
+            + 0.5
+            * (
+                second_order_force_term * r_z
+                + second_order_field_term * m_z
+                + 15.0
+                * inv_distance_squared
+                * (
+                    7.0 * m_r * inv_distance_squared * (a_z + 2.0 * c_z)
+                    - m_r * (w_z + 2.0 * t_z)
+                    - 2.0 * (g_z + h_z + k_z)
+                )
+            )
+        ),
+    )
+
+
+@njit(cache=True)
+def _build_cell_list(positions, cell_size):
+    """
+    This function sorts the positions into a uniform grid of cells with at least
+    the given cell size, by counting sort. The cell size is doubled until the grid
+    has at most _MAX_CELLS_PER_POINT cells per point, so that small cell sizes or
+    sparse layouts do not allocate and scan a grid of mostly empty cells.
+
+    Parameters
+    ----------
+    positions: numpy.ndarray
+        2D (dim, n_points) array containing data with 'float' type.
+    cell_size: float
+        Smallest edge length of the cubic cells.
+
+    Returns
+    -------
+    grid_origin: numpy.ndarray
+        1D (dim,) array, lower corner of the grid.
+    grid_shape: numpy.ndarray
+        1D (dim,) array containing data with 'int' type, number of cells.
+    cell_size: float
+        Edge length of the cubic cells.
+    cell_index: numpy.ndarray
+        1D (n_points,) array containing data with 'int' type, flat cell index of
+        each point.
+    cell_start: numpy.ndarray
+        1D (n_cells + 1,) array containing data with 'int' type, start of each
+        cell in cell_elements.
+    cell_elements: numpy.ndarray
+        1D (n_points,) array containing data with 'int' type, points sorted by
+        cell.
+
+    """
+    n_points = positions.shape[1]
+    grid_origin = np.empty(3)
+    grid_extent = np.empty(3)
+    for i in range(3):
+        grid_origin[i] = positions[i].min()
+        grid_extent[i] = positions[i].max() - grid_origin[i]
+    max_n_cells = _MAX_CELLS_PER_POINT * max(n_points, 1)
+    while (
+        (grid_extent[0] / cell_size + 1.0)
+        * (grid_extent[1] / cell_size + 1.0)
+        * (grid_extent[2] / cell_size + 1.0)
+    ) > max_n_cells:
+        cell_size *= 2.0
+    grid_shape = np.empty(3, dtype=np.int64)
+    for i in range(3):
+        grid_shape[i] = int(grid_extent[i] / cell_size) + 1
+    n_cells = grid_shape[0] * grid_shape[1] * grid_shape[2]
+
+    cell_index = np.empty(n_points, dtype=np.int64)
+    cell_start = np.zeros(n_cells + 1, dtype=np.int64)
+    for k in range(n_points):
+        flat_index = 0
+        for i in range(3):
+            index = min(
+                int((positions[i, k] - grid_origin[i]) / cell_size), grid_shape[i] - 1
+            )
+            flat_index = flat_index * grid_shape[i] + index
+        cell_index[k] = flat_index
+        cell_start[flat_index + 1] += 1
+    for cell in range(n_cells):
+        cell_start[cell + 1] += cell_start[cell]
+
+    cell_fill = cell_start[:-1].copy()
+    cell_elements = np.empty(n_points, dtype=np.int64)
+    for k in range(n_points):
+        cell_elements[cell_fill[cell_index[k]]] = k
+        cell_fill[cell_index[k]] += 1
+    return grid_origin, grid_shape, cell_size, cell_index, cell_start, cell_elements
+
+
+@njit(cache=True)
+def _compute_dipole_field_jacobian(r_x, r_y, r_z, m_x, m_y, m_z, jacobian):
+    """
+    This function adds the spatial gradient of the magnetic field of a dipole m
+    at r, dB_i/dr_j, to the 2D (dim, dim) jacobian in place.
+
+    dB_i/dr_j = mu_0 / (4 pi) (3 (m_j r_i + m_i r_j + (m . r) delta_ij) / r^5
+        - 15 (m . r) r_i r_j / r^7)
+
+    """
+    inv_distance_squared = 1.0 / (r_x * r_x + r_y * r_y + r_z * r_z)
+    prefactor = (
+        3.0
+        * MU_0
+        / (4.0 * np.pi)
+        * inv_distance_squared
+        * inv_distance_squared
+        * np.sqrt(inv_distance_squared)
+    )
+    m_r = m_x * r_x + m_y * r_y + m_z * r_z
+    r = (r_x, r_y, r_z)
+    m = (m_x, m_y, m_z)
+    for i in range(3):
+        for j in range(3):
+            jacobian[i, j] += prefactor * (
+                m[j] * r[i]
+                + m[i] * r[j]
+                + m_r * (i == j)
+                - 5.0 * m_r * r[i] * r[j] * inv_distance_squared
+            )
+
+
+@njit(cache=True, parallel=True)
+def _compute_cell_far_fields(
+    magnetization_collection,
+    cell_size,
+    grid_shape,
+    cell_start,
+    cell_elements,
+    occupied_cells,
+):
+    """
+    This function sums the lab frame magnetization of the elements in each
+    occupied cell, and computes the magnetic field of the far cells and its
+    gradient at the center of each occupied cell, in parallel over the cells.
+    Far cells are the cells outside of the 27 neighboring cells, and their
+    summed magnetization is placed at their center. All pairs of occupied cells
+    are visited, so the cost is O(N_cells^2).
+
+    Returns
+    -------
+    cell_far_field: numpy.ndarray
+        2D (dim, n_occupied_cells) array containing data with 'float' type.
+    cell_far_field_jacobian: numpy.ndarray
+        3D (dim, dim, n_occupied_cells) array containing data with 'float' type.
+
+    """
+    n_occupied_cells = occupied_cells.shape[0]
+    n_y = grid_shape[1]
+    n_z = grid_shape[2]
+    cell_magnetization = np.zeros((3, n_occupied_cells))
+    for c in range(n_occupied_cells):
+        cell = occupied_cells[c]
+        for p in range(cell_start[cell], cell_start[cell + 1]):
+            for i in range(3):
+                cell_magnetization[i, c] += magnetization_collection[
+                    i, cell_elements[p]
+                ]
+
+    cell_far_field = np.zeros((3, n_occupied_cells))
+    cell_far_field_jacobian = np.zeros((3, 3, n_occupied_cells))
+    for target in prange(n_occupied_cells):
+        t_x = occupied_cells[target] // (n_y * n_z)
+        t_y = (occupied_cells[target] // n_z) % n_y
+        t_z = occupied_cells[target] % n_z
+        for source in range(n_occupied_cells):
+            s_x = occupied_cells[source] // (n_y * n_z)
+            s_y = (occupied_cells[source] // n_z) % n_y
+            s_z = occupied_cells[source] % n_z
+            if abs(s_x - t_x) <= 1 and abs(s_y - t_y) <= 1 and abs(s_z - t_z) <= 1:
+                continue
+            r_x = (t_x - s_x) * cell_size
+            r_y = (t_y - s_y) * cell_size
+            r_z = (t_z - s_z) * cell_size
+            m_x = cell_magnetization[0, source]
+            m_y = cell_magnetization[1, source]
+            m_z = cell_magnetization[2, source]
+            b_x, b_y, b_z, _, _, _ = _compute_dipole_pair_interaction(
+                r_x, r_y, r_z, 0.0, 0.0, 0.0, m_x, m_y, m_z
+            )
+            cell_far_field[0, target] += b_x
+            cell_far_field[1, target] += b_y
+            cell_far_field[2, target] += b_z
+            _compute_dipole_field_jacobian(
+                r_x, r_y, r_z, m_x, m_y, m_z, cell_far_field_jacobian[:, :, target]
+            )
+    return cell_far_field, cell_far_field_jacobian
+
+
+@njit(cache=True, parallel=True)
+def _compute_dipole_interactions_with_cell_list(
+    positions,
+    magnetization_collection,
+    rod_index,
+    element_offsets,
+    exclude_same_rod,
+    cutoff_radius,
+    far_field_correction,
+    grid_origin,
+    grid_shape,
+    cell_size,
+    cell_index,
+    cell_start,
+    cell_elements,
+    occupied_cell_index,
+    cell_far_field,
+    cell_far_field_jacobian,
+    dipole_field_collection,
+    dipole_force_collection,
+):
+    """
+    This function computes the dipole fields and forces at all elements, in
+    parallel over the target elements. Source elements are searched in the 27
+    neighboring cells of the target cell, which are not smaller than the cutoff
+    radius. If far_field_correction is True, pairs in neighboring cells are not
+    cut off, and the field of all other cells is expanded to first order around
+    the center of the target cell.
+
+    Parameters
+    ----------
+    positions: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetization of the elements in the lab frame.
+    rod_index: numpy.ndarray
+        1D (n_elems,) array containing data with 'int' type.
+    element_offsets: numpy.ndarray
+        1D (n_rods + 1) array containing data with 'int' type.
+    exclude_same_rod: bool
+    cutoff_radius: float
+    far_field_correction: bool
+    grid_origin, grid_shape, cell_size, cell_index, cell_start, cell_elements:
+        Cell list, see _build_cell_list.
+    occupied_cell_index: numpy.ndarray
+        1D (n_cells,) array containing data with 'int' type.
+        Index of each cell in the occupied cells, -1 if the cell is empty.
+    cell_far_field, cell_far_field_jacobian:
+        Far field and its gradient at the occupied cells, see
+        _compute_cell_far_fields.
+    dipole_field_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type, output.
+    dipole_force_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type, output.
+
+    """
+    n_elems = positions.shape[1]
+    cutoff_radius_squared = cutoff_radius * cutoff_radius
+    n_y = grid_shape[1]
+    n_z = grid_shape[2]
+    for target in prange(n_elems):
+        x = positions[0, target]
+        y = positions[1, target]
+        z = positions[2, target]
+        m_x = magnetization_collection[0, target]
+        m_y = magnetization_collection[1, target]
+        m_z = magnetization_collection[2, target]
+        target_rod = rod_index[target]
+        target_cell = cell_index[target]
+        c_x = target_cell // (n_y * n_z)
+        c_y = (target_cell // n_z) % n_y
+        c_z = target_cell % n_z
+
+        field_x = 0.0
+        field_y = 0.0
+        field_z = 0.0
+        force_x = 0.0
+        force_y = 0.0
+        force_z = 0.0
+        for n_x in range(max(c_x - 1, 0), min(c_x + 2, grid_shape[0])):
+            for n_y_ in range(max(c_y - 1, 0), min(c_y + 2, n_y)):
+                for n_z_ in range(max(c_z - 1, 0), min(c_z + 2, n_z)):
+                    cell = (n_x * n_y + n_y_) * n_z + n_z_
+                    for p in range(cell_start[cell], cell_start[cell + 1]):
+                        source = cell_elements[p]
+                        if source == target or (
+                            exclude_same_rod and rod_index[source] == target_rod
+                        ):
+                            continue
+                        r_x = x - positions[0, source]
+                        r_y = y - positions[1, source]
+                        r_z = z - positions[2, source]
+                        if (
+                            not far_field_correction
+                            and r_x * r_x + r_y * r_y + r_z * r_z
+                            > cutoff_radius_squared
+                        ):
+                            continue
+                        b_x, b_y, b_z, f_x, f_y, f_z = _compute_dipole_pair_interaction(
+                            r_x,
+                            r_y,
+                            r_z,
+                            m_x,
+                            m_y,
+                            m_z,
+                            magnetization_collection[0, source],
+                            magnetization_collection[1, source],
+                            magnetization_collection[2, source],
+                        )
+                        field_x += b_x
+                        field_y += b_y
+                        field_z += b_z
+                        force_x += f_x
+                        force_y += f_y
+                        force_z += f_z
+
+        if far_field_correction:
+            # field of the far cells is expanded around the target cell center,
+            # B = B_c + J (x - x_c), and the force is F = J^T m
+            c = occupied_cell_index[target_cell]
+            d_x = x - (grid_origin[0] + (c_x + 0.5) * cell_size)
+            d_y = y - (grid_origin[1] + (c_y + 0.5) * cell_size)
+            d_z = z - (grid_origin[2] + (c_z + 0.5) * cell_size)
+            jacobian = cell_far_field_jacobian[:, :, c]
+            field_x += (
+                cell_far_field[0, c]
+                + jacobian[0, 0] * d_x
+                + jacobian[0, 1] * d_y
+                + jacobian[0, 2] * d_z
+            )
+            field_y += (
+                cell_far_field[1, c]
+                + jacobian[1, 0] * d_x
+                + jacobian[1, 1] * d_y
+                + jacobian[1, 2] * d_z
+            )
+            field_z += (
+                cell_far_field[2, c]
+                + jacobian[2, 0] * d_x
+                + jacobian[2, 1] * d_y
+                + jacobian[2, 2] * d_z
+            )
+            force_x += (
+                jacobian[0, 0] * m_x + jacobian[1, 0] * m_y + jacobian[2, 0] * m_z
+            )
+            force_y += (
+                jacobian[0, 1] * m_x + jacobian[1, 1] * m_y + jacobian[2, 1] * m_z
+            )
+            force_z += (
+                jacobian[0, 2] * m_x + jacobian[1, 2] * m_y + jacobian[2, 2] * m_z
+            )
+
+            # remove the elements of the target rod from the summed magnetization
+            # of the far cells, since they are excluded
+            if exclude_same_rod:
+                for source in range(
+                    element_offsets[target_rod], element_offsets[target_rod + 1]
+                ):
+                    cell = cell_index[source]
+                    s_x = cell // (n_y * n_z)
+                    s_y = (cell // n_z) % n_y
+                    s_z = cell % n_z
+                    if (
+                        abs(s_x - c_x) <= 1
+                        and abs(s_y - c_y) <= 1
+                        and abs(s_z - c_z) <= 1
+                    ):
+                        continue
+                    b_x, b_y, b_z, f_x, f_y, f_z = _compute_dipole_pair_interaction(
+                        x - (grid_origin[0] + (s_x + 0.5) * cell_size),
+                        y - (grid_origin[1] + (s_y + 0.5) * cell_size),
+                        z - (grid_origin[2] + (s_z + 0.5) * cell_size),
+                        m_x,
+                        m_y,
+                        m_z,
+                        magnetization_collection[0, source],
+                        magnetization_collection[1, source],
+                        magnetization_collection[2, source],
+                    )
+                    field_x -= b_x
+                    field_y -= b_y
+                    field_z -= b_z
+                    force_x -= f_x
+                    force_y -= f_y
+                    force_z -= f_z
+
+        dipole_field_collection[0, target] = field_x
+        dipole_field_collection[1, target] = field_y
+        dipole_field_collection[2, target] = field_z
+        dipole_force_collection[0, target] = force_x
+        dipole_force_collection[1, target] = force_y
+        dipole_force_collection[2, target] = force_z
+
+
+@njit(cache=True)
+def _compute_max_displacement(positions, reference_positions):
+    """
+    This function returns the largest distance between positions and reference
+    positions.
+    """
+    max_displacement_squared = 0.0
+    for k in range(positions.shape[1]):
+        displacement_squared = 0.0
+        for i in range(3):
+            displacement = positions[i, k] - reference_positions[i, k]
+            displacement_squared += displacement * displacement
+        max_displacement_squared = max(max_displacement_squared, displacement_squared)
+    return np.sqrt(max_displacement_squared)
+
+
+@njit(cache=True)
+def _build_octree(positions, leaf_size, max_depth):
+    """
+    This function builds an octree of the positions, top down. Nodes are split
+    into their non-empty octants until they have at most leaf_size elements or
+    reach max_depth. Elements of each node are contiguous in element_order, and
+    children of each node are contiguous in the node arrays.
+
+    Parameters
+    ----------
+    positions: numpy.ndarray
+        2D (dim, n_points) array containing data with 'float' type.
+    leaf_size: int
+        Maximum number of elements in a leaf node.
+    max_depth: int
+        Maximum depth of the octree.
+
+    Returns
+    -------
+    octree: tuple
+        element_order (n_points,), its inverse element_rank (n_points,),
+        node_start (n_nodes,), node_end (n_nodes,), node_first_child (n_nodes,)
+        and node_n_children (n_nodes,) arrays containing data with 'int' type.
+
+    """
+    n_points = positions.shape[1]
+    element_order = np.arange(n_points)
+    element_buffer = np.empty(n_points, dtype=np.int64)
+    capacity = max(16, 2 * n_points)
+    node_start = np.zeros(capacity, dtype=np.int64)
+    node_end = np.zeros(capacity, dtype=np.int64)
+    node_first_child = np.zeros(capacity, dtype=np.int64)
+    node_n_children = np.zeros(capacity, dtype=np.int64)
+    node_depth = np.zeros(capacity, dtype=np.int64)
+    node_center = np.zeros((3, capacity))
+    node_half_size = np.zeros(capacity)
+
+    # root node is the bounding cube of the positions
+    half_size = 0.0
+    for i in range(3):
+        lower = positions[i].min()
+        upper = positions[i].max()
+        node_center[i, 0] = 0.5 * (lower + upper)
+        half_size = max(half_size, 0.5 * (upper - lower))
+    node_half_size[0] = half_size
+    node_end[0] = n_points
+    n_nodes = 1
+
+    octant = np.empty(n_points, dtype=np.int64)
+    octant_count = np.zeros(9, dtype=np.int64)
+    node = 0
+    while node < n_nodes:
+        start = node_start[node]
+        end = node_end[node]
+        if end - start <= leaf_size or node_depth[node] >= max_depth:
+            node += 1
+            continue
+
+        # counting sort of the node elements into octants
+        octant_count[:] = 0
+        for p in range(start, end):
+            k = element_order[p]
+            octant[p] = (
+                4 * (positions[0, k] > node_center[0, node])
+                + 2 * (positions[1, k] > node_center[1, node])
+                + (positions[2, k] > node_center[2, node])
+            )
+            octant_count[octant[p] + 1] += 1
+        for o in range(8):
+            octant_count[o + 1] += octant_count[o]
+        for p in range(start, end):
+            element_buffer[start + octant_count[octant[p]]] = element_order[p]
+            octant_count[octant[p]] += 1
+        element_order[start:end] = element_buffer[start:end]
+
+        if n_nodes + 8 > capacity:
+            node_start = np.concatenate((node_start, np.zeros_like(node_start)))
+            node_end = np.concatenate((node_end, np.zeros_like(node_end)))
+            node_first_child = np.concatenate(
+                (node_first_child, np.zeros_like(node_first_child))
+            )
+            node_n_children = np.concatenate(
+                (node_n_children, np.zeros_like(node_n_children))
+            )
+            node_depth = np.concatenate((node_depth, np.zeros_like(node_depth)))
+            node_center = np.concatenate(
+                (node_center, np.zeros_like(node_center)), axis=1
+            )
+            node_half_size = np.concatenate(
+                (node_half_size, np.zeros_like(node_half_size))
+            )
+            capacity *= 2
+
+        # after the sort, octant_count[o] is the end of octant o
+        node_first_child[node] = n_nodes
+        child_half_size = 0.5 * node_half_size[node]
+        child_start = start
+        for o in range(8):
+            child_end = start + octant_count[o]
+            if child_end == child_start:
+                continue
+            node_start[n_nodes] = child_start
+            node_end[n_nodes] = child_end
+            node_depth[n_nodes] = node_depth[node] + 1
+            node_half_size[n_nodes] = child_half_size
+            node_center[0, n_nodes] = node_center[0, node] + child_half_size * (
+                2 * (o // 4) - 1
+            )
+            node_center[1, n_nodes] = node_center[1, node] + child_half_size * (
+                2 * ((o // 2) % 2) - 1
+            )
+            node_center[2, n_nodes] = node_center[2, node] + child_half_size * (
+                2 * (o % 2) - 1
+            )
+            child_start = child_end
+            n_nodes += 1
+        node_n_children[node] = n_nodes - node_first_child[node]
+        node += 1
+
+    element_rank = np.empty(n_points, dtype=np.int64)
+    element_rank[element_order] = np.arange(n_points)
+    return (
+        element_order,
+        element_rank,
+        node_start[:n_nodes].copy(),
+        node_end[:n_nodes].copy(),
+        node_first_child[:n_nodes].copy(),
+        node_n_children[:n_nodes].copy(),
+    )
+
+
+@njit(cache=True, parallel=True)
+def _refit_octree(
+    positions, magnetization_collection, element_order, node_start, node_end
+):
+    """
+    This function computes the centroid, the size, i.e. the diagonal of the
+    bounding box, the summed magnetization and the first and second moments of
+    the magnetization about the centroid of the elements of each octree node for
+    the current positions, in parallel over the nodes.
+
+    Returns
+    -------
+    node_centroid: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    node_magnetization: numpy.ndarray
+        2D (dim, n_nodes) array containing data with 'float' type.
+    node_first_moment: numpy.ndarray
+        3D (n_nodes, dim, dim) array containing data with 'float' type,
+        sum_k m_k,i (x_k,j - centroid_j).
+    node_second_moment: numpy.ndarray
+        4D (n_nodes, dim, dim, dim) array containing data with 'float' type,
+        sum_k m_k,i (x_k,j - centroid_j) (x_k,l - centroid_l).
+    node_size: numpy.ndarray
+        1D (n_nodes,) array containing data with 'float' type.
+
+    """
+    n_nodes = node_start.shape[0]
+    node_centroid = np.zeros((3, n_nodes))
+    node_magnetization = np.zeros((3, n_nodes))
+    # moments are contiguous per node, as they are read together in the traversal
+    node_first_moment = np.zeros((n_nodes, 3, 3))
+    node_second_moment = np.zeros((n_nodes, 3, 3, 3))
+    node_size = np.zeros(n_nodes)
+    for node in prange(n_nodes):
+        start = node_start[node]
+        end = node_end[node]
+        size_squared = 0.0
+        for i in range(3):
+            lower = np.inf
+            upper = -np.inf
+            position_sum = 0.0
+            magnetization_sum = 0.0
+            for p in range(start, end):
+                k = element_order[p]
+                lower = min(lower, positions[i, k])
+                upper = max(upper, positions[i, k])
+                position_sum += positions[i, k]
+                magnetization_sum += magnetization_collection[i, k]
+            node_centroid[i, node] = position_sum / (end - start)
+            node_magnetization[i, node] = magnetization_sum
+            size_squared += (upper - lower) * (upper - lower)
+        node_size[node] = np.sqrt(size_squared)
+        for p in range(start, end):
+            k = element_order[p]
+            for i in range(3):
+                for j in range(3):
+                    first_moment = magnetization_collection[i, k] * (
+                        positions[j, k] - node_centroid[j, node]
+                    )
+                    node_first_moment[node, i, j] += first_moment
+                    for l in range(3):
+                        node_second_moment[node, i, j, l] += first_moment * (
+                            positions[l, k] - node_centroid[l, node]
+                        )
+    return (
+        node_centroid,
+        node_magnetization,
+        node_first_moment,
+        node_second_moment,
+        node_size,
+    )
+
+
+@njit(cache=True)
+def _accept_octree_node(x, y, z, node, node_centroid, node_size, opening_angle_squared):
+    """
+    This function returns if the octree node is seen as its summed magnetization
+    at its centroid by the target at x, y, z, and the distance vector to the
+    centroid.
+    """
+    r_x = x - node_centroid[0, node]
+    r_y = y - node_centroid[1, node]
+    r_z = z - node_centroid[2, node]
+    is_accepted = node_size[node] * node_size[node] < opening_angle_squared * (
+        r_x * r_x + r_y * r_y + r_z * r_z
+    )
+    return is_accepted, r_x, r_y, r_z
+
+
+@njit(cache=True, parallel=True)
+def _compute_dipole_interactions_with_octree(
+    positions,
+    magnetization_collection,
+    rod_index,
+    element_offsets,
+    exclude_same_rod,
+    opening_angle,
+    max_depth,
+    element_order,
+    element_rank,
+    node_start,
+    node_end,
+    node_first_child,
+    node_n_children,
+    node_centroid,
+    node_magnetization,
+    node_first_moment,
+    node_second_moment,
+    node_size,
+    dipole_field_collection,
+    dipole_force_collection,
+):
+    """
+    This function computes the dipole fields and forces at all elements with the
+    Barnes-Hut tree code, in parallel over the target elements. The octree is
+    traversed depth first, and a node is seen as its summed magnetization at its
+    centroid, corrected by the first and second moments of its magnetization, if
+    node size < opening angle * distance, otherwise it is opened. Elements of
+    leaf nodes which are not accepted are summed directly.
+
+    Parameters
+    ----------
+    positions: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetization of the elements in the lab frame.
+    rod_index: numpy.ndarray
+        1D (n_elems,) array containing data with 'int' type.
+    element_offsets: numpy.ndarray
+        1D (n_rods + 1) array containing data with 'int' type.
+    exclude_same_rod: bool
+    opening_angle: float
+    max_depth: int
+    element_order, element_rank, node_start, node_end, node_first_child,
+    node_n_children:
+        Octree, see _build_octree.
+    node_centroid, node_magnetization, node_first_moment, node_second_moment,
+    node_size:
+        Refit octree nodes, see _refit_octree.
+    dipole_field_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type, output.
+    dipole_force_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type, output.
+
+    """
+    n_elems = positions.shape[1]
+    opening_angle_squared = opening_angle * opening_angle
+    stack_size = 8 * (max_depth + 1)
+    for target in prange(n_elems):
+        x = positions[0, target]
+        y = positions[1, target]
+        z = positions[2, target]
+        m_x = magnetization_collection[0, target]
+        m_y = magnetization_collection[1, target]
+        m_z = magnetization_collection[2, target]
+        target_rod = rod_index[target]
+
+        field_x = 0.0
+        field_y = 0.0
+        field_z = 0.0
+        force_x = 0.0
+        force_y = 0.0
+        force_z = 0.0
+        stack = np.empty(stack_size, dtype=np.int64)
+        source_first_moment = np.empty((3, 3))
+        source_second_moment = np.empty((3, 3, 3))
+        stack[0] = 0
+        stack_top = 1
+        while stack_top > 0:
+            stack_top -= 1
+            node = stack[stack_top]
+            is_accepted, r_x, r_y, r_z = _accept_octree_node(
+                x, y, z, node, node_centroid, node_size, opening_angle_squared
+            )
+            if is_accepted:
+                b_x, b_y, b_z, f_x, f_y, f_z = _compute_dipole_pair_interaction(
+                    r_x,
+                    r_y,
+                    r_z,
+                    m_x,
+                    m_y,
+                    m_z,
+                    node_magnetization[0, node],
+                    node_magnetization[1, node],
+                    node_magnetization[2, node],
+                )
+                (
+                    moment_b_x,
+                    moment_b_y,
+                    moment_b_z,
+                    moment_f_x,
+                    moment_f_y,
+                    moment_f_z,
+                ) = _compute_dipole_moment_interaction(
+                    r_x,
+                    r_y,
+                    r_z,
+                    m_x,
+                    m_y,
+                    m_z,
+                    node_first_moment[node],
+                    node_second_moment[node],
+                )
+                b_x += moment_b_x
+                b_y += moment_b_y
+                b_z += moment_b_z
+                f_x += moment_f_x
+                f_y += moment_f_y
+                f_z += moment_f_z
+            elif node_n_children[node] > 0:
+                for child in range(
+                    node_first_child[node],
+                    node_first_child[node] + node_n_children[node],
+                ):
+                    stack[stack_top] = child
+                    stack_top += 1
+                continue
+            else:
+                b_x = 0.0
+                b_y = 0.0
+                b_z = 0.0
+                f_x = 0.0
+                f_y = 0.0
+                f_z = 0.0
+                for p in range(node_start[node], node_end[node]):
+                    source = element_order[p]
+                    if source == target or (
+                        exclude_same_rod and rod_index[source] == target_rod
+                    ):
+                        continue
+                    (
+                        pair_b_x,
+                        pair_b_y,
+                        pair_b_z,
+                        pair_f_x,
+                        pair_f_y,
+                        pair_f_z,
+                    ) = _compute_dipole_pair_interaction(
+                        x - positions[0, source],
+                        y - positions[1, source],
+                        z - positions[2, source],
+                        m_x,
+                        m_y,
+                        m_z,
+                        magnetization_collection[0, source],
+                        magnetization_collection[1, source],
+                        magnetization_collection[2, source],
+                    )
+                    b_x += pair_b_x
+                    b_y += pair_b_y
+                    b_z += pair_b_z
+                    f_x += pair_f_x
+                    f_y += pair_f_y
+                    f_z += pair_f_z
+            field_x += b_x
+            field_y += b_y
+            field_z += b_z
+            force_x += f_x
+            force_y += f_y
+            force_z += f_z
+
+        # elements of the target rod are removed from the moments of the
+        # magnetization of the accepted nodes containing them, found by walking
+        # down the octree
+        if exclude_same_rod:
+            for source in range(
+                element_offsets[target_rod], element_offsets[target_rod + 1]
+            ):
+                if source == target:
+                    continue
+                rank = element_rank[source]
+                node = 0
+                while True:
+                    is_accepted, r_x, r_y, r_z = _accept_octree_node(
+                        x, y, z, node, node_centroid, node_size, opening_angle_squared
+                    )
+                    if is_accepted:
+                        b_x, b_y, b_z, f_x, f_y, f_z = _compute_dipole_pair_interaction(
+                            r_x,
+                            r_y,
+                            r_z,
+                            m_x,
+                            m_y,
+                            m_z,
+                            magnetization_collection[0, source],
+                            magnetization_collection[1, source],
+                            magnetization_collection[2, source],
+                        )
+                        # moments of the element about the centroid
+                        for i in range(3):
+                            for j in range(3):
+                                source_first_moment[i, j] = magnetization_collection[
+                                    i, source
+                                ] * (positions[j, source] - node_centroid[j, node])
+                                for l in range(3):
+                                    source_second_moment[i, j, l] = source_first_moment[
+                                        i, j
+                                    ] * (positions[l, source] - node_centroid[l, node])
+                        (
+                            moment_b_x,
+                            moment_b_y,
+                            moment_b_z,
+                            moment_f_x,
+                            moment_f_y,
+                            moment_f_z,
+                        ) = _compute_dipole_moment_interaction(
+                            r_x,
+                            r_y,
+                            r_z,
+                            m_x,
+                            m_y,
+                            m_z,
+                            source_first_moment,
+                            source_second_moment,
+                        )
+                        field_x -= b_x + moment_b_x
+                        field_y -= b_y + moment_b_y
+                        field_z -= b_z + moment_b_z
+                        force_x -= f_x + moment_f_x
+                        force_y -= f_y + moment_f_y
+                        force_z -= f_z + moment_f_z
+                        break
+                    if node_n_children[node] == 0:
+                        # excluded in the direct sum of the leaf
+                        break
+                    child = node_first_child[node]
+                    while node_end[child] <= rank:
+                        child += 1
+                    node = child
+
+        dipole_field_collection[0, target] = field_x
+        dipole_field_collection[1, target] = field_y
+        dipole_field_collection[2, target] = field_z
+        dipole_force_collection[0, target] = force_x
+        dipole_force_collection[1, target] = force_y
+        dipole_force_collection[2, target] = force_z
+
+
+@njit(cache=True)
+def _compute_ewald_pair_interaction(
+    r_x,
+    r_y,
+    r_z,
+    m_i_x,
+    m_i_y,
+    m_i_z,
+    m_j_x,
+    m_j_y,
+    m_j_z,
+    ewald_splitting,
+    is_long_range,
+):
+    """
+    This function computes the short-range part of the Ewald split magnetic field
+    of dipole j at dipole i and force of dipole j on dipole i, where
+    r = x_i - x_j, or the long-range part if is_long_range is True.
+
+    B = mu_0 / (4 pi) (-m_j b(r) + (m_j . r) c(r) r)
+    F = mu_0 / (4 pi) (((m_i . m_j) r + (m_j . r) m_i + (m_i . r) m_j) c(r)
+        - (m_i . r) (m_j . r) d(r) r)
+
+    where b, c and d are the screened 1 / r^3, 3 / r^5 and 15 / r^7.
+
+    Returns
+    -------
+    field and force: tuple
+        Components of the field and the force, in the lab frame.
+
+    """
+    distance_squared = r_x * r_x + r_y * r_y + r_z * r_z
+    distance = np.sqrt(distance_squared)
+    inv_distance_squared = 1.0 / distance_squared
+    splitting_distance_squared = ewald_splitting * ewald_splitting * distance_squared
+    gaussian_term = (
+        2.0
+        * ewald_splitting
+        * distance
+        / np.sqrt(np.pi)
+        * np.exp(-splitting_distance_squared)
+    )
+    # long-range part is the bare interaction minus the short-range part
+    screening = erfc(ewald_splitting * distance)
+    sign = 1.0
+    if is_long_range:
+        screening -= 1.0
+        sign = -1.0
+    b = (
+        sign
+        * MU_0
+        / (4.0 * np.pi)
+        * (screening + gaussian_term)
+        * inv_distance_squared
+        / distance
+    )
+    c = (
+        sign
+        * MU_0
+        / (4.0 * np.pi)
+        * (3.0 * screening + gaussian_term * (3.0 + 2.0 * splitting_distance_squared))
+        * inv_distance_squared
+        * inv_distance_squared
+        / distance
+    )
+    d = (
+        sign
+        * MU_0
+        / (4.0 * np.pi)
+        * (
+            15.0 * screening
+            + gaussian_term
+            * (
+                15.0
+                + 10.0 * splitting_distance_squared
+                + 4.0 * splitting_distance_squared * splitting_distance_squared
+            )
+        )
+        * inv_distance_squared
+        * inv_distance_squared
+        * inv_distance_squared
+        / distance
+    )
+    m_i_r = m_i_x * r_x + m_i_y * r_y + m_i_z * r_z
+    m_j_r = m_j_x * r_x + m_j_y * r_y + m_j_z * r_z
+    m_i_m_j = m_i_x * m_j_x + m_i_y * m_j_y + m_i_z * m_j_z
+    radial_force = m_i_m_j * c - m_i_r * m_j_r * d
+    return (
+        m_j_r * c * r_x - m_j_x * b,
+        m_j_r * c * r_y - m_j_y * b,
+        m_j_r * c * r_z - m_j_z * b,
+        radial_force * r_x + (m_j_r * m_i_x + m_i_r * m_j_x) * c,
+        radial_force * r_y + (m_j_r * m_i_y + m_i_r * m_j_y) * c,
+        radial_force * r_z + (m_j_r * m_i_z + m_i_r * m_j_z) * c,
+    )
+
+
+@njit(cache=True)
+def _build_periodic_cell_list(positions, domain_size, cell_size):
+    """
+    This function sorts the positions into a grid of cells that is periodic in x
+    and y, by counting sort. Cells are at least cell_size wide, and span the
+    domain size in x and y, and the positions in z.
+
+    Parameters
+    ----------
+    positions: numpy.ndarray
+        2D (dim, n_points) array containing data with 'float' type.
+    domain_size: numpy.ndarray
+        1D (2,) array containing data with 'float' type, periods in x and y.
+    cell_size: float
+        Smallest edge length of the cells.
+
+    Returns
+    -------
+    grid_shape: numpy.ndarray
+        1D (dim,) array containing data with 'int' type, number of cells.
+    cell_index: numpy.ndarray
+        1D (n_points,) array containing data with 'int' type, flat cell index of
+        each point.
+    cell_start: numpy.ndarray
+        1D (n_cells + 1,) array containing data with 'int' type, start of each
+        cell in cell_elements.
+    cell_elements: numpy.ndarray
+        1D (n_points,) array containing data with 'int' type, points sorted by
+        cell.
+
+    """
+    n_points = positions.shape[1]
+    grid_shape = np.empty(3, dtype=np.int64)
+    cell_edge = np.empty(3)
+    for i in range(2):
+        grid_shape[i] = max(int(domain_size[i] / cell_size), 1)
+        cell_edge[i] = domain_size[i] / grid_shape[i]
+    z_min = positions[2].min()
+    grid_shape[2] = int((positions[2].max() - z_min) / cell_size) + 1
+    cell_edge[2] = cell_size
+    n_cells = grid_shape[0] * grid_shape[1] * grid_shape[2]
+
+    cell_index = np.empty(n_points, dtype=np.int64)
+    cell_start = np.zeros(n_cells + 1, dtype=np.int64)
+    for k in range(n_points):
+        flat_index = 0
+        for i in range(3):
+            if i < 2:
+                coordinate = positions[i, k] % domain_size[i]
+            else:
+                coordinate = positions[i, k] - z_min
+            index = min(int(coordinate / cell_edge[i]), grid_shape[i] - 1)
+            flat_index = flat_index * grid_shape[i] + index
+        cell_index[k] = flat_index
+        cell_start[flat_index + 1] += 1
+    for cell in range(n_cells):
+        cell_start[cell + 1] += cell_start[cell]
+
+    cell_fill = cell_start[:-1].copy()
+    cell_elements = np.empty(n_points, dtype=np.int64)
+    for k in range(n_points):
+        cell_elements[cell_fill[cell_index[k]]] = k
+        cell_fill[cell_index[k]] += 1
+    return grid_shape, cell_index, cell_start, cell_elements
+
+
+@njit(cache=True, parallel=True)
+def _compute_periodic_real_space_dipole_interactions(
+    positions,
+    magnetization_collection,
+    rod_index,
+    element_offsets,
+    exclude_same_rod,
+    domain_size,
+    cutoff_radius,
+    ewald_splitting,
+    grid_shape,
+    cell_index,
+    cell_start,
+    cell_elements,
+    dipole_field_collection,
+    dipole_force_collection,
+):
+    """
+    This function computes the short-range part of the Ewald split dipole fields
+    and forces at all elements, in parallel over the target elements, with the
+    minimum image convention in x and y. It also removes the self field and the
+    long-range part of excluded pairs, which are included in the mesh part.
+
+    Parameters
+    ----------
+    positions: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+        Magnetization of the elements in the lab frame.
+    rod_index: numpy.ndarray
+        1D (n_elems,) array containing data with 'int' type.
+    element_offsets: numpy.ndarray
+        1D (n_rods + 1) array containing data with 'int' type.
+    exclude_same_rod: bool
+    domain_size: numpy.ndarray
+        1D (2,) array containing data with 'float' type, periods in x and y.
+    cutoff_radius: float
+    ewald_splitting: float
+    grid_shape, cell_index, cell_start, cell_elements:
+        Periodic cell list, see _build_periodic_cell_list.
+    dipole_field_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type, output.
+    dipole_force_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type, output.
+
+    """
+    n_elems = positions.shape[1]
+    cutoff_radius_squared = cutoff_radius * cutoff_radius
+    n_x = grid_shape[0]
+    n_y = grid_shape[1]
+    n_z = grid_shape[2]
+    # periodic neighbors are searched in all cells if there are less than 3
+    n_neighbors_x = 3 if n_x >= 3 else n_x
+    n_neighbors_y = 3 if n_y >= 3 else n_y
+    self_field_prefactor = (
+        MU_0 / (4.0 * np.pi) * 4.0 * ewald_splitting**3 / (3.0 * np.sqrt(np.pi))
+    )
+    for target in prange(n_elems):
+        x = positions[0, target]
+        y = positions[1, target]
+        z = positions[2, target]
+        m_x = magnetization_collection[0, target]
+        m_y = magnetization_collection[1, target]
+        m_z = magnetization_collection[2, target]
+        target_rod = rod_index[target]
+        target_cell = cell_index[target]
+        c_x = target_cell // (n_y * n_z)
+        c_y = (target_cell // n_z) % n_y
+        c_z = target_cell % n_z
+
+        field_x = self_field_prefactor * m_x
+        field_y = self_field_prefactor * m_y
+        field_z = self_field_prefactor * m_z
+        force_x = 0.0
+        force_y = 0.0
+        force_z = 0.0
+        for i_x in range(n_neighbors_x):
+            n_x_ = (c_x + i_x - 1) % n_x if n_x >= 3 else i_x
+            for i_y in range(n_neighbors_y):
+                n_y_ = (c_y + i_y - 1) % n_y if n_y >= 3 else i_y
+                for n_z_ in range(max(c_z - 1, 0), min(c_z + 2, n_z)):
+                    cell = (n_x_ * n_y + n_y_) * n_z + n_z_
+                    for p in range(cell_start[cell], cell_start[cell + 1]):
+                        source = cell_elements[p]
+                        if source == target or (
+                            exclude_same_rod and rod_index[source] == target_rod
+                        ):
+                            continue
+                        r_x = x - positions[0, source]
+                        r_y = y - positions[1, source]
+                        r_z = z - positions[2, source]
+                        r_x -= domain_size[0] * np.floor(r_x / domain_size[0] + 0.5)
+                        r_y -= domain_size[1] * np.floor(r_y / domain_size[1] + 0.5)
+                        if r_x * r_x + r_y * r_y + r_z * r_z > cutoff_radius_squared:
+                            continue
+                        b_x, b_y, b_z, f_x, f_y, f_z = _compute_ewald_pair_interaction(
+                            r_x,
+                            r_y,
+                            r_z,
+                            m_x,
+                            m_y,
+                            m_z,
+                            magnetization_collection[0, source],
+                            magnetization_collection[1, source],
+                            magnetization_collection[2, source],
+                            ewald_splitting,
+                            False,
+                        )
+                        field_x += b_x
+                        field_y += b_y
+                        field_z += b_z
+                        force_x += f_x
+                        force_y += f_y
+                        force_z += f_z
+
+        if exclude_same_rod:
+            for source in range(
+                element_offsets[target_rod], element_offsets[target_rod + 1]
+            ):
+                if source == target:
+                    continue
+                r_x = x - positions[0, source]
+                r_y = y - positions[1, source]
+                r_x -= domain_size[0] * np.floor(r_x / domain_size[0] + 0.5)
+                r_y -= domain_size[1] * np.floor(r_y / domain_size[1] + 0.5)
+                b_x, b_y, b_z, f_x, f_y, f_z = _compute_ewald_pair_interaction(
+                    r_x,
+                    r_y,
+                    z - positions[2, source],
+                    m_x,
+                    m_y,
+                    m_z,
+                    magnetization_collection[0, source],
+                    magnetization_collection[1, source],
+                    magnetization_collection[2, source],
+                    ewald_splitting,
+                    True,
+                )
+                field_x -= b_x
+                field_y -= b_y
+                field_z -= b_z
+                force_x -= f_x
+                force_y -= f_y
+                force_z -= f_z
+
+        dipole_field_collection[0, target] = field_x
+        dipole_field_collection[1, target] = field_y
+        dipole_field_collection[2, target] = field_z
+        dipole_force_collection[0, target] = force_x
+        dipole_force_collection[1, target] = force_y
+        dipole_force_collection[2, target] = force_z
+
+
+@njit(cache=True)
+def _compute_bspline_weights(fraction, interpolation_order, weights, derivatives):
+    """
+    This function computes the cardinal B-spline M_n(fraction + s) of order
+    n = interpolation_order and its derivative, for s = 0, ..., n - 1.
+
+    M_n(u) = (u M_n-1(u) + (n - u) M_n-1(u - 1)) / (n - 1)
+    M_n'(u) = M_n-1(u) - M_n-1(u - 1)
+
+    """
+    weights[:] = 0.0
+    weights[0] = 1.0
+    for order in range(2, interpolation_order + 1):
+        if order == interpolation_order:
+            derivatives[0] = weights[0]
+            for s in range(1, order):
+                derivatives[s] = weights[s] - weights[s - 1]
+        for s in range(order - 1, -1, -1):
+            u = fraction + s
+            weight = u * weights[s]
+            if s > 0:
+                weight += (order - u) * weights[s - 1]
+            weights[s] = weight / (order - 1)
+
+
+@njit(cache=True)
+def _compute_mesh_stencil(
+    position,
+    mesh_origin,
+    mesh_size,
+    mesh_shape,
+    interpolation_order,
+    index,
+    weights,
+    derivatives,
+):
+    """
+    This function computes the mesh indices and B-spline weights of a position,
+    and the derivatives of the weights with respect to the position, in each
+    direction. Mesh point k is weighted by M_n(u - k) where u is the position
+    in mesh spacings.
+    """
+    for i in range(3):
+        u = (position[i] - mesh_origin[i]) / mesh_size[i] % 1.0 * mesh_shape[i]
+        floor_u = np.floor(u)
+        _compute_bspline_weights(
+            u - floor_u, interpolation_order, weights[i], derivatives[i]
+        )
+        for s in range(interpolation_order):
+            index[i, s] = (int(floor_u) - s) % mesh_shape[i]
+            derivatives[i, s] *= mesh_shape[i] / mesh_size[i]
+
+
+@njit(cache=True)
+def _spread_magnetization_on_mesh(
+    positions,
+    magnetization_collection,
+    mesh_origin,
+    mesh_size,
+    interpolation_order,
+    mesh,
+):
+    """
+    This function spreads the magnetization of the elements on the periodic mesh
+    with B-splines.
+
+    Parameters
+    ----------
+    positions: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+    mesh_origin: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+    mesh_size: numpy.ndarray
+        1D (dim,) array containing data with 'float' type, periods of the mesh.
+    interpolation_order: int
+    mesh: numpy.ndarray
+        4D (dim, n_x, n_y, n_z) array containing data with 'float' type, output.
+
+    """
+    mesh_shape = np.array(mesh.shape[1:])
+    index = np.empty((3, interpolation_order), dtype=np.int64)
+    weights = np.empty((3, interpolation_order))
+    derivatives = np.empty((3, interpolation_order))
+    for k in range(positions.shape[1]):
+        _compute_mesh_stencil(
+            positions[:, k],
+            mesh_origin,
+            mesh_size,
+            mesh_shape,
+            interpolation_order,
+            index,
+            weights,
+            derivatives,
+        )
+        for s_x in range(interpolation_order):
+            for s_y in range(interpolation_order):
+                weight_xy = weights[0, s_x] * weights[1, s_y]
+                for s_z in range(interpolation_order):
+                    weight = weight_xy * weights[2, s_z]
+                    for i in range(3):
+                        mesh[i, index[0, s_x], index[1, s_y], index[2, s_z]] += (
+                            weight * magnetization_collection[i, k]
+                        )
+
+
+@njit(cache=True, parallel=True)
+def _interpolate_mesh_field(
+    positions,
+    magnetization_collection,
+    mesh_origin,
+    mesh_size,
+    interpolation_order,
+    mesh_field,
+    dipole_field_collection,
+    dipole_force_collection,
+):
+    """
+    This function interpolates the long-range field from the mesh to the
+    elements with B-splines, and adds the field and the force F = grad(m . B),
+    from the derivatives of the B-splines, to the outputs.
+
+    Parameters
+    ----------
+    positions: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+    magnetization_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type.
+    mesh_origin: numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+    mesh_size: numpy.ndarray
+        1D (dim,) array containing data with 'float' type, periods of the mesh.
+    interpolation_order: int
+    mesh_field: numpy.ndarray
+        4D (dim, n_x, n_y, n_z) array containing data with 'float' type.
+    dipole_field_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type, output.
+    dipole_force_collection: numpy.ndarray
+        2D (dim, n_elems) array containing data with 'float' type, output.
+
+    """
+    mesh_shape = np.array(mesh_field.shape[1:])
+    for k in prange(positions.shape[1]):
+        index = np.empty((3, interpolation_order), dtype=np.int64)
+        weights = np.empty((3, interpolation_order))
+        derivatives = np.empty((3, interpolation_order))
+        _compute_mesh_stencil(
+            positions[:, k],
+            mesh_origin,
+            mesh_size,
+            mesh_shape,
+            interpolation_order,
+            index,
+            weights,
+            derivatives,
+        )
+        m_x = magnetization_collection[0, k]
+        m_y = magnetization_collection[1, k]
+        m_z = magnetization_collection[2, k]
+        field_x = 0.0
+        field_y = 0.0
+        field_z = 0.0
+        force_x = 0.0
+        force_y = 0.0
+        force_z = 0.0
+        for s_x in range(interpolation_order):
+            for s_y in range(interpolation_order):
+                for s_z in range(interpolation_order):
+                    b_x = mesh_field[0, index[0, s_x], index[1, s_y], index[2, s_z]]
+                    b_y = mesh_field[1, index[0, s_x], index[1, s_y], index[2, s_z]]
+                    b_z = mesh_field[2, index[0, s_x], index[1, s_y], index[2, s_z]]
+                    weight = weights[0, s_x] * weights[1, s_y] * weights[2, s_z]
+                    field_x += weight * b_x
+                    field_y += weight * b_y
+                    field_z += weight * b_z
+                    m_b = m_x * b_x + m_y * b_y + m_z * b_z
+                    force_x += (
+                        m_b * derivatives[0, s_x] * weights[1, s_y] * weights[2, s_z]
+                    )
+                    force_y += (
+                        m_b * weights[0, s_x] * derivatives[1, s_y] * weights[2, s_z]
+                    )
+                    force_z += (
+                        m_b * weights[0, s_x] * weights[1, s_y] * derivatives[2, s_z]
+                    )
+        dipole_field_collection[0, k] += field_x
+        dipole_field_collection[1, k] += field_y
+        dipole_field_collection[2, k] += field_z
+        dipole_force_collection[0, k] += force_x
+        dipole_force_collection[1, k] += force_y
+        dipole_force_collection[2, k] += force_z
+
+
+def _compute_ewald_influence_function(
+    mesh_size, mesh_shape, ewald_splitting, interpolation_order
+):
+    """
+    This function computes the wave vectors of the real FFT of the mesh and the
+    influence function of the smooth particle-mesh Ewald summation,
+    mu_0 exp(-k^2 / (4 alpha^2)) / (k^2 V) times the B-spline moduli |b(k)|^2,
+    which correct the B-spline spreading and interpolation.
+
+    Parameters
+    ----------
+    mesh_size: numpy.ndarray
+        1D (dim,) array containing data with 'float' type, periods of the mesh.
+    mesh_shape: tuple
+        Number of mesh points in each direction, even numbers.
+    ewald_splitting: float
+    interpolation_order: int
+
+    Returns
+    -------
+    wave_vectors: tuple
+        k_x (n_x, 1, 1), k_y (1, n_y, 1) and k_z (1, 1, n_z // 2 + 1) arrays.
+    influence_function: numpy.ndarray
+        3D (n_x, n_y, n_z // 2 + 1) array containing data with 'float' type.
+
+    """
+    wave_vectors = []
+    bspline_moduli = []
+    weights = np.empty(interpolation_order)
+    _compute_bspline_weights(
+        0.0, interpolation_order, weights, np.empty(interpolation_order)
+    )
+    for i in range(3):
+        n_mesh = mesh_shape[i]
+        if i < 2:
+            mode = np.fft.fftfreq(n_mesh, 1.0 / n_mesh)
+        else:
+            mode = np.fft.rfftfreq(n_mesh, 1.0 / n_mesh)
+        wave_vector = 2.0 * np.pi * mode / mesh_size[i]
+        interpolation_error = np.abs(
+            np.exp(2j * np.pi * np.outer(mode, np.arange(interpolation_order)) / n_mesh)
+            @ weights
+        )
+        # Nyquist modes are dropped, their gradient is not defined
+        bspline_modulus = np.where(
+            np.abs(mode) == n_mesh // 2, 0.0, 1.0 / interpolation_error**2
+        )
+        shape = [1, 1, 1]
+        shape[i] = -1
+        wave_vectors.append(wave_vector.reshape(shape))
+        bspline_moduli.append(bspline_modulus.reshape(shape))
+
+    k_x, k_y, k_z = wave_vectors
+    wave_vector_squared = k_x**2 + k_y**2 + k_z**2
+    wave_vector_squared[0, 0, 0] = 1.0
+    influence_function = (
+        MU_0
+        * np.exp(-wave_vector_squared / (4.0 * ewald_splitting**2))
+        / (wave_vector_squared * np.prod(mesh_size))
+        * bspline_moduli[0]
+        * bspline_moduli[1]
+        * bspline_moduli[2]
+    )
+    influence_function[0, 0, 0] = 0.0
+    return tuple(wave_vectors), influence_function
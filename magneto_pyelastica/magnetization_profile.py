@@ -0,0 +1,334 @@
+__doc__ = """ Module implementation for time varying magnetization profiles of magnetic
+Cosserat rods."""
+__all__ = [
+    "BaseMagnetizationProfile",
+    "ConstantMagnetizationProfile",
+    "DecayingMagnetizationProfile",
+    "TabulatedMagnetizationProfile",
+]
+
+from typing import Union
+from magneto_pyelastica.magnetic_forces import compute_magnetization_collection
+import numpy as np
+
+
+class BaseMagnetizationProfile:
+    """
+    This is the base class for magnetization profile objects.
+
+    Notes
+    -----
+    Every new magnetization profile class must be derived from
+    BaseMagnetizationProfile class, and implement the compute_value method,
+    which returns the magnetization of all rod elements in the material frame
+    in one vectorized evaluation.
+    The value method memoizes the last evaluated time, so that forces and torques
+    cost one evaluation per time. Profiles constant in time set is_static to True,
+    and are evaluated only once. If the parameters of a profile are mutated at
+    runtime, invalidate_cache has to be called.
+
+    """
+
+    is_static = False
+
+    def __init__(self):
+        """
+        BaseMagnetizationProfile class does not need any input parameters.
+        """
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """
+        This function clears the memoized value of the magnetization, it has to be
+        called after the profile parameters are mutated.
+        """
+        self._cached_time = None
+        self._cached_value = None
+
+    def value(self, time: np.float64 = 0.0):
+        """Returns the magnetization of the rod elements.
+
+        The value is computed with compute_value method, and a read-only view of it
+        is cached and returned while the time does not change, or forever for
+        static profiles.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+
+        Returns
+        -------
+        magnetization: numpy.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Magnetization of the rod elements in the material frame, read-only.
+
+        """
+        if self.is_static and self._cached_value is not None:
+            return self._cached_value
+        if time != self._cached_time:
+            magnetization = self.compute_value(time=time).view()
+            magnetization.flags.writeable = False
+            self._cached_value = magnetization
+            self._cached_time = time
+        return self._cached_value
+
+    def compute_value(self, time: np.float64 = 0.0):
+        """Computes the magnetization of the rod elements.
+
+        In BaseMagnetizationProfile class, this routine simply passes.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+
+        Returns
+        -------
+
+        """
+
+
+class ConstantMagnetizationProfile(BaseMagnetizationProfile):
+    """
+    This class represents a magnetization constant in time, programmed in the
+    material frame of the rod.
+
+        Attributes
+        ----------
+        magnetization: numpy.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Magnetization of the rod elements in the material frame.
+
+    """
+
+    is_static = True
+
+    def __init__(
+        self,
+        magnetization_density: Union[float, np.ndarray],
+        magnetization_direction: np.ndarray,
+        rod_director_collection: np.ndarray,
+    ):
+        """
+
+        Parameters
+        ----------
+        magnetization_density: float or a np.ndarray
+            Float number or 1D (n_elems) array containing data with 'float' type.
+            Density of magnetization of the rod.
+        magnetization_direction: np.ndarray
+            1D (dim) or 2D (dim, n_elems) array containing data with 'float' type.
+            Direction of magnetization of the rod in the lab frame.
+        rod_director_collection: numpy.ndarray
+            3D (dim, dim, n_elems) array containing data with 'float' type.
+            Rod element directors, which define the material frame of the
+            magnetization.
+
+        """
+        super(ConstantMagnetizationProfile, self).__init__()
+        self.magnetization = compute_magnetization_collection(
+            magnetization_density=magnetization_density,
+            magnetization_direction=magnetization_direction,
+            rod_volume=np.ones((rod_director_collection.shape[2],)),
+            rod_director_collection=rod_director_collection,
+        )
+
+    def compute_value(self, time: np.float64 = 0.0):
+        """
+        This function returns the constant magnetization of the rod elements.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+
+        Returns
+        -------
+        magnetization: numpy.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Magnetization of the rod elements in the material frame.
+
+        """
+        return self.magnetization
+
+
+class DecayingMagnetizationProfile(ConstantMagnetizationProfile):
+    """
+    This class represents a magnetization decaying exponentially in time, i.e.
+    thermal demagnetization of a heated rod, down to a remanent fraction of the
+    initial magnetization.
+
+        Attributes
+        ----------
+        magnetization: numpy.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Initial magnetization of the rod elements in the material frame.
+        decay_time: float or numpy.ndarray
+            Float number or 1D (n_elems) array containing data with 'float' type.
+            Time constant of the decay, which can vary along the rod.
+        start_time : float
+            Start time of the decay.
+        remanent_fraction : float
+            Fraction of the initial magnetization left after the decay.
+
+    """
+
+    is_static = False
+
+    def __init__(
+        self,
+        magnetization_density: Union[float, np.ndarray],
+        magnetization_direction: np.ndarray,
+        rod_director_collection: np.ndarray,
+        decay_time: Union[float, np.ndarray],
+        start_time: float = 0.0,
+        remanent_fraction: float = 0.0,
+    ):
+        """
+
+        Parameters
+        ----------
+        magnetization_density: float or a np.ndarray
+            Float number or 1D (n_elems) array containing data with 'float' type.
+            Initial density of magnetization of the rod.
+        magnetization_direction: np.ndarray
+            1D (dim) or 2D (dim, n_elems) array containing data with 'float' type.
+            Direction of magnetization of the rod in the lab frame.
+        rod_director_collection: numpy.ndarray
+            3D (dim, dim, n_elems) array containing data with 'float' type.
+            Rod element directors, which define the material frame of the
+            magnetization.
+        decay_time: float or numpy.ndarray
+            Float number or 1D (n_elems) array containing data with 'float' type.
+            Time constant of the decay, which can vary along the rod.
+        start_time : float
+            Start time of the decay.
+        remanent_fraction : float
+            Fraction of the initial magnetization left after the decay.
+
+        """
+        super(DecayingMagnetizationProfile, self).__init__(
+            magnetization_density=magnetization_density,
+            magnetization_direction=magnetization_direction,
+            rod_director_collection=rod_director_collection,
+        )
+        decay_time = np.asarray(decay_time, dtype=np.float64)
+        if not (
+            decay_time.shape in ((), (self.magnetization.shape[1],))
+            and np.all(decay_time > 0.0)
+        ):
+            raise ValueError(
+                "Invalid decay time! Should be either a positive float or "
+                "an array of shape (num_rod_elements,)"
+            )
+        self.decay_time = decay_time
+        self.start_time = start_time
+        self.remanent_fraction = remanent_fraction
+
+    def compute_value(self, time: np.float64 = 0.0):
+        """
+        This function returns the decayed magnetization of the rod elements.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+
+        Returns
+        -------
+        magnetization: numpy.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Magnetization of the rod elements in the material frame.
+
+        """
+        elapsed_time = max(time - self.start_time, 0.0)
+        factor = self.remanent_fraction + (1.0 - self.remanent_fraction) * np.exp(
+            -elapsed_time / self.decay_time
+        )
+        return self.magnetization * factor
+
+
+class TabulatedMagnetizationProfile(BaseMagnetizationProfile):
+    """
+    This class represents a magnetization given as samples in time, i.e. a rod
+    reprogrammed during the simulation. Samples are interpolated linearly.
+
+        Attributes
+        ----------
+        magnetization_samples: numpy.ndarray
+            3D (n_samples, dim, n_elems) array containing data with 'float' type.
+            Magnetization samples of the rod elements in the material frame.
+        sample_times: numpy.ndarray
+            1D (n_samples,) array containing data with 'float' type.
+            Increasing sample times.
+
+    Notes
+    -----
+    Times outside of the samples are clamped to the first or last sample. The
+    returned magnetization is a buffer overwritten at the next evaluation time.
+
+    """
+
+    def __init__(self, magnetization_samples: np.ndarray, sample_times: np.ndarray):
+        """
+
+        Parameters
+        ----------
+        magnetization_samples: numpy.ndarray
+            3D (n_samples, dim, n_elems) array containing data with 'float' type.
+            Magnetization samples of the rod elements in the material frame, i.e.
+            values of ConstantMagnetizationProfile objects.
+        sample_times: numpy.ndarray
+            1D (n_samples,) array containing data with 'float' type.
+            Increasing sample times.
+
+        """
+        super(TabulatedMagnetizationProfile, self).__init__()
+        self.magnetization_samples = np.asarray(magnetization_samples, dtype=np.float64)
+        if not (
+            self.magnetization_samples.ndim == 3
+            and self.magnetization_samples.shape[1] == 3
+            and self.magnetization_samples.shape[0] >= 2
+        ):
+            raise ValueError(
+                "Invalid magnetization samples! Should be an array of shape "
+                "(num_samples, 3, num_rod_elements) with at least two samples"
+            )
+        self.sample_times = np.asarray(sample_times, dtype=np.float64)
+        if self.sample_times.shape != (self.magnetization_samples.shape[0],):
+            raise ValueError(
+                "Invalid sample times! Should have one time for each sample"
+            )
+        if not np.all(np.diff(self.sample_times) > 0.0):
+            raise ValueError("Invalid sample times! Should be strictly increasing")
+        self._value_buffer = np.zeros_like(self.magnetization_samples[0])
+
+    def compute_value(self, time: np.float64 = 0.0):
+        """
+        This function returns the magnetization of the rod elements, interpolated
+        from the magnetization samples.
+
+        Parameters
+        ----------
+        time : float
+            The time of simulation.
+
+        Returns
+        -------
+        magnetization: numpy.ndarray
+            2D (dim, n_elems) array containing data with 'float' type.
+            Magnetization of the rod elements in the material frame.
+
+        """
+        sample_idx = np.searchsorted(self.sample_times, time, side="right") - 1
+        sample_idx = min(max(sample_idx, 0), self.sample_times.shape[0] - 2)
+        weight = (time - self.sample_times[sample_idx]) / (
+            self.sample_times[sample_idx + 1] - self.sample_times[sample_idx]
+        )
+        weight = min(max(weight, 0.0), 1.0)
+        np.multiply(
+            1.0 - weight, self.magnetization_samples[sample_idx], out=self._value_buffer
+        )
+        self._value_buffer += weight * self.magnetization_samples[sample_idx + 1]
+        return self._value_buffer
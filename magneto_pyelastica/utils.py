@@ -1,13 +1,175 @@
 """ Handy utilities"""
-__all__ = ["compute_ramp_factor"]
+__all__ = [
+    "RAMP_PROFILES",
+    "get_ramp_profile_id",
+    "compute_ramp_factor",
+    "compute_ramp_factor_kernel",
+    "compute_ramp_factors",
+    "compute_ramp_factors_kernel",
+    "trilinear_interpolation",
+    "trilinear_interpolation_gradient",
+]
 
 from elastica.utils import Tolerance
+import numpy as np
+from numba import njit
 
+# tolerance of ramp interval, hoisted to a constant for the compiled kernels
+RAMP_TOLERANCE = Tolerance.atol()
+# ramp profiles and their ids used by the compiled kernels
+RAMP_PROFILES = {
+    "linear": 0,
+    "smoothstep": 1,
+    "smootherstep": 2,
+    "cosine": 3,
+    "exponential": 4,
+}
+# rate of the exponential ramp profile over the ramp interval
+EXPONENTIAL_RAMP_RATE = 5.0
+
+
+def get_ramp_profile_id(ramp_profile):
+    """
+    This function returns the id of the ramp profile, used by compiled kernels.
+
+    Parameters
+    ----------
+    ramp_profile : str
+        Name of the ramp profile, one of RAMP_PROFILES.
+
+    Returns
+    -------
+    ramp_profile_id : int
+        Id of the ramp profile.
+
+    """
+    if ramp_profile not in RAMP_PROFILES:
+        raise ValueError(
+            "Invalid ramp profile! Should be one of " + ", ".join(RAMP_PROFILES)
+        )
+    return RAMP_PROFILES[ramp_profile]
+
+
+@njit(cache=True)
+def _evaluate_ramp_profile(ramp, ramp_profile_id):
+    """
+    This function maps the clipped linear ramp in [0, 1] to the ramp profile.
+    Profiles are polynomials or exponentials of the ramp without any branching
+    on time, so that the same function is used for a scalar time or an array
+    of times.
+
+    Parameters
+    ----------
+    ramp : float or numpy.ndarray
+        Linear ramp, clipped to [0, 1].
+    ramp_profile_id : int
+        Id of the ramp profile, see RAMP_PROFILES.
+
+    Returns
+    -------
+    factor : float or numpy.ndarray
+        Ramp factor, 0 at ramp = 0 and 1 at ramp = 1.
+
+    """
+    if ramp_profile_id == 1:
+        # C1 smoothstep
+        return ramp * ramp * (3.0 - 2.0 * ramp)
+    if ramp_profile_id == 2:
+        # C2 smootherstep
+        return ramp * ramp * ramp * (ramp * (6.0 * ramp - 15.0) + 10.0)
+    if ramp_profile_id == 3:
+        # raised cosine, C1
+        return 0.5 - 0.5 * np.cos(np.pi * ramp)
+    if ramp_profile_id == 4:
+        # normalized exponential saturation, C0 at both ends
+        return (1.0 - np.exp(-EXPONENTIAL_RAMP_RATE * ramp)) / (
+            1.0 - np.exp(-EXPONENTIAL_RAMP_RATE)
+        )
+    return ramp
+
+
+@njit(cache=True)
+def _compute_profiled_ramp_factor(
+    time, ramp_interval, start_time, end_time, ramp_profile_id
+):
+    """
+    This function returns the ramp factor of the ramp profile. As for the linear
+    ramp, the turning on ramp is used until end_time and the turning off ramp
+    after it, each mapped by the ramp profile, so that the linear profile gives
+    the factors of the linear ramp, also when end_time is within the ramp
+    interval. Ramps are clipped to [0, 1] with min/max and selected with masks,
+    so a scalar time or an array of times can be given.
+    """
+    ramp_up = np.minimum(
+        1.0, np.maximum(0.0, (time - start_time) / (ramp_interval + RAMP_TOLERANCE))
+    )
+    ramp_down = np.minimum(
+        1.0,
+        np.maximum(
+            0.0, -1 / (ramp_interval + RAMP_TOLERANCE) * (time - end_time) + 1.0
+        ),
+    )
+    return (time > start_time) * (time <= end_time) * _evaluate_ramp_profile(
+        ramp_up, ramp_profile_id
+    ) + (time > end_time) * _evaluate_ramp_profile(ramp_down, ramp_profile_id)
+
+
+def compute_ramp_factor(
+    time, ramp_interval, start_time, end_time, ramp_profile="linear"
+):
+    """
+    This function returns a ramping up factor based on time, ramp_interval,
+    start_time and end_time. The default ramp is linear. The smoothstep,
+    smootherstep and cosine profiles avoid the kinks of the linear ramp at
+    start_time, start_time + ramp_interval, end_time and end_time +
+    ramp_interval. The exponential profile saturates faster, but keeps kinks at
+    these times.
+
+    Parameters
+    ----------
+    time : float
+        The time of simulation.
+    ramp_interval : float
+        ramping time for magnetic field.
+    start_time : float
+        Turning on time of magnetic field.
+    end_time : float
+        Turning off time of magnetic field.
+    ramp_profile : str
+        Ramp profile, one of 'linear', 'smoothstep' (C1), 'smootherstep' (C2),
+        'cosine' (raised cosine, C1) and 'exponential' (C0).
+
+    Returns
+    -------
+    factor : float
+        Ramp up factor.
 
-def compute_ramp_factor(time, ramp_interval, start_time, end_time):
     """
-    This function returns a linear ramping up factor based on time, ramp_interval,
-    start_time and end_time.
+    if ramp_profile != "linear":
+        return float(
+            _compute_profiled_ramp_factor(
+                float(time),
+                ramp_interval,
+                start_time,
+                end_time,
+                get_ramp_profile_id(ramp_profile),
+            )
+        )
+    factor = (time > start_time) * (time <= end_time) * min(
+        1.0, (time - start_time) / (ramp_interval + RAMP_TOLERANCE)
+    ) + (time > end_time) * max(
+        0.0, -1 / (ramp_interval + RAMP_TOLERANCE) * (time - end_time) + 1.0
+    )
+    return factor
+
+
+@njit(cache=True)
+def compute_ramp_factor_kernel(
+    time, ramp_interval, start_time, end_time, ramp_profile_id=0
+):
+    """
+    This function is the compiled counterpart of compute_ramp_factor, and can be
+    called from other njit decorated functions.
 
     Parameters
     ----------
@@ -19,6 +181,8 @@ def compute_ramp_factor(time, ramp_interval, start_time, end_time):
         Turning on time of magnetic field.
     end_time : float
         Turning off time of magnetic field.
+    ramp_profile_id : int
+        Id of the ramp profile, see RAMP_PROFILES.
 
     Returns
     -------
@@ -26,9 +190,220 @@ def compute_ramp_factor(time, ramp_interval, start_time, end_time):
         Ramp up factor.
 
     """
+    if ramp_profile_id != 0:
+        return _compute_profiled_ramp_factor(
+            time, ramp_interval, start_time, end_time, ramp_profile_id
+        )
     factor = (time > start_time) * (time <= end_time) * min(
-        1.0, (time - start_time) / (ramp_interval + Tolerance.atol())
+        1.0, (time - start_time) / (ramp_interval + RAMP_TOLERANCE)
     ) + (time > end_time) * max(
-        0.0, -1 / (ramp_interval + Tolerance.atol()) * (time - end_time) + 1.0
+        0.0, -1 / (ramp_interval + RAMP_TOLERANCE) * (time - end_time) + 1.0
     )
     return factor
+
+
+def compute_ramp_factors(
+    times, ramp_interval, start_time, end_time, ramp_profile="linear"
+):
+    """
+    This function returns the ramping up factors for an array of times,
+    evaluated in one vectorized pass. Factors are identical to the ones of
+    compute_ramp_factor.
+
+    Parameters
+    ----------
+    times : numpy.ndarray
+        1D (n_times,) array containing data with 'float' type.
+        Times of simulation.
+    ramp_interval : float
+        ramping time for magnetic field.
+    start_time : float
+        Turning on time of magnetic field.
+    end_time : float
+        Turning off time of magnetic field.
+    ramp_profile : str
+        Ramp profile, one of RAMP_PROFILES.
+
+    Returns
+    -------
+    factors : numpy.ndarray
+        1D (n_times,) array containing data with 'float' type.
+        Ramp up factors.
+
+    """
+    times = np.asarray(times, dtype=np.float64)
+    return compute_ramp_factors_kernel(
+        times, ramp_interval, start_time, end_time, get_ramp_profile_id(ramp_profile)
+    )
+
+
+@njit(cache=True)
+def compute_ramp_factors_kernel(
+    times, ramp_interval, start_time, end_time, ramp_profile_id=0
+):
+    """
+    This function is the compiled counterpart of compute_ramp_factors, and can be
+    called from other njit decorated functions with a float array of times.
+
+    Parameters
+    ----------
+    times : numpy.ndarray
+        1D (n_times,) array containing data with 'float' type.
+        Times of simulation.
+    ramp_interval : float
+        ramping time for magnetic field.
+    start_time : float
+        Turning on time of magnetic field.
+    end_time : float
+        Turning off time of magnetic field.
+    ramp_profile_id : int
+        Id of the ramp profile, see RAMP_PROFILES.
+
+    Returns
+    -------
+    factors : numpy.ndarray
+        1D (n_times,) array containing data with 'float' type.
+        Ramp up factors.
+
+    """
+    if ramp_profile_id != 0:
+        return _compute_profiled_ramp_factor(
+            times, ramp_interval, start_time, end_time, ramp_profile_id
+        )
+    ramp_up_factors = np.minimum(
+        1.0, (times - start_time) / (ramp_interval + RAMP_TOLERANCE)
+    )
+    ramp_down_factors = np.maximum(
+        0.0, -1 / (ramp_interval + RAMP_TOLERANCE) * (times - end_time) + 1.0
+    )
+    return np.where(
+        times > end_time,
+        ramp_down_factors,
+        np.where(times > start_time, ramp_up_factors, 0.0),
+    )
+
+
+def _compute_trilinear_stencil(grid_shape, grid_origin, grid_spacing, positions):
+    """
+    This function computes the lower corner indices of the grid cells containing
+    the positions and the interpolation weights within those cells. Positions
+    outside of the grid are clamped to the grid boundary, is_clamped marks the
+    clamped directions of each position.
+    """
+    grid_spacing = np.broadcast_to(np.asarray(grid_spacing, dtype=np.float64), (3,))
+    scaled_positions = (positions - np.reshape(grid_origin, (3, 1))) / np.reshape(
+        grid_spacing, (3, 1)
+    )
+    index = np.clip(
+        np.floor(scaled_positions).astype(np.int64),
+        0,
+        np.reshape(grid_shape, (3, 1)) - 2,
+    )
+    weight = np.clip(scaled_positions - index, 0.0, 1.0)
+    is_clamped = (scaled_positions < 0.0) | (
+        scaled_positions > np.reshape(grid_shape, (3, 1)) - 1
+    )
+    return index, weight, grid_spacing, is_clamped
+
+
+def trilinear_interpolation(field_grid, grid_origin, grid_spacing, positions):
+    """
+    This function interpolates a vector field given on a uniform 3D grid to the
+    positions, using trilinear interpolation. Only grid nodes of the cells that
+    contain the positions are read, so field_grid can be a memory map.
+
+    Parameters
+    ----------
+    field_grid : numpy.ndarray
+        4D (n_x, n_y, n_z, dim) array containing data with 'float' type.
+        Vector field on the grid nodes.
+    grid_origin : numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+        Position of the first grid node.
+    grid_spacing : float or numpy.ndarray
+        Float or 1D (dim,) array containing data with 'float' type.
+        Grid spacing in each direction.
+    positions : numpy.ndarray
+        2D (dim, n_points) array containing data with 'float' type.
+        Positions where the field is interpolated.
+
+    Returns
+    -------
+    field : numpy.ndarray
+        2D (dim, n_points) array containing data with 'float' type.
+        Interpolated field.
+
+    """
+    index, weight, _, _ = _compute_trilinear_stencil(
+        field_grid.shape[:3], grid_origin, grid_spacing, positions
+    )
+    field = np.zeros((field_grid.shape[3], positions.shape[1]))
+    for corner in range(8):
+        shift = ((corner >> 2) & 1, (corner >> 1) & 1, corner & 1)
+        corner_weight = np.ones(positions.shape[1])
+        for i in range(3):
+            corner_weight *= weight[i] if shift[i] else 1.0 - weight[i]
+        field += (
+            corner_weight
+            * np.asarray(
+                field_grid[
+                    index[0] + shift[0], index[1] + shift[1], index[2] + shift[2]
+                ]
+            ).T
+        )
+    return field
+
+
+def trilinear_interpolation_gradient(field_grid, grid_origin, grid_spacing, positions):
+    """
+    This function computes the spatial gradient of the trilinear interpolation of
+    a vector field given on a uniform 3D grid, at the positions. Positions
+    outside of the grid are clamped, so the interpolated field is constant and
+    its gradient is zero along the clamped directions.
+
+    Parameters
+    ----------
+    field_grid : numpy.ndarray
+        4D (n_x, n_y, n_z, dim) array containing data with 'float' type.
+        Vector field on the grid nodes.
+    grid_origin : numpy.ndarray
+        1D (dim,) array containing data with 'float' type.
+        Position of the first grid node.
+    grid_spacing : float or numpy.ndarray
+        Float or 1D (dim,) array containing data with 'float' type.
+        Grid spacing in each direction.
+    positions : numpy.ndarray
+        2D (dim, n_points) array containing data with 'float' type.
+        Positions where the field gradient is interpolated.
+
+    Returns
+    -------
+    field_gradient : numpy.ndarray
+        3D (dim, dim, n_points) array containing data with 'float' type.
+        Gradient dF_i/dx_j of the interpolated field, stored as [i, j].
+
+    """
+    index, weight, grid_spacing, is_clamped = _compute_trilinear_stencil(
+        field_grid.shape[:3], grid_origin, grid_spacing, positions
+    )
+    field_gradient = np.zeros((field_grid.shape[3], 3, positions.shape[1]))
+    for corner in range(8):
+        shift = ((corner >> 2) & 1, (corner >> 1) & 1, corner & 1)
+        corner_field = np.asarray(
+            field_grid[index[0] + shift[0], index[1] + shift[1], index[2] + shift[2]]
+        ).T
+        for j in range(3):
+            # derivative of the corner weight along direction j
+            corner_weight_derivative = np.ones(positions.shape[1])
+            for i in range(3):
+                if i == j:
+                    corner_weight_derivative *= (
+                        1.0 if shift[i] else -1.0
+                    ) / grid_spacing[i]
+                else:
+                    corner_weight_derivative *= (
+                        weight[i] if shift[i] else 1.0 - weight[i]
+                    )
+            field_gradient[:, j, :] += corner_weight_derivative * corner_field
+    field_gradient *= ~is_clamped
+    return field_gradient
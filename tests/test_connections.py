@@ -0,0 +1,762 @@
+import numpy as np
+import pytest
+from elastica.rod.cosserat_rod import CosseratRod
+from elastica.experimental.connection_contact_joint.parallel_connection import (
+    SurfaceJointSideBySide,
+    get_connection_vector_straight_straight_rod,
+)
+from magneto_pyelastica.connections import (
+    get_connection_vector_for_perpendicular_rods,
+    get_connection_vectors_for_perpendicular_rods,
+    BatchedPerpendicularRodsConnection,
+    BatchedSurfaceJointSideBySide,
+    find_perpendicular_rods_connections,
+    find_side_by_side_connections,
+    _find_close_element_pairs,
+    _apply_perpendicular_rods_joint,
+    _apply_side_by_side_surface_joint,
+)
+
+
+def make_perpendicular_rods(n_rods_two, n_elems_one=12, n_elems_two=5):
+    """Backbone along x, rods along z with their tip elements on the backbone"""
+    radius = 0.1
+    backbone_length = 2 * radius * n_elems_one
+    rod_one = CosseratRod.straight_rod(
+        n_elems_one,
+        np.zeros((3,)),
+        np.array([1.0, 0.0, 0.0]),
+        np.array([0.0, 0.0, 1.0]),
+        backbone_length,
+        radius,
+        1e3,
+        youngs_modulus=1e6,
+        shear_modulus=1e6 / 3.0,
+    )
+    rod_two_list = []
+    rod_one_element_index = []
+    rod_two_length = 1.0
+    for i in range(n_rods_two):
+        element_idx = (i * n_elems_one) // n_rods_two
+        element_position = 0.5 * (
+            rod_one.position_collection[:, element_idx]
+            + rod_one.position_collection[:, element_idx + 1]
+        )
+        start = element_position - np.array([0.0, 0.0, rod_two_length + radius])
+        rod_two_list.append(
+            CosseratRod.straight_rod(
+                n_elems_two,
+                start,
+                np.array([0.0, 0.0, 1.0]),
+                np.array([0.0, 1.0, 0.0]),
+                rod_two_length,
+                radius,
+                1e3,
+                youngs_modulus=1e6,
+                shear_modulus=1e6 / 3.0,
+            )
+        )
+        rod_one_element_index.append(element_idx)
+    return rod_one, rod_two_list, np.array(rod_one_element_index)
+
+
+def perturb_rods(rod_list, scale):
+    for rod in rod_list:
+        rod.position_collection += scale * np.random.randn(
+            *rod.position_collection.shape
+        )
+        rod.velocity_collection[...] = np.random.randn(*rod.velocity_collection.shape)
+        rod.dilatation[...] = 1.0 + 0.1 * np.random.rand(rod.n_elems)
+
+
+def apply_reference_perpendicular_rods_connection(
+    k,
+    nu,
+    k_repulsive,
+    kt,
+    rod_one,
+    index_one,
+    rod_two,
+    index_two,
+    rod_one_direction_vec_in_material_frame,
+    rod_two_direction_vec_in_material_frame,
+    rest_offset_btw_rods,
+):
+    """Per connection reference of PerpendicularRodsConnection of the examples"""
+    rod_one_to_rod_two_connection_vec = (
+        rod_one.director_collection[:, :, index_one].T
+        @ rod_one_direction_vec_in_material_frame
+    )
+    rod_two_to_rod_one_connection_vec = (
+        rod_two.director_collection[:, :, index_two].T
+        @ rod_two_direction_vec_in_material_frame
+    )
+    rod_one_element_position = 0.5 * (
+        rod_one.position_collection[:, index_one]
+        + rod_one.position_collection[:, index_one + 1]
+    )
+    rod_two_element_position = 0.5 * (
+        rod_two.position_collection[:, index_two]
+        + rod_two.position_collection[:, index_two + 1]
+    )
+    offset_rod_one = 0.5 * rest_offset_btw_rods / np.sqrt(rod_one.dilatation[index_one])
+    offset_rod_two = 0.5 * rest_offset_btw_rods * rod_two.dilatation[index_two]
+    rod_one_rd2 = rod_one_to_rod_two_connection_vec * (
+        rod_one.radius[index_one] + offset_rod_one
+    )
+    rod_two_ld3 = rod_two_to_rod_one_connection_vec * (
+        rod_two.lengths[index_two] / 2 + offset_rod_two
+    )
+    distance_vector = np.round(
+        (rod_two_element_position + rod_two_ld3)
+        - (rod_one_element_position + rod_one_rd2),
+        12,
+    )
+    spring_force = k * distance_vector
+    relative_velocity = 0.5 * (
+        rod_two.velocity_collection[:, index_two]
+        + rod_two.velocity_collection[:, index_two + 1]
+    ) - 0.5 * (
+        rod_one.velocity_collection[:, index_one]
+        + rod_one.velocity_collection[:, index_one + 1]
+    )
+    distance = np.linalg.norm(distance_vector)
+    normalized_distance_vector = (
+        distance_vector / distance if distance >= 1e-12 else np.zeros((3,))
+    )
+    total_force = spring_force + nu * (
+        np.dot(relative_velocity, normalized_distance_vector)
+        * normalized_distance_vector
+    )
+    center_distance = rod_two_element_position - rod_one_element_position
+    penetration = np.linalg.norm(center_distance) - (
+        rod_one.radius[index_one]
+        + offset_rod_one
+        + rod_two.lengths[index_two] / 2
+        + offset_rod_two
+    )
+    if penetration < 0:
+        total_force += (
+            -k_repulsive
+            * np.abs(penetration) ** 1.5
+            * center_distance
+            / np.linalg.norm(center_distance)
+        )
+    rod_one.external_forces[:, index_one] += 0.5 * total_force
+    rod_one.external_forces[:, index_one + 1] += 0.5 * total_force
+    rod_two.external_forces[:, index_two] -= 0.5 * total_force
+    rod_two.external_forces[:, index_two + 1] -= 0.5 * total_force
+
+    torque_on_rod_one = np.cross(rod_one_rd2, spring_force)
+    torque_on_rod_two = np.cross(rod_two_ld3, -spring_force)
+    moment_arm = (
+        rod_one.radius[index_one] * rod_two_ld3 / np.linalg.norm(rod_two_ld3)
+        + rod_two_ld3
+    )
+    distance_vector = np.round(
+        rod_one_element_position - (rod_two_element_position + moment_arm), 12
+    )
+    spring_torque = np.cross(moment_arm, kt * distance_vector)
+    torque_on_rod_one -= spring_torque
+    torque_on_rod_two += spring_torque
+    rod_one.external_torques[:, index_one] += (
+        rod_one.director_collection[:, :, index_one] @ torque_on_rod_one
+    )
+    rod_two.external_torques[:, index_two] += (
+        rod_two.director_collection[:, :, index_two] @ torque_on_rod_two
+    )
+
+
+def test_get_connection_vector_for_perpendicular_rods():
+    rod_one, rod_two_list, rod_one_element_index = make_perpendicular_rods(3)
+    for rod_two, index_one in zip(rod_two_list, rod_one_element_index):
+        (
+            rod_one_direction_vec_in_material_frame,
+            rod_two_direction_vec_in_material_frame,
+            offset_btw_rods,
+        ) = get_connection_vector_for_perpendicular_rods(
+            rod_one, rod_two, index_one, rod_two.n_elems - 1
+        )
+        # rod two touches rod one from below, along the d1 director of rod one
+        np.testing.assert_allclose(
+            rod_one.director_collection[:, :, index_one].T
+            @ rod_one_direction_vec_in_material_frame,
+            [0.0, 0.0, -1.0],
+            atol=1e-12,
+        )
+        np.testing.assert_allclose(
+            rod_two.director_collection[:, :, -1].T
+            @ rod_two_direction_vec_in_material_frame,
+            [0.0, 0.0, 1.0],
+            atol=1e-12,
+        )
+        np.testing.assert_allclose(offset_btw_rods, 0.0, atol=1e-12)
+
+
+@pytest.mark.parametrize("n_rods_two", [1, 4, 12])
+def test_get_connection_vectors_for_perpendicular_rods(n_rods_two):
+    rod_one, rod_two_list, rod_one_element_index = make_perpendicular_rods(n_rods_two)
+    rod_list = [rod_one] + rod_two_list
+    perturb_rods(rod_list, 1e-2)
+    # every rod two is connected with its tip and a random element to rod one
+    rod_one_index = np.zeros((2 * n_rods_two,), dtype=int)
+    rod_one_element_index = np.hstack(
+        [rod_one_element_index, np.random.randint(rod_one.n_elems, size=n_rods_two)]
+    )
+    rod_two_index = np.tile(np.arange(1, n_rods_two + 1), 2)
+    rod_two_element_index = np.hstack(
+        [
+            [rod.n_elems - 1 for rod in rod_two_list],
+            np.random.randint(rod_two_list[0].n_elems, size=n_rods_two),
+        ]
+    )
+
+    (
+        rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame,
+        offset_btw_rods,
+    ) = get_connection_vectors_for_perpendicular_rods(
+        rod_list,
+        rod_one_index,
+        rod_one_element_index,
+        rod_two_index,
+        rod_two_element_index,
+    )
+
+    assert rod_one_direction_vec_in_material_frame.shape == (3, 2 * n_rods_two)
+    assert rod_two_direction_vec_in_material_frame.shape == (3, 2 * n_rods_two)
+    assert offset_btw_rods.shape == (2 * n_rods_two,)
+    for n in range(2 * n_rods_two):
+        correct_connection_vectors = get_connection_vector_for_perpendicular_rods(
+            rod_list[rod_one_index[n]],
+            rod_list[rod_two_index[n]],
+            rod_one_element_index[n],
+            rod_two_element_index[n],
+        )
+        np.testing.assert_allclose(
+            rod_one_direction_vec_in_material_frame[:, n],
+            correct_connection_vectors[0],
+            atol=1e-14,
+        )
+        np.testing.assert_allclose(
+            rod_two_direction_vec_in_material_frame[:, n],
+            correct_connection_vectors[1],
+            atol=1e-14,
+        )
+        np.testing.assert_allclose(
+            offset_btw_rods[n], correct_connection_vectors[2], atol=1e-14
+        )
+
+
+def test_get_connection_vectors_for_perpendicular_rods_without_connections():
+    rod_one, rod_two_list, _ = make_perpendicular_rods(1)
+    no_connections = np.zeros((0,), dtype=int)
+    (
+        rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame,
+        offset_btw_rods,
+    ) = get_connection_vectors_for_perpendicular_rods(
+        [rod_one] + rod_two_list,
+        no_connections,
+        no_connections,
+        no_connections,
+        no_connections,
+    )
+    assert rod_one_direction_vec_in_material_frame.shape == (3, 0)
+    assert rod_two_direction_vec_in_material_frame.shape == (3, 0)
+    assert offset_btw_rods.shape == (0,)
+
+
+@pytest.mark.parametrize(
+    "invalid_indices, error_message",
+    [
+        (
+            dict(rod_two_element_index=np.array([4, 4])),
+            "Invalid connection indices! Should be arrays of shape "
+            "(num_connections,)",
+        ),
+        (
+            dict(rod_one_index=np.array([[0]])),
+            "Invalid connection indices! Should be arrays of shape "
+            "(num_connections,)",
+        ),
+        (
+            dict(rod_two_index=np.array([2])),
+            "Invalid connection indices! Rod indices should be in the rod_list",
+        ),
+    ],
+)
+def test_get_connection_vectors_for_perpendicular_rods_invalid_indices(
+    invalid_indices, error_message
+):
+    rod_one, rod_two_list, _ = make_perpendicular_rods(1)
+    indices = dict(
+        rod_one_index=np.array([0]),
+        rod_one_element_index=np.array([0]),
+        rod_two_index=np.array([1]),
+        rod_two_element_index=np.array([4]),
+    )
+    indices.update(invalid_indices)
+    with pytest.raises(ValueError) as exc_info:
+        _ = get_connection_vectors_for_perpendicular_rods(
+            [rod_one] + rod_two_list, **indices
+        )
+    assert exc_info.value.args[0] == error_message
+
+
+@pytest.mark.parametrize("n_rods_two", [1, 4, 12])
+@pytest.mark.parametrize("perturbation", [1e-3, 5e-2])
+def test_batched_perpendicular_rods_connection(n_rods_two, perturbation):
+    rod_one, rod_two_list, rod_one_element_index = make_perpendicular_rods(n_rods_two)
+    rod_list = [rod_one] + rod_two_list
+    connection_vectors = [
+        get_connection_vector_for_perpendicular_rods(
+            rod_one, rod_two, index_one, rod_two.n_elems - 1
+        )
+        for rod_two, index_one in zip(rod_two_list, rod_one_element_index)
+    ]
+    rod_one_direction_vec_in_material_frame = np.array(
+        [vectors[0] for vectors in connection_vectors]
+    ).T
+    rod_two_direction_vec_in_material_frame = np.array(
+        [vectors[1] for vectors in connection_vectors]
+    ).T
+    offset_btw_rods = np.array([vectors[2] for vectors in connection_vectors])
+    k = 1e4 * (1.0 + np.random.rand(n_rods_two))
+    perturb_rods(rod_list, perturbation)
+
+    batched_connection = BatchedPerpendicularRodsConnection(
+        rod_list=rod_list,
+        rod_one_index=np.zeros((n_rods_two,), dtype=int),
+        rod_one_element_index=rod_one_element_index,
+        rod_two_index=np.arange(1, n_rods_two + 1),
+        rod_two_element_index=[rod.n_elems - 1 for rod in rod_two_list],
+        k=k,
+        nu=0.1,
+        k_repulsive=1e4,
+        kt=1e3,
+        rod_one_direction_vec_in_material_frame=rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame=rod_two_direction_vec_in_material_frame,
+        offset_btw_rods=offset_btw_rods,
+    )
+    batched_connection.apply_forces(rod_list[0], time=0.0)
+    batched_connection.apply_torques(rod_list[0], time=0.0)
+    external_forces = [rod.external_forces.copy() for rod in rod_list]
+    external_torques = [rod.external_torques.copy() for rod in rod_list]
+    assert np.abs(external_forces[0]).max() > 0.0
+
+    for rod in rod_list:
+        rod.external_forces[...] = 0.0
+        rod.external_torques[...] = 0.0
+    for n, rod_two in enumerate(rod_two_list):
+        apply_reference_perpendicular_rods_connection(
+            k[n],
+            0.1,
+            1e4,
+            1e3,
+            rod_one,
+            rod_one_element_index[n],
+            rod_two,
+            rod_two.n_elems - 1,
+            rod_one_direction_vec_in_material_frame[:, n],
+            rod_two_direction_vec_in_material_frame[:, n],
+            offset_btw_rods[n],
+        )
+    for rod, forces, torques in zip(rod_list, external_forces, external_torques):
+        np.testing.assert_allclose(forces, rod.external_forces, rtol=1e-10, atol=1e-8)
+        np.testing.assert_allclose(torques, rod.external_torques, rtol=1e-10, atol=1e-8)
+
+
+@pytest.mark.parametrize(
+    "invalid_kwargs, error_message",
+    [
+        (
+            dict(rod_two_index=np.array([1, 1])),
+            "Invalid connection indices! Should be arrays of shape "
+            "(num_connections,)",
+        ),
+        (
+            dict(rod_two_index=np.array([2])),
+            "Invalid connection indices! Rod indices should be in the rod_list",
+        ),
+        (
+            dict(k=np.ones((2,))),
+            "Invalid connection parameter! Should be either a float or an array of "
+            "shape (num_connections,)",
+        ),
+    ],
+)
+def test_batched_perpendicular_rods_connection_invalid_init(
+    invalid_kwargs, error_message
+):
+    rod_one, rod_two_list, rod_one_element_index = make_perpendicular_rods(1)
+    kwargs = dict(
+        rod_list=[rod_one] + rod_two_list,
+        rod_one_index=np.array([0]),
+        rod_one_element_index=rod_one_element_index,
+        rod_two_index=np.array([1]),
+        rod_two_element_index=np.array([4]),
+        k=1.0,
+        nu=1.0,
+        k_repulsive=1.0,
+        kt=1.0,
+        rod_one_direction_vec_in_material_frame=np.ones((3, 1)),
+        rod_two_direction_vec_in_material_frame=np.ones((3, 1)),
+        offset_btw_rods=np.zeros((1,)),
+    )
+    kwargs.update(invalid_kwargs)
+    with pytest.raises(ValueError) as exc_info:
+        _ = BatchedPerpendicularRodsConnection(**kwargs)
+    assert exc_info.value.args[0] == error_message
+
+
+def make_parallel_rods(n_rods, n_elems=8):
+    """Rods along x, side by side along y"""
+    radius = 0.1
+    return [
+        CosseratRod.straight_rod(
+            n_elems,
+            np.array([0.0, 2 * radius * i, 0.0]),
+            np.array([1.0, 0.0, 0.0]),
+            np.array([0.0, 0.0, 1.0]),
+            1.0,
+            radius,
+            1e3,
+            youngs_modulus=1e6,
+            shear_modulus=1e6 / 3.0,
+        )
+        for i in range(n_rods)
+    ]
+
+
+@pytest.mark.parametrize("n_rods", [2, 3, 6])
+@pytest.mark.parametrize("perturbation", [1e-3, 5e-2])
+def test_batched_surface_joint_side_by_side(n_rods, perturbation):
+    rod_list = make_parallel_rods(n_rods)
+    n_elems = rod_list[0].n_elems
+    element_index = np.arange(n_elems)
+    connection_vector_list = [
+        get_connection_vector_straight_straight_rod(
+            rod_one, rod_two, rod_one_idx=(0, n_elems), rod_two_idx=(0, n_elems)
+        )
+        for rod_one, rod_two in zip(rod_list[:-1], rod_list[1:])
+    ]
+    perturb_rods(rod_list, perturbation)
+
+    # full element ranges of neighbouring rods are connected
+    batched_joint = BatchedSurfaceJointSideBySide(
+        rod_list=rod_list,
+        rod_one_index=np.repeat(np.arange(n_rods - 1), n_elems),
+        rod_one_element_index=np.tile(element_index, n_rods - 1),
+        rod_two_index=np.repeat(np.arange(1, n_rods), n_elems),
+        rod_two_element_index=np.tile(element_index, n_rods - 1),
+        k=1e4,
+        nu=0.1,
+        k_repulsive=1e5,
+        rod_one_direction_vec_in_material_frame=np.hstack(
+            [vectors[0] for vectors in connection_vector_list]
+        ),
+        rod_two_direction_vec_in_material_frame=np.hstack(
+            [vectors[1] for vectors in connection_vector_list]
+        ),
+        offset_btw_rods=np.hstack([vectors[2] for vectors in connection_vector_list]),
+    )
+    batched_joint.apply_forces(rod_list[0], time=0.0)
+    batched_joint.apply_torques(rod_list[0], time=0.0)
+    external_forces = [rod.external_forces.copy() for rod in rod_list]
+    external_torques = [rod.external_torques.copy() for rod in rod_list]
+    assert np.abs(external_forces[0]).max() > 0.0
+
+    for rod in rod_list:
+        rod.external_forces[...] = 0.0
+        rod.external_torques[...] = 0.0
+    for rod_one, rod_two, connection_vectors in zip(
+        rod_list[:-1], rod_list[1:], connection_vector_list
+    ):
+        # one joint per element, contact of SurfaceJointSideBySide uses the norm
+        # of all center distances of the call
+        for i in range(n_elems):
+            joint = SurfaceJointSideBySide(
+                k=1e4,
+                nu=0.1,
+                k_repulsive=1e5,
+                rod_one_direction_vec_in_material_frame=connection_vectors[0][
+                    :, i : i + 1
+                ],
+                rod_two_direction_vec_in_material_frame=connection_vectors[1][
+                    :, i : i + 1
+                ],
+                offset_btw_rods=connection_vectors[2][i : i + 1],
+            )
+            index = element_index[i : i + 1].copy()
+            joint.apply_forces(rod_one, index, rod_two, index, 0.0)
+            joint.apply_torques(rod_one, index, rod_two, index, 0.0)
+    for rod, forces, torques in zip(rod_list, external_forces, external_torques):
+        np.testing.assert_allclose(forces, rod.external_forces, rtol=1e-10, atol=1e-8)
+        np.testing.assert_allclose(torques, rod.external_torques, rtol=1e-10, atol=1e-8)
+
+
+@pytest.mark.parametrize("perturbation", [1e-3, 5e-2])
+@pytest.mark.parametrize("rest_offset_btw_rods", [0.0, 1e-2])
+def test_apply_perpendicular_rods_joint(perturbation, rest_offset_btw_rods):
+    rod_one, rod_two_list, rod_one_element_index = make_perpendicular_rods(4)
+    rod_list = [rod_one] + rod_two_list
+    connection_vectors = [
+        get_connection_vector_for_perpendicular_rods(
+            rod_one, rod_two, index_one, rod_two.n_elems - 1
+        )
+        for rod_two, index_one in zip(rod_two_list, rod_one_element_index)
+    ]
+    perturb_rods(rod_list, perturbation)
+
+    for rod_two, index_one, vectors in zip(
+        rod_two_list, rod_one_element_index, connection_vectors
+    ):
+        _apply_perpendicular_rods_joint(
+            1e4,
+            0.1,
+            1e4,
+            1e3,
+            vectors[0],
+            vectors[1],
+            rest_offset_btw_rods,
+            index_one,
+            rod_two.n_elems - 1,
+            rod_one.director_collection,
+            rod_two.director_collection,
+            rod_one.position_collection,
+            rod_two.position_collection,
+            rod_one.velocity_collection,
+            rod_two.velocity_collection,
+            rod_one.radius,
+            rod_two.lengths,
+            rod_one.dilatation,
+            rod_two.dilatation,
+            rod_one.external_forces,
+            rod_two.external_forces,
+            rod_one.external_torques,
+            rod_two.external_torques,
+        )
+    external_forces = [rod.external_forces.copy() for rod in rod_list]
+    external_torques = [rod.external_torques.copy() for rod in rod_list]
+
+    for rod in rod_list:
+        rod.external_forces[...] = 0.0
+        rod.external_torques[...] = 0.0
+    for rod_two, index_one, vectors in zip(
+        rod_two_list, rod_one_element_index, connection_vectors
+    ):
+        apply_reference_perpendicular_rods_connection(
+            1e4,
+            0.1,
+            1e4,
+            1e3,
+            rod_one,
+            index_one,
+            rod_two,
+            rod_two.n_elems - 1,
+            vectors[0],
+            vectors[1],
+            rest_offset_btw_rods,
+        )
+    for rod, forces, torques in zip(rod_list, external_forces, external_torques):
+        np.testing.assert_allclose(forces, rod.external_forces, rtol=1e-10, atol=1e-8)
+        np.testing.assert_allclose(torques, rod.external_torques, rtol=1e-10, atol=1e-8)
+
+
+@pytest.mark.parametrize("perturbation", [1e-3, 5e-2])
+def test_apply_side_by_side_surface_joint(perturbation):
+    rod_one, rod_two = make_parallel_rods(2)
+    n_elems = rod_one.n_elems
+    (
+        rod_one_direction_vec_in_material_frame,
+        rod_two_direction_vec_in_material_frame,
+        offset_btw_rods,
+    ) = get_connection_vector_straight_straight_rod(
+        rod_one, rod_two, rod_one_idx=(0, n_elems), rod_two_idx=(0, n_elems)
+    )
+    perturb_rods([rod_one, rod_two], perturbation)
+
+    for i in range(n_elems):
+        _apply_side_by_side_surface_joint(
+            1e4,
+            0.1,
+            1e5,
+            rod_one_direction_vec_in_material_frame[:, i],
+            rod_two_direction_vec_in_material_frame[:, i],
+            offset_btw_rods[i],
+            i,
+            i,
+            rod_one.director_collection,
+            rod_two.director_collection,
+            rod_one.position_collection,
+            rod_two.position_collection,
+            rod_one.velocity_collection,
+            rod_two.velocity_collection,
+            rod_one.radius,
+            rod_two.radius,
+            rod_one.dilatation,
+            rod_two.dilatation,
+            rod_one.external_forces,
+            rod_two.external_forces,
+            rod_one.external_torques,
+            rod_two.external_torques,
+        )
+    external_forces = [rod.external_forces.copy() for rod in (rod_one, rod_two)]
+    external_torques = [rod.external_torques.copy() for rod in (rod_one, rod_two)]
+
+    for rod in (rod_one, rod_two):
+        rod.external_forces[...] = 0.0
+        rod.external_torques[...] = 0.0
+    for i in range(n_elems):
+        joint = SurfaceJointSideBySide(
+            k=1e4,
+            nu=0.1,
+            k_repulsive=1e5,
+            rod_one_direction_vec_in_material_frame=rod_one_direction_vec_in_material_frame[
+                :, i : i + 1
+            ],
+            rod_two_direction_vec_in_material_frame=rod_two_direction_vec_in_material_frame[
+                :, i : i + 1
+            ],
+            offset_btw_rods=offset_btw_rods[i : i + 1],
+        )
+        index = np.array([i])
+        joint.apply_forces(rod_one, index, rod_two, index, 0.0)
+        joint.apply_torques(rod_one, index, rod_two, index, 0.0)
+    for rod, forces, torques in zip(
+        (rod_one, rod_two), external_forces, external_torques
+    ):
+        np.testing.assert_allclose(forces, rod.external_forces, rtol=1e-10, atol=1e-8)
+        np.testing.assert_allclose(torques, rod.external_torques, rtol=1e-10, atol=1e-8)
+
+
+@pytest.mark.parametrize("tolerance", [1e-3, 1e-2])
+def test_find_close_element_pairs(tolerance):
+    element_position_one = np.random.rand(3, 300)
+    element_size_one = 0.02 * np.random.rand(300)
+    element_position_two = np.random.rand(3, 200)
+    element_size_two = 0.03 * np.random.rand(200)
+    index_one, index_two, gap = _find_close_element_pairs(
+        element_position_one,
+        element_size_one,
+        element_position_two,
+        element_size_two,
+        tolerance,
+    )
+
+    # brute force
+    correct_gap = np.linalg.norm(
+        element_position_two[:, np.newaxis, :] - element_position_one[..., np.newaxis],
+        axis=0,
+    ) - (element_size_one[:, np.newaxis] + element_size_two[np.newaxis, :])
+    correct_index_one, correct_index_two = np.nonzero(correct_gap <= tolerance)
+    assert set(zip(index_one, index_two)) == set(
+        zip(correct_index_one, correct_index_two)
+    )
+    np.testing.assert_allclose(gap, correct_gap[index_one, index_two], atol=1e-14)
+
+
+@pytest.mark.parametrize("n_rods_two", [1, 4, 12])
+def test_find_perpendicular_rods_connections(n_rods_two):
+    rod_one, rod_two_list, rod_one_element_index = make_perpendicular_rods(n_rods_two)
+    # rod far from the backbone is not connected
+    far_rod = CosseratRod.straight_rod(
+        5,
+        np.array([0.0, 5.0, -1.0]),
+        np.array([0.0, 0.0, 1.0]),
+        np.array([0.0, 1.0, 0.0]),
+        1.0,
+        0.1,
+        1e3,
+        youngs_modulus=1e6,
+        shear_modulus=1e6 / 3.0,
+    )
+    rod_list = [rod_one] + rod_two_list + [far_rod]
+    connections = find_perpendicular_rods_connections(
+        rod_list, rod_one_index=[0], rod_two_index=np.arange(1, len(rod_list))
+    )
+
+    np.testing.assert_array_equal(connections["rod_one_index"], 0)
+    np.testing.assert_array_equal(
+        connections["rod_one_element_index"], rod_one_element_index
+    )
+    np.testing.assert_array_equal(
+        connections["rod_two_index"], np.arange(1, n_rods_two + 1)
+    )
+    np.testing.assert_array_equal(
+        connections["rod_two_element_index"], [rod.n_elems - 1 for rod in rod_two_list]
+    )
+    for n, (rod_two, index_one) in enumerate(zip(rod_two_list, rod_one_element_index)):
+        correct_connection_vectors = get_connection_vector_for_perpendicular_rods(
+            rod_one, rod_two, index_one, rod_two.n_elems - 1
+        )
+        np.testing.assert_allclose(
+            connections["rod_one_direction_vec_in_material_frame"][:, n],
+            correct_connection_vectors[0],
+            atol=1e-14,
+        )
+        np.testing.assert_allclose(
+            connections["rod_two_direction_vec_in_material_frame"][:, n],
+            correct_connection_vectors[1],
+            atol=1e-14,
+        )
+        np.testing.assert_allclose(
+            connections["offset_btw_rods"][n], correct_connection_vectors[2], atol=1e-14
+        )
+
+
+@pytest.mark.parametrize("n_rods", [2, 3, 6])
+def test_find_side_by_side_connections(n_rods):
+    rod_list = make_parallel_rods(n_rods)
+    n_elems = rod_list[0].n_elems
+    connections = find_side_by_side_connections(
+        rod_list, rod_one_index=np.arange(n_rods), rod_two_index=np.arange(n_rods)
+    )
+
+    # neighbouring rods are connected once along their full length
+    order = np.lexsort(
+        (connections["rod_one_element_index"], connections["rod_one_index"])
+    )
+    np.testing.assert_array_equal(
+        connections["rod_one_index"][order], np.repeat(np.arange(n_rods - 1), n_elems)
+    )
+    np.testing.assert_array_equal(
+        connections["rod_two_index"][order], np.repeat(np.arange(1, n_rods), n_elems)
+    )
+    np.testing.assert_array_equal(
+        connections["rod_one_element_index"][order],
+        np.tile(np.arange(n_elems), n_rods - 1),
+    )
+    np.testing.assert_array_equal(
+        connections["rod_two_element_index"][order],
+        np.tile(np.arange(n_elems), n_rods - 1),
+    )
+    correct_connection_vectors = [
+        get_connection_vector_straight_straight_rod(
+            rod_one, rod_two, rod_one_idx=(0, n_elems), rod_two_idx=(0, n_elems)
+        )
+        for rod_one, rod_two in zip(rod_list[:-1], rod_list[1:])
+    ]
+    for i, key in enumerate(
+        [
+            "rod_one_direction_vec_in_material_frame",
+            "rod_two_direction_vec_in_material_frame",
+            "offset_btw_rods",
+        ]
+    ):
+        np.testing.assert_allclose(
+            connections[key][..., order],
+            np.concatenate(
+                [vectors[i] for vectors in correct_connection_vectors], axis=-1
+            ),
+            atol=1e-14,
+        )
+
+    # rods of different groups are connected in the given order
+    connections = find_side_by_side_connections(
+        rod_list, rod_one_index=[1], rod_two_index=[0]
+    )
+    np.testing.assert_array_equal(connections["rod_one_index"], 1)
+    np.testing.assert_array_equal(connections["rod_two_index"], 0)
+    assert connections["rod_one_index"].shape == (n_elems,)
@@ -4,8 +4,16 @@ from magneto_pyelastica.magnetic_field import (
     BaseMagneticField,
     ConstantMagneticField,
     SingleModeOscillatingMagneticField,
+    MultiModeOscillatingMagneticField,
+    TabulatedMagneticField,
+    CoilMagneticField,
+    GriddedMagneticField,
+    CompositeMagneticField,
+    compute_current_loop_segments,
 )
+from magneto_pyelastica.utils import compute_ramp_factors
 from elastica.utils import Tolerance
+from numba import njit
 
 
 @pytest.mark.parametrize("time", [0.0, 1.0, 2.0, 4.0, 8.0])
@@ -83,3 +91,797 @@ def test_single_mode_oscillating_magnetic_field(
     np.testing.assert_allclose(
         magnetic_field_value, correct_magnetic_field_value, atol=Tolerance.atol()
     )
+
+
+@njit(cache=True)
+def _evaluate_compiled_magnetic_field(kernel, parameters, times):
+    # evaluate the compiled field inside a njit function, like a fused kernel
+    magnetic_field_values = np.zeros((times.shape[0], 3))
+    for k in range(times.shape[0]):
+        kernel(times[k], parameters, magnetic_field_values[k])
+    return magnetic_field_values
+
+
+@pytest.mark.parametrize("ramp_profile", ["linear", "smootherstep"])
+@pytest.mark.parametrize("field_type", ["constant", "single_mode"])
+def test_compiled_magnetic_field(field_type, ramp_profile):
+    dim = 3
+    ramp_interval = 1.0
+    start_time = 1.0
+    end_time = 8.0
+    if field_type == "constant":
+        magnetic_field_object = ConstantMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            ramp_interval=ramp_interval,
+            start_time=start_time,
+            end_time=end_time,
+            ramp_profile=ramp_profile,
+        )
+    else:
+        magnetic_field_object = SingleModeOscillatingMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            magnetic_field_angular_frequency=np.random.rand(dim),
+            magnetic_field_phase_difference=np.random.rand(dim),
+            ramp_interval=ramp_interval,
+            start_time=start_time,
+            end_time=end_time,
+            ramp_profile=ramp_profile,
+        )
+    times = np.linspace(0.0, 10.0, 41)
+
+    compiled_magnetic_field_values = _evaluate_compiled_magnetic_field(
+        magnetic_field_object.compiled_kernel,
+        magnetic_field_object.compiled_parameters(),
+        times,
+    )
+
+    for k, time in enumerate(times):
+        np.testing.assert_allclose(
+            compiled_magnetic_field_values[k],
+            magnetic_field_object.value(time=time),
+            atol=Tolerance.atol(),
+        )
+
+
+@pytest.mark.parametrize(
+    "field_type", ["constant", "single_mode", "multi_mode", "tabulated"]
+)
+def test_magnetic_field_values(field_type):
+    dim = 3
+    n_modes = 4
+    field_kwargs = dict(ramp_interval=1.0, start_time=1.0, end_time=8.0)
+    if field_type == "constant":
+        magnetic_field_object = ConstantMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim), **field_kwargs
+        )
+    elif field_type == "single_mode":
+        magnetic_field_object = SingleModeOscillatingMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            magnetic_field_angular_frequency=np.random.rand(dim),
+            magnetic_field_phase_difference=np.random.rand(dim),
+            **field_kwargs,
+        )
+    elif field_type == "multi_mode":
+        magnetic_field_object = MultiModeOscillatingMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim, n_modes),
+            magnetic_field_angular_frequency=np.random.rand(dim, n_modes),
+            magnetic_field_phase_difference=np.random.rand(dim, n_modes),
+            **field_kwargs,
+        )
+    else:
+        magnetic_field_object = TabulatedMagneticField(
+            waveform=np.random.rand(16, dim), sampling_interval=1.0, **field_kwargs
+        )
+    times = np.linspace(0.0, 10.0, 41)
+
+    magnetic_field_values = magnetic_field_object.values(times=times)
+
+    assert magnetic_field_values.shape == (times.shape[0], dim)
+    for k, time in enumerate(times):
+        np.testing.assert_allclose(
+            magnetic_field_values[k],
+            magnetic_field_object.value(time=time),
+            atol=Tolerance.atol(),
+        )
+
+
+@pytest.mark.parametrize("ramp_profile", ["smoothstep", "cosine", "exponential"])
+def test_magnetic_field_ramp_profile(ramp_profile):
+    dim = 3
+    ramp_interval = 2.0
+    start_time = 1.0
+    end_time = 8.0
+    magnetic_field_amplitude = np.random.rand(dim)
+    magnetic_field_object = ConstantMagneticField(
+        magnetic_field_amplitude=magnetic_field_amplitude,
+        ramp_interval=ramp_interval,
+        start_time=start_time,
+        end_time=end_time,
+        ramp_profile=ramp_profile,
+    )
+    times = np.linspace(0.0, 12.0, 25)
+
+    correct_factors = compute_ramp_factors(
+        times=times,
+        ramp_interval=ramp_interval,
+        start_time=start_time,
+        end_time=end_time,
+        ramp_profile=ramp_profile,
+    )
+    for k, time in enumerate(times):
+        np.testing.assert_allclose(
+            magnetic_field_object.value(time=time),
+            correct_factors[k] * magnetic_field_amplitude,
+            atol=Tolerance.atol(),
+        )
+
+
+def test_magnetic_field_invalid_ramp_profile():
+    with pytest.raises(ValueError) as excinfo:
+        ConstantMagneticField(
+            magnetic_field_amplitude=np.ones(3),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=1.0,
+            ramp_profile="quadratic",
+        )
+    assert "Invalid ramp profile!" in str(excinfo.value)
+
+
+def test_base_magnetic_field_compiled_parameters():
+    with pytest.raises(NotImplementedError):
+        BaseMagneticField().compiled_parameters()
+
+
+def test_magnetic_field_value_cache():
+    class MockMagneticField(BaseMagneticField):
+        def __init__(self, magnetic_field_amplitude):
+            super(MockMagneticField, self).__init__()
+            self.magnetic_field_amplitude = magnetic_field_amplitude
+            self.n_evaluations = 0
+
+        def compute_value(self, time: np.float64 = 0.0):
+            self.n_evaluations += 1
+            return self.magnetic_field_amplitude * time
+
+    dim = 3
+    magnetic_field_object = MockMagneticField(np.random.rand(dim))
+
+    # repeated calls at the same time are evaluated once
+    first_value = magnetic_field_object.value(time=2.0)
+    second_value = magnetic_field_object.value(time=2.0)
+    assert second_value is first_value
+    assert magnetic_field_object.n_evaluations == 1
+    # cached value is read-only
+    with pytest.raises(ValueError):
+        first_value[0] = 0.0
+
+    # new time triggers a new evaluation
+    magnetic_field_object.value(time=4.0)
+    assert magnetic_field_object.n_evaluations == 2
+
+    # mutated parameters are picked up after invalidation
+    magnetic_field_object.magnetic_field_amplitude = np.ones(dim)
+    assert magnetic_field_object.n_evaluations == 2
+    magnetic_field_object.invalidate_cache()
+    np.testing.assert_allclose(
+        magnetic_field_object.value(time=4.0), 4.0 * np.ones(dim), atol=Tolerance.atol()
+    )
+    assert magnetic_field_object.n_evaluations == 3
+
+
+@pytest.mark.parametrize("n_points", [1, 4, 16])
+def test_uniform_magnetic_field_value_at(n_points):
+    dim = 3
+    magnetic_field_amplitude = np.random.rand(dim)
+    magnetic_field_object = ConstantMagneticField(
+        magnetic_field_amplitude=magnetic_field_amplitude,
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=8.0,
+    )
+    assert magnetic_field_object.is_uniform
+    magnetic_field_value = magnetic_field_object.value_at(
+        time=4.0, positions=np.random.rand(dim, n_points)
+    )
+    assert magnetic_field_value.shape == (dim, n_points)
+    np.testing.assert_allclose(
+        magnetic_field_value,
+        magnetic_field_amplitude.reshape(dim, 1) * np.ones((n_points,)),
+        atol=Tolerance.atol(),
+    )
+
+
+@pytest.mark.parametrize("n_points", [1, 4, 16])
+def test_magnetic_field_finite_difference_jacobian_at(n_points):
+    class MockNonuniformMagneticField(BaseMagneticField):
+        is_uniform = False
+
+        def value_at(self, time, positions):
+            x, y, z = positions
+            return np.array([x**2, y * z, np.sin(x) * time])
+
+    dim = 3
+    time = 2.0
+    positions = np.random.rand(dim, n_points)
+    x, y, z = positions
+    correct_jacobian = np.zeros((dim, dim, n_points))
+    correct_jacobian[0, 0] = 2.0 * x
+    correct_jacobian[1, 1] = z
+    correct_jacobian[1, 2] = y
+    correct_jacobian[2, 0] = np.cos(x) * time
+
+    magnetic_field_jacobian = MockNonuniformMagneticField().jacobian_at(
+        time=time, positions=positions
+    )
+    np.testing.assert_allclose(magnetic_field_jacobian, correct_jacobian, atol=1e-8)
+
+    # uniform fields have no gradient
+    np.testing.assert_allclose(
+        BaseMagneticField().jacobian_at(time=time, positions=positions), 0.0
+    )
+
+
+@pytest.mark.parametrize("n_workers", [1, 3])
+def test_coil_magnetic_field(n_workers):
+    dim = 3
+    mu_0 = 4e-7 * np.pi
+    radius = 1.0
+    current = 2.0
+    normal = np.array([0.0, 0.0, 1.0])
+    segment_start_collection, segment_end_collection = compute_current_loop_segments(
+        center=np.zeros(dim), normal=normal, radius=radius, n_segments=512
+    )
+    ramp_interval = 1.0
+    magnetic_field_object = CoilMagneticField(
+        segment_start_collection=segment_start_collection,
+        segment_end_collection=segment_end_collection,
+        grid_origin=np.array([-0.4, -0.4, -0.4]),
+        grid_spacing=0.1,
+        grid_shape=(9, 9, 9),
+        ramp_interval=ramp_interval,
+        start_time=0.0,
+        end_time=8.0,
+        segment_current=current,
+        current_waveform=lambda time: np.cos(time),
+        n_workers=n_workers,
+    )
+    assert not magnetic_field_object.is_uniform
+
+    # field at the loop center is mu_0 I / (2 R) along normal
+    time = 2.0
+    magnetic_field_value = magnetic_field_object.value_at(
+        time=time, positions=np.zeros((dim, 1))
+    )
+    np.testing.assert_allclose(
+        magnetic_field_value[:, 0],
+        np.cos(time) * mu_0 * current / (2.0 * radius) * normal,
+        rtol=1e-4,
+        atol=1e-12,
+    )
+
+    # field on the loop axis is mu_0 I R^2 / (2 (R^2 + z^2)^(3/2)) along normal
+    z = 0.3
+    magnetic_field_value = magnetic_field_object.value_at(
+        time=time, positions=np.array([[0.0], [0.0], [z]])
+    )
+    np.testing.assert_allclose(
+        magnetic_field_value[2, 0],
+        np.cos(time)
+        * mu_0
+        * current
+        * radius**2
+        / (2.0 * (radius**2 + z**2) ** 1.5),
+        rtol=1e-3,
+    )
+
+    # analytical gradient of interpolation matches finite differences
+    positions = 0.6 * (np.random.rand(dim, 8) - 0.5)
+    np.testing.assert_allclose(
+        magnetic_field_object.jacobian_at(time=time, positions=positions),
+        BaseMagneticField.jacobian_at(
+            magnetic_field_object, time=time, positions=positions
+        ),
+        atol=1e-10,
+    )
+
+
+def test_coil_magnetic_field_invalid_grid():
+    correct_error_message = (
+        "Invalid grid shape! Should have at least two grid nodes in each " "direction"
+    )
+    with pytest.raises(ValueError) as exc_info:
+        _ = CoilMagneticField(
+            segment_start_collection=np.zeros((3, 1)),
+            segment_end_collection=np.ones((3, 1)),
+            grid_origin=np.zeros(3),
+            grid_spacing=0.1,
+            grid_shape=(1, 4, 4),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+        )
+    assert exc_info.value.args[0] == correct_error_message
+
+
+def _linear_field_map(grid_shape, grid_origin, grid_spacing, field_gradient):
+    grid_points = np.stack(
+        np.meshgrid(
+            *[
+                grid_origin[i] + grid_spacing * np.arange(grid_shape[i])
+                for i in range(3)
+            ],
+            indexing="ij",
+        ),
+        axis=-1,
+    )
+    return grid_points @ field_gradient.T
+
+
+@pytest.mark.parametrize("file_format", ["npy", "raw", "array"])
+def test_gridded_magnetic_field(tmp_path, file_format):
+    dim = 3
+    grid_shape = (5, 6, 7)
+    grid_origin = np.random.rand(dim)
+    grid_spacing = 0.25
+    field_gradient = np.random.rand(dim, dim)
+    field_map = _linear_field_map(grid_shape, grid_origin, grid_spacing, field_gradient)
+    if file_format == "npy":
+        np.save(tmp_path / "field_map.npy", field_map)
+        field_map = tmp_path / "field_map.npy"
+    elif file_format == "raw":
+        field_map.tofile(tmp_path / "field_map.raw")
+        field_map = str(tmp_path / "field_map.raw")
+
+    magnetic_field_object = GriddedMagneticField(
+        field_map=field_map,
+        grid_origin=grid_origin,
+        grid_spacing=grid_spacing,
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=8.0,
+        grid_shape=grid_shape,
+    )
+    if file_format != "array":
+        # field map is not loaded into memory
+        assert isinstance(magnetic_field_object.field_map, np.memmap)
+
+    positions = grid_origin.reshape(dim, 1) + 0.1 + 0.8 * np.random.rand(dim, 16)
+    np.testing.assert_allclose(
+        magnetic_field_object.value_at(time=4.0, positions=positions),
+        field_gradient @ positions,
+        atol=1e-12,
+    )
+    np.testing.assert_allclose(
+        magnetic_field_object.jacobian_at(time=0.5, positions=positions),
+        0.5 * field_gradient.reshape(dim, dim, 1) * np.ones((16,)),
+        atol=1e-10,
+    )
+
+
+@pytest.mark.parametrize("time", [-1.0, 0.0, 0.25, 1.0, 1.5, 3.0])
+@pytest.mark.parametrize("as_sequence", [True, False])
+def test_gridded_magnetic_field_time_slices(tmp_path, time, as_sequence):
+    dim = 3
+    grid_shape = (3, 3, 3)
+    grid_origin = np.zeros(dim)
+    grid_spacing = 1.0
+    slice_times = np.array([0.0, 1.0, 2.0])
+    slice_scales = np.array([1.0, 3.0, -1.0])
+    field_gradient = np.random.rand(dim, dim)
+    field_map = _linear_field_map(grid_shape, grid_origin, grid_spacing, field_gradient)
+    field_map_slices = [scale * field_map for scale in slice_scales]
+    if as_sequence:
+        for i, field_map_slice in enumerate(field_map_slices):
+            np.save(tmp_path / f"field_map_{i}.npy", field_map_slice)
+        field_map = [tmp_path / f"field_map_{i}.npy" for i in range(3)]
+    else:
+        np.save(tmp_path / "field_map.npy", np.stack(field_map_slices))
+        field_map = tmp_path / "field_map.npy"
+
+    magnetic_field_object = GriddedMagneticField(
+        field_map=field_map,
+        grid_origin=grid_origin,
+        grid_spacing=grid_spacing,
+        ramp_interval=0.0,
+        start_time=-10.0,
+        end_time=10.0,
+        slice_times=slice_times,
+    )
+    positions = 2.0 * np.random.rand(dim, 4)
+    correct_scale = np.interp(time, slice_times, slice_scales)
+    np.testing.assert_allclose(
+        magnetic_field_object.value_at(time=time, positions=positions),
+        correct_scale * field_gradient @ positions,
+        atol=1e-10,
+    )
+
+
+def test_gridded_magnetic_field_invalid_init(tmp_path):
+    field_map = np.zeros((2, 3, 3, 3, 3))
+    with pytest.raises(ValueError) as exc_info:
+        _ = GriddedMagneticField(
+            field_map=field_map,
+            grid_origin=np.zeros(3),
+            grid_spacing=1.0,
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+            slice_times=np.array([0.0, 1.0, 2.0]),
+        )
+    assert exc_info.value.args[0] == (
+        "Invalid slice times! Should have one time for each field map slice"
+    )
+
+    field_map.tofile(tmp_path / "field_map.raw")
+    with pytest.raises(ValueError) as exc_info:
+        _ = GriddedMagneticField(
+            field_map=str(tmp_path / "field_map.raw"),
+            grid_origin=np.zeros(3),
+            grid_spacing=1.0,
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+        )
+    assert exc_info.value.args[0] == (
+        "Invalid grid shape! Should be given for raw field map files"
+    )
+
+
+@pytest.mark.parametrize("time", [4.0, 8.0, 16.0])
+@pytest.mark.parametrize("n_modes", [1, 10, 50])
+@pytest.mark.parametrize("use_recurrence", [True, False])
+def test_multi_mode_oscillating_magnetic_field(time, n_modes, use_recurrence):
+    dim = 3
+    ramp_interval = 1.0
+    start_time = 0.0
+    end_time = 8.0
+    fundamental_angular_frequency = 0.7
+    magnetic_field_amplitude = np.random.rand(dim, n_modes)
+    magnetic_field_angular_frequency = (
+        fundamental_angular_frequency
+        * np.random.randint(0, 2 * n_modes, size=(dim, n_modes))
+    )
+    magnetic_field_phase_difference = np.random.rand(dim, n_modes)
+    magnetic_field_object = MultiModeOscillatingMagneticField(
+        magnetic_field_amplitude=magnetic_field_amplitude,
+        magnetic_field_angular_frequency=magnetic_field_angular_frequency,
+        magnetic_field_phase_difference=magnetic_field_phase_difference,
+        ramp_interval=ramp_interval,
+        start_time=start_time,
+        end_time=end_time,
+        fundamental_angular_frequency=(
+            fundamental_angular_frequency if use_recurrence else None
+        ),
+    )
+    magnetic_field_value = magnetic_field_object.value(time=time)
+
+    correct_factor = 0.0
+    if time > start_time:
+        correct_factor = (time > start_time) * min(
+            1.0, (time - start_time) / ramp_interval
+        )
+    if time > end_time:
+        correct_factor = max(0.0, -1 / ramp_interval * (time - end_time) + 1.0)
+    correct_magnetic_field_value = correct_factor * np.sum(
+        magnetic_field_amplitude
+        * np.sin(
+            magnetic_field_angular_frequency * time + magnetic_field_phase_difference
+        ),
+        axis=1,
+    )
+    np.testing.assert_allclose(
+        magnetic_field_value, correct_magnetic_field_value, atol=1e-10
+    )
+
+
+def test_multi_mode_oscillating_magnetic_field_invalid_init():
+    dim = 3
+    n_modes = 4
+    with pytest.raises(ValueError) as exc_info:
+        _ = MultiModeOscillatingMagneticField(
+            magnetic_field_amplitude=np.ones((dim, n_modes)),
+            magnetic_field_angular_frequency=np.ones((dim, n_modes + 1)),
+            magnetic_field_phase_difference=np.ones((dim, n_modes)),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+        )
+    assert exc_info.value.args[0] == (
+        "Invalid magnetic field modes! Amplitude, angular frequency and "
+        "phase difference should be arrays of shape (3, num_modes)"
+    )
+    with pytest.raises(ValueError) as exc_info:
+        _ = MultiModeOscillatingMagneticField(
+            magnetic_field_amplitude=np.ones((dim, n_modes)),
+            magnetic_field_angular_frequency=1.5 * np.ones((dim, n_modes)),
+            magnetic_field_phase_difference=np.ones((dim, n_modes)),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+            fundamental_angular_frequency=1.0,
+        )
+    assert exc_info.value.args[0] == (
+        "Invalid fundamental angular frequency! Angular frequencies "
+        "should be non-negative integer multiples of it"
+    )
+
+
+@pytest.mark.parametrize("interpolation", ["linear", "cubic"])
+@pytest.mark.parametrize("uniform_sampling", [True, False])
+def test_tabulated_magnetic_field(interpolation, uniform_sampling):
+    dim = 3
+    n_samples = 400
+    sample_start_time = 1.0
+    if uniform_sampling:
+        sample_times = sample_start_time + 0.05 * np.arange(n_samples)
+    else:
+        sample_times = sample_start_time + np.cumsum(
+            0.05 + 0.05 * np.random.rand(n_samples)
+        )
+        sample_times -= sample_times[0] - sample_start_time
+    angular_frequency = np.array([1.0, 0.5, 0.25])
+    waveform = np.sin(np.outer(sample_times, angular_frequency))
+    magnetic_field_object = TabulatedMagneticField(
+        waveform=waveform,
+        ramp_interval=0.0,
+        start_time=0.0,
+        end_time=1e3,
+        sample_times=None if uniform_sampling else sample_times,
+        sample_start_time=sample_start_time,
+        sampling_interval=0.05 if uniform_sampling else None,
+        interpolation=interpolation,
+    )
+
+    # samples are reproduced
+    for sample_idx in [0, 1, 57, n_samples - 1]:
+        np.testing.assert_allclose(
+            magnetic_field_object.value(time=sample_times[sample_idx]),
+            waveform[sample_idx],
+            atol=1e-12,
+        )
+    # both increasing and decreasing times are interpolated
+    tolerance = 2e-3
+    if interpolation == "cubic":
+        tolerance = 2e-5 if uniform_sampling else 5e-4
+    for time in np.concatenate(
+        [
+            np.linspace(sample_times[0], sample_times[-1], 97),
+            np.linspace(sample_times[-1], sample_times[0], 31),
+        ]
+    ):
+        np.testing.assert_allclose(
+            magnetic_field_object.value(time=time),
+            np.sin(time * angular_frequency),
+            atol=tolerance,
+        )
+    # times outside of samples are clamped
+    np.testing.assert_allclose(
+        magnetic_field_object.value(time=sample_times[-1] + 10.0),
+        waveform[-1],
+        atol=1e-12,
+    )
+
+
+def test_tabulated_magnetic_field_values_are_not_overwritten():
+    waveform = np.outer(np.arange(4.0), np.array([1.0, 2.0, 3.0]))
+    magnetic_field_object = TabulatedMagneticField(
+        waveform=waveform,
+        ramp_interval=0.0,
+        start_time=-1.0,
+        end_time=1e3,
+        sampling_interval=1.0,
+    )
+    magnetic_field = magnetic_field_object.value(time=0.5)
+    _ = magnetic_field_object.value(time=1.5)
+    np.testing.assert_allclose(magnetic_field, [0.5, 1.0, 1.5])
+    assert not magnetic_field.flags.writeable
+
+
+def test_tabulated_magnetic_field_from_file(tmp_path):
+    dim = 3
+    waveform = np.random.rand(16, dim)
+    np.save(tmp_path / "waveform.npy", waveform)
+    magnetic_field_object = TabulatedMagneticField(
+        waveform=str(tmp_path / "waveform.npy"),
+        ramp_interval=0.0,
+        start_time=-1.0,
+        end_time=1e3,
+        sampling_interval=0.5,
+    )
+    np.testing.assert_allclose(
+        magnetic_field_object.value(time=1.25),
+        0.5 * (waveform[2] + waveform[3]),
+        atol=1e-12,
+    )
+
+
+def test_tabulated_magnetic_field_invalid_init():
+    dim = 3
+    with pytest.raises(ValueError) as exc_info:
+        _ = TabulatedMagneticField(
+            waveform=np.ones((4, dim + 1)),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+            sampling_interval=0.1,
+        )
+    assert exc_info.value.args[0] == (
+        "Invalid waveform! Should be an array of shape (num_samples, 3) "
+        "with at least two samples"
+    )
+    with pytest.raises(ValueError) as exc_info:
+        _ = TabulatedMagneticField(
+            waveform=np.ones((4, dim)),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+        )
+    assert exc_info.value.args[0] == (
+        "Invalid sampling! Either sample_times or sampling_interval should be given"
+    )
+    with pytest.raises(ValueError) as exc_info:
+        _ = TabulatedMagneticField(
+            waveform=np.ones((4, dim)),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+            sampling_interval=0.1,
+            interpolation="quadratic",
+        )
+    assert exc_info.value.args[0] == (
+        "Invalid interpolation! Should be either 'linear' or 'cubic'"
+    )
+    with pytest.raises(ValueError) as exc_info:
+        _ = TabulatedMagneticField(
+            waveform=np.ones((4, dim)),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+            sample_times=np.arange(3.0),
+        )
+    assert exc_info.value.args[0] == (
+        "Invalid sample times! Should have one time for each sample"
+    )
+    with pytest.raises(ValueError) as exc_info:
+        _ = TabulatedMagneticField(
+            waveform=np.ones((4, dim)),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+            sample_times=np.array([0.0, 1.0, 1.0, 2.0]),
+        )
+    assert exc_info.value.args[0] == (
+        "Invalid sample times! Should be strictly increasing"
+    )
+
+
+@pytest.mark.parametrize("time", [0.5, 1.5, 3.0, 4.5, 7.0, 9.5])
+def test_composite_magnetic_field(time):
+    dim = 3
+    n_modes = 3
+    bias_field = ConstantMagneticField(
+        magnetic_field_amplitude=np.random.rand(dim),
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=8.0,
+    )
+    rotating_field = SingleModeOscillatingMagneticField(
+        magnetic_field_amplitude=np.random.rand(dim),
+        magnetic_field_angular_frequency=np.random.rand(dim),
+        magnetic_field_phase_difference=np.random.rand(dim),
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=8.0,
+    )
+    multi_mode_field = MultiModeOscillatingMagneticField(
+        magnetic_field_amplitude=np.random.rand(dim, n_modes),
+        magnetic_field_angular_frequency=np.random.rand(dim, n_modes),
+        magnetic_field_phase_difference=np.random.rand(dim, n_modes),
+        ramp_interval=2.0,
+        start_time=1.0,
+        end_time=6.0,
+        ramp_profile="smoothstep",
+    )
+    tabulated_field = TabulatedMagneticField(
+        waveform=np.random.rand(16, dim),
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=8.0,
+        sampling_interval=1.0,
+    )
+
+    magnetic_field_object = (
+        bias_field
+        + 2.0 * rotating_field.gated(1.0, 4.0)
+        - (multi_mode_field + tabulated_field).gated(2.0, 9.0)
+    )
+    correct_magnetic_field_value = (
+        bias_field.value(time)
+        + 2.0 * (1.0 < time <= 4.0) * rotating_field.value(time)
+        - (2.0 < time <= 9.0)
+        * (multi_mode_field.value(time) + tabulated_field.value(time))
+    )
+
+    # expression tree is flattened, modes are gathered with distinct ramps
+    assert len(magnetic_field_object.magnetic_field_terms) == 4
+    assert magnetic_field_object.magnetic_field_amplitude.shape == (dim, 2 + n_modes)
+    assert magnetic_field_object.ramp_parameters.shape == (4, 2)
+    assert len(magnetic_field_object.other_terms) == 1
+    assert magnetic_field_object.is_uniform
+    np.testing.assert_allclose(
+        magnetic_field_object.value(time=time),
+        correct_magnetic_field_value,
+        atol=Tolerance.atol(),
+    )
+    np.testing.assert_allclose(
+        magnetic_field_object.values(times=np.array([time, time]))[1],
+        correct_magnetic_field_value,
+        atol=Tolerance.atol(),
+    )
+
+
+def test_composite_magnetic_field_sum():
+    dim = 3
+    magnetic_fields = [
+        ConstantMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+        )
+        for _ in range(4)
+    ]
+    magnetic_field_object = sum(magnetic_fields)
+
+    assert isinstance(magnetic_field_object, CompositeMagneticField)
+    np.testing.assert_allclose(
+        magnetic_field_object.value(time=4.0),
+        np.sum([field.value(time=4.0) for field in magnetic_fields], axis=0),
+        atol=Tolerance.atol(),
+    )
+
+
+def test_composite_magnetic_field_non_uniform():
+    dim = 3
+    grid_shape = (5, 6, 7)
+    grid_origin = np.random.rand(dim)
+    grid_spacing = 0.25
+    field_gradient = np.random.rand(dim, dim)
+    gridded_field = GriddedMagneticField(
+        field_map=_linear_field_map(
+            grid_shape, grid_origin, grid_spacing, field_gradient
+        ),
+        grid_origin=grid_origin,
+        grid_spacing=grid_spacing,
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=8.0,
+    )
+    magnetic_field_amplitude = np.random.rand(dim)
+    bias_field = ConstantMagneticField(
+        magnetic_field_amplitude=magnetic_field_amplitude,
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=8.0,
+    )
+    magnetic_field_object = bias_field + 0.5 * gridded_field
+    positions = grid_origin.reshape(dim, 1) + 0.1 + 0.8 * np.random.rand(dim, 16)
+
+    assert not magnetic_field_object.is_uniform
+    np.testing.assert_allclose(
+        magnetic_field_object.value_at(time=4.0, positions=positions),
+        magnetic_field_amplitude.reshape(dim, 1) + 0.5 * field_gradient @ positions,
+        atol=1e-12,
+    )
+    np.testing.assert_allclose(
+        magnetic_field_object.jacobian_at(time=4.0, positions=positions),
+        0.5 * field_gradient.reshape(dim, dim, 1) * np.ones((16,)),
+        atol=1e-10,
+    )
+
+
+def test_composite_magnetic_field_invalid_init():
+    with pytest.raises(ValueError) as excinfo:
+        CompositeMagneticField([(np.ones(3), 1.0, -np.inf, np.inf)])
+    assert "Invalid magnetic field term!" in str(excinfo.value)
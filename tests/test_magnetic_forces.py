@@ -1,7 +1,22 @@
 import numpy as np
 import pytest
-from magneto_pyelastica.magnetic_field import BaseMagneticField, ConstantMagneticField
-from magneto_pyelastica.magnetic_forces import MagneticForces
+from magneto_pyelastica.magnetic_field import (
+    BaseMagneticField,
+    ConstantMagneticField,
+    MU_0,
+)
+from magneto_pyelastica.magnetic_forces import (
+    MagneticForces,
+    CollectiveMagneticForces,
+    ProgrammedMagneticForces,
+    SoftMagneticForces,
+    SATURATION_LAWS,
+    _compute_magnetic_torques,
+)
+from magneto_pyelastica.magnetization_profile import (
+    ConstantMagnetizationProfile,
+    DecayingMagnetizationProfile,
+)
 from elastica.utils import Tolerance
 
 
@@ -10,6 +25,7 @@ def mock_magnetic_rod_init(self):
     self.external_forces = 0.0
     self.external_torques = 0.0
     self.director_collection = 0.0
+    self.position_collection = 0.0
     self.volume = 0.0
 
 
@@ -117,3 +133,888 @@ def test_magnetic_forces_apply_torques(
     np.testing.assert_allclose(
         mock_rod.external_torques, correct_magnetic_field_torques, atol=Tolerance.atol()
     )
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+def test_compute_magnetic_torques_matches_vectorized_path(n_elems):
+    from elastica._linalg import _batch_cross, _batch_matvec
+    from elastica._rotations import _get_rotation_matrix
+
+    dim = 3
+    magnetization_collection = np.random.rand(dim, n_elems)
+    director_collection = _get_rotation_matrix(1.0, np.random.rand(dim, n_elems))
+    magnetic_field = np.random.rand(dim)
+    external_torques = np.random.rand(dim, n_elems)
+
+    correct_external_torques = external_torques + _batch_cross(
+        magnetization_collection,
+        _batch_matvec(
+            director_collection, magnetic_field.reshape(dim, 1) * np.ones((n_elems,))
+        ),
+    )
+    _compute_magnetic_torques(
+        magnetization_collection,
+        director_collection,
+        magnetic_field,
+        external_torques,
+    )
+
+    # fused kernel must be bit-identical to the vectorized path
+    np.testing.assert_array_equal(external_torques, correct_external_torques)
+
+
+@pytest.mark.parametrize("n_rods", [1, 3, 8])
+@pytest.mark.parametrize("time", [4.0, 8.0])
+def test_collective_magnetic_forces_apply_torques(n_rods, time):
+    from elastica._rotations import _get_rotation_matrix
+
+    dim = 3
+    magnetic_field_object = ConstantMagneticField(
+        magnetic_field_amplitude=np.random.rand(dim),
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=16.0,
+    )
+    rod_list = []
+    magnetization_direction_list = []
+    for i in range(n_rods):
+        n_elems = 2 + 3 * i
+        mock_rod = MockMagneticRod()
+        mock_rod.n_elems = n_elems
+        mock_rod.external_forces = np.zeros((dim, n_elems + 1))
+        mock_rod.external_torques = np.zeros((dim, n_elems))
+        mock_rod.director_collection = _get_rotation_matrix(
+            1.0, np.random.rand(dim, n_elems)
+        )
+        mock_rod.position_collection = np.random.rand(dim, n_elems + 1)
+        mock_rod.volume = np.random.rand(n_elems)
+        rod_list.append(mock_rod)
+        magnetization_direction_list.append(np.random.rand(dim, n_elems))
+    magnetization_density = 3.0
+
+    collective_magnetic_forcing = CollectiveMagneticForces(
+        external_magnetic_field=magnetic_field_object,
+        rod_list=rod_list,
+        magnetization_density=magnetization_density,
+        magnetization_direction=[
+            direction.copy() for direction in magnetization_direction_list
+        ],
+    )
+    collective_magnetic_forcing.apply_torques(rod=rod_list[0], time=time)
+
+    for mock_rod, magnetization_direction in zip(
+        rod_list, magnetization_direction_list
+    ):
+        reference_rod = MockMagneticRod()
+        reference_rod.external_torques = np.zeros((dim, mock_rod.n_elems))
+        reference_rod.director_collection = mock_rod.director_collection
+        MagneticForces(
+            external_magnetic_field=magnetic_field_object,
+            magnetization_density=magnetization_density,
+            magnetization_direction=magnetization_direction,
+            rod_volume=mock_rod.volume,
+            rod_director_collection=mock_rod.director_collection,
+        ).apply_torques(rod=reference_rod, time=time)
+        np.testing.assert_allclose(
+            mock_rod.external_torques,
+            reference_rod.external_torques,
+            atol=Tolerance.atol(),
+        )
+
+
+def test_collective_magnetic_forces_invalid_init():
+    dim = 3
+    n_elems = 4
+    mock_rod = MockMagneticRod()
+    mock_rod.n_elems = n_elems
+    mock_rod.director_collection = np.repeat(
+        np.identity(dim)[:, :, np.newaxis], n_elems, axis=2
+    )
+    mock_rod.volume = np.ones((n_elems,))
+    correct_error_message = (
+        "Invalid magnetization list! Should have one entry for each rod "
+        "in the rod_list"
+    )
+    with pytest.raises(ValueError) as exc_info:
+        _ = CollectiveMagneticForces(
+            external_magnetic_field=BaseMagneticField(),
+            rod_list=[mock_rod, mock_rod],
+            magnetization_density=[1.0],
+            magnetization_direction=np.ones((3,)),
+        )
+    assert exc_info.value.args[0] == correct_error_message
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+def test_magnetic_forces_set_magnetization(n_elems):
+    from elastica._rotations import _get_rotation_matrix
+
+    dim = 3
+    magnetic_field_object = ConstantMagneticField(
+        magnetic_field_amplitude=np.random.rand(dim),
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=16.0,
+    )
+    mock_rod = MockMagneticRod()
+    mock_rod.external_torques = np.zeros((dim, n_elems))
+    mock_rod.director_collection = _get_rotation_matrix(
+        1.0, np.random.rand(dim, n_elems)
+    )
+    mock_rod.volume = np.random.rand(n_elems)
+    magnetization_direction = np.random.rand(dim, n_elems)
+    magnetic_forcing = MagneticForces(
+        external_magnetic_field=magnetic_field_object,
+        magnetization_density=2.0,
+        magnetization_direction=magnetization_direction,
+        rod_volume=mock_rod.volume,
+        rod_director_collection=mock_rod.director_collection,
+    )
+    initial_magnetization_collection = magnetic_forcing.magnetization_collection.copy()
+
+    # reprogramming is deferred until the next time step
+    new_magnetization_density = np.random.rand(n_elems)
+    new_rod_volume = np.random.rand(n_elems)
+    magnetic_forcing.set_magnetization(
+        magnetization_density=new_magnetization_density, rod_volume=new_rod_volume
+    )
+    np.testing.assert_allclose(
+        magnetic_forcing.magnetization_collection, initial_magnetization_collection
+    )
+    # rod rotates, magnetization direction is kept in the material frame
+    mock_rod.director_collection = _get_rotation_matrix(
+        1.0, np.random.rand(dim, n_elems)
+    )
+    magnetic_forcing.apply_torques(rod=mock_rod, time=4.0)
+    np.testing.assert_allclose(
+        magnetic_forcing.magnetization_collection,
+        initial_magnetization_collection
+        * new_magnetization_density
+        * new_rod_volume
+        / (2.0 * mock_rod.volume),
+        atol=Tolerance.atol(),
+    )
+
+    # new direction is converted with the directors at the next time step
+    new_magnetization_direction = np.random.rand(dim)
+    magnetic_forcing.set_magnetization(
+        magnetization_direction=new_magnetization_direction
+    )
+    mock_rod.external_torques *= 0.0
+    magnetic_forcing.apply_torques(rod=mock_rod, time=4.0)
+    reference_rod = MockMagneticRod()
+    reference_rod.external_torques = np.zeros((dim, n_elems))
+    reference_rod.director_collection = mock_rod.director_collection
+    MagneticForces(
+        external_magnetic_field=magnetic_field_object,
+        magnetization_density=new_magnetization_density,
+        magnetization_direction=new_magnetization_direction,
+        rod_volume=new_rod_volume,
+        rod_director_collection=mock_rod.director_collection,
+    ).apply_torques(rod=reference_rod, time=4.0)
+    np.testing.assert_allclose(
+        mock_rod.external_torques,
+        reference_rod.external_torques,
+        atol=Tolerance.atol(),
+    )
+
+    # invalid arguments are rejected when set
+    correct_error_message = (
+        "Invalid magnetization intensity! Should be either a float or "
+        "an array of shape (num_rod_elements,)"
+    )
+    with pytest.raises(ValueError) as exc_info:
+        magnetic_forcing.set_magnetization(
+            magnetization_density=np.ones((n_elems + 1,))
+        )
+    assert exc_info.value.args[0] == correct_error_message
+
+
+@pytest.mark.parametrize("n_rods", [1, 3, 8])
+def test_collective_magnetic_forces_set_magnetization(n_rods):
+    from elastica._rotations import _get_rotation_matrix
+
+    dim = 3
+    time = 4.0
+    magnetic_field_object = ConstantMagneticField(
+        magnetic_field_amplitude=np.random.rand(dim),
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=16.0,
+    )
+    rod_list = []
+    for i in range(n_rods):
+        n_elems = 2 + 3 * i
+        mock_rod = MockMagneticRod()
+        mock_rod.n_elems = n_elems
+        mock_rod.external_forces = np.zeros((dim, n_elems + 1))
+        mock_rod.external_torques = np.zeros((dim, n_elems))
+        mock_rod.director_collection = _get_rotation_matrix(
+            1.0, np.random.rand(dim, n_elems)
+        )
+        mock_rod.position_collection = np.random.rand(dim, n_elems + 1)
+        mock_rod.volume = np.random.rand(n_elems)
+        rod_list.append(mock_rod)
+    collective_magnetic_forcing = CollectiveMagneticForces(
+        external_magnetic_field=magnetic_field_object,
+        rod_list=rod_list,
+        magnetization_density=3.0,
+        magnetization_direction=np.random.rand(dim),
+    )
+    initial_magnetization_collection = (
+        collective_magnetic_forcing.magnetization_collection.copy()
+    )
+
+    # reprogram the last rod only
+    rod_idx = n_rods - 1
+    new_magnetization_direction = np.random.rand(dim)
+    new_rod_volume = np.random.rand(rod_list[rod_idx].n_elems)
+    collective_magnetic_forcing.set_magnetization(
+        rod_idx,
+        magnetization_density=5.0,
+        magnetization_direction=new_magnetization_direction,
+        rod_volume=new_rod_volume,
+    )
+    collective_magnetic_forcing.apply_torques(rod=rod_list[0], time=time)
+
+    start = collective_magnetic_forcing.element_offsets[rod_idx]
+    np.testing.assert_allclose(
+        collective_magnetic_forcing.magnetization_collection[:, :start],
+        initial_magnetization_collection[:, :start],
+    )
+    reference_rod = MockMagneticRod()
+    reference_rod.external_torques = np.zeros((dim, rod_list[rod_idx].n_elems))
+    reference_rod.director_collection = rod_list[rod_idx].director_collection
+    MagneticForces(
+        external_magnetic_field=magnetic_field_object,
+        magnetization_density=5.0,
+        magnetization_direction=new_magnetization_direction,
+        rod_volume=new_rod_volume,
+        rod_director_collection=rod_list[rod_idx].director_collection,
+    ).apply_torques(rod=reference_rod, time=time)
+    np.testing.assert_allclose(
+        rod_list[rod_idx].external_torques,
+        reference_rod.external_torques,
+        atol=Tolerance.atol(),
+    )
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+@pytest.mark.parametrize("time", [0.5, 2.0, 4.0])
+def test_programmed_magnetic_forces_apply_torques(n_elems, time):
+    from elastica._rotations import _get_rotation_matrix
+
+    dim = 3
+    magnetic_field_object = ConstantMagneticField(
+        magnetic_field_amplitude=np.random.rand(dim),
+        ramp_interval=1.0,
+        start_time=0.0,
+        end_time=16.0,
+    )
+    mock_rod = MockMagneticRod()
+    mock_rod.external_torques = np.zeros((dim, n_elems))
+    mock_rod.director_collection = _get_rotation_matrix(
+        1.0, np.random.rand(dim, n_elems)
+    )
+    mock_rod.volume = np.random.rand(n_elems)
+    magnetization_direction = np.random.rand(dim, n_elems)
+    decay_time = 2.0
+    magnetic_forcing = ProgrammedMagneticForces(
+        external_magnetic_field=magnetic_field_object,
+        magnetization_profile=DecayingMagnetizationProfile(
+            magnetization_density=3.0,
+            magnetization_direction=magnetization_direction.copy(),
+            rod_director_collection=mock_rod.director_collection,
+            decay_time=decay_time,
+            start_time=1.0,
+        ),
+        rod_volume=mock_rod.volume,
+    )
+    magnetic_forcing.apply_forces(rod=mock_rod, time=time)
+    magnetic_forcing.apply_torques(rod=mock_rod, time=time)
+
+    reference_rod = MockMagneticRod()
+    reference_rod.external_torques = np.zeros((dim, n_elems))
+    reference_rod.director_collection = mock_rod.director_collection
+    MagneticForces(
+        external_magnetic_field=magnetic_field_object,
+        magnetization_density=3.0 * np.exp(-max(time - 1.0, 0.0) / decay_time),
+        magnetization_direction=magnetization_direction.copy(),
+        rod_volume=mock_rod.volume,
+        rod_director_collection=mock_rod.director_collection,
+    ).apply_torques(rod=reference_rod, time=time)
+    np.testing.assert_allclose(
+        mock_rod.external_torques,
+        reference_rod.external_torques,
+        atol=Tolerance.atol(),
+    )
+
+
+def test_programmed_magnetic_forces_static_profile():
+    dim = 3
+    n_elems = 4
+    mock_rod = MockMagneticRod()
+    mock_rod.external_torques = np.zeros((dim, n_elems))
+    mock_rod.director_collection = np.repeat(
+        np.identity(dim)[:, :, np.newaxis], n_elems, axis=2
+    )
+    mock_rod.volume = np.random.rand(n_elems)
+    magnetic_forcing = ProgrammedMagneticForces(
+        external_magnetic_field=ConstantMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=16.0,
+        ),
+        magnetization_profile=ConstantMagnetizationProfile(
+            magnetization_density=2.0,
+            magnetization_direction=np.array([0.0, 0.0, 1.0]),
+            rod_director_collection=mock_rod.director_collection,
+        ),
+        rod_volume=mock_rod.volume,
+    )
+    magnetic_forcing.apply_torques(rod=mock_rod, time=1.0)
+    np.testing.assert_allclose(
+        magnetic_forcing.magnetization_collection[2], 2.0 * mock_rod.volume
+    )
+    # static profiles are not recomputed at later time steps
+    magnetic_forcing.magnetization_collection *= 0.0
+    magnetic_forcing.apply_torques(rod=mock_rod, time=2.0)
+    np.testing.assert_allclose(magnetic_forcing.magnetization_collection, 0.0)
+
+    with pytest.raises(TypeError) as exc_info:
+        magnetic_forcing.set_magnetization(magnetization_density=1.0)
+    assert (
+        exc_info.value.args[0]
+        == "ProgrammedMagneticForces has programmed magnetization, it can not be set"
+    )
+
+
+class MockLinearMagneticField(BaseMagneticField):
+    """Spatially varying magnetic field B(x) = B0 + G x"""
+
+    is_uniform = False
+
+    def __init__(self, magnetic_field_amplitude, magnetic_field_gradient):
+        super(MockLinearMagneticField, self).__init__()
+        self.magnetic_field_amplitude = magnetic_field_amplitude
+        self.magnetic_field_gradient = magnetic_field_gradient
+
+    def value_at(self, time, positions):
+        return self.magnetic_field_amplitude.reshape(3, 1) + np.einsum(
+            "ij,jk->ik", self.magnetic_field_gradient, positions
+        )
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+def test_magnetic_forces_apply_torques_in_nonuniform_field(n_elems):
+    from elastica._rotations import _get_rotation_matrix
+
+    dim = 3
+    mock_rod = MockMagneticRod()
+    mock_rod.n_elems = n_elems
+    mock_rod.external_forces = np.zeros((dim, n_elems + 1))
+    mock_rod.external_torques = np.zeros((dim, n_elems))
+    mock_rod.director_collection = _get_rotation_matrix(
+        1.0, np.random.rand(dim, n_elems)
+    )
+    mock_rod.position_collection = np.random.rand(dim, n_elems + 1)
+    mock_rod.volume = np.random.rand(n_elems)
+    magnetic_field_object = MockLinearMagneticField(
+        magnetic_field_amplitude=np.random.rand(dim),
+        magnetic_field_gradient=np.random.rand(dim, dim),
+    )
+    external_magnetic_field_forcing = MagneticForces(
+        external_magnetic_field=magnetic_field_object,
+        magnetization_density=2.0,
+        magnetization_direction=np.random.rand(dim),
+        rod_volume=mock_rod.volume,
+        rod_director_collection=mock_rod.director_collection,
+    )
+    external_magnetic_field_forcing.apply_torques(rod=mock_rod, time=0.0)
+
+    element_position = 0.5 * (
+        mock_rod.position_collection[:, 1:] + mock_rod.position_collection[:, :-1]
+    )
+    magnetic_field_in_material_frame = np.einsum(
+        "ijk,jk->ik",
+        mock_rod.director_collection,
+        magnetic_field_object.value_at(time=0.0, positions=element_position),
+    )
+    correct_magnetic_field_torques = np.cross(
+        external_magnetic_field_forcing.magnetization_collection,
+        magnetic_field_in_material_frame,
+        axis=0,
+    )
+    np.testing.assert_allclose(
+        mock_rod.external_torques, correct_magnetic_field_torques, atol=Tolerance.atol()
+    )
+
+    # collective forcing evaluates field at all elements in one call
+    mock_rod.external_torques[...] = 0.0
+    collective_magnetic_forcing = CollectiveMagneticForces(
+        external_magnetic_field=magnetic_field_object,
+        rod_list=[mock_rod],
+        magnetization_density=2.0,
+        magnetization_direction=[np.random.rand(dim)],
+    )
+    collective_magnetic_forcing.magnetization_collection[
+        ...
+    ] = external_magnetic_field_forcing.magnetization_collection
+    collective_magnetic_forcing.apply_torques(rod=mock_rod, time=0.0)
+    np.testing.assert_allclose(
+        mock_rod.external_torques, correct_magnetic_field_torques, atol=Tolerance.atol()
+    )
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+def test_magnetic_forces_apply_forces(n_elems):
+    from elastica._rotations import _get_rotation_matrix
+
+    dim = 3
+    mock_rod = MockMagneticRod()
+    mock_rod.n_elems = n_elems
+    mock_rod.external_forces = np.zeros((dim, n_elems + 1))
+    mock_rod.external_torques = np.zeros((dim, n_elems))
+    mock_rod.director_collection = _get_rotation_matrix(
+        1.0, np.random.rand(dim, n_elems)
+    )
+    mock_rod.position_collection = np.random.rand(dim, n_elems + 1)
+    mock_rod.volume = np.random.rand(n_elems)
+    magnetization_direction = np.random.rand(dim, n_elems)
+
+    # uniform fields do not apply any force
+    external_magnetic_field_forcing = MagneticForces(
+        external_magnetic_field=ConstantMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+        ),
+        magnetization_density=2.0,
+        magnetization_direction=magnetization_direction.copy(),
+        rod_volume=mock_rod.volume,
+        rod_director_collection=mock_rod.director_collection,
+    )
+    external_magnetic_field_forcing.apply_forces(rod=mock_rod, time=4.0)
+    np.testing.assert_allclose(mock_rod.external_forces, 0.0)
+
+    # linear gradient field, force on element is G^T m in lab frame
+    magnetic_field_gradient = np.random.rand(dim, dim)
+    external_magnetic_field_forcing = MagneticForces(
+        external_magnetic_field=MockLinearMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            magnetic_field_gradient=magnetic_field_gradient,
+        ),
+        magnetization_density=2.0,
+        magnetization_direction=magnetization_direction.copy(),
+        rod_volume=mock_rod.volume,
+        rod_director_collection=mock_rod.director_collection,
+    )
+    external_magnetic_field_forcing.apply_forces(rod=mock_rod, time=4.0)
+
+    magnetization_in_lab_frame = np.einsum(
+        "jik,jk->ik",
+        mock_rod.director_collection,
+        external_magnetic_field_forcing.magnetization_collection,
+    )
+    element_forces = magnetic_field_gradient.T @ magnetization_in_lab_frame
+    correct_external_forces = np.zeros((dim, n_elems + 1))
+    correct_external_forces[:, :-1] += 0.5 * element_forces
+    correct_external_forces[:, 1:] += 0.5 * element_forces
+    np.testing.assert_allclose(
+        mock_rod.external_forces, correct_external_forces, atol=1e-8
+    )
+
+    # collective forcing applies the same forces
+    mock_rod.external_forces[...] = 0.0
+    collective_magnetic_forcing = CollectiveMagneticForces(
+        external_magnetic_field=external_magnetic_field_forcing.external_magnetic_field,
+        rod_list=[mock_rod],
+        magnetization_density=2.0,
+        magnetization_direction=[magnetization_direction.copy()],
+    )
+    collective_magnetic_forcing.apply_forces(rod=mock_rod, time=4.0)
+    np.testing.assert_allclose(
+        mock_rod.external_forces, correct_external_forces, atol=1e-8
+    )
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+@pytest.mark.parametrize("is_uniform", [True, False])
+def test_magnetic_forces_diagnostics(n_elems, is_uniform):
+    from elastica._rotations import _get_rotation_matrix
+
+    dim = 3
+    diagnostics_step_skip = 2
+    mock_rod = MockMagneticRod()
+    mock_rod.external_forces = np.zeros((dim, n_elems + 1))
+    mock_rod.external_torques = np.zeros((dim, n_elems))
+    mock_rod.director_collection = _get_rotation_matrix(
+        1.0, np.random.rand(dim, n_elems)
+    )
+    mock_rod.position_collection = np.random.rand(dim, n_elems + 1)
+    mock_rod.velocity_collection = np.random.rand(dim, n_elems + 1)
+    mock_rod.omega_collection = np.random.rand(dim, n_elems)
+    mock_rod.volume = np.random.rand(n_elems)
+    if is_uniform:
+        magnetic_field_object = ConstantMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+        )
+    else:
+        magnetic_field_object = MockLinearMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            magnetic_field_gradient=np.random.rand(dim, dim),
+        )
+    magnetic_forcing_kwargs = dict(
+        external_magnetic_field=magnetic_field_object,
+        magnetization_density=2.0,
+        magnetization_direction=np.random.rand(dim, n_elems),
+        rod_volume=mock_rod.volume,
+        rod_director_collection=mock_rod.director_collection,
+    )
+    magnetic_forcing = MagneticForces(
+        diagnostics_step_skip=diagnostics_step_skip, **magnetic_forcing_kwargs
+    )
+    reference_rod = MockMagneticRod()
+    reference_rod.external_forces = np.zeros((dim, n_elems + 1))
+    reference_rod.external_torques = np.zeros((dim, n_elems))
+    reference_rod.director_collection = mock_rod.director_collection
+    reference_rod.position_collection = mock_rod.position_collection
+    reference_magnetic_forcing = MagneticForces(**magnetic_forcing_kwargs)
+
+    times = [1.0, 2.0, 3.0, 4.0, 5.0]
+    for time in times:
+        mock_rod.external_forces[...] = 0.0
+        mock_rod.external_torques[...] = 0.0
+        magnetic_forcing.apply_forces(rod=mock_rod, time=time)
+        magnetic_forcing.apply_torques(rod=mock_rod, time=time)
+        reference_rod.external_forces[...] = 0.0
+        reference_rod.external_torques[...] = 0.0
+        reference_magnetic_forcing.apply_forces(rod=reference_rod, time=time)
+        reference_magnetic_forcing.apply_torques(rod=reference_rod, time=time)
+        # diagnostics do not change the forces and torques
+        np.testing.assert_allclose(
+            mock_rod.external_forces, reference_rod.external_forces, atol=1e-12
+        )
+        np.testing.assert_allclose(
+            mock_rod.external_torques, reference_rod.external_torques, atol=1e-12
+        )
+
+    assert magnetic_forcing.diagnostics["time"] == times[::diagnostics_step_skip]
+    # last time step is recorded
+    element_positions = 0.5 * (
+        mock_rod.position_collection[:, 1:] + mock_rod.position_collection[:, :-1]
+    )
+    magnetic_field = magnetic_field_object.value_at(
+        time=times[-1], positions=element_positions
+    )
+    magnetization_in_lab_frame = np.einsum(
+        "jik,jk->ik",
+        mock_rod.director_collection,
+        magnetic_forcing.magnetization_collection,
+    )
+    correct_zeeman_energy = -np.sum(magnetization_in_lab_frame * magnetic_field)
+    correct_magnetic_power = np.sum(
+        mock_rod.external_torques * mock_rod.omega_collection
+    ) + np.sum(mock_rod.external_forces * mock_rod.velocity_collection)
+    np.testing.assert_allclose(
+        magnetic_forcing.diagnostics["zeeman_energy"][-1],
+        correct_zeeman_energy,
+        rtol=1e-10,
+    )
+    np.testing.assert_allclose(
+        magnetic_forcing.diagnostics["magnetic_power"][-1],
+        correct_magnetic_power,
+        rtol=1e-10,
+    )
+
+    correct_error_message = (
+        "Invalid diagnostics step skip! Should be a non-negative integer"
+    )
+    with pytest.raises(ValueError) as exc_info:
+        _ = MagneticForces(diagnostics_step_skip=-1, **magnetic_forcing_kwargs)
+    assert exc_info.value.args[0] == correct_error_message
+
+
+def make_mock_soft_magnetic_rod(n_elems):
+    from elastica._rotations import _get_rotation_matrix
+
+    dim = 3
+    mock_rod = MockMagneticRod()
+    mock_rod.n_elems = n_elems
+    mock_rod.external_forces = np.zeros((dim, n_elems + 1))
+    mock_rod.external_torques = np.zeros((dim, n_elems))
+    mock_rod.director_collection = _get_rotation_matrix(
+        1.0, np.random.rand(dim, n_elems)
+    )
+    mock_rod.position_collection = np.random.rand(dim, n_elems + 1)
+    mock_rod.volume = np.random.rand(n_elems)
+    return mock_rod
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+@pytest.mark.parametrize("magnetic_susceptibility", [2.0, np.array([0.5, 1.0, 4.0])])
+def test_soft_magnetic_forces_apply_torques(n_elems, magnetic_susceptibility):
+    dim = 3
+    mock_rod = make_mock_soft_magnetic_rod(n_elems)
+    magnetic_field_amplitude = np.random.rand(dim)
+    soft_magnetic_forcing = SoftMagneticForces(
+        external_magnetic_field=ConstantMagneticField(
+            magnetic_field_amplitude=magnetic_field_amplitude,
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+        ),
+        magnetic_susceptibility=magnetic_susceptibility,
+        rod_volume=mock_rod.volume,
+    )
+    soft_magnetic_forcing.apply_forces(rod=mock_rod, time=4.0)
+    soft_magnetic_forcing.apply_torques(rod=mock_rod, time=4.0)
+
+    # induced magnetization is V chi Q B / mu_0 in the material frame
+    magnetic_field_in_material_frame = np.einsum(
+        "ijk,j->ik", mock_rod.director_collection, magnetic_field_amplitude
+    )
+    correct_magnetization = (
+        mock_rod.volume
+        * np.array(magnetic_susceptibility).reshape(-1, 1)
+        * magnetic_field_in_material_frame
+        / MU_0
+    )
+    np.testing.assert_allclose(
+        soft_magnetic_forcing.magnetization_collection,
+        correct_magnetization,
+        rtol=1e-12,
+    )
+    np.testing.assert_allclose(mock_rod.external_forces, 0.0)
+    # isotropic soft magnetization is parallel to the field, without torques
+    correct_torques = np.cross(
+        correct_magnetization, magnetic_field_in_material_frame, axis=0
+    )
+    np.testing.assert_allclose(
+        mock_rod.external_torques,
+        correct_torques,
+        atol=1e-12 * np.abs(correct_magnetization).max(),
+    )
+    if np.ndim(magnetic_susceptibility) == 0:
+        np.testing.assert_allclose(
+            mock_rod.external_torques,
+            0.0,
+            atol=1e-12 * np.abs(correct_magnetization).max(),
+        )
+
+
+@pytest.mark.parametrize("saturation_law", list(SATURATION_LAWS))
+def test_soft_magnetic_forces_saturation_laws(saturation_law):
+    dim = 3
+    n_elems = 4
+    mock_rod = make_mock_soft_magnetic_rod(n_elems)
+    magnetic_susceptibility = 2.0
+    saturation_magnetization = 1e5
+    field_direction = np.random.rand(dim)
+    field_direction /= np.linalg.norm(field_direction)
+
+    magnetization_density = []
+    for field_strength in [1e-7, 1e3]:
+        soft_magnetic_forcing = SoftMagneticForces(
+            external_magnetic_field=ConstantMagneticField(
+                magnetic_field_amplitude=field_strength * field_direction,
+                ramp_interval=1.0,
+                start_time=0.0,
+                end_time=8.0,
+            ),
+            magnetic_susceptibility=magnetic_susceptibility,
+            rod_volume=mock_rod.volume,
+            saturation_magnetization=saturation_magnetization,
+            saturation_law=saturation_law,
+        )
+        soft_magnetic_forcing.apply_torques(rod=mock_rod, time=4.0)
+        magnetization_in_lab_frame = np.einsum(
+            "jik,jk->ik",
+            mock_rod.director_collection,
+            soft_magnetic_forcing.magnetization_collection,
+        )
+        # magnetization stays along the field
+        np.testing.assert_allclose(
+            magnetization_in_lab_frame
+            / np.linalg.norm(magnetization_in_lab_frame, axis=0),
+            field_direction.reshape(dim, 1) * np.ones((n_elems,)),
+            rtol=1e-10,
+        )
+        magnetization_density.append(
+            np.linalg.norm(magnetization_in_lab_frame, axis=0) / mock_rod.volume
+        )
+
+    # weak fields are linear for all laws
+    np.testing.assert_allclose(
+        magnetization_density[0], magnetic_susceptibility * 1e-7 / MU_0, rtol=1e-5
+    )
+    # strong fields saturate
+    if saturation_law == "linear":
+        np.testing.assert_allclose(
+            magnetization_density[1], magnetic_susceptibility * 1e3 / MU_0
+        )
+    else:
+        np.testing.assert_allclose(
+            magnetization_density[1], saturation_magnetization, rtol=1e-3
+        )
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+def test_soft_magnetic_forces_apply_forces(n_elems):
+    dim = 3
+    mock_rod = make_mock_soft_magnetic_rod(n_elems)
+    magnetic_field_gradient = np.random.rand(dim, dim)
+    magnetic_field_gradient += magnetic_field_gradient.T
+    soft_magnetic_forcing = SoftMagneticForces(
+        external_magnetic_field=MockLinearMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            magnetic_field_gradient=magnetic_field_gradient,
+        ),
+        magnetic_susceptibility=np.array([0.5, 1.0, 4.0]),
+        rod_volume=mock_rod.volume,
+    )
+    soft_magnetic_forcing.apply_forces(rod=mock_rod, time=0.0)
+
+    # force on element is G^T m in lab frame, with the induced magnetization
+    magnetization_in_lab_frame = np.einsum(
+        "jik,jk->ik",
+        mock_rod.director_collection,
+        soft_magnetic_forcing.magnetization_collection,
+    )
+    element_forces = magnetic_field_gradient.T @ magnetization_in_lab_frame
+    correct_external_forces = np.zeros((dim, n_elems + 1))
+    correct_external_forces[:, :-1] += 0.5 * element_forces
+    correct_external_forces[:, 1:] += 0.5 * element_forces
+    np.testing.assert_allclose(
+        mock_rod.external_forces,
+        correct_external_forces,
+        rtol=1e-8,
+        atol=1e-12 * np.abs(element_forces).max(),
+    )
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+@pytest.mark.parametrize("is_uniform", [True, False])
+def test_soft_magnetic_forces_diagnostics(n_elems, is_uniform):
+    dim = 3
+    diagnostics_step_skip = 2
+    mock_rod = make_mock_soft_magnetic_rod(n_elems)
+    mock_rod.velocity_collection = np.random.rand(dim, n_elems + 1)
+    mock_rod.omega_collection = np.random.rand(dim, n_elems)
+    if is_uniform:
+        magnetic_field_object = ConstantMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            ramp_interval=1.0,
+            start_time=0.0,
+            end_time=8.0,
+        )
+    else:
+        magnetic_field_object = MockLinearMagneticField(
+            magnetic_field_amplitude=np.random.rand(dim),
+            magnetic_field_gradient=np.random.rand(dim, dim),
+        )
+    soft_magnetic_forcing_kwargs = dict(
+        external_magnetic_field=magnetic_field_object,
+        magnetic_susceptibility=np.array([0.5, 1.0, 4.0]),
+        rod_volume=mock_rod.volume,
+    )
+    soft_magnetic_forcing = SoftMagneticForces(
+        diagnostics_step_skip=diagnostics_step_skip, **soft_magnetic_forcing_kwargs
+    )
+    reference_rod = make_mock_soft_magnetic_rod(n_elems)
+    reference_rod.director_collection = mock_rod.director_collection
+    reference_rod.position_collection = mock_rod.position_collection
+    reference_soft_magnetic_forcing = SoftMagneticForces(**soft_magnetic_forcing_kwargs)
+
+    times = [1.0, 2.0, 3.0, 4.0, 5.0]
+    for time in times:
+        mock_rod.external_forces[...] = 0.0
+        mock_rod.external_torques[...] = 0.0
+        soft_magnetic_forcing.apply_forces(rod=mock_rod, time=time)
+        soft_magnetic_forcing.apply_torques(rod=mock_rod, time=time)
+        reference_rod.external_forces[...] = 0.0
+        reference_rod.external_torques[...] = 0.0
+        reference_soft_magnetic_forcing.apply_forces(rod=reference_rod, time=time)
+        reference_soft_magnetic_forcing.apply_torques(rod=reference_rod, time=time)
+        # diagnostics do not change the forces and torques
+        np.testing.assert_allclose(
+            mock_rod.external_forces, reference_rod.external_forces, atol=1e-12
+        )
+        np.testing.assert_allclose(
+            mock_rod.external_torques, reference_rod.external_torques, atol=1e-12
+        )
+
+    assert soft_magnetic_forcing.diagnostics["time"] == times[::diagnostics_step_skip]
+    # last time step is recorded
+    magnetization_in_lab_frame = np.einsum(
+        "jik,jk->ik",
+        mock_rod.director_collection,
+        soft_magnetic_forcing.magnetization_collection,
+    )
+    correct_zeeman_energy = -np.sum(
+        magnetization_in_lab_frame * soft_magnetic_forcing.magnetic_field_collection
+    )
+    correct_magnetic_power = np.sum(
+        mock_rod.external_torques * mock_rod.omega_collection
+    ) + np.sum(mock_rod.external_forces * mock_rod.velocity_collection)
+    np.testing.assert_allclose(
+        soft_magnetic_forcing.diagnostics["zeeman_energy"][-1],
+        correct_zeeman_energy,
+        rtol=1e-10,
+    )
+    np.testing.assert_allclose(
+        soft_magnetic_forcing.diagnostics["magnetic_power"][-1],
+        correct_magnetic_power,
+        rtol=1e-10,
+    )
+
+
+@pytest.mark.parametrize(
+    "invalid_kwargs, error_message",
+    [
+        (
+            dict(magnetic_susceptibility=np.ones((2,))),
+            "Invalid magnetic susceptibility! Should be either a float, a (3,) "
+            "array or an array of shape (3, num_rod_elements)",
+        ),
+        (
+            dict(magnetic_susceptibility=1.0, saturation_magnetization=0.0),
+            "Invalid saturation magnetization! Should be a positive float",
+        ),
+        (
+            dict(magnetic_susceptibility=1.0, saturation_law="tanh"),
+            "Invalid saturation law! Should be one of linear, langevin, frohlich",
+        ),
+        (
+            dict(magnetic_susceptibility=1.0, diagnostics_step_skip=-1),
+            "Invalid diagnostics step skip! Should be a non-negative integer",
+        ),
+    ],
+)
+def test_soft_magnetic_forces_invalid_init(invalid_kwargs, error_message):
+    with pytest.raises(ValueError) as exc_info:
+        _ = SoftMagneticForces(
+            external_magnetic_field=BaseMagneticField(),
+            rod_volume=np.ones((4,)),
+            **invalid_kwargs,
+        )
+    assert exc_info.value.args[0] == error_message
+
+
+def test_soft_magnetic_forces_set_magnetization():
+    soft_magnetic_forcing = SoftMagneticForces(
+        external_magnetic_field=BaseMagneticField(),
+        magnetic_susceptibility=1.0,
+        rod_volume=np.ones((4,)),
+    )
+    with pytest.raises(TypeError) as exc_info:
+        soft_magnetic_forcing.set_magnetization(magnetization_density=1.0)
+    assert (
+        exc_info.value.args[0]
+        == "SoftMagneticForces has induced magnetization, it can not be set"
+    )
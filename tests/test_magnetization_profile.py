@@ -0,0 +1,166 @@
+import numpy as np
+import pytest
+from magneto_pyelastica.magnetic_forces import compute_magnetization_collection
+from magneto_pyelastica.magnetization_profile import (
+    BaseMagnetizationProfile,
+    ConstantMagnetizationProfile,
+    DecayingMagnetizationProfile,
+    TabulatedMagnetizationProfile,
+)
+from elastica._rotations import _get_rotation_matrix
+from elastica.utils import Tolerance
+
+
+def test_base_magnetization_profile_is_not_static():
+    magnetization_profile = BaseMagnetizationProfile()
+    assert not magnetization_profile.is_static
+    assert magnetization_profile.compute_value(time=1.0) is None
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+def test_constant_magnetization_profile(n_elems):
+    dim = 3
+    director_collection = _get_rotation_matrix(1.0, np.random.rand(dim, n_elems))
+    magnetization_density = np.random.rand(n_elems)
+    magnetization_direction = np.random.rand(dim, n_elems)
+    magnetization_profile = ConstantMagnetizationProfile(
+        magnetization_density=magnetization_density,
+        magnetization_direction=magnetization_direction.copy(),
+        rod_director_collection=director_collection,
+    )
+    correct_magnetization = compute_magnetization_collection(
+        magnetization_density=magnetization_density,
+        magnetization_direction=magnetization_direction.copy(),
+        rod_volume=np.ones((n_elems,)),
+        rod_director_collection=director_collection,
+    )
+    magnetization = magnetization_profile.value(time=0.0)
+    np.testing.assert_allclose(
+        magnetization, correct_magnetization, atol=Tolerance.atol()
+    )
+    assert not magnetization.flags.writeable
+    # static profiles are evaluated only once
+    assert magnetization_profile.value(time=1.0) is magnetization
+    magnetization_profile.invalidate_cache()
+    assert magnetization_profile.value(time=1.0) is not magnetization
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+@pytest.mark.parametrize("time", [0.5, 1.0, 4.0])
+def test_decaying_magnetization_profile(n_elems, time):
+    dim = 3
+    director_collection = _get_rotation_matrix(1.0, np.random.rand(dim, n_elems))
+    magnetization_direction = np.random.rand(dim)
+    decay_time = np.random.rand(n_elems) + 0.5
+    start_time = 1.0
+    remanent_fraction = 0.2
+    magnetization_profile = DecayingMagnetizationProfile(
+        magnetization_density=2.0,
+        magnetization_direction=magnetization_direction.copy(),
+        rod_director_collection=director_collection,
+        decay_time=decay_time,
+        start_time=start_time,
+        remanent_fraction=remanent_fraction,
+    )
+    initial_magnetization = ConstantMagnetizationProfile(
+        magnetization_density=2.0,
+        magnetization_direction=magnetization_direction.copy(),
+        rod_director_collection=director_collection,
+    ).value()
+    factor = remanent_fraction + (1.0 - remanent_fraction) * np.exp(
+        -max(time - start_time, 0.0) / decay_time
+    )
+    magnetization = magnetization_profile.value(time=time)
+    np.testing.assert_allclose(
+        magnetization, initial_magnetization * factor, atol=Tolerance.atol()
+    )
+    # value is memoized while the time does not change
+    assert magnetization_profile.value(time=time) is magnetization
+    assert magnetization_profile.value(time=time + 1.0) is not magnetization
+
+
+@pytest.mark.parametrize("decay_time", [0.0, -1.0, np.ones((5,))])
+def test_decaying_magnetization_profile_invalid_init(decay_time):
+    n_elems = 4
+    director_collection = np.repeat(np.identity(3)[:, :, np.newaxis], n_elems, axis=2)
+    correct_error_message = (
+        "Invalid decay time! Should be either a positive float or "
+        "an array of shape (num_rod_elements,)"
+    )
+    with pytest.raises(ValueError) as exc_info:
+        _ = DecayingMagnetizationProfile(
+            magnetization_density=1.0,
+            magnetization_direction=np.ones((3,)),
+            rod_director_collection=director_collection,
+            decay_time=decay_time,
+        )
+    assert exc_info.value.args[0] == correct_error_message
+
+
+@pytest.mark.parametrize("n_elems", [2, 4, 16])
+def test_tabulated_magnetization_profile(n_elems):
+    dim = 3
+    sample_times = np.array([1.0, 2.0, 4.0])
+    magnetization_samples = np.random.rand(3, dim, n_elems)
+    magnetization_profile = TabulatedMagnetizationProfile(
+        magnetization_samples=magnetization_samples, sample_times=sample_times
+    )
+    # times outside of the samples are clamped
+    np.testing.assert_allclose(
+        magnetization_profile.value(time=0.0), magnetization_samples[0]
+    )
+    np.testing.assert_allclose(
+        magnetization_profile.value(time=5.0), magnetization_samples[2]
+    )
+    np.testing.assert_allclose(
+        magnetization_profile.value(time=1.5),
+        0.5 * (magnetization_samples[0] + magnetization_samples[1]),
+        atol=Tolerance.atol(),
+    )
+    np.testing.assert_allclose(
+        magnetization_profile.value(time=3.5),
+        0.25 * magnetization_samples[1] + 0.75 * magnetization_samples[2],
+        atol=Tolerance.atol(),
+    )
+
+
+@pytest.mark.parametrize(
+    "magnetization_samples, sample_times, error_message",
+    [
+        (
+            np.ones((1, 3, 4)),
+            np.array([0.0]),
+            "Invalid magnetization samples! Should be an array of shape "
+            "(num_samples, 3, num_rod_elements) with at least two samples",
+        ),
+        (
+            np.ones((2, 2, 4)),
+            np.array([0.0, 1.0]),
+            "Invalid magnetization samples! Should be an array of shape "
+            "(num_samples, 3, num_rod_elements) with at least two samples",
+        ),
+        (
+            np.ones((2, 3, 4)),
+            np.array([0.0, 1.0, 2.0]),
+            "Invalid sample times! Should have one time for each sample",
+        ),
+        (
+            np.ones((3, 3, 4)),
+            np.array([0.0, 1.0, 1.0]),
+            "Invalid sample times! Should be strictly increasing",
+        ),
+        (
+            np.ones((3, 3, 4)),
+            np.array([0.0, 2.0, 1.0]),
+            "Invalid sample times! Should be strictly increasing",
+        ),
+    ],
+)
+def test_tabulated_magnetization_profile_invalid_init(
+    magnetization_samples, sample_times, error_message
+):
+    with pytest.raises(ValueError) as exc_info:
+        _ = TabulatedMagnetizationProfile(
+            magnetization_samples=magnetization_samples, sample_times=sample_times
+        )
+    assert exc_info.value.args[0] == error_message
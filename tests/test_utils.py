@@ -1,7 +1,16 @@
 import numpy as np
 import pytest
 from magneto_pyelastica.utils import (
+    EXPONENTIAL_RAMP_RATE,
+    RAMP_PROFILES,
+    get_ramp_profile_id,
     compute_ramp_factor,
+    compute_ramp_factor_kernel,
+    compute_ramp_factors,
+    compute_ramp_factors_kernel,
+    _compute_profiled_ramp_factor,
+    trilinear_interpolation,
+    trilinear_interpolation_gradient,
 )
 from elastica.utils import Tolerance
 
@@ -25,3 +34,269 @@ def test_compute_ramp_factor(time):
         correct_factor = max(0.0, -1 / ramp_interval * (time - end_time) + 1.0)
 
     np.testing.assert_allclose(factor, correct_factor, atol=Tolerance.atol())
+
+
+@pytest.mark.parametrize("time", [0.0, 1.0, 2.0, 2.5, 4.0, 5.5, 8.0])
+def test_compute_ramp_factor_kernel(time):
+    ramp_interval = 1.0
+    start_time = 2.0
+    end_time = 5.0
+
+    factor = compute_ramp_factor_kernel(time, ramp_interval, start_time, end_time)
+    correct_factor = compute_ramp_factor(
+        time=time, ramp_interval=ramp_interval, start_time=start_time, end_time=end_time
+    )
+
+    assert factor == correct_factor
+
+
+@pytest.mark.parametrize("ramp_interval", [0.0, 1.0, 4.0])
+def test_compute_ramp_factors(ramp_interval):
+    start_time = 2.0
+    end_time = 5.0
+    times = np.linspace(0.0, 12.0, 97)
+
+    correct_factors = np.array(
+        [
+            compute_ramp_factor(
+                time=time,
+                ramp_interval=ramp_interval,
+                start_time=start_time,
+                end_time=end_time,
+            )
+            for time in times
+        ]
+    )
+    factors = compute_ramp_factors(
+        times=times,
+        ramp_interval=ramp_interval,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    compiled_factors = compute_ramp_factors_kernel(
+        times, ramp_interval, start_time, end_time
+    )
+
+    np.testing.assert_allclose(factors, correct_factors, atol=Tolerance.atol())
+    np.testing.assert_allclose(compiled_factors, correct_factors, atol=Tolerance.atol())
+
+
+@pytest.mark.parametrize("ramp_profile", list(RAMP_PROFILES))
+def test_compute_ramp_factor_profiles(ramp_profile):
+    ramp_interval = 1.0
+    start_time = 2.0
+    end_time = 5.0
+    times = np.linspace(0.0, 8.0, 801)
+
+    factors = compute_ramp_factors(
+        times=times,
+        ramp_interval=ramp_interval,
+        start_time=start_time,
+        end_time=end_time,
+        ramp_profile=ramp_profile,
+    )
+    compiled_factors = compute_ramp_factors_kernel(
+        times, ramp_interval, start_time, end_time, get_ramp_profile_id(ramp_profile)
+    )
+    scalar_factors = np.array(
+        [
+            compute_ramp_factor(
+                time=time,
+                ramp_interval=ramp_interval,
+                start_time=start_time,
+                end_time=end_time,
+                ramp_profile=ramp_profile,
+            )
+            for time in times
+        ]
+    )
+    compiled_scalar_factors = np.array(
+        [
+            compute_ramp_factor_kernel(
+                time,
+                ramp_interval,
+                start_time,
+                end_time,
+                get_ramp_profile_id(ramp_profile),
+            )
+            for time in times
+        ]
+    )
+
+    np.testing.assert_allclose(compiled_factors, factors, atol=Tolerance.atol())
+    np.testing.assert_allclose(scalar_factors, factors, atol=Tolerance.atol())
+    np.testing.assert_allclose(compiled_scalar_factors, factors, atol=Tolerance.atol())
+    # field is off before start time, on after ramp and off after ramping down
+    np.testing.assert_allclose(factors[times <= start_time], 0.0)
+    np.testing.assert_allclose(
+        factors[(times >= start_time + ramp_interval) & (times <= end_time)],
+        1.0,
+        atol=Tolerance.atol(),
+    )
+    np.testing.assert_allclose(
+        factors[times > end_time + ramp_interval], 0.0, atol=Tolerance.atol()
+    )
+    assert np.all(factors >= 0.0) and np.all(factors <= 1.0)
+    # ramp up is monotonic
+    ramp_up_factors = factors[times <= end_time]
+    assert np.all(np.diff(ramp_up_factors) >= 0.0)
+
+
+@pytest.mark.parametrize("ramp_profile", ["smoothstep", "smootherstep", "cosine"])
+def test_compute_ramp_factor_smooth_profiles(ramp_profile):
+    # smooth profiles do not have a kink at the ends of the ramp interval
+    ramp_interval = 1.0
+    start_time = 2.0
+    end_time = 5.0
+    step = 1e-4
+    for time in [start_time, start_time + ramp_interval]:
+        factors = compute_ramp_factors(
+            times=np.array([time - step, time, time + step]),
+            ramp_interval=ramp_interval,
+            start_time=start_time,
+            end_time=end_time,
+            ramp_profile=ramp_profile,
+        )
+        left_slope = (factors[1] - factors[0]) / step
+        right_slope = (factors[2] - factors[1]) / step
+        np.testing.assert_allclose(left_slope, right_slope, atol=1e-2)
+
+
+@pytest.mark.parametrize("end_time", [5.0, 2.5, 1.0])
+def test_profiled_ramp_factor_matches_linear_ramp(end_time):
+    # end time within the ramp interval switches to the turning off ramp before
+    # the field is fully on
+    ramp_interval = 1.0
+    start_time = 2.0
+    times = np.linspace(0.0, 8.0, 801)
+
+    correct_factors = np.array(
+        [
+            compute_ramp_factor(
+                time=time,
+                ramp_interval=ramp_interval,
+                start_time=start_time,
+                end_time=end_time,
+            )
+            for time in times
+        ]
+    )
+    factors = _compute_profiled_ramp_factor(
+        times, ramp_interval, start_time, end_time, get_ramp_profile_id("linear")
+    )
+    scalar_factors = np.array(
+        [
+            _compute_profiled_ramp_factor(
+                time,
+                ramp_interval,
+                start_time,
+                end_time,
+                get_ramp_profile_id("linear"),
+            )
+            for time in times
+        ]
+    )
+
+    np.testing.assert_array_equal(factors, correct_factors)
+    np.testing.assert_array_equal(scalar_factors, correct_factors)
+
+
+@pytest.mark.parametrize("ramp_profile", list(RAMP_PROFILES))
+def test_compute_ramp_factor_profiles_with_short_window(ramp_profile):
+    # profiles map the linear ramp, also when end time is within the ramp interval
+    ramp_interval = 1.0
+    start_time = 2.0
+    end_time = 2.5
+    times = np.linspace(0.0, 8.0, 801)
+
+    linear_factors = compute_ramp_factors(
+        times=times,
+        ramp_interval=ramp_interval,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    factors = compute_ramp_factors(
+        times=times,
+        ramp_interval=ramp_interval,
+        start_time=start_time,
+        end_time=end_time,
+        ramp_profile=ramp_profile,
+    )
+    profile_functions = {
+        "linear": lambda ramp: ramp,
+        "smoothstep": lambda ramp: ramp**2 * (3.0 - 2.0 * ramp),
+        "smootherstep": lambda ramp: ramp**3 * (10.0 - 15.0 * ramp + 6.0 * ramp**2),
+        "cosine": lambda ramp: 0.5 - 0.5 * np.cos(np.pi * ramp),
+        "exponential": lambda ramp: (1.0 - np.exp(-EXPONENTIAL_RAMP_RATE * ramp))
+        / (1.0 - np.exp(-EXPONENTIAL_RAMP_RATE)),
+    }
+    correct_factors = profile_functions[ramp_profile](linear_factors)
+
+    np.testing.assert_allclose(factors, correct_factors, atol=1e-12)
+    np.testing.assert_allclose(factors[times > end_time + ramp_interval], 0.0)
+
+
+def test_invalid_ramp_profile():
+    with pytest.raises(ValueError) as excinfo:
+        get_ramp_profile_id("quadratic")
+    assert "Invalid ramp profile!" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("n_points", [1, 8, 32])
+def test_trilinear_interpolation_of_linear_field(n_points):
+    dim = 3
+    grid_shape = (4, 5, 6)
+    grid_origin = np.random.rand(dim)
+    grid_spacing = np.array([0.5, 0.25, 0.2])
+    field_offset = np.random.rand(dim)
+    field_gradient = np.random.rand(dim, dim)
+    grid_points = np.stack(
+        np.meshgrid(
+            *[
+                grid_origin[i] + grid_spacing[i] * np.arange(grid_shape[i])
+                for i in range(3)
+            ],
+            indexing="ij",
+        ),
+        axis=-1,
+    )
+    # linear field is reproduced exactly by trilinear interpolation
+    field_grid = field_offset + grid_points @ field_gradient.T
+    positions = grid_origin.reshape(dim, 1) + np.random.rand(dim, n_points) * (
+        grid_spacing * (np.array(grid_shape) - 1)
+    ).reshape(dim, 1)
+
+    field = trilinear_interpolation(field_grid, grid_origin, grid_spacing, positions)
+    np.testing.assert_allclose(
+        field, field_offset.reshape(dim, 1) + field_gradient @ positions, atol=1e-12
+    )
+    field_jacobian = trilinear_interpolation_gradient(
+        field_grid, grid_origin, grid_spacing, positions
+    )
+    np.testing.assert_allclose(
+        field_jacobian,
+        field_gradient.reshape(dim, dim, 1) * np.ones((n_points,)),
+        atol=1e-10,
+    )
+
+
+def test_trilinear_interpolation_outside_of_grid():
+    # field F = (x, y, z) on a 3^3 grid with unit spacing
+    grid_points = np.stack(
+        np.meshgrid(*[np.arange(3.0)] * 3, indexing="ij"),
+        axis=-1,
+    )
+    positions = np.array([[5.0, 1.0, -2.0], [1.0, 0.5, 1.0], [1.5, 4.0, 0.5]])
+
+    field = trilinear_interpolation(grid_points, np.zeros(3), 1.0, positions)
+    np.testing.assert_allclose(field, np.clip(positions, 0.0, 2.0), atol=1e-12)
+    # field is constant along the clamped directions
+    field_jacobian = trilinear_interpolation_gradient(
+        grid_points, np.zeros(3), 1.0, positions
+    )
+    is_inside = (positions >= 0.0) & (positions <= 2.0)
+    np.testing.assert_allclose(
+        field_jacobian,
+        np.eye(3).reshape(3, 3, 1) * is_inside.reshape(1, 3, -1),
+        atol=1e-12,
+    )